@@ -18,7 +18,7 @@ from ...util import file_func
 
 from . import cubes_olap_srv_test_dialog
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 0, 2)
 
 
 class iqCubesOLAPServer(cubes_olap_server_proto.iqCubesOLAPServerProto, object.iqObject):
@@ -147,6 +147,53 @@ class iqCubesOLAPServer(cubes_olap_server_proto.iqCubesOLAPServerProto, object.i
         """
         return self.getAttribute('allow_cors_origin')
 
+    def getCacheTTL(self):
+        """
+        Get response cache time to live in seconds.
+        """
+        return self.getAttribute('cache_ttl')
+
+    def getCacheSize(self):
+        """
+        Get response cache maximum entry number.
+        """
+        return self.getAttribute('cache_size')
+
+    def getVersionSQL(self):
+        """
+        Get cube source table version query.
+        The table name is substituted for %(table_name)s.
+        """
+        return self.getAttribute('version_sql')
+
+    def getCubeSourceVersion(self, cube_name):
+        """
+        Get cube source table version.
+        The version query is used if defined, otherwise PostgreSQL table statistics.
+        For other databases without the version query the version is not defined
+        and the response cache expires only by TTL.
+
+        :param cube_name: Cube name.
+        :return: Version value or None if not defined.
+        """
+        cube = self.findCube(cube_name)
+        db = self.getDB()
+        if cube is None or db is None:
+            return None
+
+        table_name = cube.getTableName()
+        version_sql = self.getVersionSQL()
+        if version_sql:
+            sql = version_sql % dict(table_name=table_name)
+        elif db.getDialect() == 'postgresql':
+            sql = 'SELECT n_tup_ins, n_tup_upd, n_tup_del FROM pg_stat_user_tables WHERE relname = \'%s\'' % table_name
+        else:
+            return None
+        records = db.executeSQL(sql, first_record=True)
+        if records and records[0]:
+            return tuple(records[0].values())
+        return None
+
     def getExec(self):
         """
         OLAP server startup file.
@@ -89,6 +89,7 @@ import subprocess
 
 from . import olap_server_interface
 from . import pivot_dataframe_manager
+from . import olap_client
 
 from ...util import file_func
 from ...util import log_func
@@ -100,7 +101,7 @@ from ...util import global_func
 
 from ..virtual_spreadsheet import v_spreadsheet
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 0, 3)
 
 DEFAULT_SLICER_EXEC = 'slicer'
 ALTER_SLICER_EXEC = file_func.getNormalPath(os.path.join(file_func.getHomePath(),
@@ -144,6 +145,9 @@ class iqCubesOLAPServerProto(olap_server_interface.iqOLAPServerInterface,
         # OLAP server run sub process object
         self._server_subprocess = None
 
+        # OLAP server HTTP client
+        self._olap_client = None
+
     def getExec(self):
         """
         OLAP server startup file.
@@ -230,6 +234,10 @@ class iqCubesOLAPServerProto(olap_server_interface.iqOLAPServerInterface,
 
         :return: True/False.
         """
+        if self._olap_client is not None:
+            self._olap_client.close()
+            self._olap_client.invalidate()
+
         if self._server_subprocess is not None:
             self._server_subprocess.terminate()
             self._server_subprocess.kill()
@@ -333,7 +341,58 @@ class iqCubesOLAPServerProto(olap_server_interface.iqOLAPServerInterface,
         """
         url = self._getRequestURL(request_url) if not request_url.startswith(FULL_URL_PREFIX) else request_url
         log_func.debug(u'Specified JSON by URL <%s>' % url)
-        return json_func.getJSONAsDictByURL(url)
+        return self.getOLAPClient().getJSON(url)
+
+    def getOLAPClient(self):
+        """
+        Get OLAP server HTTP client object.
+        The client keeps the connection to the server and caches responses.
+        Response data must not be modified.
+        """
+        if self._olap_client is None:
+            self._olap_client = olap_client.iqOLAPServerClient(cache_ttl=self.getCacheTTL(),
+                                                               cache_size=self.getCacheSize(),
+                                                               get_source_version=self.getCubeSourceVersion)
+        return self._olap_client
+
+    def getResponseMetrics(self):
+        """
+        Get OLAP server request latency and cache hit rate metrics.
+
+        :return: Metrics dictionary.
+        """
+        return self.getOLAPClient().getMetrics()
+
+    def invalidateResponseCache(self, cube_name=None):
+        """
+        Invalidate OLAP server response cache.
+
+        :param cube_name: Cube name. If None then all cache is cleared.
+        """
+        if self._olap_client is not None:
+            self._olap_client.invalidate(cube_name)
+
+    def getCubeSourceVersion(self, cube_name):
+        """
+        Get cube source table version.
+        Cached responses of the cube are invalidated when the version is changed.
+
+        :param cube_name: Cube name.
+        :return: Any comparable value or None if not defined.
+        """
+        return None
+
+    def getCacheTTL(self):
+        """
+        Get response cache time to live in seconds.
+        """
+        return olap_client.DEFAULT_CACHE_TTL
+
+    def getCacheSize(self):
+        """
+        Get response cache maximum entry number.
+        """
+        return olap_client.DEFAULT_CACHE_SIZE
 
     def getDBPsp(self):
         """
@@ -768,11 +827,10 @@ class iqCubesOLAPServerProto(olap_server_interface.iqOLAPServerInterface,
         row_dimension_list = list(row_dimension) if row_dimension else list()
         col_dimension_list = list(col_dimension) if col_dimension else list()
         col_names = row_dimension_list + col_dimension_list + aggregates
-        rows = [[cell.get(col_name, None) for col_name in col_names] for cell in cells]
         data_frame = None
         try:
             # Create table
-            data_frame = self.createDataFrame(rows, column_names=col_names)
+            data_frame = self.createDataFrameFromCells(cells, column_names=col_names)
             # Setting dimension indices
             data_frame = self.setPivotDimensions(row_dimension=row_dimension, col_dimension=col_dimension)
             # Replace NaN with 0
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OLAP server HTTP client.
+
+The client keeps persistent (keep-alive) connections to the OLAP server
+and caches responses by normalized request URL.
+Cache entries expire by TTL or when the cube source table version is changed.
+The client may be shared by threads: every request uses its own connection
+from the connection pool, so one slow request does not block other requests.
+"""
+
+import json
+import time
+import threading
+import collections
+import http.client
+import urllib.parse
+
+from ...util import log_func
+
+__version__ = (0, 0, 0, 2)
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_CACHE_TTL = 60
+DEFAULT_CACHE_SIZE = 256
+
+# Maximum idle connection number to one network location
+MAX_IDLE_CONNECTIONS = 8
+
+# Minimum interval (in seconds) between cube source version checks
+DEFAULT_VERSION_CHECK_INTERVAL = 5
+
+# Request parameters that do not change the response data
+IGNORE_URL_PARAMS = ('prettyprint', )
+
+CUBE_URL_PREFIX = 'cube'
+
+# Cache entry
+iqOLAPCacheItem = collections.namedtuple('iqOLAPCacheItem', ('data', 'timestamp', 'cube', 'version'))
+
+
+class iqOLAPServerClient(object):
+    """
+    OLAP server HTTP client with response cache.
+    """
+    def __init__(self, timeout=DEFAULT_TIMEOUT,
+                 cache_ttl=DEFAULT_CACHE_TTL, cache_size=DEFAULT_CACHE_SIZE,
+                 get_source_version=None, version_check_interval=DEFAULT_VERSION_CHECK_INTERVAL):
+        """
+        Constructor.
+
+        :param timeout: Connection timeout in seconds.
+        :param cache_ttl: Cache entry time to live in seconds. If 0 then the cache is off.
+        :param cache_size: Maximum cache entry number.
+        :param get_source_version: Function of getting cube source table version by cube name.
+            If the version is changed then all cube cache entries are invalidated.
+        :param version_check_interval: Minimum interval between cube source version checks in seconds.
+        """
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.get_source_version = get_source_version
+        self.version_check_interval = version_check_interval
+
+        # The lock protects the cache, statistics and connection pool only.
+        # Source version queries and HTTP requests are made without the lock
+        self._lock = threading.RLock()
+        # Idle persistent connections by network location: {network location: [connection, ...]}
+        self._connections = dict()
+        # Response cache by normalized URL
+        self._cache = collections.OrderedDict()
+        # Cube source versions: {cube name: (version, check timestamp)}
+        self._source_versions = dict()
+
+        self.resetMetrics()
+
+    def resetMetrics(self):
+        """
+        Reset client metrics.
+        """
+        with self._lock:
+            self._request_count = 0
+            self._hit_count = 0
+            self._miss_count = 0
+            self._error_count = 0
+            self._connect_count = 0
+            self._total_latency = 0.0
+            self._max_latency = 0.0
+
+    def getMetrics(self):
+        """
+        Get client metrics.
+
+        :return: Metrics dictionary.
+        """
+        with self._lock:
+            server_count = self._miss_count - self._error_count
+            return dict(request_count=self._request_count,
+                        hit_count=self._hit_count,
+                        miss_count=self._miss_count,
+                        error_count=self._error_count,
+                        connect_count=self._connect_count,
+                        hit_rate=float(self._hit_count) / self._request_count if self._request_count else 0.0,
+                        avg_latency=self._total_latency / server_count if server_count > 0 else 0.0,
+                        max_latency=self._max_latency,
+                        cache_size=len(self._cache))
+
+    def normURL(self, url):
+        """
+        Normalize request URL.
+        Request parameters are sorted and parameters that
+        do not change the response are removed.
+
+        :param url: Request URL.
+        :return: Tuple (network location, normalized path with query).
+        """
+        split_url = urllib.parse.urlsplit(url)
+        params = [(name, value) for name, value in urllib.parse.parse_qsl(split_url.query, keep_blank_values=True)
+                  if name not in IGNORE_URL_PARAMS]
+        params.sort()
+        path = '/' + split_url.path.strip('/')
+        if params:
+            path += '?' + urllib.parse.urlencode(params, safe=':|,')
+        return split_url.netloc, path
+
+    def getCubeName(self, path):
+        """
+        Get cube name from request path.
+
+        :param path: Normalized request path.
+        :return: Cube name or None if it is not cube request.
+        """
+        path_items = path.split('?')[0].strip('/').split('/')
+        if len(path_items) > 1 and path_items[0] == CUBE_URL_PREFIX:
+            return path_items[1]
+        return None
+
+    def _getSourceVersion(self, cube_name):
+        """
+        Get cube source table version.
+        Version is requested not often than version check interval.
+        Other threads use the previous version while the version is requested.
+
+        :param cube_name: Cube name.
+        """
+        if self.get_source_version is None or cube_name is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            version, check_time = self._source_versions.get(cube_name, (None, 0.0))
+            if now - check_time < self.version_check_interval:
+                return version
+            self._source_versions[cube_name] = (version, now)
+
+        try:
+            new_version = self.get_source_version(cube_name)
+        except:
+            log_func.fatal(u'Error get OLAP cube <%s> source version' % cube_name)
+            new_version = None
+
+        with self._lock:
+            if new_version != version:
+                self.invalidate(cube_name)
+            self._source_versions[cube_name] = (new_version, now)
+        return new_version
+
+    def invalidate(self, cube_name=None):
+        """
+        Invalidate cache entries.
+
+        :param cube_name: Cube name. If None then all cache is cleared.
+        """
+        with self._lock:
+            if cube_name is None:
+                self._cache.clear()
+                self._source_versions.clear()
+            else:
+                for key in [key for key, item in self._cache.items() if item.cube == cube_name]:
+                    del self._cache[key]
+
+    def _checkoutConnection(self, netloc):
+        """
+        Take idle persistent connection from the pool or create new connection.
+        The connection is used by one thread until it is returned to the pool.
+
+        :param netloc: Network location (host:port).
+        """
+        with self._lock:
+            idle_connections = self._connections.get(netloc)
+            if idle_connections:
+                return idle_connections.pop()
+            self._connect_count += 1
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _checkinConnection(self, netloc, connection):
+        """
+        Return persistent connection to the pool.
+
+        :param netloc: Network location (host:port).
+        :param connection: Connection object.
+        """
+        with self._lock:
+            idle_connections = self._connections.setdefault(netloc, list())
+            if len(idle_connections) < MAX_IDLE_CONNECTIONS:
+                idle_connections.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        with self._lock:
+            connections = self._connections
+            self._connections = dict()
+        for idle_connections in connections.values():
+            for connection in idle_connections:
+                connection.close()
+
+    def _request(self, netloc, path):
+        """
+        Make GET request through persistent connection.
+        If the connection was closed by the server then the request is repeated once.
+
+        :param netloc: Network location (host:port).
+        :param path: Request path.
+        :return: Response body.
+        """
+        for i_try in range(2):
+            connection = self._checkoutConnection(netloc)
+            try:
+                connection.request('GET', path, headers={'Connection': 'keep-alive'})
+                response = connection.getresponse()
+                body = response.read()
+                if response.will_close:
+                    connection.close()
+                else:
+                    self._checkinConnection(netloc, connection)
+                if response.status != http.client.OK:
+                    raise http.client.HTTPException(u'HTTP status %d' % response.status)
+                return body
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if i_try:
+                    raise
+            except:
+                connection.close()
+                raise
+
+    def getJSON(self, url, use_cache=True):
+        """
+        Get JSON response as python dictionary.
+
+        :param url: Full request URL.
+        :param use_cache: Use response cache?
+        :return: Python dictionary or None if error.
+        """
+        netloc, path = self.normURL(url)
+        key = netloc + path
+        cube_name = self.getCubeName(path)
+
+        use_cache = use_cache and self.cache_ttl > 0
+        version = self._getSourceVersion(cube_name) if use_cache else None
+        with self._lock:
+            self._request_count += 1
+            if use_cache:
+                item = self._cache.get(key)
+                if item is not None:
+                    if time.time() - item.timestamp < self.cache_ttl and item.version == version:
+                        self._cache.move_to_end(key)
+                        self._hit_count += 1
+                        return item.data
+                    del self._cache[key]
+            self._miss_count += 1
+
+        start_time = time.time()
+        try:
+            data = json.loads(self._request(netloc, path))
+        except:
+            with self._lock:
+                self._error_count += 1
+            log_func.fatal(u'Error get JSON data by URL <%s>' % url)
+            return None
+        latency = time.time() - start_time
+
+        with self._lock:
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+            if use_cache:
+                self._cache[key] = iqOLAPCacheItem(data, time.time(), cube_name, version)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return data
@@ -11,7 +11,7 @@ import pandas
 from ...util import log_func
 from ...util import lang_func
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 1, 2)
 
 _ = lang_func.getTranslation().gettext
 
@@ -20,6 +20,9 @@ AGGREGATE_FUNCTION_NAMES = ('sum', 'min_value', 'max_value', 'mean')
 TOTAL_LABEL = _(u'TOTAL:')
 TOTAL_GROUP_LABEL = _(u'Total')
 
+# Aggregate functions which totals can be calculated from totals of the lower level
+ROLLUP_FUNCTION_NAMES = {'sum': 'sum', 'min_value': 'min', 'max_value': 'max'}
+
 
 class iqPivotDataFrameManager(object):
     """
@@ -50,11 +53,27 @@ class iqPivotDataFrameManager(object):
         self._cur_pivot_dataframe = None
 
         try:
-            data_rows = [pandas.Series(row) for row in rows]
-            self._cur_pivot_dataframe = pandas.DataFrame(data_rows)
-            # Set column names
-            if data_rows:
-                self._cur_pivot_dataframe.columns = column_names
+            self._cur_pivot_dataframe = pandas.DataFrame.from_records(rows, columns=column_names)
+        except:
+            log_func.fatal(u'Error create pivot table dataframe. Columns: %s' % str(column_names))
+
+        return self._cur_pivot_dataframe
+
+    def createDataFrameFromCells(self, cells, column_names):
+        """
+        Create pivot table dataframe from OLAP server cells.
+        The dataframe is built by columns in one step.
+
+        :param cells: Cell dictionary list.
+        :param column_names: Column names.
+        :return: pandas.DataFrame.
+        """
+        self._cur_pivot_dataframe = None
+
+        try:
+            columns = dict([(column_name, [cell.get(column_name, None) for cell in cells])
+                            for column_name in column_names])
+            self._cur_pivot_dataframe = pandas.DataFrame(columns, columns=column_names)
         except:
             log_func.fatal(u'Error create pivot table dataframe. Columns: %s' % str(column_names))
 
@@ -174,9 +193,54 @@ class iqPivotDataFrameManager(object):
             dataframe.loc[row_idx] = total
         return dataframe
 
+    def getRollupTotals(self, dataframe, aggregate_function_name='sum'):
+        """
+        Calculation of group totals for every row level and the grand total in one pass.
+        Every level is aggregated from the totals of the next (lower) level,
+        so the detail data is scanned once.
+
+        :param dataframe: Pivot table pandas.DataFrame object.
+        :param aggregate_function_name: The name of the aggregation function.
+        :return: Tuple (group total dataframe list from upper to lower level, grand total pandas.Series).
+        """
+        levels = list(dataframe.index.names)
+        function_name = ROLLUP_FUNCTION_NAMES.get(aggregate_function_name, None)
+
+        group_totals = list()
+        totals = dataframe
+        for i_level in range(len(levels) - 1, 0, -1):
+            if function_name:
+                totals = totals.groupby(level=levels[:i_level], sort=False).agg(function_name)
+            else:
+                # Not decomposable function is calculated by the detail data
+                totals = dataframe.groupby(level=levels[:i_level], sort=False).agg(aggregate_function_name)
+            group_totals.insert(0, totals)
+
+        if function_name:
+            grand_total = totals.agg(function_name)
+        else:
+            grand_total = dataframe.agg(aggregate_function_name)
+        return group_totals, grand_total
+
+    def _getGroupTotalIndex(self, totals, levels):
+        """
+        Get group total index aligned to all row levels.
+        Rolled up levels are marked by TOTAL_GROUP_LABEL.
+
+        :param totals: Group totals pandas.DataFrame object.
+        :param levels: Row level names.
+        :return: pandas.MultiIndex object.
+        """
+        level_count = totals.index.nlevels
+        tail = (TOTAL_GROUP_LABEL, ) + (u'', ) * (len(levels) - level_count - 1)
+        index = [(idx if isinstance(idx, tuple) else (idx, )) + tail for idx in totals.index]
+        return pandas.MultiIndex.from_tuples(index, names=levels)
+
     def totalGroupPivotTable(self, dataframe):
         """
         Calculation of totals by groups of the pivot table by rows.
+        Totals are grouped by all row levels except the last one.
+        Use rollupPivotTable to get totals of every group level and the grand total.
 
         :param dataframe: Pivot table pandas.DataFrame object.
         :return: pandas.DataFrame object.
@@ -185,16 +249,44 @@ class iqPivotDataFrameManager(object):
             levels = dataframe.index.names
             log_func.debug(u'Levels %s' % str(levels))
 
-            dataframe = pandas.concat([
-                dataframe.assign(
+            if len(levels) > 1:
+                # Group totals are the same for every level, so they are calculated once
+                dataframe = dataframe.assign(
                     **{x: '' for x in levels}
-                ).groupby(level=levels[:-1]).sum() for i_level in range(len(levels)-1)
-            ])
-            # Remove duplicate entries
-            dataframe = dataframe.drop_duplicates()
+                ).groupby(level=levels[:-1]).sum()
+                # Remove duplicate entries
+                dataframe = dataframe.drop_duplicates()
 
             log_func.debug(u'Calculation of group totals by values:\n%s' % str(dataframe))
         except:
             log_func.fatal(u'Error calculating totals for pivot table groups :\n%s\n' % str(dataframe))
 
         return dataframe
+
+    def rollupPivotTable(self, dataframe, aggregate_function_name='sum'):
+        """
+        Append group totals and the grand total rows to the pivot table.
+        Group total rows follow the detail rows from upper to lower level.
+
+        :param dataframe: Pivot table pandas.DataFrame object.
+        :param aggregate_function_name: The name of the aggregation function.
+        :return: pandas.DataFrame object.
+        """
+        try:
+            levels = list(dataframe.index.names)
+            group_totals, grand_total = self.getRollupTotals(dataframe, aggregate_function_name)
+
+            if group_totals:
+                for totals in group_totals:
+                    totals.index = self._getGroupTotalIndex(totals, levels)
+                dataframe = pandas.concat([dataframe] + group_totals)
+
+            row_idx = [u''] * len(levels)
+            row_idx[0] = TOTAL_LABEL
+            row_idx = tuple(row_idx) if len(row_idx) > 1 else row_idx[0]
+            # Assign by position: a Series is not aligned to a new row of not sorted MultiIndex
+            dataframe.loc[row_idx, :] = grand_total[dataframe.columns].values
+        except:
+            log_func.fatal(u'Error calculating rollup totals for pivot table :\n%s\n' % str(dataframe))
+
+        return dataframe
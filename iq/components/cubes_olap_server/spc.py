@@ -12,6 +12,7 @@ from ...editor import property_editor_id
 from ... import passport
 
 from . import cubes_olap_server_proto
+from . import olap_client
 
 from .. import data_engine
 
@@ -71,6 +72,9 @@ CUBESOLAPSERVER_SPC = {
     'reload': True,
     'prettyprint': False,
     'allow_cors_origin': '*',
+    'cache_ttl': olap_client.DEFAULT_CACHE_TTL,
+    'cache_size': olap_client.DEFAULT_CACHE_SIZE,
+    'version_sql': None,
 
     '__package__': u'OLAP',
     '__icon__': 'fatcow/server_components',
@@ -98,6 +102,9 @@ CUBESOLAPSERVER_SPC = {
         'reload': property_editor_id.CHECKBOX_EDITOR,
         'prettyprint': property_editor_id.CHECKBOX_EDITOR,
         'allow_cors_origin': property_editor_id.STRING_EDITOR,
+        'cache_ttl': property_editor_id.INTEGER_EDITOR,
+        'cache_size': property_editor_id.INTEGER_EDITOR,
+        'version_sql': property_editor_id.TEXT_EDITOR,
     },
     '__help__': {
         'db': u'Database object passport for OLAP cubes storage',
@@ -113,6 +120,9 @@ CUBESOLAPSERVER_SPC = {
         'reload': u'',
         'prettyprint': u'Demonstration purposes ',
         'allow_cors_origin': u'Resource sharing header. Other related headers are also added if this option is present',
+        'cache_ttl': u'Response cache time to live in seconds. 0 - cache is off',
+        'cache_size': u'Response cache maximum entry number',
+        'version_sql': u'Cube source table version query. For example: SELECT MAX(dt) FROM %(table_name)s. If not defined then PostgreSQL table statistics are used, for other databases the cache expires only by TTL',
     },
 }
 
@@ -14,8 +14,9 @@ import sqlalchemy.ext.declarative
 import sqlalchemy.orm
 
 from ...util import log_func
+from ...util import instrument_func
 
-__version__ = (0, 0, 1, 2)
+__version__ = (0, 0, 1, 3)
 
 Base = sqlalchemy.ext.declarative.declarative_base()
 
@@ -272,6 +273,7 @@ class iqDBEngineManager(object):
 
         return is_connect
 
+    @instrument_func.timed('db_engine.executeSQL')
     def executeSQL(self, sql_query, first_record=False):
         """
         Execute SQL expression.
@@ -299,6 +301,7 @@ class iqDBEngineManager(object):
                     else:
                         records = result.fetchall()
                     recordset = [{name: float(value) if isinstance(value, decimal.Decimal) else value for name, value in dict(rec).items()} for rec in records]
+                    instrument_func.count('db_engine.executeSQL.records', len(recordset))
                 else:
                     log_func.info(u'Query <%s> not return recordset' % sql_query)
                 transaction.commit()
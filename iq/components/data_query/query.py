@@ -7,10 +7,11 @@ Data query component.
 
 from ...util import log_func
 from ...util import txtgen_func
+from ...util import instrument_func
 
 from ..data_model import data_object
 
-__version__ = (0, 0, 2, 1)
+__version__ = (0, 0, 2, 2)
 
 
 class iqDBQuery(data_object.iqDataObjectProto):
@@ -41,6 +42,7 @@ class iqDBQuery(data_object.iqDataObjectProto):
         log_func.error(u'Not define getSQLText method in <%s>' % self.__class__.__name__)
         return None
 
+    @instrument_func.timed('data_query.execute')
     def execute(self, **variables):
         """
         Execute query.
@@ -54,7 +56,8 @@ class iqDBQuery(data_object.iqDataObjectProto):
         if not db or not sql_txt:
             return None
 
-        full_sql_txt = txtgen_func.generate(sql_txt, variables)
+        with instrument_func.timer('data_query.generateSQL'):
+            full_sql_txt = txtgen_func.generate(sql_txt, variables)
         log_func.debug(u'Execute SQL:\n%s' % full_sql_txt)
         try:
             if full_sql_txt:
@@ -11,7 +11,7 @@ from . import spc
 from . import wide_history
 from ...util import exec_func
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 0, 2)
 
 
 class iqDataWideHistory(wide_history.iqWideHistoryManager, data_navigator.COMPONENT):
@@ -36,6 +36,13 @@ class iqDataWideHistory(wide_history.iqWideHistoryManager, data_navigator.COMPON
         """
         return self.getAttribute('dt_column')
 
+    def getCacheSize(self):
+        """
+        Get range cache memory budget in megabytes.
+        If 0 then the range cache is not used.
+        """
+        return self.getAttribute('cache_size')
+
     def getFilter(self):
         """
         Additional record filter.
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Wide history columnar range cache.
+
+Cached records are stored by columns as NumPy arrays sorted by time.
+The cache keeps the list of covered time ranges. Only the uncovered parts
+of the requested range are read from the database and merged into the arrays.
+Range and point lookups are made by binary search.
+Least recently used ranges are evicted when the memory budget is exceeded.
+"""
+
+import datetime
+import threading
+
+import numpy
+
+__version__ = (0, 0, 0, 1)
+
+# Default cache memory budget in megabytes
+DEFAULT_CACHE_SIZE = 64
+
+EPOCH_DATETIME = datetime.datetime(1970, 1, 1)
+ONE_MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Estimated memory size of a Python object value in bytes
+OBJECT_ITEM_SIZE = 64
+
+
+def toMicroseconds(dt):
+    """
+    Convert date-time to microseconds since 1970-01-01.
+
+    :param dt: datetime.datetime object.
+    :return: Integer number of microseconds.
+    """
+    return (dt - EPOCH_DATETIME) // ONE_MICROSECOND
+
+
+def toTimeArray(dts):
+    """
+    Convert date-time list to NumPy datetime64[us] array.
+
+    :param dts: datetime.datetime list.
+    :return: NumPy array.
+    """
+    return numpy.fromiter([toMicroseconds(dt) for dt in dts],
+                          dtype=numpy.int64, count=len(dts)).view('datetime64[us]')
+
+
+def toValueArray(values):
+    """
+    Convert value list to NumPy array.
+    Numeric and boolean values are stored in the native array,
+    other values (strings, None, ...) as Python objects.
+
+    :param values: Value list.
+    :return: NumPy array.
+    """
+    try:
+        array = numpy.array(values)
+    except (ValueError, OverflowError):
+        array = None
+    if array is None or array.ndim != 1 or array.dtype.kind not in 'biuf':
+        array = numpy.empty(len(values), dtype=object)
+        array[:] = values
+    return array
+
+
+def getArraySize(array):
+    """
+    Get estimated memory size of the array in bytes.
+    """
+    if array.dtype == object:
+        return array.nbytes + len(array) * OBJECT_ITEM_SIZE
+    return array.nbytes
+
+
+class iqWideHistoryRangeCache(object):
+    """
+    Wide history columnar range cache.
+    """
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        Constructor.
+
+        :param cache_size: Cache memory budget in megabytes.
+        """
+        self.cache_size = cache_size
+
+        self._lock = threading.RLock()
+        self.clear()
+        self.resetMetrics()
+
+    def clear(self):
+        """
+        Clear cache.
+        """
+        with self._lock:
+            self._times = numpy.empty(0, dtype='datetime64[us]')
+            self._columns = dict()
+            # Covered ranges sorted by start: [[start, stop, last access], ...]
+            self._ranges = list()
+            self._access_counter = 0
+            self.first_record = None
+
+    def resetMetrics(self):
+        """
+        Reset cache metrics.
+        """
+        with self._lock:
+            self._hit_count = 0
+            self._miss_count = 0
+            self._fetch_count = 0
+            self._evict_count = 0
+
+    def getMetrics(self):
+        """
+        Get cache metrics.
+
+        :return: Metrics dictionary.
+        """
+        with self._lock:
+            return dict(hit_count=self._hit_count,
+                        miss_count=self._miss_count,
+                        fetch_count=self._fetch_count,
+                        evict_count=self._evict_count,
+                        range_count=len(self._ranges),
+                        record_count=len(self._times),
+                        size=self.getSize())
+
+    def getSize(self):
+        """
+        Get estimated cache memory size in bytes.
+        """
+        return self._times.nbytes + sum([getArraySize(array) for array in self._columns.values()])
+
+    def _touch(self, cache_range):
+        """
+        Mark the covered range as recently used.
+        """
+        self._access_counter += 1
+        cache_range[2] = self._access_counter
+
+    def _findRange(self, start, stop):
+        """
+        Find the covered range which contains [start, stop].
+
+        :param start: Start as numpy.datetime64.
+        :param stop: Stop as numpy.datetime64.
+        :return: Covered range or None if not found.
+        """
+        for cache_range in self._ranges:
+            if cache_range[0] <= start and stop <= cache_range[1]:
+                return cache_range
+        return None
+
+    def getMissingRanges(self, start_dt, stop_dt):
+        """
+        Get uncovered parts of the range.
+
+        :type start_dt: datetime.datetime.
+        :param start_dt: The start date-time of the range.
+        :type stop_dt: datetime.datetime.
+        :param stop_dt: The end date-time of the range.
+        :return: List of (start date-time, stop date-time).
+            The bounds of the parts are the bounds of the adjacent covered ranges,
+            so the records of the bounds are filtered when the parts are merged.
+        """
+        start = numpy.datetime64(start_dt, 'us')
+        stop = numpy.datetime64(stop_dt, 'us')
+        missing_ranges = list()
+        with self._lock:
+            cursor = start
+            cursor_covered = False
+            for range_start, range_stop, last_access in self._ranges:
+                if range_stop < cursor:
+                    continue
+                if range_start > stop:
+                    break
+                if range_start > cursor:
+                    missing_ranges.append((cursor, range_start))
+                cursor = max(cursor, range_stop)
+                cursor_covered = True
+                if cursor >= stop:
+                    break
+            if cursor < stop or not cursor_covered:
+                missing_ranges.append((cursor, stop))
+        return [(range_start.item(), range_stop.item()) for range_start, range_stop in missing_ranges]
+
+    def put(self, start_dt, stop_dt, dts, columns):
+        """
+        Merge fetched records of the range into the cache.
+
+        :type start_dt: datetime.datetime.
+        :param start_dt: The start date-time of the fetched range.
+        :type stop_dt: datetime.datetime.
+        :param stop_dt: The end date-time of the fetched range.
+        :param dts: Record date-time list sorted by time.
+        :param columns: Column value lists dictionary {column name: [value, ...]}.
+            The date-time column is not included.
+        :return: True/False.
+        """
+        start = numpy.datetime64(start_dt, 'us')
+        stop = numpy.datetime64(stop_dt, 'us')
+        times = toTimeArray(dts)
+
+        with self._lock:
+            self._fetch_count += 1
+            if self._columns and set(columns.keys()) != set(self._columns.keys()):
+                # The model is changed
+                self.clear()
+
+            # Remove the records out of the range and the records of already covered ranges
+            mask = (times >= start) & (times <= stop)
+            for range_start, range_stop, last_access in self._ranges:
+                mask &= (times < range_start) | (times > range_stop)
+
+            positions = numpy.searchsorted(self._times, times[mask], side='right')
+            self._times = numpy.insert(self._times, positions, times[mask])
+            for name, values in columns.items():
+                new_values = toValueArray(values)[mask]
+                array = self._columns.get(name)
+                if array is None or not len(array):
+                    self._columns[name] = new_values
+                elif len(new_values):
+                    if array.dtype != new_values.dtype:
+                        if object in (array.dtype, new_values.dtype):
+                            dtype = object
+                        else:
+                            dtype = numpy.result_type(array, new_values)
+                        array = array.astype(dtype)
+                        new_values = new_values.astype(dtype)
+                    self._columns[name] = numpy.insert(array, positions, new_values)
+
+            # Merge covered ranges
+            new_range = [start, stop, 0]
+            ranges = list()
+            for cache_range in self._ranges:
+                if cache_range[1] + 1 < new_range[0] or cache_range[0] > new_range[1] + 1:
+                    ranges.append(cache_range)
+                else:
+                    new_range[0] = min(new_range[0], cache_range[0])
+                    new_range[1] = max(new_range[1], cache_range[1])
+            ranges.append(new_range)
+            ranges.sort(key=lambda cache_range: cache_range[0])
+            self._ranges = ranges
+            self._touch(new_range)
+
+            self._evict(new_range)
+        return True
+
+    def _evict(self, keep_range):
+        """
+        Evict least recently used ranges while the memory budget is exceeded.
+
+        :param keep_range: The range which is evicted last.
+        """
+        budget = self.cache_size * 1048576
+        while self._ranges and self.getSize() > budget:
+            ranges = [cache_range for cache_range in self._ranges if cache_range is not keep_range]
+            if not ranges:
+                # The range is larger than the whole budget
+                self._evict_count += 1
+                self.clear()
+                break
+            cache_range = min(ranges, key=lambda item: item[2])
+            mask = (self._times < cache_range[0]) | (self._times > cache_range[1])
+            self._times = self._times[mask]
+            for name in list(self._columns.keys()):
+                self._columns[name] = self._columns[name][mask]
+            self._ranges.remove(cache_range)
+            self._evict_count += 1
+
+    def isCovered(self, start_dt, stop_dt):
+        """
+        Is the range covered by the cache?
+        """
+        with self._lock:
+            return self._findRange(numpy.datetime64(start_dt, 'us'), numpy.datetime64(stop_dt, 'us')) is not None
+
+    def getValues(self, col_name, start_dt, stop_dt):
+        """
+        Get cached column values of the range.
+
+        :param col_name: Column name.
+        :type start_dt: datetime.datetime.
+        :param start_dt: The start date-time of the range.
+        :type stop_dt: datetime.datetime.
+        :param stop_dt: The end date-time of the range.
+        :return: [(date-time, value), ...] sorted by time
+            or None if the range is not covered.
+        """
+        start = numpy.datetime64(start_dt, 'us')
+        stop = numpy.datetime64(stop_dt, 'us')
+        with self._lock:
+            cache_range = self._findRange(start, stop)
+            if cache_range is None or col_name not in self._columns:
+                self._miss_count += 1
+                return None
+            self._hit_count += 1
+            self._touch(cache_range)
+            i_start = numpy.searchsorted(self._times, start, side='left')
+            i_stop = numpy.searchsorted(self._times, stop, side='right')
+            times = self._times[i_start:i_stop].astype(object).tolist()
+            values = self._columns[col_name][i_start:i_stop].tolist()
+        return list(zip(times, values))
+
+    def getRecord(self, dt):
+        """
+        Get cached record by date-time.
+
+        :type dt: datetime.datetime.
+        :param dt: Record date-time.
+        :return: Record dictionary without the date-time column,
+            an empty dictionary if there is no record
+            or None if the date-time is not covered.
+        """
+        time = numpy.datetime64(dt, 'us')
+        with self._lock:
+            cache_range = self._findRange(time, time)
+            if cache_range is None:
+                self._miss_count += 1
+                return None
+            self._hit_count += 1
+            self._touch(cache_range)
+            i_record = numpy.searchsorted(self._times, time, side='left')
+            if i_record >= len(self._times) or self._times[i_record] != time:
+                return dict()
+            return {name: array[i_record].item() if array.dtype != object else array[i_record]
+                    for name, array in self._columns.items()}
@@ -12,7 +12,7 @@ from .. import data_navigator
 from ...util import spc_func
 from ... import passport
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 0, 3)
 
 
 def getColumnNames(resource=None, *args, **kwargs):
@@ -63,6 +63,7 @@ DATAWIDEHISTORY_SPC = {
 
     'filter': None,
     'dt_column': None,
+    'cache_size': 0,
 
     '__package__': u'Data',
     '__icon__': 'fatcow/clock_history_frame',
@@ -78,9 +79,13 @@ DATAWIDEHISTORY_SPC = {
             'editor': property_editor_id.CHOICE_EDITOR,
             'choices': getColumnNames,
         },
+        'cache_size': property_editor_id.INTEGER_EDITOR,
     },
     '__help__': {
         'dt_column': u'Column name for time',
+        'cache_size': u'Range cache memory budget in megabytes. If 0 then the range cache is not used. '
+                      u'Records older than 1 minute are cached as unchanged: use it only for append-only tables '
+                      u'with local time',
     },
 }
 
@@ -5,17 +5,115 @@
 Data wide history manager.
 """
 
+import datetime
+import numpy
 import sqlalchemy
+import sqlalchemy.orm
 
 from ..data_navigator import model_navigator
 
+from . import range_cache
+
 from ...util import log_func
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 0, 5)
 
 # Default temporary field name
 DEFAULT_DT_FIELDNAME = 'dt'
 
+# Default number of time buckets / downsampled points (about screen width)
+DEFAULT_BUCKET_COUNT = 1000
+
+# Downsampling methods
+AVG_DOWNSAMPLE = 'avg'
+MINMAX_DOWNSAMPLE = 'minmax'
+LTTB_DOWNSAMPLE = 'lttb'
+DOWNSAMPLE_METHODS = (AVG_DOWNSAMPLE, MINMAX_DOWNSAMPLE, LTTB_DOWNSAMPLE)
+# MINMAX_DOWNSAMPLE gives up to 4 points per bucket
+MINMAX_BUCKET_POINT_COUNT = 4
+
+EPOCH_DATETIME = datetime.datetime(1970, 1, 1)
+
+# The latest records may be not written yet.
+# The range cache does not cover this interval before the current time.
+LIVE_RECORD_INTERVAL = datetime.timedelta(seconds=60)
+
+
+def getEpochSQLExpression(dt_field, dialect_name):
+    """
+    Get SQL expression of date-time column as seconds since 1970-01-01.
+
+    :param dt_field: Date-time column.
+    :param dialect_name: SQLAlchemy dialect name.
+    :return: SQL expression or None if the dialect is not supported.
+    """
+    if dialect_name == 'sqlite':
+        return (sqlalchemy.func.julianday(dt_field) - 2440587.5) * 86400.0
+    elif dialect_name == 'postgresql':
+        return sqlalchemy.extract('epoch', dt_field)
+    elif dialect_name == 'mysql':
+        return sqlalchemy.func.timestampdiff(sqlalchemy.literal_column('MICROSECOND'),
+                                             EPOCH_DATETIME, dt_field) / 1000000.0
+    return None
+
+
+def getBucketSQLExpression(epoch, start_epoch, bucket_seconds, dialect_name):
+    """
+    Get SQL expression of time bucket index.
+
+    :param epoch: SQL expression of date-time column as seconds since 1970-01-01.
+    :param start_epoch: Range start as seconds since 1970-01-01.
+    :param bucket_seconds: Bucket width in seconds.
+    :param dialect_name: SQLAlchemy dialect name.
+    :return: SQL expression.
+    """
+    offset = (epoch - start_epoch) / bucket_seconds
+    if dialect_name == 'sqlite':
+        # Offset is not negative inside the range, so the truncation is floor
+        return sqlalchemy.cast(offset, sqlalchemy.Integer)
+    return sqlalchemy.func.floor(offset)
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    :param points: Point list [(x, y), ...] sorted by x.
+        X may be date-time values.
+    :param threshold: Result point number.
+    :return: Downsampled point list.
+    """
+    point_count = len(points)
+    if threshold >= point_count or threshold < 3:
+        return list(points)
+
+    x_values = [point[0] for point in points]
+    if isinstance(x_values[0], datetime.datetime):
+        x = numpy.fromiter([(x_value - EPOCH_DATETIME).total_seconds() for x_value in x_values],
+                           dtype=numpy.float64, count=point_count)
+    else:
+        x = numpy.asarray(x_values, dtype=numpy.float64)
+    y = numpy.asarray([point[1] for point in points], dtype=numpy.float64)
+
+    # Inner bucket edges. The first and the last points are always selected
+    edges = numpy.linspace(1, point_count - 1, threshold - 1).astype(numpy.int64)
+    selected = [0]
+    prev_index = 0
+    for i_bucket in range(threshold - 2):
+        start, stop = edges[i_bucket], edges[i_bucket + 1]
+        if i_bucket + 2 < len(edges):
+            next_start, next_stop = edges[i_bucket + 1], edges[i_bucket + 2]
+            avg_x = x[next_start:next_stop].mean()
+            avg_y = y[next_start:next_stop].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        areas = numpy.abs((x[prev_index] - avg_x) * (y[start:stop] - y[prev_index]) -
+                          (x[prev_index] - x[start:stop]) * (avg_y - y[prev_index]))
+        prev_index = start + int(areas.argmax())
+        selected.append(prev_index)
+    selected.append(point_count - 1)
+    return [points[i] for i in selected]
+
 
 class iqWideHistoryManager(model_navigator.iqModelNavigatorManager):
     """
@@ -29,6 +127,8 @@ class iqWideHistoryManager(model_navigator.iqModelNavigatorManager):
         """
         model_navigator.iqModelNavigatorManager.__init__(self, model=model)
 
+        self._range_cache = None
+
     def getDTColumnName(self):
         """
         Get datetime column name.
@@ -59,6 +159,89 @@ class iqWideHistoryManager(model_navigator.iqModelNavigatorManager):
 
         return [record for record in records if rec_filter(record)]
 
+    def getCacheSize(self):
+        """
+        Get range cache memory budget in megabytes.
+        If 0 then the range cache is not used.
+        The range cache is off by default: records older than LIVE_RECORD_INTERVAL
+        before the local current time are cached as unchanged.
+        Enable it only for append-only tables with local time
+        and call clearRangeCache if written historical data is changed.
+        """
+        return 0
+
+    def getRangeCache(self):
+        """
+        Get columnar range cache object.
+
+        :return: Range cache object or None if the range cache is not used.
+        """
+        cache_size = self.getCacheSize()
+        if not cache_size:
+            return None
+        if self._range_cache is None:
+            self._range_cache = range_cache.iqWideHistoryRangeCache(cache_size=cache_size)
+        self._range_cache.cache_size = cache_size
+        return self._range_cache
+
+    def clearRangeCache(self):
+        """
+        Clear range cache.
+        It is necessary if already written historical data is changed.
+        """
+        if self._range_cache is not None:
+            self._range_cache.clear()
+
+    def _updateRangeCache(self, cache, start_dt, stop_dt):
+        """
+        Read uncovered parts of the range from the database into the range cache.
+
+        :param cache: Range cache object.
+        :type start_dt: datetime.datetime.
+        :param start_dt: The start date-time of the range.
+        :type stop_dt: datetime.datetime.
+        :param stop_dt: The end date-time of the range.
+        :return: Tuple (cached range stop date-time, live record list).
+            Live records are the latest records which are not cached:
+            [(date-time, {column name: value}), ...].
+            Or None in case of an error.
+        """
+        model = self.getModel()
+        if not model:
+            log_func.warning(u'The table of storage of historical data in the object is not defined <%s>' % self.getName())
+            return None
+
+        dt_fieldname = self.getDTColumnName()
+        col_names = [attr.key for attr in sqlalchemy.inspect(model).column_attrs if attr.key != dt_fieldname]
+        dt_field = getattr(model, dt_fieldname)
+        fields = [dt_field] + [getattr(model, col_name) for col_name in col_names]
+
+        live_start_dt = datetime.datetime.now() - LIVE_RECORD_INTERVAL
+        cached_stop_dt = min(stop_dt, live_start_dt)
+        live_records = list()
+        missing_ranges = cache.getMissingRanges(start_dt, stop_dt)
+        if not missing_ranges:
+            return cached_stop_dt, live_records
+
+        transaction = self.startTransaction()
+        try:
+            for range_start_dt, range_stop_dt in missing_ranges:
+                rows = transaction.query(*fields).filter(dt_field.between(range_start_dt,
+                                                                          range_stop_dt)).order_by(dt_field).all()
+                dts = [row[0] for row in rows]
+                if range_start_dt <= cached_stop_dt:
+                    columns = {col_name: [row[i + 1] for row in rows] for i, col_name in enumerate(col_names)}
+                    cache.put(range_start_dt, min(range_stop_dt, cached_stop_dt), dts, columns)
+                live_records += [(row[0], dict(zip(col_names, row[1:]))) for row in rows
+                                 if row[0] > cached_stop_dt]
+        except:
+            log_func.fatal(u'Error update historical data range cache')
+            live_records = None
+        self.stopTransaction(transaction)
+        if live_records is None:
+            return None
+        return cached_stop_dt, live_records
+
     def get(self, start_dt, stop_dt, rec_filter=None):
         """
         Get historical data for the specified range.
@@ -96,7 +279,7 @@ class iqWideHistoryManager(model_navigator.iqModelNavigatorManager):
         self.stopTransaction(transaction)
         return recordset
 
-    def getValues(self, col_name, start_dt, stop_dt, rec_filter=None):
+    def getValues(self, col_name, start_dt, stop_dt, rec_filter=None, point_count=None):
         """
         Get historical data of a specified range for a specific column.
 
@@ -111,10 +294,24 @@ class iqWideHistoryManager(model_navigator.iqModelNavigatorManager):
             There is a RECORD variable in the namespace that points to the current record.
             The function returns True for the record that falls into the resulting list,
             False - if missed.
+        :param point_count: Maximum point number.
+            If defined then the data is downsampled by time buckets on the database server.
         :return: Record list {'dt': date-time from the specified range,
                               'data': value}.
             Or an empty list in case of an error.
         """
+        if point_count:
+            return self.getDownsampledValues(col_name, start_dt, stop_dt,
+                                             point_count=point_count, rec_filter=rec_filter)
+
+        if rec_filter is None:
+            rec_filter = self.getFilter()
+        cache = self.getRangeCache() if not rec_filter else None
+        if cache is not None:
+            tag_data = self._getCachedValues(cache, col_name, start_dt, stop_dt)
+            if tag_data is not None:
+                return tag_data
+
         records = self.get(start_dt, stop_dt, rec_filter=rec_filter)
         dt_fieldname = self.getDTColumnName()
         tag_data = [(rec.get(dt_fieldname, None), rec.get(col_name, 0)) for rec in records]
@@ -122,6 +319,224 @@ class iqWideHistoryManager(model_navigator.iqModelNavigatorManager):
         tag_data.sort()
         return tag_data
 
+    def _getCachedValues(self, cache, col_name, start_dt, stop_dt):
+        """
+        Get historical data of a specified range for a specific column from the range cache.
+
+        :return: Record list as getValues or None if the cache can not be used.
+        """
+        update = self._updateRangeCache(cache, start_dt, stop_dt)
+        if update is None:
+            return None
+        cached_stop_dt, live_records = update
+
+        tag_data = list()
+        if start_dt <= cached_stop_dt:
+            tag_data = cache.getValues(col_name, start_dt, cached_stop_dt)
+            if tag_data is None:
+                return None
+        tag_data += [(dt, record.get(col_name, 0)) for dt, record in live_records]
+        return tag_data
+
+    def _getBucketsSQL(self, transaction, model, col_name, start_dt, stop_dt, bucket_count):
+        """
+        Aggregate column values into time buckets in SQL.
+
+        :return: Bucket list or None if the database dialect is not supported.
+        """
+        dialect_name = transaction.get_bind().dialect.name
+        dt_fieldname = self.getDTColumnName()
+        dt_field = getattr(model, dt_fieldname)
+        epoch = getEpochSQLExpression(dt_field, dialect_name)
+        if epoch is None:
+            return None
+
+        start_epoch = (start_dt - EPOCH_DATETIME).total_seconds()
+        bucket_seconds = max((stop_dt - start_dt).total_seconds() / bucket_count, 0.000001)
+        bucket = getBucketSQLExpression(epoch, start_epoch, bucket_seconds, dialect_name)
+        value_field = getattr(model, col_name)
+
+        bucket_query = transaction.query(bucket.label('bucket'),
+                                         sqlalchemy.func.count(value_field).label('count'),
+                                         sqlalchemy.func.min(value_field).label('min'),
+                                         sqlalchemy.func.max(value_field).label('max'),
+                                         sqlalchemy.func.avg(value_field).label('avg'),
+                                         sqlalchemy.func.min(dt_field).label('first_dt'),
+                                         sqlalchemy.func.max(dt_field).label('last_dt'))
+        bucket_query = bucket_query.filter(dt_field.between(start_dt, stop_dt))
+        buckets = bucket_query.group_by(sqlalchemy.literal_column('bucket')).subquery()
+
+        # The first and the last values of the bucket
+        first_model = sqlalchemy.orm.aliased(model)
+        last_model = sqlalchemy.orm.aliased(model)
+        query = transaction.query(buckets.c.bucket, buckets.c.count,
+                                  buckets.c.min, buckets.c.max, buckets.c.avg,
+                                  buckets.c.first_dt, buckets.c.last_dt,
+                                  getattr(first_model, col_name), getattr(last_model, col_name))
+        query = query.join(first_model, getattr(first_model, dt_fieldname) == buckets.c.first_dt)
+        query = query.join(last_model, getattr(last_model, dt_fieldname) == buckets.c.last_dt)
+        query = query.order_by(buckets.c.bucket)
+
+        result = list()
+        prev_bucket = None
+        for row in query:
+            # The range stop record belongs to the last bucket
+            i_bucket = min(int(row[0]), bucket_count - 1)
+            if i_bucket == prev_bucket:
+                bucket = result[-1]
+                if row[6] > bucket['last_dt']:
+                    # The range stop record bucket
+                    count = bucket['count'] + row[1]
+                    bucket['avg'] = (bucket['avg'] * bucket['count'] + float(row[4]) * row[1]) / count
+                    bucket['count'] = count
+                    bucket['min'] = min(bucket['min'], row[2])
+                    bucket['max'] = max(bucket['max'], row[3])
+                    bucket['last_dt'], bucket['last'] = row[6], row[8]
+                # Otherwise several records with the same first/last date-time
+                continue
+            prev_bucket = i_bucket
+            result.append(dict(dt=start_dt + datetime.timedelta(seconds=i_bucket * bucket_seconds),
+                               count=row[1], min=row[2], max=row[3],
+                               avg=float(row[4]) if row[4] is not None else None,
+                               first_dt=row[5], last_dt=row[6], first=row[7], last=row[8]))
+        return result
+
+    def _getBucketsRecords(self, records, col_name, start_dt, stop_dt, bucket_count):
+        """
+        Aggregate column values of records into time buckets.
+        Used when the records are filtered by a function or the database dialect is not supported.
+
+        :return: Bucket list.
+        """
+        dt_fieldname = self.getDTColumnName()
+        bucket_seconds = max((stop_dt - start_dt).total_seconds() / bucket_count, 0.000001)
+        buckets = dict()
+        for record in records:
+            dt = record.get(dt_fieldname)
+            value = record.get(col_name)
+            if dt is None or value is None:
+                continue
+            # The range stop record belongs to the last bucket
+            i_bucket = min(int((dt - start_dt).total_seconds() // bucket_seconds), bucket_count - 1)
+            bucket = buckets.get(i_bucket)
+            if bucket is None:
+                buckets[i_bucket] = dict(dt=start_dt + datetime.timedelta(seconds=i_bucket * bucket_seconds),
+                                         count=1, min=value, max=value, avg=value,
+                                         first_dt=dt, last_dt=dt, first=value, last=value)
+                continue
+            bucket['count'] += 1
+            bucket['min'] = min(bucket['min'], value)
+            bucket['max'] = max(bucket['max'], value)
+            # Sum of values until the end
+            bucket['avg'] += value
+            if dt < bucket['first_dt']:
+                bucket['first_dt'], bucket['first'] = dt, value
+            if dt >= bucket['last_dt']:
+                bucket['last_dt'], bucket['last'] = dt, value
+
+        result = [buckets[i_bucket] for i_bucket in sorted(buckets.keys())]
+        for bucket in result:
+            bucket['avg'] = float(bucket['avg']) / bucket['count']
+        return result
+
+    def getBuckets(self, col_name, start_dt, stop_dt, bucket_count=DEFAULT_BUCKET_COUNT, rec_filter=None):
+        """
+        Get column values aggregated into time buckets of the specified range.
+        Aggregation is made by the database server.
+        If the filter function is defined then the records are aggregated after filtering.
+
+        :param col_name: Column name.
+        :type start_dt: datetime.datetime.
+        :param start_dt: The start date-time of the range.
+        :type stop_dt: datetime.datetime.
+        :param stop_dt: The end date-time of the range.
+        :param bucket_count: Number of equal time buckets of the range.
+        :param rec_filter: Function of additional filter of records.
+        :return: List of non-empty bucket dictionaries sorted by time:
+            {'dt': bucket start date-time,
+             'count': record count,
+             'min': minimum value, 'max': maximum value, 'avg': average value,
+             'first_dt': first record date-time, 'first': first value,
+             'last_dt': last record date-time, 'last': last value}
+            Or an empty list in case of an error.
+        """
+        if rec_filter is None:
+            rec_filter = self.getFilter()
+
+        bucket_count = max(int(bucket_count), 1)
+        if rec_filter:
+            records = self.get(start_dt, stop_dt, rec_filter=rec_filter)
+            return self._getBucketsRecords(records, col_name, start_dt, stop_dt, bucket_count)
+
+        model = self.getModel()
+        if not model:
+            log_func.warning(u'The table of storage of historical data in the object is not defined <%s>' % self.getName())
+            return list()
+
+        transaction = self.startTransaction()
+        buckets = list()
+        try:
+            buckets = self._getBucketsSQL(transaction, model, col_name, start_dt, stop_dt, bucket_count)
+        except:
+            log_func.fatal(u'Error get historical data buckets for the specified range')
+        self.stopTransaction(transaction)
+
+        if buckets is None:
+            log_func.warning(u'SQL time buckets are not supported. Records are aggregated in <%s>' % self.getName())
+            records = self.get(start_dt, stop_dt)
+            return self._getBucketsRecords(records, col_name, start_dt, stop_dt, bucket_count)
+        return buckets
+
+    def getDownsampledValues(self, col_name, start_dt, stop_dt, point_count=DEFAULT_BUCKET_COUNT,
+                             method=MINMAX_DOWNSAMPLE, rec_filter=None):
+        """
+        Get downsampled historical data of a specified range for a specific column.
+
+        :param col_name: Column name.
+        :type start_dt: datetime.datetime.
+        :param start_dt: The start date-time of the range.
+        :type stop_dt: datetime.datetime.
+        :param stop_dt: The end date-time of the range.
+        :param point_count: Approximate number of result points.
+        :param method: Downsampling method:
+            AVG_DOWNSAMPLE - average value of each bucket at the bucket middle.
+            MINMAX_DOWNSAMPLE - first, minimum, maximum and last values of each bucket.
+            LTTB_DOWNSAMPLE - Largest-Triangle-Three-Buckets selection of point_count points
+                from the MINMAX_DOWNSAMPLE points of point_count buckets.
+        :param rec_filter: Function of additional filter of records.
+        :return: Point list [(date-time, value), ...] sorted by time as getValues.
+            Or an empty list in case of an error.
+        """
+        if method not in DOWNSAMPLE_METHODS:
+            log_func.warning(u'Unsupported downsampling method <%s>' % method)
+            return list()
+
+        if method == MINMAX_DOWNSAMPLE:
+            bucket_count = max(int(point_count) // MINMAX_BUCKET_POINT_COUNT, 1)
+        else:
+            # LTTB selects points from the denser min/max candidate set
+            bucket_count = max(int(point_count), 1)
+        buckets = self.getBuckets(col_name, start_dt, stop_dt, bucket_count=bucket_count, rec_filter=rec_filter)
+        if method == AVG_DOWNSAMPLE:
+            half_width = (stop_dt - start_dt) / (bucket_count * 2)
+            return [(bucket['dt'] + half_width, bucket['avg']) for bucket in buckets]
+
+        tag_data = list()
+        for bucket in buckets:
+            first_dt, last_dt = bucket['first_dt'], bucket['last_dt']
+            tag_data.append((first_dt, bucket['first']))
+            if bucket['count'] > 2:
+                # Minimum and maximum are placed in the middle of the bucket data
+                middle_dt = first_dt + (last_dt - first_dt) / 2
+                tag_data.append((middle_dt, bucket['min']))
+                tag_data.append((middle_dt, bucket['max']))
+            if last_dt != first_dt:
+                tag_data.append((last_dt, bucket['last']))
+
+        if method == LTTB_DOWNSAMPLE:
+            return lttb(tag_data, point_count)
+        return tag_data
+
     def getLastRecord(self, rec_filter=None, rec_limit=1):
         """
         Get the latest recorded historical data.
@@ -224,6 +639,11 @@ class iqWideHistoryManager(model_navigator.iqModelNavigatorManager):
         if rec_filter is None:
             rec_filter = self.getFilter()
 
+        # Historical data is only added, so the first record is not changed
+        cache = self.getRangeCache() if not rec_filter else None
+        if cache is not None and cache.first_record:
+            return dict(cache.first_record)
+
         model = self.getModel()
         transaction = self.startTransaction()
         record = dict()
@@ -248,6 +668,9 @@ class iqWideHistoryManager(model_navigator.iqModelNavigatorManager):
         except:
             log_func.fatal(u'Error get the first recorded historical data')
         self.stopTransaction(transaction)
+
+        if cache is not None and record:
+            cache.first_record = dict(record)
         return record
 
     def getFirstValue(self, col_name, rec_filter=None, rec_limit=1):
@@ -308,6 +731,19 @@ class iqWideHistoryManager(model_navigator.iqModelNavigatorManager):
         if rec_filter is None:
             rec_filter = self.getFilter()
 
+        cache = self.getRangeCache() if not rec_filter else None
+        if cache is not None:
+            record = cache.getRecord(dt)
+            if record is not None:
+                # The date-time is covered by the range cache
+                if record:
+                    dt_fieldname = self.getDTColumnName()
+                    record[dt_fieldname] = dt
+                    record[DEFAULT_DT_FIELDNAME] = dt
+                else:
+                    log_func.warning(u'No data in historical data table <%s>' % self.getName())
+                return record
+
         model = self.getModel()
         transaction = self.startTransaction()
         record = dict()
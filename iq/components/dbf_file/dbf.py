@@ -9,8 +9,11 @@ import os
 import os.path
 import copy
 import time
+import struct
+import datetime
 
 from ...util import log_func
+from ...util import dbf_func
 
 # Error codes:
 NOT_ERROR = 0       # Not error
@@ -63,7 +66,10 @@ RIGHT_ALIGN = 0
 
 DEFAULT_DBF_ENCODING = 'cp866'
 
-__version__ = (0, 0, 0, 1)
+# Record number encoded in one write block of bulk append
+APPEND_BLOCK_REC_COUNT = 8192
+
+__version__ = (0, 0, 1, 1)
 
 
 class iqDBFFileProto(object):
@@ -307,6 +313,16 @@ class iqDBFFileProto(object):
         """
         assert 0, u'Empty method'
 
+    def appendRecords(self, records, encoding=DEFAULT_DBF_ENCODING):
+        """
+        Bulk append records to table end.
+
+        :param records: Record iterable.
+            Record is dictionary {field name: value} or value sequence by field index.
+        :param encoding: DBF file code page.
+        """
+        assert 0, u'Empty method'
+
     def getRecDict(self):
         """
         Get current record as dictionary.
@@ -803,6 +819,85 @@ class iqDBFPYFile(iqDBFFileProto):
             self._rec_count += 1
         return ok
 
+    def appendRecords(self, records, encoding=DEFAULT_DBF_ENCODING):
+        """
+        Bulk append records to table end.
+        Records are encoded by blocks and written directly to the file.
+        The header record count is updated once at the end.
+        If error then the file is truncated to the original size.
+
+        :param records: Record iterable.
+            Record is dictionary {field name: value} or value sequence by field index.
+        :param encoding: DBF file code page.
+        :return: True/False.
+        """
+        dbf_filename = self.getDBFFileName()
+        if not dbf_filename or not os.path.exists(dbf_filename):
+            log_func.warning(u'DBF file <%s> not found' % dbf_filename)
+            return False
+
+        # The opened table must not hold a stale header while the file is written
+        is_opened = self._dbf is not None and self._cur_rec_no >= 0
+        if is_opened:
+            self._dbf.flush()
+            self.closeDBF()
+
+        result = self._appendRecords(dbf_filename, records, encoding)
+
+        if is_opened:
+            self.openDBF()
+        self._rec_count = -1
+        return result
+
+    def _appendRecords(self, dbf_filename, records, encoding=DEFAULT_DBF_ENCODING):
+        """
+        Bulk append records to DBF file.
+
+        :param dbf_filename: DBF filename.
+        :param records: Record iterable.
+        :param encoding: DBF file code page.
+        :return: True/False.
+        """
+        with open(dbf_filename, 'r+b') as dbf_file:
+            header, fields = dbf_func.readDBFStructure(dbf_file)
+            field_names = [field['name'] for field in fields]
+            data_end = header['header_len'] + header['rec_count'] * header['record_len']
+            rec_count = 0
+            try:
+                # Overwrite EOF marker
+                dbf_file.seek(data_end)
+                block = list()
+                for record in records:
+                    if isinstance(record, dict):
+                        record = dict([(str(name).upper(), value) for name, value in record.items()])
+                        values = [record.get(name, None) for name in field_names]
+                    else:
+                        values = list(record) + [None] * (len(fields) - len(record))
+                    block.append(b' ')
+                    block.extend([dbf_func.encodeDBFValue(value, field['type'], field['len'],
+                                                          field['decimal'], encoding=encoding)
+                                  for field, value in zip(fields, values)])
+                    rec_count += 1
+                    if not rec_count % APPEND_BLOCK_REC_COUNT:
+                        dbf_file.write(b''.join(block))
+                        block = list()
+                dbf_file.write(b''.join(block) + dbf_func.DBF_FILE_EOF)
+                dbf_file.truncate()
+
+                today = datetime.date.today()
+                dbf_file.seek(1)
+                dbf_file.write(struct.pack('<3BL', today.year % 100, today.month, today.day,
+                                           header['rec_count'] + rec_count))
+                dbf_file.flush()
+                os.fsync(dbf_file.fileno())
+                return True
+            except:
+                log_func.fatal(u'Error bulk append records in DBF file <%s>' % dbf_filename)
+                dbf_file.seek(data_end)
+                dbf_file.write(dbf_func.DBF_FILE_EOF)
+                dbf_file.truncate()
+        return False
+
     def getRecDict(self):
         """
         Get current record as dictionary.
@@ -6,33 +6,48 @@ DBF readonly file manager.
 """
 
 import os.path
+import array
 
 from ..dbf_file import dbf
 
 from ...util import log_func
 
-__version__ = (0, 0, 0, 1)
+from . import dbf_stream
+
+__version__ = (0, 0, 1, 3)
 
 
 class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
     """
     *.DBF readonly file class.
-    Requirement <dbfread> library. [https://github.com/olemb/dbfread/]
+    Records are read from memory-mapped file on demand.
+    Deleted records are hidden. Record numbers are indexes of not deleted records.
+    Field value lookups use on-disk field indexes.
+    The lookup reader and the opened field indexes are kept between lookups
+    until the DBF file size or modify time is changed.
     """
-    def __init__(self, dbf_filename=None, encoding=dbf.DEFAULT_DBF_ENCODING):
+    def __init__(self, dbf_filename=None, encoding=dbf.DEFAULT_DBF_ENCODING, index_dirname=None):
         """
         Constructor.
 
         :param dbf_filename: DBF filename.
         :param encoding: DBF file code page.
+        :param index_dirname: Field index files folder.
+            If not defined then the index cache folder in the profile folder is used.
         """
         dbf.iqDBFFileProto.__init__(self, dbf_filename)
 
         self.encoding = encoding
+        self.index_dirname = index_dirname
 
-        self._dbf = None        # DBF object
+        self._dbf = None        # DBF stream reader object
         self._cur_rec_no = -1   # Current record number
         self._rec_count = -1    # Record number
+        self._rec_nos = None    # DBF record indexes of not deleted records
+
+        self._lookup_dbf = None         # DBF stream reader object for lookups
+        self._lookup_signature = None   # DBF file (size, modify time) of the lookup reader
+        self._field_indexes = dict()    # Opened field indexes {field name: field index object}
 
     def openDBF(self, dbf_filename=None, encoding=dbf.DEFAULT_DBF_ENCODING):
         """
@@ -47,12 +62,13 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
             self.encoding = encoding
 
         if self._dbf_file_name and os.path.exists(self._dbf_file_name):
-            try:
-                import dbfread
-            except ImportError:
-                log_func.warning(u'Error import <dbfread> [https://github.com/olemb/dbfread/]')
+            self.closeDBF()
+            reader = dbf_stream.iqDBFStreamReader(self._dbf_file_name, encoding=self.encoding)
+            if not reader.open():
                 return False
-            self._dbf = dbfread.DBF(self._dbf_file_name, load=True, encoding=self.encoding)
+            self._dbf = reader
+            self._rec_nos = None
+            self._rec_count = -1
             self._cur_rec_no = 0
             return True
         return False
@@ -60,9 +76,14 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
     def closeDBF(self):
         """
         Close DBF file.
+        The lookup reader and the opened field indexes are closed too.
         """
+        self.closeLookup()
         if self._dbf:
             self._cur_rec_no = -1
+            self._rec_count = -1
+            self._rec_nos = None
+            self._dbf.close()
             self._dbf = None
             return True
         return False
@@ -83,7 +104,7 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
         """
         if self._dbf:
             cur_record = self._getCurrentRecord()
-            return list(cur_record.values())[int(n_field)]
+            return list(cur_record.values())[int(n_field)] if cur_record else None
         return None
 
     def getFieldByName(self, field_name):
@@ -94,7 +115,7 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
         """
         if self._dbf:
             cur_record = self._getCurrentRecord()
-            return dict(cur_record)[str(field_name).upper()]
+            return cur_record[str(field_name).upper()] if cur_record else None
         return None
 
     def getDateFieldFmtByNum(self, n_field, datetime_fmt='%d/%m/%Y'):
@@ -185,7 +206,7 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
         """
         if 0 <= self._cur_rec_no < self.getRecCount():
             try:
-                return self._dbf.records[self._cur_rec_no]
+                return self._dbf.getRecord(self._getRecNos()[self._cur_rec_no])
             except:
                 log_func.fatal(u'Error get record [%d] in DBF file <%s>' % (self._cur_rec_no,
                                                                             self.getDBFFileName()))
@@ -194,10 +215,8 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
     def isDelRec(self):
         """
         Is mark deleted record?
+        Deleted records are hidden, so always False.
         """
-        # cur_record = self._getCurrentRecord()
-        # if cur_record:
-        #     return cur_record.deleted
         return False
 
     def getRecDict(self):
@@ -205,11 +224,6 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
         Get current record as dictionary.
         """
         cur_record = self._getCurrentRecord()
-
-        if self.isDelRec():
-            log_func.warning(u'Get marked delete DBF record')
-            return None
-
         if cur_record:
             return dict(cur_record)
         return None
@@ -220,13 +234,22 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
         """
         pass
 
+    def _getRecNos(self):
+        """
+        Get DBF record indexes of not deleted records.
+        The deleted flags are scanned at the first cursor access only.
+        """
+        if self._rec_nos is None and self._dbf:
+            self._rec_nos = array.array('L', self._dbf.iterRecNo())
+        return self._rec_nos
+
     def getRecCount(self):
         """
         Get record number.
         """
         if self._dbf:
             if self._rec_count < 0:
-                self._rec_count = len(self._dbf)
+                self._rec_count = len(self._getRecNos())
         else:
             self._rec_count = -1
         return self._rec_count
@@ -238,8 +261,7 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
         :param field_name: Field name.
         """
         if self._dbf:
-            field_names = [field.name for field in self._dbf.fields]
-            return field_names.index(str(field_name).upper())
+            return self._dbf.getFieldNum(field_name)
         return -1
 
     def findSort(self, field_name, find_text):
@@ -251,6 +273,71 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
         """
         pass
 
+    def _getLookupDBF(self):
+        """
+        Get DBF stream reader object for lookups.
+        The reader is reopened and the field indexes are closed
+        if the DBF file size or modify time has changed.
+
+        :return: DBF stream reader object or None if error.
+        """
+        if not self._dbf_file_name or not os.path.exists(self._dbf_file_name):
+            self.closeLookup()
+            return None
+
+        stat = os.stat(self._dbf_file_name)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self._lookup_dbf is None or signature != self._lookup_signature:
+            self.closeLookup()
+            reader = dbf_stream.iqDBFStreamReader(self._dbf_file_name, encoding=self.encoding)
+            if not reader.open():
+                return None
+            self._lookup_dbf = reader
+            self._lookup_signature = signature
+        return self._lookup_dbf
+
+    def closeLookup(self):
+        """
+        Close the lookup reader and the opened field indexes.
+        """
+        for field_index in self._field_indexes.values():
+            field_index.close()
+        self._field_indexes = dict()
+        if self._lookup_dbf is not None:
+            self._lookup_dbf.close()
+            self._lookup_dbf = None
+        self._lookup_signature = None
+
+    def getFieldIndex(self, field_name):
+        """
+        Get opened field index object.
+        The index file is built at first use and
+        rebuilt when the DBF file is changed.
+        The index object is kept opened until the DBF file is changed or closeLookup is called.
+
+        :param field_name: Field name.
+        :return: Field index object or None if error.
+        """
+        reader = self._getLookupDBF()
+        if reader is None:
+            log_func.warning(u'Error open DBF file <%s>' % self.getDBFFileName())
+            return None
+
+        field_name = str(field_name).upper()
+        field_index = self._field_indexes.get(field_name, None)
+        if field_index is not None:
+            return field_index
+
+        if reader.getField(field_name) is None:
+            log_func.warning(u'Field <%s> not found in DBF file <%s>' % (field_name, self.getDBFFileName()))
+            return None
+
+        field_index = dbf_stream.iqDBFFieldIndex(reader, field_name, index_dirname=self.index_dirname)
+        if field_index.open():
+            self._field_indexes[field_name] = field_index
+            return field_index
+        return None
+
     def filterRecsByField(self, field_name, value):
         """
         Filter records by field value.
@@ -260,28 +347,17 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
         :return: Filtered record list.
         """
         try:
-            records = list()
-            open_ok = self.openDBF()
-            if not open_ok:
-                log_func.warning(u'Error open DBF file <%s>' % self.getDBFFileName())
+            field_index = self.getFieldIndex(field_name)
+            if not field_index:
                 return list()
 
-            value = value.strip()
-            record = self.getRecDict()
-            while not self.isEOF():
-                if field_name in record:
-                    field_value = record[field_name].strip()
-                    if field_value == value:
-                        records.append(record)
-                else:
-                    log_func.warning(u'Field <%s> not found in record %s' % (field_name, record.keys()))
-                self.nextDBF()
-                record = self.getRecDict()
-            self.closeDBF()
-
-            return records
+            reader = self._lookup_dbf
+            # Deleted flags are checked only for the found records
+            return [reader.getRecord(rec_no)
+                    for rec_no in field_index.findRecNo(value.strip() if isinstance(value, str) else value)
+                    if not reader.isDeleted(rec_no)]
         except:
-            self.closeDBF()
+            self.closeLookup()
             log_func.fatal(u'Error filter records DBF file <%s> by field <%s> value <%s>' % (self.getDBFFileName(),
                                                                                              field_name, value))
         return list()
@@ -299,29 +375,21 @@ class iqDBFReadOnlyFile(dbf.iqDBFFileProto):
             if empty dictionary if error.
         """
         try:
-            index_records = dict()
-            open_ok = self.openDBF()
-            if not open_ok:
-                log_func.warning(u'Error open DBF file <%s>' % self.getDBFFileName())
+            field_index = self.getFieldIndex(field_name)
+            if not field_index:
                 return dict()
 
-            record = self.getRecDict()
-            while not self.isEOF():
-                if field_name in record:
-                    field_value = record[field_name].strip()
-                    if field_value in index_records:
-                        index_records[field_value].append(record)
-                    else:
-                        index_records[field_value] = [record]
-                else:
-                    log_func.warning(u'Field <%s> not found in record %s' % (field_name, record.keys()))
-                self.nextDBF()
-                record = self.getRecDict()
-            self.closeDBF()
-
+            reader = self._lookup_dbf
+            index_records = dict()
+            for field_value, rec_nos in field_index.iterGroups():
+                if isinstance(field_value, str):
+                    field_value = field_value.strip()
+                records = [reader.getRecord(rec_no) for rec_no in rec_nos if not reader.isDeleted(rec_no)]
+                if records:
+                    index_records[field_value] = records
             return index_records
         except:
-            self.closeDBF()
+            self.closeLookup()
             log_func.fatal(u'Error filter records DBF file <%s> by field <%s>' % (self.getDBFFileName(),
                                                                                   field_name))
         return dict()
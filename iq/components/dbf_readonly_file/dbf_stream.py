@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Streaming DBF file reader.
+
+Records are decoded on demand from a memory-mapped DBF file,
+so large legacy tables are not loaded into memory.
+Optional on-disk secondary field indexes give O(log n) lookups by field value.
+Memo field values are read from the DBT/FPT memo file.
+"""
+
+import os
+import os.path
+import mmap
+import struct
+import datetime
+import collections
+import hashlib
+import tempfile
+
+from ...util import log_func
+from ...util import file_func
+
+__version__ = (0, 0, 0, 3)
+
+DBF_HEADER_FMT = '<BBBBLHH20x'
+DBF_HEADER_SIZE = struct.calcsize(DBF_HEADER_FMT)
+DBF_FIELD_FMT = '<11sc4xBB14x'
+DBF_FIELD_SIZE = struct.calcsize(DBF_FIELD_FMT)
+DBF_HEADER_TERMINATOR = b'\r'
+
+DELETED_RECORD_FLAG = b'*'
+
+# Index file format
+# Not <.idx>: it is FoxPro/Clipper index file extension
+INDEX_FILE_EXT = '.iqidx'
+INDEX_CACHE_DIRNAME = 'dbf_index'
+INDEX_SIGNATURE = b'IQDBFIDX'
+INDEX_VERSION = 2
+INDEX_HEADER_FMT = '<8sHQqLH11s'
+INDEX_HEADER_SIZE = struct.calcsize(INDEX_HEADER_FMT)
+INDEX_REC_NO_FMT = '<L'
+INDEX_REC_NO_SIZE = struct.calcsize(INDEX_REC_NO_FMT)
+INDEX_KEY_PAD = b'\x00'
+
+# Julian day number of 0001-01-01
+JULIAN_DAY_OFFSET = 1721425
+
+# Memo file format
+MEMO_FILE_EXTS = ('.fpt', '.FPT', '.dbt', '.DBT')
+MEMO_FIELD_TYPES = ('M', 'G', 'P', 'B')
+# Field types with text values. Other field types are compared by raw bytes in indexes
+TEXT_FIELD_TYPES = ('C', 'N', 'F', 'D', 'L')
+# Field types with number text values. Index keys are formatted by the field decimal count
+NUMERIC_FIELD_TYPES = ('N', 'F')
+DBT_BLOCK_SIZE = 512
+DBT_MEMO_TERMINATOR = b'\x1a'
+DBT4_MEMO_SIGNATURE = b'\xff\xff\x08\x00'
+DBT4_MEMO_HEADER_FMT = '<4sL'
+DBT4_MEMO_HEADER_SIZE = struct.calcsize(DBT4_MEMO_HEADER_FMT)
+FPT_HEADER_FMT = '>L2xH'
+FPT_MEMO_HEADER_FMT = '>LL'
+FPT_MEMO_HEADER_SIZE = struct.calcsize(FPT_MEMO_HEADER_FMT)
+# dBase III DBF version with memo
+DBF3_MEMO_VERSION = 0x83
+
+# DBF field definition (attributes are compatible with <dbfread> field objects)
+iqDBFField = collections.namedtuple('iqDBFField', ('name', 'type', 'length', 'decimal_count', 'offset'))
+
+
+def _parseCharacter(data, encoding):
+    return data.rstrip(b'\x00 ').decode(encoding)
+
+
+def _parseNumeric(data, encoding):
+    data = data.strip(b'\x00 ')
+    if not data:
+        return None
+    try:
+        return int(data)
+    except ValueError:
+        try:
+            return float(data.replace(b',', b'.'))
+        except ValueError:
+            return None
+
+
+def _parseFloat(data, encoding):
+    data = data.strip(b'\x00 ')
+    if not data:
+        return None
+    try:
+        return float(data.replace(b',', b'.'))
+    except ValueError:
+        return None
+
+
+def _parseDate(data, encoding):
+    if not data.strip(b'\x00 0'):
+        return None
+    try:
+        return datetime.date(int(data[:4]), int(data[4:6]), int(data[6:8]))
+    except ValueError:
+        return None
+
+
+def _parseLogical(data, encoding):
+    if not data:
+        return None
+    elif data in b'TtYy':
+        return True
+    elif data in b'FfNn':
+        return False
+    return None
+
+
+def _parseInteger(data, encoding):
+    return struct.unpack('<i', data)[0]
+
+
+def _parseDouble(data, encoding):
+    return struct.unpack('<d', data)[0]
+
+
+def _parseTimestamp(data, encoding):
+    day, msec = struct.unpack('<LL', data)
+    if not day:
+        return None
+    return datetime.datetime.fromordinal(day - JULIAN_DAY_OFFSET) + datetime.timedelta(milliseconds=msec)
+
+
+def _packTimestamp(value):
+    return struct.pack('<LL', value.toordinal() + JULIAN_DAY_OFFSET,
+                       ((value.hour * 60 + value.minute) * 60 + value.second) * 1000 + value.microsecond // 1000)
+
+
+def _parseRaw(data, encoding):
+    return data.strip(b'\x00 ').decode(encoding)
+
+
+FIELD_PARSERS = {
+    'C': _parseCharacter,
+    'N': _parseNumeric,
+    'F': _parseFloat,
+    'D': _parseDate,
+    'L': _parseLogical,
+    'I': _parseInteger,
+    'O': _parseDouble,
+    'T': _parseTimestamp,
+    '@': _parseTimestamp,
+}
+
+# Binary field value to raw bytes packers for index keys
+FIELD_PACKERS = {
+    'I': struct.Struct('<i').pack,
+    '+': struct.Struct('<i').pack,
+    'O': struct.Struct('<d').pack,
+    'T': _packTimestamp,
+    '@': _packTimestamp,
+}
+
+
+class iqDBFMemoFile(object):
+    """
+    DBT (dBase III/IV) or FPT (FoxPro) memo file reader.
+    """
+    def __init__(self, memo_filename, dbf_version=0):
+        """
+        Constructor.
+
+        :param memo_filename: Memo filename.
+        :param dbf_version: DBF file version byte.
+        """
+        self.memo_filename = memo_filename
+        self.is_fpt = memo_filename.lower().endswith('.fpt')
+        self.is_dbt3 = not self.is_fpt and dbf_version == DBF3_MEMO_VERSION
+        self.block_size = DBT_BLOCK_SIZE
+
+        self._file = open(memo_filename, 'rb')
+        header = self._file.read(DBT_BLOCK_SIZE)
+        if self.is_fpt:
+            self.block_size = struct.unpack(FPT_HEADER_FMT, header[:struct.calcsize(FPT_HEADER_FMT)])[1]
+        elif not self.is_dbt3 and len(header) >= 22:
+            self.block_size = struct.unpack('<H', header[20:22])[0] or DBT_BLOCK_SIZE
+
+    def close(self):
+        """
+        Close memo file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def getMemo(self, block_no):
+        """
+        Get memo data.
+
+        :param block_no: Memo start block number.
+        :return: Memo bytes or None if there is no memo.
+        """
+        if not block_no:
+            return None
+        self._file.seek(block_no * self.block_size)
+        if self.is_fpt:
+            memo_type, length = struct.unpack(FPT_MEMO_HEADER_FMT, self._file.read(FPT_MEMO_HEADER_SIZE))
+            return self._file.read(length)
+
+        if not self.is_dbt3:
+            signature, length = struct.unpack(DBT4_MEMO_HEADER_FMT, self._file.read(DBT4_MEMO_HEADER_SIZE))
+            if signature == DBT4_MEMO_SIGNATURE:
+                return self._file.read(length - DBT4_MEMO_HEADER_SIZE)
+            self._file.seek(block_no * self.block_size)
+
+        data = b''
+        while True:
+            block = self._file.read(self.block_size)
+            if not block:
+                return data
+            end = block.find(DBT_MEMO_TERMINATOR)
+            if end >= 0:
+                return data + block[:end]
+            data += block
+
+
+class iqDBFStreamReader(object):
+    """
+    Memory-mapped DBF file reader.
+    Records are decoded only when requested.
+    """
+    def __init__(self, dbf_filename, encoding='cp866'):
+        """
+        Constructor.
+
+        :param dbf_filename: DBF filename.
+        :param encoding: DBF file code page.
+        """
+        self.dbf_filename = dbf_filename
+        self.encoding = encoding
+
+        self.fields = list()
+        self.header_length = 0
+        self.record_length = 0
+        self.rec_count = 0
+
+        self.version = 0
+
+        self._file = None
+        self._mmap = None
+        self._memo_file = None
+        self._field_index = dict()
+        self._field_parsers = list()
+
+    def open(self):
+        """
+        Open DBF file and read header.
+
+        :return: True/False.
+        """
+        self.close()
+        if not os.path.isfile(self.dbf_filename) or not os.path.getsize(self.dbf_filename):
+            log_func.warning(u'DBF file <%s> not found or empty' % self.dbf_filename)
+            return False
+
+        try:
+            self._file = open(self.dbf_filename, 'rb')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._readHeader()
+            if any(self.isMemoField(field) for field in self.fields):
+                self._openMemoFile()
+            return True
+        except:
+            log_func.fatal(u'Error open DBF file <%s>' % self.dbf_filename)
+            self.close()
+        return False
+
+    def close(self):
+        """
+        Close DBF file.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._memo_file is not None:
+            self._memo_file.close()
+            self._memo_file = None
+        self.fields = list()
+        self._field_index = dict()
+        self._field_parsers = list()
+        self.rec_count = 0
+
+    def isOpened(self):
+        """
+        Is DBF file opened?
+        """
+        return self._mmap is not None
+
+    def _readHeader(self):
+        """
+        Read DBF header and field definitions.
+        """
+        version, year, month, day, rec_count, header_length, record_length = struct.unpack(DBF_HEADER_FMT,
+                                                                                           self._mmap[:DBF_HEADER_SIZE])
+        self.version = version
+        self.header_length = header_length
+        self.record_length = record_length
+
+        fields = list()
+        offset = 1
+        pos = DBF_HEADER_SIZE
+        while pos + DBF_FIELD_SIZE <= header_length and self._mmap[pos:pos + 1] != DBF_HEADER_TERMINATOR:
+            name, field_type, length, decimal_count = struct.unpack(DBF_FIELD_FMT,
+                                                                    self._mmap[pos:pos + DBF_FIELD_SIZE])
+            name = name.split(b'\x00')[0].decode(self.encoding).upper()
+            fields.append(iqDBFField(name, field_type.decode('ascii'), length, decimal_count, offset))
+            offset += length
+            pos += DBF_FIELD_SIZE
+        self.fields = fields
+        self._field_index = dict([(field.name, i) for i, field in enumerate(fields)])
+        self._field_parsers = [self._memoParser(field) if self.isMemoField(field) else FIELD_PARSERS.get(field.type,
+                                                                                                        _parseRaw)
+                               for field in fields]
+
+        # A truncated file must not give records beyond the end of data
+        if record_length:
+            rec_count = min(rec_count, max(0, len(self._mmap) - header_length) // record_length)
+        self.rec_count = rec_count
+
+    def isMemoField(self, field):
+        """
+        Is the field stored in the memo file?
+
+        :param field: Field definition.
+        """
+        # Visual FoxPro B field is double
+        return field.type in MEMO_FIELD_TYPES and not (field.type == 'B' and field.length == 8)
+
+    def _openMemoFile(self):
+        """
+        Open memo file of the DBF file.
+        """
+        base_filename = os.path.splitext(self.dbf_filename)[0]
+        for memo_ext in MEMO_FILE_EXTS:
+            memo_filename = base_filename + memo_ext
+            if os.path.isfile(memo_filename):
+                self._memo_file = iqDBFMemoFile(memo_filename, self.version)
+                return
+        log_func.warning(u'Memo file of DBF file <%s> not found' % self.dbf_filename)
+
+    def _memoParser(self, field):
+        """
+        Get memo field parser.
+
+        :param field: Field definition.
+        """
+        def parseMemo(data, encoding):
+            if self._memo_file is None:
+                return None
+            if field.length == 4:
+                block_no = struct.unpack('<L', data)[0]
+            else:
+                data = data.strip(b'\x00 ')
+                block_no = int(data) if data.isdigit() else 0
+            memo = self._memo_file.getMemo(block_no)
+            if memo is not None and field.type == 'M':
+                return memo.decode(encoding, 'replace')
+            return memo
+        return parseMemo
+
+    def getField(self, field_name):
+        """
+        Get field definition by name.
+
+        :param field_name: Field name.
+        :return: Field definition or None if not found.
+        """
+        i_field = self._field_index.get(str(field_name).upper(), -1)
+        return self.fields[i_field] if i_field >= 0 else None
+
+    def getFieldNum(self, field_name):
+        """
+        Get field index by name.
+
+        :param field_name: Field name.
+        :return: Field index or -1 if not found.
+        """
+        return self._field_index.get(str(field_name).upper(), -1)
+
+    def getRawRecord(self, rec_no):
+        """
+        Get raw record bytes.
+
+        :param rec_no: Record index.
+        """
+        start = self.header_length + rec_no * self.record_length
+        return self._mmap[start:start + self.record_length]
+
+    def isDeleted(self, rec_no):
+        """
+        Is record marked as deleted?
+
+        :param rec_no: Record index.
+        """
+        start = self.header_length + rec_no * self.record_length
+        return self._mmap[start:start + 1] == DELETED_RECORD_FLAG
+
+    def getRawFieldValue(self, rec_no, field):
+        """
+        Get raw field bytes of the record.
+
+        :param rec_no: Record index.
+        :param field: Field definition.
+        """
+        start = self.header_length + rec_no * self.record_length + field.offset
+        return self._mmap[start:start + field.length]
+
+    def decodeFieldValue(self, field, data):
+        """
+        Decode field value.
+
+        :param field: Field definition.
+        :param data: Raw field bytes.
+        """
+        return self._field_parsers[self._field_index[field.name]](data, self.encoding)
+
+    def getRecord(self, rec_no):
+        """
+        Get record as dictionary.
+
+        :param rec_no: Record index.
+        :return: Record dictionary or None if error.
+        """
+        if not 0 <= rec_no < self.rec_count:
+            return None
+        data = self.getRawRecord(rec_no)
+        encoding = self.encoding
+        record = collections.OrderedDict()
+        for field, parser in zip(self.fields, self._field_parsers):
+            record[field.name] = parser(data[field.offset:field.offset + field.length], encoding)
+        return record
+
+    def iterRecNo(self):
+        """
+        Iterate over not deleted record indexes.
+        """
+        for rec_no in range(self.rec_count):
+            if not self.isDeleted(rec_no):
+                yield rec_no
+
+    def iterRecords(self):
+        """
+        Iterate over not deleted records.
+        """
+        for rec_no in self.iterRecNo():
+            yield self.getRecord(rec_no)
+
+    def getStatSignature(self):
+        """
+        Get DBF file signature for index invalidation.
+
+        :return: Tuple (file size, modify time in nanoseconds).
+        """
+        stat = os.stat(self.dbf_filename)
+        return stat.st_size, stat.st_mtime_ns
+
+    def normFieldKey(self, field, data):
+        """
+        Normalize raw field bytes to index key.
+        Numeric field values are formatted with the field decimal count,
+        so <5>, <5.0> and <5.00> give the same key.
+
+        :param field: Field definition.
+        :param data: Raw field bytes.
+        """
+        if field.type not in TEXT_FIELD_TYPES:
+            return data[:field.length].ljust(field.length, INDEX_KEY_PAD)
+        data = data.strip(b'\x00 ')
+        if field.type in NUMERIC_FIELD_TYPES:
+            value = _parseFloat(data, self.encoding)
+            if value is not None:
+                # -0.0 and 0.0 must give the same key
+                data = b'%.*f' % (field.decimal_count, value if value else 0.0)
+        return data[:field.length].ljust(field.length, INDEX_KEY_PAD)
+
+    def getFieldKey(self, field, value):
+        """
+        Get index key by field value.
+
+        :param field: Field definition.
+        :param value: Field value.
+        """
+        if not isinstance(value, bytes):
+            if field.type in FIELD_PACKERS:
+                value = FIELD_PACKERS[field.type](value)
+            elif field.type == 'D' and isinstance(value, datetime.date):
+                value = value.strftime('%Y%m%d').encode(self.encoding)
+            else:
+                value = str(value).encode(self.encoding)
+        return self.normFieldKey(field, value)
+
+
+def getIndexCacheDirname():
+    """
+    Get default field index files folder.
+    The folder is created if it does not exist.
+
+    :return: Index cache folder in the profile folder or temporary folder.
+    """
+    profile_path = file_func.getProfilePath()
+    if not profile_path:
+        return tempfile.gettempdir()
+    index_dirname = os.path.join(profile_path, INDEX_CACHE_DIRNAME)
+    if not os.path.exists(index_dirname):
+        file_func.createDir(index_dirname)
+    return index_dirname
+
+
+class iqDBFFieldIndex(object):
+    """
+    On-disk secondary index of DBF field.
+    Index file contains sorted fixed-size entries (field key, record index).
+    The index is rebuilt if the DBF file size or modify time has changed.
+    """
+    def __init__(self, reader, field_name, index_dirname=None):
+        """
+        Constructor.
+
+        :param reader: DBF stream reader object.
+        :param field_name: Indexed field name.
+        :param index_dirname: Index files folder.
+            If not defined then the index cache folder in the profile folder is used.
+            If the profile folder is not defined then temporary folder is used.
+        """
+        self.reader = reader
+        self.field = reader.getField(field_name)
+        if self.field is None:
+            raise KeyError(u'Field <%s> not found in DBF file <%s>' % (field_name, reader.dbf_filename))
+
+        self.index_filename = self._getIndexFilename(index_dirname)
+        self.entry_size = self.field.length + INDEX_REC_NO_SIZE
+        self.count = 0
+
+        self._file = None
+        self._mmap = None
+
+    def _getIndexFilename(self, index_dirname=None):
+        """
+        Get index filename.
+
+        :param index_dirname: Index files folder.
+        """
+        dbf_filename = os.path.abspath(self.reader.dbf_filename)
+        if index_dirname is None:
+            index_dirname = getIndexCacheDirname()
+        base_filename = os.path.splitext(os.path.basename(dbf_filename))[0]
+        # DBF files with the same name in different folders share the cache folder
+        path_hash = hashlib.md5(os.path.dirname(dbf_filename).encode('utf-8', 'replace')).hexdigest()[:8]
+        return os.path.join(index_dirname, '%s_%s.%s%s' % (base_filename, path_hash,
+                                                            self.field.name, INDEX_FILE_EXT))
+
+    def _getHeader(self):
+        """
+        Get index file header bytes for current DBF file state.
+        """
+        dbf_size, dbf_mtime = self.reader.getStatSignature()
+        return struct.pack(INDEX_HEADER_FMT, INDEX_SIGNATURE, INDEX_VERSION, dbf_size, dbf_mtime,
+                           self.reader.rec_count, self.field.length, self.field.name.encode('ascii', 'replace'))
+
+    def isActual(self):
+        """
+        Is index file actual for the DBF file?
+        """
+        if not os.path.isfile(self.index_filename):
+            return False
+        try:
+            with open(self.index_filename, 'rb') as index_file:
+                header = index_file.read(INDEX_HEADER_SIZE)
+            return header == self._getHeader()
+        except:
+            log_func.fatal(u'Error check DBF index file <%s>' % self.index_filename)
+        return False
+
+    def build(self):
+        """
+        Build index file.
+
+        :return: True/False.
+        """
+        reader = self.reader
+        field = self.field
+        try:
+            entries = [(reader.normFieldKey(field, reader.getRawFieldValue(rec_no, field)), rec_no)
+                       for rec_no in reader.iterRecNo()]
+            entries.sort()
+
+            tmp_filename = self.index_filename + '.tmp'
+            with open(tmp_filename, 'wb') as index_file:
+                index_file.write(self._getHeader())
+                rec_no_struct = struct.Struct(INDEX_REC_NO_FMT)
+                index_file.write(b''.join([key + rec_no_struct.pack(rec_no) for key, rec_no in entries]))
+            os.replace(tmp_filename, self.index_filename)
+            log_func.info(u'DBF index file <%s> built. Entries: %d' % (self.index_filename, len(entries)))
+            return True
+        except:
+            log_func.fatal(u'Error build DBF index file <%s>' % self.index_filename)
+        return False
+
+    def open(self):
+        """
+        Open index. Index file is rebuilt if it is not actual.
+
+        :return: True/False.
+        """
+        self.close()
+        if not self.isActual() and not self.build():
+            return False
+        try:
+            self._file = open(self.index_filename, 'rb')
+            size = os.fstat(self._file.fileno()).st_size
+            self.count = (size - INDEX_HEADER_SIZE) // self.entry_size
+            if self.count:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return True
+        except:
+            log_func.fatal(u'Error open DBF index file <%s>' % self.index_filename)
+            self.close()
+        return False
+
+    def close(self):
+        """
+        Close index file.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.count = 0
+
+    def _getKey(self, i):
+        start = INDEX_HEADER_SIZE + i * self.entry_size
+        return self._mmap[start:start + self.field.length]
+
+    def _getRecNo(self, i):
+        start = INDEX_HEADER_SIZE + i * self.entry_size + self.field.length
+        return struct.unpack(INDEX_REC_NO_FMT, self._mmap[start:start + INDEX_REC_NO_SIZE])[0]
+
+    def _bisect(self, key, right=False):
+        """
+        Binary search of key position in the index.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            middle_key = self._getKey(middle)
+            if middle_key < key or (right and middle_key == key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def findRecNo(self, value):
+        """
+        Find record indexes by field value.
+
+        :param value: Field value.
+        :return: Sorted record index list.
+        """
+        if not self.count:
+            return list()
+        key = self.reader.getFieldKey(self.field, value)
+        start = self._bisect(key)
+        stop = self._bisect(key, right=True)
+        return sorted([self._getRecNo(i) for i in range(start, stop)])
+
+    def iterGroups(self):
+        """
+        Iterate over groups of records with the same field value.
+
+        :return: Generator of (field value, record index list).
+        """
+        prev_key = None
+        rec_nos = list()
+        for i in range(self.count):
+            key = self._getKey(i)
+            if key != prev_key and rec_nos:
+                yield self.reader.decodeFieldValue(self.field, prev_key), sorted(rec_nos)
+                rec_nos = list()
+            prev_key = key
+            rec_nos.append(self._getRecNo(i))
+        if rec_nos:
+            yield self.reader.decodeFieldValue(self.field, prev_key), sorted(rec_nos)
@@ -13,7 +13,7 @@ from ...util import log_func
 from ...util import spc_func
 from ...util import str_func
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 0, 3)
 
 
 class iqGnuplotTrend(gnuplot_trend_proto.iqGnuplotTrendProto, wx_panel.COMPONENT):
@@ -44,6 +44,8 @@ class iqGnuplotTrend(gnuplot_trend_proto.iqGnuplotTrendProto, wx_panel.COMPONENT
         self.setXPrecision()
         self.setYPrecision()
 
+        self.setMinRedrawInterval()
+
     def setPens(self, pens):
         """
         Set trend pens.
@@ -78,6 +80,8 @@ class iqGnuplotTrend(gnuplot_trend_proto.iqGnuplotTrendProto, wx_panel.COMPONENT
             manager = self._getManager()
         for i, pen in enumerate(pens):
             self._setPenColour(n_pen=i + 1, pen=pen, manager=manager)
+        # Cached frames are drawn with the old line styles
+        self.clearFrameCache()
 
     def _setPenColour(self, n_pen, pen, manager=None):
         """
@@ -275,5 +279,16 @@ class iqGnuplotTrend(gnuplot_trend_proto.iqGnuplotTrendProto, wx_panel.COMPONENT
             y_precision = self.getAttribute('y_precision')
         return self.setPrecisions(self._x_precision, y_precision)
 
+    def setMinRedrawInterval(self, min_redraw_interval=None):
+        """
+        Set minimum interval between frame renderings.
+
+        :param min_redraw_interval: Interval in seconds.
+            If not defined, then taken from the resource description of the object.
+        """
+        if min_redraw_interval is None:
+            min_redraw_interval = self.getAttribute('min_redraw_interval')
+        return gnuplot_trend_proto.iqGnuplotTrendProto.setMinRedrawInterval(self, min_redraw_interval)
+
 
 COMPONENT = iqGnuplotTrend
@@ -27,13 +27,19 @@ eog ./trend.png
 import os
 import os.path
 import datetime
+import time
+import queue
+import threading
+import subprocess
+
+import numpy
 
 import iq
 from iq.util import log_func
 from iq.util import txtfile_func
 from iq.util import sys_func
 
-__version__ = (0, 0, 0, 2)
+__version__ = (0, 0, 0, 4)
 
 # Gnuplot command delimiter
 COMMAND_DELIMETER = ';'
@@ -43,8 +49,207 @@ WIN_GNUPLOT_RUN = 'start /WAIT /B gnuplot.exe'
 
 GNUPLOT_COMMAND_FMT = '%s -e \"%s\"'
 
+UNIX_GNUPLOT_EXECUTABLE = 'gnuplot'
+WIN_GNUPLOT_EXECUTABLE = 'gnuplot.exe'
+
+# Frame render timeout in the persistent gnuplot session (seconds)
+DEFAULT_SESSION_TIMEOUT = 30
+# Frame render done signature
+SESSION_DONE_SIGNATURE = '__IQ_GNUPLOT_DONE_%d__'
+
 DATETIME_GRAPH_DATA_FMT = '%Y-%m-%d %H:%M:%S'
 
+# Binary graph data value format.
+# Date-time X values are written as seconds since 1970-01-01 (gnuplot 5 time epoch)
+BINARY_GRAPH_DATA_FORMAT = '%float64'
+GRAPH_TIME_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class iqGnuplotSession(object):
+    """
+    Persistent gnuplot process.
+    Commands are fed to the process over the pipe,
+    so the gnuplot process is not started for each frame.
+    """
+    def __init__(self, executable=None, timeout=DEFAULT_SESSION_TIMEOUT):
+        """
+        Constructor.
+
+        :param executable: Gnuplot executable. If None then it is defined by platform.
+        :param timeout: Frame render timeout in seconds.
+        """
+        if executable is None:
+            executable = WIN_GNUPLOT_EXECUTABLE if sys_func.isWindowsPlatform() else UNIX_GNUPLOT_EXECUTABLE
+        self.executable = executable
+        self.timeout = timeout
+
+        self._process = None
+        self._lines = None
+        self._run_count = 0
+
+        self.resetMetrics()
+
+    def resetMetrics(self):
+        """
+        Reset session metrics.
+        """
+        self.start_count = 0
+        self.run_count = 0
+        self.error_count = 0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
+
+    def getMetrics(self):
+        """
+        Get session metrics.
+
+        :return: Metrics dictionary.
+        """
+        return dict(start_count=self.start_count,
+                    run_count=self.run_count,
+                    error_count=self.error_count,
+                    total_run_time=self.total_run_time,
+                    avg_run_time=self.total_run_time / self.run_count if self.run_count else 0.0,
+                    max_run_time=self.max_run_time)
+
+    def isRunning(self):
+        """
+        Is the gnuplot process running?
+        """
+        return self._process is not None and self._process.poll() is None
+
+    def _readLines(self, process, lines):
+        """
+        Gnuplot process output reader thread function.
+        """
+        for line in process.stdout:
+            lines.put(line.rstrip('\r\n'))
+        lines.put(None)
+
+    def start(self):
+        """
+        Start gnuplot process.
+
+        :return: True/False.
+        """
+        if self.isRunning():
+            return True
+        try:
+            self._process = subprocess.Popen([self.executable], stdin=subprocess.PIPE,
+                                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                             universal_newlines=True, bufsize=1)
+            self._lines = queue.Queue()
+            thread = threading.Thread(target=self._readLines, args=(self._process, self._lines), daemon=True)
+            thread.start()
+            self.start_count += 1
+            return True
+        except:
+            log_func.fatal(u'Error start gnuplot process <%s>' % self.executable)
+            self._process = None
+        return False
+
+    def stop(self):
+        """
+        Stop gnuplot process.
+        """
+        if self._process is not None:
+            try:
+                if self.isRunning():
+                    self._process.stdin.write('exit\n')
+                    self._process.stdin.flush()
+                    self._process.wait(self.timeout)
+            except:
+                self._process.kill()
+            self._process = None
+
+    def run(self, commands):
+        """
+        Run gnuplot commands and wait for the end of the output.
+
+        :param commands: Gnuplot command list.
+        :return: True/False.
+        """
+        if not self.start():
+            return False
+
+        self._run_count += 1
+        done_signature = SESSION_DONE_SIGNATURE % self._run_count
+        # Reset the settings of the previous frame.
+        # Closing the output file finishes the frame.
+        script = '\n'.join(['reset'] + list(commands) +
+                           ['set output', 'set print \'-\'', 'print \'%s\'' % done_signature]) + '\n'
+
+        start_time = time.time()
+        try:
+            self._process.stdin.write(script)
+            self._process.stdin.flush()
+            while True:
+                line = self._lines.get(timeout=self.timeout)
+                if line is None:
+                    log_func.warning(u'Gnuplot process is terminated')
+                    self._process = None
+                    self.error_count += 1
+                    return False
+                if line == done_signature:
+                    break
+                if line.strip():
+                    log_func.warning(u'Gnuplot: %s' % line)
+        except:
+            log_func.fatal(u'Error run commands in gnuplot session')
+            self.error_count += 1
+            self.stop()
+            return False
+
+        run_time = time.time() - start_time
+        self.run_count += 1
+        self.total_run_time += run_time
+        self.max_run_time = max(self.max_run_time, run_time)
+        return True
+
+
+def _toGraphX(x_values):
+    """
+    Convert X coordinate values to float array.
+
+    :param x_values: X coordinate value sequence.
+        Date-time values are converted to seconds since 1970-01-01 as is (without time zone).
+    :return: numpy float64 array.
+    """
+    if x_values and isinstance(x_values[0], datetime.datetime):
+        return numpy.fromiter([(x - GRAPH_TIME_EPOCH).total_seconds() for x in x_values],
+                              dtype=numpy.float64, count=len(x_values))
+    return numpy.asarray(x_values, dtype=numpy.float64)
+
+
+def mergeGraphData(pens_points):
+    """
+    Merge pen point lists by X coordinate.
+    The merge is an outer join on the X axis.
+    If the pen has no point with some X then its Y value is 0.0.
+
+    :param pens_points: List of pen point lists.
+        [[(x1, y1), (x2, y2), ... (xN, yN)], ...]
+    :return: numpy float64 array of graph data rows sorted by X:
+        [[x, pen 1 y, pen 2 y, ... pen N y], ...]
+    """
+    pens_x = list()
+    pens_y = list()
+    for points in pens_points:
+        if isinstance(points, (list, tuple)) and points:
+            pens_x.append(_toGraphX([point[0] for point in points]))
+            pens_y.append(numpy.fromiter([point[1] for point in points], dtype=numpy.float64, count=len(points)))
+        else:
+            pens_x.append(numpy.empty(0, dtype=numpy.float64))
+            pens_y.append(numpy.empty(0, dtype=numpy.float64))
+
+    all_x = numpy.unique(numpy.concatenate(pens_x)) if pens_x else numpy.empty(0, dtype=numpy.float64)
+    graph_data = numpy.zeros((len(all_x), len(pens_x) + 1), dtype=numpy.float64)
+    graph_data[:, 0] = all_x
+    for i_pen, (x_values, y_values) in enumerate(zip(pens_x, pens_y)):
+        if len(x_values):
+            graph_data[numpy.searchsorted(all_x, x_values), i_pen + 1] = y_values
+    return graph_data
+
 
 class iqGnuplotManager(object):
     """
@@ -60,6 +265,21 @@ class iqGnuplotManager(object):
 
         self.__x_format = None
 
+        # Persistent gnuplot session.
+        # If it is not defined then the gnuplot process is started for each generation
+        self.session = None
+        # Time of the last generation in the external process (seconds)
+        self.last_run_time = 0.0
+
+    def setSession(self, session=None):
+        """
+        Set persistent gnuplot session.
+
+        :param session: Gnuplot session object.
+            If None then the gnuplot process is started for each generation.
+        """
+        self.session = session
+
     def clearCommands(self):
         """
         Clear the list of commands.
@@ -358,6 +578,47 @@ class iqGnuplotManager(object):
                 self.commands.append(cmd)
         return True
 
+    def setPlotBinary(self, graph_filename, count=1):
+        """
+        Set charting from the binary chart data file.
+
+        :param graph_filename: Binary chart data file full name.
+            The file contains float64 rows: X, pen 1 Y, pen 2 Y, ... pen N Y.
+        :param count: The number of graphs.
+        :return: True/False.
+        """
+        if not os.path.exists(graph_filename):
+            return self.setPlot(graph_filename, count)
+
+        cmd_sign = 'plot '
+        binary_format = BINARY_GRAPH_DATA_FORMAT * (count + 1)
+        params = ['\'%s\' binary format=\'%s\' using 1:%d with lines linestyle %d' % (graph_filename, binary_format,
+                                                                                   i + 2, i + 1)
+                  for i in range(count)]
+        cmd = cmd_sign + ', '.join(params)
+
+        # The chart rendering command can only be the last command.
+        self._deleteCommand(cmd_sign)
+        self.commands.append(cmd)
+        return True
+
+    def saveGraphDataBinary(self, graph_filename, graph_data):
+        """
+        Write graph data to a binary data file.
+
+        :param graph_filename: The full name of the chart data file.
+        :param graph_data: numpy float64 array of graph data rows
+            [[x, pen 1 y, pen 2 y, ... pen N y], ...].
+            See mergeGraphData function.
+        :return: True/False.
+        """
+        try:
+            numpy.ascontiguousarray(graph_data, dtype=numpy.float64).tofile(graph_filename)
+            return True
+        except:
+            log_func.fatal(u'Error save binary graph data file <%s>' % graph_filename)
+        return False
+
     def saveGraphData(self, graph_filename, graph_data=(), fields=()):
         """
         Write graph data to a data file.
@@ -380,15 +641,14 @@ class iqGnuplotManager(object):
         """
         global DATETIME_GRAPH_DATA_FMT
 
-        txt = ''
+        lines = list()
         for record in graph_data:
             x = record.get('x', 0)
             # x_str = str(x) if self.__x_format is None else (x.strftime(self.__x_format) if isinstance(x, datetime.datetime) else str(x))
             x_str = x.strftime(DATETIME_GRAPH_DATA_FMT) if isinstance(x, datetime.datetime) else str(x)
             record_list = [x_str] + [str(record.get(field, 0)) for field in fields]
-            record_txt = ' '.join(record_list)
-            txt += record_txt + '\n'
-        return txtfile_func.saveTextFile(graph_filename, txt)
+            lines.append(' '.join(record_list) + '\n')
+        return txtfile_func.saveTextFile(graph_filename, ''.join(lines))
 
     def getRunCommand(self):
         """
@@ -410,14 +670,22 @@ class iqGnuplotManager(object):
     def runCommands(self):
         """
         Start generating.
-        Another name for the method is generate
+        Another name for the method is generate.
+        If the persistent gnuplot session can not be started
+        then the gnuplot process is started for the generation.
 
         :return: True/False.
         """
-        cmd = self.getRunCommand()
-        log_func.info(u'Command execution <%s>' % cmd)
-        os.system(cmd)
-        return True
+        start_time = time.time()
+        if self.session is not None and self.session.start():
+            result = self.session.run(self.commands)
+        else:
+            cmd = self.getRunCommand()
+            log_func.info(u'Command execution <%s>' % cmd)
+            os.system(cmd)
+            result = True
+        self.last_run_time = time.time() - start_time
+        return result
 
     gen = runCommands
 
@@ -7,11 +7,12 @@ The component is based on the gnuplot utility.
 """
 
 import os.path
-import operator
 import wx
 import datetime
 import time
 import uuid
+import hashlib
+import collections
 
 from ...util import log_func
 from ...util import file_func
@@ -21,7 +22,7 @@ from . import gnuplot_manager
 
 from . import trend_proto
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 0, 4)
 
 # Gnuplot utility file name
 GNUPLOT_FILENAME = 'gnuplot'
@@ -38,11 +39,17 @@ PNG_FILE_TYPE = 'PNG'
 PDF_FILE_TYPE = 'PDF'
 
 DATA_FILE_EXT = '.dat'
+BINARY_DATA_FILE_EXT = '.bin'
 
 # Default precision
 DEFAULT_X_PRECISION = '01:00:00'
 DEFAULT_Y_PRECISION = '1.0'
 
+# Minimum interval between frame renderings (seconds)
+DEFAULT_MIN_REDRAW_INTERVAL = 0.5
+# Maximum number of cached frames of one trend
+DEFAULT_FRAME_CACHE_SIZE = 16
+
 
 class iqGnuplotTrendProto(trend_proto.iqTrendProto):
     """
@@ -88,6 +95,21 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
         self.__gnuplot_manager.enableLegend(False)
         self.__gnuplot_manager.enableXTime()
         self.__gnuplot_manager.enableXTextVertical()
+        # Persistent gnuplot process instead of a process per frame
+        self.__gnuplot_manager.setSession(gnuplot_manager.iqGnuplotSession())
+
+        # Frame cache: {(data version, scene, size, pen count): frame filename}
+        self._frame_cache = collections.OrderedDict()
+        # Digest of the current pen data
+        self._graph_data_version = None
+        # Current frame filename
+        self._cur_frame_filename = None
+
+        self._min_redraw_interval = DEFAULT_MIN_REDRAW_INTERVAL
+        self._last_draw_time = 0.0
+        self._redraw_timer = None
+
+        self.resetFrameMetrics()
 
         # If you need to remove / free resources when removing control,
         # then you need to use the wx.EVT_WINDOW_DESTROY event
@@ -99,6 +121,63 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
         """
         return self.__gnuplot_manager
 
+    def getMinRedrawInterval(self):
+        """
+        Minimum interval between frame renderings in seconds.
+        """
+        return self._min_redraw_interval
+
+    def setMinRedrawInterval(self, min_redraw_interval=DEFAULT_MIN_REDRAW_INTERVAL):
+        """
+        Set minimum interval between frame renderings.
+
+        :param min_redraw_interval: Interval in seconds. If 0 then rendering is not throttled.
+            If None then the default interval is used.
+        """
+        if min_redraw_interval is None:
+            min_redraw_interval = DEFAULT_MIN_REDRAW_INTERVAL
+        self._min_redraw_interval = max(float(min_redraw_interval), 0.0)
+
+    def resetFrameMetrics(self):
+        """
+        Reset frame rendering metrics.
+        """
+        self._frame_count = 0
+        self._cache_hit_count = 0
+        self._cache_miss_count = 0
+        self._throttled_count = 0
+        self._total_frame_time = 0.0
+        self._max_frame_time = 0.0
+        self._total_external_time = 0.0
+        self._max_external_time = 0.0
+
+    def getFrameMetrics(self):
+        """
+        Get frame rendering metrics.
+
+        :return: Metrics dictionary.
+        """
+        session = self.__gnuplot_manager.session
+        return dict(frame_count=self._frame_count,
+                    cache_hit_count=self._cache_hit_count,
+                    cache_miss_count=self._cache_miss_count,
+                    throttled_count=self._throttled_count,
+                    avg_frame_time=self._total_frame_time / self._frame_count if self._frame_count else 0.0,
+                    max_frame_time=self._max_frame_time,
+                    total_external_time=self._total_external_time,
+                    avg_external_time=self._total_external_time / self._cache_miss_count if self._cache_miss_count else 0.0,
+                    max_external_time=self._max_external_time,
+                    session=session.getMetrics() if session is not None else None)
+
+    def clearFrameCache(self):
+        """
+        Clear frame cache and delete cached frame files.
+        """
+        for frame_filename in self._frame_cache.values():
+            self.delFrameFile(frame_filename)
+        self._frame_cache.clear()
+        self._cur_frame_filename = None
+
     def isAdaptScene(self):
         """
         To adapt the trend scene according to the data?
@@ -166,10 +245,13 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
             If None, then the format is not set.
         :return: Tuple (x_format, y_format) of current formats.
         """
+        formats = (self._x_format, self._y_format)
         if x_format is not None:
             self._x_format = x_format
         if y_format is not None:
             self._y_format = y_format
+        if (self._x_format, self._y_format) != formats:
+            self.clearFrameCache()
         return self._x_format, self._y_format
 
     def setPrecisions(self, x_precision=None, y_precision=None):
@@ -182,6 +264,7 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
             If None, then the division price is not set.
         :return: Tuple (x_precision, y_precision) of the current division prices.
         """
+        precisions = (self._x_precision, self._y_precision)
         if x_precision is not None:
             if isinstance(x_precision, str):
                 # Цена деления задается строкой. Необходимо правильно преобразовать
@@ -191,6 +274,8 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
             if not isinstance(y_precision, float):
                 y_precision = float(y_precision)
             self._y_precision = y_precision
+        if (self._x_precision, self._y_precision) != precisions:
+            self.clearFrameCache()
         return self._x_precision, self._y_precision
 
     def onDestroy(self, event):
@@ -205,6 +290,15 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
         self.delFrameFile(frame_filename)
         dat_filename = os.path.splitext(frame_filename)[0] + DATA_FILE_EXT
         file_func.removeFile(dat_filename)
+        bin_filename = os.path.splitext(frame_filename)[0] + BINARY_DATA_FILE_EXT
+        file_func.removeFile(bin_filename)
+
+        self.clearFrameCache()
+        if self._redraw_timer is not None:
+            self._redraw_timer.Stop()
+            self._redraw_timer = None
+        if self.__gnuplot_manager.session is not None:
+            self.__gnuplot_manager.session.stop()
         event.Skip()
 
     def getTrendUUID(self):
@@ -227,15 +321,15 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
             self.__frame_filename = os.path.join(DEFAULT_GNUPLOT_FRAME_PATH, obj_uuid + file_ext)
         return self.__frame_filename
 
-    def getGraphFileName(self, file_type=DATA_FILE_EXT):
+    def getGraphFileName(self, file_type=BINARY_DATA_FILE_EXT):
         """
         The name of the chart data file.
 
         :param file_type: File Type / File Extension.
-            The default text file is * .dat.
+            The default binary file is *.bin. The text file is *.dat.
         """
         frame_filename = self.getFrameFileName()
-        graph_filename = os.path.splitext(frame_filename)[0] + DATA_FILE_EXT
+        graph_filename = os.path.splitext(frame_filename)[0] + file_type
         return graph_filename
 
     def getCurScene(self):
@@ -276,7 +370,7 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
                          'exponent': 'E'}
 
     def drawFrame(self, size=(0, 0), x_format='time', y_format='numeric',
-                  scene=None, points=None):
+                  scene=None, points=None, frame_filename=None):
         """
         Drawing a frame of trend data.
 
@@ -286,6 +380,7 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
         :param scene: The boundaries of the scene window in the data of the subject area.
         :param points: List of chart points.
             The list of points can also be specified by the name of the data file.
+        :param frame_filename: Frame filename. If None then the trend frame filename is used.
         :return: The file name of the rendered frame or None in case of an error.
         """
         try:
@@ -293,7 +388,8 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
                 scene = self._cur_scene
 
             return self._drawFrame(size=size, x_format=x_format, y_format=y_format,
-                                   scene=scene, points=points, file_type=PNG_FILE_TYPE)
+                                   scene=scene, points=points, file_type=PNG_FILE_TYPE,
+                                   frame_filename=frame_filename)
         except:
             log_func.fatal(u'Frame rendering error')
         return None
@@ -321,7 +417,7 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
         return None
 
     def _drawFrame(self, size=(0, 0), x_format='time', y_format='numeric', scene=None,
-                   points=None, file_type=PNG_FILE_TYPE):
+                   points=None, file_type=PNG_FILE_TYPE, frame_filename=None):
         """
         Drawing a frame of trend data.
 
@@ -331,9 +427,11 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
         :param scene: The boundaries of the scene window in the data of the subject area.
         :param points: List of chart points.
             The list of points can also be specified by the name of the data file.
+        :param frame_filename: Frame filename. If None then the trend frame filename is used.
         :return: The file name of the rendered frame or None in case of an error.
         """
-        frame_filename = self.getFrameFileName(file_type)
+        if frame_filename is None:
+            frame_filename = self.getFrameFileName(file_type)
 
         if isinstance(points, (list, tuple)):
             graph_filename = os.path.splitext(frame_filename)[0] + DATA_FILE_EXT
@@ -393,6 +491,8 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
                                point1=float(point[1])) for point in points]
             self.__gnuplot_manager.saveGraphData(graph_filename, points_lst, ('point1',))
             self.__gnuplot_manager.setPlot(graph_filename, 1)
+        elif graph_filename.endswith(BINARY_DATA_FILE_EXT):
+            self.__gnuplot_manager.setPlotBinary(graph_filename, len(self.getPens()))
         else:
             self.__gnuplot_manager.setPlot(graph_filename, len(self.getPens()))
 
@@ -433,6 +533,7 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
                 bmp = wxbitmap_func.createBitmap(frame_filename)
                 self.canvas.SetBitmap(bmp)
                 self.canvas.Refresh()
+                self._cur_frame_filename = frame_filename
                 return True
         except:
             log_func.fatal(u'Error set frame <%s> in trend <%s>' % (frame_filename, self.getName()))
@@ -454,76 +555,143 @@ class iqGnuplotTrendProto(trend_proto.iqTrendProto):
         if pens:
             self.setDefaults()
 
-            graph_data = list()
-            for i_pen, pen in enumerate(pens):
+            pens_points = list()
+            for pen in pens:
+                points = None
                 try:
                     if pen:
                         # By feathers we form a data file
                         points = pen.getLineData()
-                        if points:
-                            if not graph_data:
-                                graph_data = [dict(x=point[0] if isinstance(point[0],
-                                                                            datetime.datetime) else float(point[0]),
-                                              pen0=float(point[1])) for point in points]
-                            else:
-                                for i_point, point in enumerate(points):
-                                    point_name = 'pen%d' % i_pen
-                                    is_graph_point = False
-                                    for i, graph_point in enumerate(graph_data):
-                                        if graph_data[i]['x'] == point[0]:
-                                            graph_data[i][point_name] = float(point[1])
-                                            is_graph_point = True
-                                            break
-                                    if not is_graph_point:
-                                        # There is no such point in the output
-                                        # Add to the general list
-                                        new_graph_point = dict()
-                                        new_graph_point['x'] = point[0] if isinstance(point[0],
-                                                                                      datetime.datetime) else float(point[0])
-                                        new_graph_point[point_name] = float(point[1])
-                                        for i_prev_pen in range(i_pen):
-                                            new_graph_point['pen%d' % i_prev_pen] = 0.0
-                                        graph_data.append(new_graph_point)
                     else:
                         log_func.warning(u'Undefined trend pen <%s>' % self.name)
                 except:
                     log_func.fatal(u'Trend rendering error')
-                    break
-
-            if graph_data:
-                # After filling in the list of graphic data, sort it by time
-                graph_data.sort(key=operator.itemgetter('x'))
-                # And save it in a file
-                self.__gnuplot_manager.saveGraphData(graph_filename, graph_data,
-                                                     ['pen%d' % i_pen for i_pen in range(len(pens))])
+                pens_points.append(points)
+
+            try:
+                # Outer join of pen points on the time axis sorted by time
+                graph_data = gnuplot_manager.mergeGraphData(pens_points)
+            except:
+                log_func.fatal(u'Error merge trend <%s> pen data' % self.getName())
+                return False
+
+            if len(graph_data):
+                if graph_filename.endswith(BINARY_DATA_FILE_EXT):
+                    graph_data_version = hashlib.md5(graph_data.tobytes()).hexdigest()
+                    if graph_data_version == self._graph_data_version and os.path.exists(graph_filename):
+                        # Pen data is not changed
+                        return True
+                    self._graph_data_version = graph_data_version
+                    return self.__gnuplot_manager.saveGraphDataBinary(graph_filename, graph_data)
+
+                pen_names = ['pen%d' % i_pen for i_pen in range(len(pens))]
+                x_values = graph_data[:, 0].tolist()
+                first_points = [points for points in pens_points if isinstance(points, (list, tuple)) and points]
+                if isinstance(first_points[0][0][0], datetime.datetime):
+                    x_values = [gnuplot_manager.GRAPH_TIME_EPOCH + datetime.timedelta(seconds=round(x, 6))
+                                for x in x_values]
+                records = [dict(zip(pen_names, row), x=x_values[i]) for i, row in enumerate(graph_data[:, 1:].tolist())]
+                self.__gnuplot_manager.saveGraphData(graph_filename, records, pen_names)
                 return True
         else:
             log_func.warning(u'Not defined feathers in the trend <%s>' % self.getName())
 
         return False
 
+    def _isRedrawThrottled(self):
+        """
+        Check minimum redraw interval.
+        If the interval is not passed then the redrawing is deferred to the end of the interval.
+
+        :return: True - redrawing is deferred / False - redraw now.
+        """
+        min_redraw_interval = self.getMinRedrawInterval()
+        elapsed_time = time.time() - self._last_draw_time
+        if min_redraw_interval and elapsed_time < min_redraw_interval:
+            self._throttled_count += 1
+            if self._redraw_timer is None:
+                delay = int((min_redraw_interval - elapsed_time) * 1000) + 1
+                self._redraw_timer = wx.CallLater(delay, self._onDeferredDraw)
+            return True
+        return False
+
+    def _onDeferredDraw(self):
+        """
+        Deferred redrawing.
+        """
+        self._redraw_timer = None
+        self.draw(redraw=True)
+
+    def _drawCachedFrame(self, size, graph_filename):
+        """
+        Get the frame from the frame cache or render it.
+
+        :param size: Frame size.
+        :param graph_filename: Chart data file.
+        :return: Frame filename or None if error.
+        """
+        scene = tuple(self._cur_scene) if self._cur_scene else None
+        key = (self._graph_data_version, scene, tuple(size), len(self.getPens()),
+               self._x_format, self._y_format, self._x_precision, self._y_precision)
+        frame_filename = self._frame_cache.get(key)
+        if frame_filename and os.path.exists(frame_filename):
+            self._frame_cache.move_to_end(key)
+            self._cache_hit_count += 1
+            return frame_filename
+
+        self._cache_miss_count += 1
+        key_digest = hashlib.md5(repr(key).encode('utf-8')).hexdigest()
+        frame_filename = os.path.join(DEFAULT_GNUPLOT_FRAME_PATH,
+                                      '%s_%s.%s' % (self.getTrendUUID(), key_digest, PNG_FILE_TYPE.lower()))
+        frame_filename = self.drawFrame(size=size, points=graph_filename, scene=self._cur_scene,
+                                        frame_filename=frame_filename)
+        external_time = self.__gnuplot_manager.last_run_time
+        self._total_external_time += external_time
+        self._max_external_time = max(self._max_external_time, external_time)
+
+        if frame_filename:
+            self._frame_cache[key] = frame_filename
+            while len(self._frame_cache) > DEFAULT_FRAME_CACHE_SIZE:
+                old_key, old_frame_filename = self._frame_cache.popitem(last=False)
+                self.delFrameFile(old_frame_filename)
+        return frame_filename
+
     def draw(self, redraw=True, size=None):
         """
         The main method of plotting a trend.
+        Rendered frames are cached by pen data, scene, size, formats and precisions.
+        The cache is cleared when formats, precisions or pen colours are changed.
+        Redrawing is throttled by the minimum redraw interval.
 
         :param redraw: Forced drawing.
         :param size: Size.
         """
+        if redraw and self._isRedrawThrottled():
+            return
+
         if size is None:
             size = self.GetSize()
 
+        start_time = time.time()
         # Sign of a non-empty trend
         graph_filename = self.getGraphFileName()
         not_empty = self._saveGraphDataFile(graph_filename)
 
         if not_empty:
+            frame_filename = None
             if redraw:
-                self.drawFrame(size=size, points=graph_filename, scene=self._cur_scene)
-            self.setFrame()
+                frame_filename = self._drawCachedFrame(size, graph_filename)
+            self.setFrame(frame_filename if frame_filename else self._cur_frame_filename)
         else:
             # If the trend is empty, then draw an empty trend
             self.drawEmpty(size=size)
 
+        self._last_draw_time = time.time()
+        frame_time = self._last_draw_time - start_time
+        self._frame_count += 1
+        self._total_frame_time += frame_time
+        self._max_frame_time = max(self._max_frame_time, frame_time)
+
     def adaptScene(self, graph_data=None):
         """
         Adapt the current scene to display according to the graph.
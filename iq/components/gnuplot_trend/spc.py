@@ -11,7 +11,7 @@ from .. import wx_panel
 from . import trend_proto
 from . import gnuplot_trend_proto
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 0, 2)
 
 COMPONENT_TYPE = 'iqGnuplotTrend'
 
@@ -32,6 +32,8 @@ GNUPLOTTREND_SPC = {
     'x_precision': gnuplot_trend_proto.DEFAULT_X_PRECISION,
     'y_precision': gnuplot_trend_proto.DEFAULT_Y_PRECISION,
 
+    'min_redraw_interval': gnuplot_trend_proto.DEFAULT_MIN_REDRAW_INTERVAL,
+
     '__package__': u'SCADA',
     '__icon__': 'fatcow/chart_line',
     '__parent__': wx_panel.SPC,
@@ -51,6 +53,7 @@ GNUPLOTTREND_SPC = {
         },
         'x_precision': property_editor_id.STRING_EDITOR,
         'y_precision': property_editor_id.STRING_EDITOR,
+        'min_redraw_interval': property_editor_id.FLOAT_EDITOR,
     },
     '__help__': {
         'x_format': u'X axis data presentation format',
@@ -61,6 +64,8 @@ GNUPLOTTREND_SPC = {
 
         'x_precision': u'X grid trend precision',
         'y_precision': u'Y grid trend precision',
+
+        'min_redraw_interval': u'Minimum interval between trend frame renderings in seconds',
     },
 }
 
@@ -3,13 +3,17 @@
 
 """
 Transformation table data component prototype class.
+
+Table data may be exchanged by rows (list of dictionaries or tuples)
+or by columns (dictionary of column arrays or Arrow-like record batch).
+Columnar exchange does not convert each value to a Python object.
 """
 
 import pandas
 
 from ...util import log_func
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 1, 1)
 
 
 class iqTransformDataSourceProto(object):
@@ -32,20 +36,36 @@ class iqTransformDataSourceProto(object):
 
     getDataset = getDataFrame
 
-    def importData(self, data=None):
+    def importData(self, data=None, columns=None):
         """
         Import table data to DataFrame object.
 
-        :param data: Table data as list of dictionary.
+        :param data: Table data as:
+            list of dictionary,
+            list of tuples (column names are set by columns),
+            dictionary of column arrays/lists {column name: values},
+            DataFrame object (used without copy)
+            or Arrow-like record batch/table (an object with to_pandas method).
+        :param columns: Column names of the list of tuples.
         :return: True/False.
         """
         if data is None:
             data = tuple()
 
-        assert isinstance(data, (list, tuple)), u'Type error import data in component <%s>' % self.__class__.__name__
+        assert isinstance(data, (list, tuple, dict, pandas.DataFrame)) or hasattr(data, 'to_pandas'), \
+            u'Type error import data in component <%s>' % self.__class__.__name__
 
         try:
-            self._dataframe = pandas.DataFrame(data)
+            if isinstance(data, pandas.DataFrame):
+                self._dataframe = data
+            elif hasattr(data, 'to_pandas'):
+                self._dataframe = data.to_pandas()
+            elif isinstance(data, dict):
+                self._dataframe = pandas.DataFrame(data, copy=False)
+            elif columns is not None:
+                self._dataframe = pandas.DataFrame.from_records(data, columns=columns)
+            else:
+                self._dataframe = pandas.DataFrame(data)
             # log_func.debug(u'Transformed DataFrame:')
             # log_func.debug(str(self._dataframe))
             return True
@@ -56,11 +76,33 @@ class iqTransformDataSourceProto(object):
 
     def exportDataToValues(self, dataframe=None):
         """
-        Export DataFrame object to table data as dict_values.
+        Export DataFrame object to table data as list of dictionary.
+
+        :param dataframe: DataFrame object.
+            If not defined then get current DataFrame object.
+        :return: Table data as list of dictionary or None if error.
+        """
+        if dataframe is None:
+            dataframe = self.getDataFrame()
+
+        if isinstance(dataframe, pandas.DataFrame):
+            try:
+                # Indexes as column ------V
+                dataframe = dataframe.reset_index()
+                return dataframe.to_dict('records')
+            except:
+                log_func.fatal(u'Export error DataFrame in <%s>' % self.getName())
+        else:
+            log_func.warning(u'Not define DataFrame object for export')
+        return None
+
+    def exportDataToTuples(self, dataframe=None):
+        """
+        Export DataFrame object to table data as list of tuples.
 
         :param dataframe: DataFrame object.
             If not defined then get current DataFrame object.
-        :return: Table data as dict_values or None if error.
+        :return: Tuple (column names, list of row tuples) or None if error.
         """
         if dataframe is None:
             dataframe = self.getDataFrame()
@@ -69,7 +111,59 @@ class iqTransformDataSourceProto(object):
             try:
                 # Indexes as column ------V
                 dataframe = dataframe.reset_index()
-                return dataframe.T.to_dict().values()
+                return list(dataframe.columns), list(dataframe.itertuples(index=False, name=None))
+            except:
+                log_func.fatal(u'Export error DataFrame in <%s>' % self.getName())
+        else:
+            log_func.warning(u'Not define DataFrame object for export')
+        return None
+
+    def exportDataToColumns(self, dataframe=None):
+        """
+        Export DataFrame object to table data as column arrays.
+        Column values are not converted to Python objects.
+
+        :param dataframe: DataFrame object.
+            If not defined then get current DataFrame object.
+        :return: Dictionary {column name: numpy array} or None if error.
+        """
+        if dataframe is None:
+            dataframe = self.getDataFrame()
+
+        if isinstance(dataframe, pandas.DataFrame):
+            try:
+                # Indexes as column ------V
+                dataframe = dataframe.reset_index()
+                return {column: dataframe[column].to_numpy() for column in dataframe.columns}
+            except:
+                log_func.fatal(u'Export error DataFrame in <%s>' % self.getName())
+        else:
+            log_func.warning(u'Not define DataFrame object for export')
+        return None
+
+    def exportDataToRecordBatch(self, dataframe=None):
+        """
+        Export DataFrame object to Arrow record batch.
+        The pyarrow package is necessary.
+
+        :param dataframe: DataFrame object.
+            If not defined then get current DataFrame object.
+        :return: pyarrow.RecordBatch object or None if error.
+        """
+        if dataframe is None:
+            dataframe = self.getDataFrame()
+
+        if isinstance(dataframe, pandas.DataFrame):
+            try:
+                import pyarrow
+            except ImportError:
+                log_func.warning(u'Import error pyarrow. For install: pip3 install pyarrow')
+                return None
+
+            try:
+                # Indexes as column ------V
+                dataframe = dataframe.reset_index()
+                return pyarrow.RecordBatch.from_pandas(dataframe, preserve_index=False)
             except:
                 log_func.fatal(u'Export error DataFrame in <%s>' % self.getName())
         else:
@@ -87,10 +181,7 @@ class iqTransformDataSourceProto(object):
         if dataframe is None:
             dataframe = self.getDataFrame()
 
-        values = self.exportDataToValues(dataframe=dataframe)
-        if values is not None:
-            return list(values)
-        return None
+        return self.exportDataToValues(dataframe=dataframe)
 
     def transform(self, dataframe=None):
         """
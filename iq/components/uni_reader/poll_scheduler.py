@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+UniReader tag polling scheduler.
+
+Subscribers register tags of UniReader controllers with a poll period.
+Tags are grouped by period and controller, so each tag is read once per cycle
+regardless of the subscriber number. All controllers of a period group are read
+with one batch request per UniReader server.
+Only changed values (on change or out of deadband) are delivered to subscribers.
+"""
+
+import time
+import threading
+import itertools
+
+from ...util import log_func
+
+from . import uni_reader_controller
+
+__version__ = (0, 0, 0, 2)
+
+DEFAULT_PERIOD = 1.0
+# Minimum poll period in seconds
+MIN_PERIOD = 0.05
+
+
+class iqTagSubscription(object):
+    """
+    Tag subscription.
+    """
+    def __init__(self, subscription_id, controller, address, period, callback, deadband=0.0, typecast=True):
+        """
+        Constructor.
+
+        :param subscription_id: Subscription identifier.
+        :param controller: UniReader controller object.
+        :param address: Tag address.
+        :param period: Poll period in seconds.
+        :param callback: Value change callback function.
+            Format: callback(controller, address, value).
+        :param deadband: Deadband of numeric values.
+            The value is delivered only if it differs from the last delivered value more than the deadband.
+            If 0 then any value change is delivered.
+        :param typecast: Convert the read value string to the tag value type?
+        """
+        self.subscription_id = subscription_id
+        self.controller = controller
+        self.address = address
+        self.period = period
+        self.callback = callback
+        self.deadband = deadband
+        self.typecast = typecast
+
+        self.has_value = False
+        self.last_value = None
+        # Is the subscription not cancelled?
+        self.active = True
+
+    def isChanged(self, value):
+        """
+        Check if the value should be delivered to the subscriber.
+
+        :param value: New tag value.
+        :return: True/False.
+        """
+        if not self.has_value:
+            return True
+        if self.deadband and isinstance(value, (int, float)) and isinstance(self.last_value, (int, float)) \
+                and not isinstance(value, bool):
+            return abs(value - self.last_value) > self.deadband
+        return value != self.last_value
+
+    def deliver(self, value):
+        """
+        Deliver the value to the subscriber if it is changed.
+
+        :param value: New tag value.
+        :return: True - the value is delivered / False - not changed or cancelled.
+        """
+        if not self.active or not self.isChanged(value):
+            return False
+        self.has_value = True
+        self.last_value = value
+        try:
+            self.callback(self.controller, self.address, value)
+        except:
+            log_func.fatal(u'UniReader scheduler. Error subscription <%s> callback' % self.address)
+        return True
+
+
+class iqPollGroup(object):
+    """
+    Tags polled with one period.
+    """
+    def __init__(self, period):
+        """
+        Constructor.
+
+        :param period: Poll period in seconds.
+        """
+        self.period = period
+        # Subscriptions: {controller: {address: [subscription, ...]}}
+        self.tags = dict()
+        self.next_time = None
+
+        self.resetMetrics()
+
+    def resetMetrics(self):
+        """
+        Reset group metrics.
+        """
+        self.cycle_count = 0
+        self.overrun_count = 0
+        self.error_count = 0
+        self.delivery_count = 0
+        self.total_jitter = 0.0
+        self.max_jitter = 0.0
+        self.total_cycle_time = 0.0
+        self.max_cycle_time = 0.0
+
+    def getMetrics(self):
+        """
+        Get group metrics.
+
+        :return: Metrics dictionary.
+        """
+        return dict(period=self.period,
+                    controller_count=len(self.tags),
+                    tag_count=sum([len(addresses) for addresses in self.tags.values()]),
+                    cycle_count=self.cycle_count,
+                    overrun_count=self.overrun_count,
+                    error_count=self.error_count,
+                    delivery_count=self.delivery_count,
+                    avg_jitter=self.total_jitter / self.cycle_count if self.cycle_count else 0.0,
+                    max_jitter=self.max_jitter,
+                    avg_cycle_time=self.total_cycle_time / self.cycle_count if self.cycle_count else 0.0,
+                    max_cycle_time=self.max_cycle_time)
+
+    def getSnapshot(self):
+        """
+        Get copy of the group subscriptions for polling.
+
+        :return: [(controller, [(address, [subscription, ...]), ...]), ...].
+        """
+        return [(controller, [(address, list(subscriptions)) for address, subscriptions in addresses.items()])
+                for controller, addresses in self.tags.items()]
+
+    def poll(self, snapshot=None):
+        """
+        Read group tags and deliver changed values.
+
+        :param snapshot: Group subscriptions snapshot.
+            If None then the snapshot is taken from the group.
+        """
+        if snapshot is None:
+            snapshot = self.getSnapshot()
+        controller_tags = [(controller, {address: address for address, subscriptions in addresses})
+                           for controller, addresses in snapshot]
+        results = uni_reader_controller.readControllersTags(*controller_tags)
+
+        for (controller, addresses), values in zip(snapshot, results):
+            for address, subscriptions in addresses:
+                value = values.get(address, u'')
+                if value == u'':
+                    # Read error
+                    self.error_count += 1
+                    continue
+                typecast_value = None
+                for subscription in subscriptions:
+                    if subscription.typecast:
+                        if typecast_value is None:
+                            typecast_value = controller.typecastTagValue(address, value)
+                        if subscription.deliver(typecast_value):
+                            self.delivery_count += 1
+                    elif subscription.deliver(value):
+                        self.delivery_count += 1
+
+
+class iqUniReaderPollScheduler(object):
+    """
+    UniReader tag polling scheduler.
+    """
+    def __init__(self):
+        """
+        Constructor.
+        """
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._running = False
+
+        self._id_counter = itertools.count(1)
+        # Subscriptions by identifier
+        self._subscriptions = dict()
+        # Poll groups by period
+        self._groups = dict()
+
+    def subscribe(self, controller, address, callback, period=DEFAULT_PERIOD, deadband=0.0, typecast=True):
+        """
+        Subscribe to tag value changes.
+        Subscriptions to the same controller tag with the same period are polled once per cycle.
+
+        :param controller: UniReader controller object.
+        :param address: Tag address.
+        :param callback: Value change callback function.
+            Format: callback(controller, address, value).
+        :param period: Poll period in seconds.
+        :param deadband: Deadband of numeric values. If 0 then any value change is delivered.
+        :param typecast: Convert the read value string to the tag value type?
+        :return: Subscription identifier or None if error.
+        """
+        if not address:
+            log_func.warning(u'UniReader scheduler. Not define tag address')
+            return None
+        if not callable(callback):
+            log_func.warning(u'UniReader scheduler. Not callable subscription <%s> callback' % address)
+            return None
+
+        period = max(float(period), MIN_PERIOD)
+        with self._lock:
+            subscription_id = next(self._id_counter)
+            subscription = iqTagSubscription(subscription_id, controller, address, period,
+                                             callback, deadband=deadband, typecast=typecast)
+            self._subscriptions[subscription_id] = subscription
+
+            group = self._groups.get(period)
+            if group is None:
+                group = iqPollGroup(period)
+                self._groups[period] = group
+            group.tags.setdefault(controller, dict()).setdefault(address, list()).append(subscription)
+        self._wakeup.set()
+        return subscription_id
+
+    def unsubscribe(self, subscription_id):
+        """
+        Cancel subscription.
+
+        :param subscription_id: Subscription identifier.
+        :return: True/False.
+        """
+        with self._lock:
+            subscription = self._subscriptions.pop(subscription_id, None)
+            if subscription is None:
+                log_func.warning(u'UniReader scheduler. Subscription <%s> not found' % str(subscription_id))
+                return False
+            subscription.active = False
+
+            group = self._groups[subscription.period]
+            addresses = group.tags[subscription.controller]
+            addresses[subscription.address].remove(subscription)
+            if not addresses[subscription.address]:
+                del addresses[subscription.address]
+            if not addresses:
+                del group.tags[subscription.controller]
+            if not group.tags:
+                del self._groups[subscription.period]
+        return True
+
+    def getSubscriptionCount(self):
+        """
+        Get subscription number.
+        """
+        return len(self._subscriptions)
+
+    def getMetrics(self):
+        """
+        Get scheduler metrics.
+
+        :return: Metrics dictionary by poll period.
+        """
+        with self._lock:
+            return {period: group.getMetrics() for period, group in self._groups.items()}
+
+    def resetMetrics(self):
+        """
+        Reset scheduler metrics.
+        """
+        with self._lock:
+            for group in self._groups.values():
+                group.resetMetrics()
+
+    def poll(self, now=None):
+        """
+        Poll all groups which cycle time has come.
+
+        :param now: Current time. If None then time.monotonic() is used.
+        :return: Time to the next poll cycle in seconds.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        # Due groups are polled outside the lock,
+        # so network reads and callbacks do not block subscribe/unsubscribe
+        with self._lock:
+            due_groups = list()
+            for group in self._groups.values():
+                if group.next_time is None:
+                    group.next_time = now
+                if now >= group.next_time:
+                    due_groups.append((group, group.getSnapshot()))
+
+        for group, snapshot in due_groups:
+            start_time = time.monotonic()
+            jitter = max(start_time - group.next_time, 0.0)
+            try:
+                group.poll(snapshot)
+            except:
+                group.error_count += 1
+                log_func.fatal(u'UniReader scheduler. Error poll group <%s>' % group.period)
+            cycle_time = time.monotonic() - start_time
+
+            group.cycle_count += 1
+            group.total_jitter += jitter
+            group.max_jitter = max(group.max_jitter, jitter)
+            group.total_cycle_time += cycle_time
+            group.max_cycle_time = max(group.max_cycle_time, cycle_time)
+
+            group.next_time += group.period
+            if group.next_time <= time.monotonic():
+                # Overrun. Missed cycles are skipped
+                group.overrun_count += 1
+                group.next_time = time.monotonic() + group.period
+
+        with self._lock:
+            next_times = [group.next_time for group in self._groups.values() if group.next_time is not None]
+
+        if not next_times:
+            return None
+        return max(min(next_times) - time.monotonic(), 0.0)
+
+    def _run(self):
+        """
+        Scheduler thread function.
+        """
+        while self._running:
+            timeout = self.poll()
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def start(self):
+        """
+        Start scheduler thread.
+
+        :return: True/False.
+        """
+        if self.isRunning():
+            log_func.warning(u'UniReader scheduler is already running')
+            return False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=None):
+        """
+        Stop scheduler thread.
+
+        :param timeout: Join timeout in seconds.
+        :return: True/False.
+        """
+        if not self.isRunning():
+            return False
+        self._running = False
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+        return True
+
+    def isRunning(self):
+        """
+        Is the scheduler running?
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+
+# Shared scheduler object
+POLL_SCHEDULER = None
+
+
+def getPollScheduler(auto_start=True):
+    """
+    Get shared UniReader poll scheduler.
+    All consumers use one scheduler so the same tags are not polled several times per cycle.
+
+    :param auto_start: Start the scheduler thread if it is not running.
+    :return: Scheduler object.
+    """
+    global POLL_SCHEDULER
+    if POLL_SCHEDULER is None:
+        POLL_SCHEDULER = iqUniReaderPollScheduler()
+    if auto_start and not POLL_SCHEDULER.isRunning():
+        POLL_SCHEDULER.start()
+    return POLL_SCHEDULER
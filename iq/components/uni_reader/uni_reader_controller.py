@@ -7,11 +7,13 @@ Universal Remote Read Controller <UniReader Remote Service>.
 This controller is used to read data from the UniReader service using XML-RPC.
 """
 
-import xmlrpc.client
+import ast
+import re
 
 from ...util import log_func
+from ...util import xmlrpc_func
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 0, 3)
 
 
 # Default port used
@@ -27,6 +29,104 @@ OPC_SERVER_NODE = 'OPC_SERVER_NODE'
 OPC_DA_NODE = 'OPC_DA'
 NODES = (OPC_SERVER_NODE, OPC_DA_NODE)
 
+READ_VALUES_METHOD = 'sources.ReadValuesAsStrings'
+
+INT_VALUE_PATTERN = re.compile(r'^[-+]?\d+$')
+FLOAT_VALUE_PATTERN = re.compile(r'^[-+]?(\d+\.\d*|\.\d+|\d+)([eE][-+]?\d+)?$')
+BOOL_VALUES = {'True': True, 'False': False}
+
+
+def _castBool(value):
+    return BOOL_VALUES[value]
+
+
+def _castStr(value):
+    return value
+
+
+def getTypecastFunction(value):
+    """
+    Detect value type and get the function of converting the string value to this type.
+
+    :param value: Value string.
+    :return: Typecast function.
+    """
+    if INT_VALUE_PATTERN.match(value):
+        return int
+    elif FLOAT_VALUE_PATTERN.match(value):
+        return float
+    elif value in BOOL_VALUES:
+        return _castBool
+    try:
+        ast.literal_eval(value)
+        return ast.literal_eval
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        pass
+    # We believe that this is a string
+    return _castStr
+
+
+def _parseReadValues(values, tag_names, node):
+    """
+    Parse UniReader read values.
+
+    :param values: Read values.
+    :param tag_names: Tag name list.
+    :param node: Node name.
+    :return: Tags dictionary with data.
+    """
+    if not isinstance(values, (tuple, list)):
+        # [NOTE] If one tag then return one value.
+        values = (values, )
+
+    if not values:
+        log_func.warning(u'UniReader. Empty values: %s' % str(values))
+        log_func.warning(u'UniReader. Check type <%s> uni_reader service node' % node)
+
+    return {tag_name: values[i] if values else u'' for i, tag_name in enumerate(tag_names)}
+
+
+def readControllersTags(*controller_tags):
+    """
+    Read data of several controllers.
+    Reads of the controllers of one UniReader server are joined
+    in one request with system.multicall.
+
+    :param controller_tags: Read list. Format:
+        ((controller, {'tag_name': 'tag_address', ...}), ...)
+    :return: Tags dictionary with data list in read order.
+    """
+    results = [dict() for i in range(len(controller_tags))]
+    # Reads grouped by server: {(host, port): [(read index, node, server, tag names, addresses), ...]}
+    server_reads = dict()
+    for i, (controller, tags) in enumerate(controller_tags):
+        if not controller.host or not controller.server or not controller.node:
+            log_func.warning(u'UniReader. Not define connection parameters of <%s>' % str(controller))
+            continue
+        tag_items = list(tags.items())
+        server_reads.setdefault((controller.host, controller.port if controller.port else DEFAULT_PORT), list()).append(
+            (i, controller.node, controller.server,
+             [tag_name for tag_name, tag_addr in tag_items],
+             [tag_addr for tag_name, tag_addr in tag_items]))
+
+    for (host, port), reads in server_reads.items():
+        calls = [(READ_VALUES_METHOD, [node, server] + addresses)
+                 for i, node, server, tag_names, addresses in reads]
+        try:
+            values_list = xmlrpc_func.callMultiXMLRPC(host, port, calls)
+        except:
+            log_func.fatal(u'Error read server data <%s:%d>' % (host, port))
+            values_list = [None] * len(reads)
+
+        for (i, node, server, tag_names, addresses), values in zip(reads, values_list):
+            if values is None or isinstance(values, Exception):
+                if values is not None:
+                    log_func.warning(u'Error read server data <%s:%d / %s>: %s' % (host, port, server, str(values)))
+                results[i] = {tag_name: u'' for tag_name in tag_names}
+            else:
+                results[i] = _parseReadValues(values, tag_names, node)
+    return results
+
 
 class iqUniReaderControllerProto(object):
     """
@@ -46,6 +146,9 @@ class iqUniReaderControllerProto(object):
         self.server = server
         self.node = node
 
+        # Compiled typecast functions by tag address
+        self._typecasts = dict()
+
     def printConnectionParam(self):
         """
         Display communication parameters UniReader Gateway.
@@ -56,12 +159,12 @@ class iqUniReaderControllerProto(object):
         log_func.info(u'\tNode <%s>' % self.node)
         log_func.info(u'\tServer <%s>' % self.server)
 
-    def readTags(self, host=None, port=DEFAULT_PORT, server=None, node=None, **tags):
+    def readTags(self, host=None, port=None, server=None, node=None, **tags):
         """
         Read data from UniReader server.
 
         :param host: Server host.
-        :param port: Server port. Default 8080.
+        :param port: Server port. If None then the controller port is used.
         :param server: Server name.
         :param node: Node name.
         :param tags: Tags dictionary.
@@ -70,6 +173,9 @@ class iqUniReaderControllerProto(object):
         """
         if host is None:
             host = self.host
+
+        if port is None:
+            port = self.port if self.port else DEFAULT_PORT
             
         if server is None:
             server = self.server
@@ -108,32 +214,20 @@ class iqUniReaderControllerProto(object):
         tag_names = [tag_name for tag_name, tag_addr in tag_items]
 
         try:
-            # Create OPC client
-            opc = xmlrpc.client.ServerProxy('http://%s:%d' % (host, port))
-            values = opc.sources.ReadValuesAsStrings(node, server, *addresses)
-
-            if not isinstance(values, (tuple, list)):
-                # [NOTE] If one tag then return one value.
-                # log_func.debug(u'UniReader. Прочитанные данные %s : %s' % (str(values), type(values)))
-                values = (values, )
-
-            if not values:
-                log_func.warning(u'UniReader. Empty values: %s' % str(values))
-                log_func.warning(u'UniReader. Check type <%s> uni_reader service node' % node)
-
-            result = {tag_name: values[i] if values else u'' for i, tag_name in enumerate(tag_names)}
-            return result
+            # OPC client with persistent connection
+            values = xmlrpc_func.callXMLRPC(host, port, READ_VALUES_METHOD, node, server, *addresses)
+            return _parseReadValues(values, tag_names, node)
         except:
             log_func.fatal(u'Error read server data <%s:%d / %s>' % (host, port, server))
             return {tag_name: u'' for tag_name in tag_names}
 
-    def readTag(self, host=None, port=DEFAULT_PORT, server=None, node=None,
+    def readTag(self, host=None, port=None, server=None, node=None,
                 address=None, typecast=True):
         """
         Read data from UniReader server. Using XML RPC.
 
         :param host: Server host.
-        :param port: Server port. Default 8080.
+        :param port: Server port. If None then the controller port is used.
         :param server: Server name.
         :param node: Node name.
         :param address: Tag address.
@@ -144,12 +238,51 @@ class iqUniReaderControllerProto(object):
                                read_tag=address)
         if values and 'read_tag' in values:
             value = values['read_tag']
-            if typecast and isinstance(value, str):
-                try:
-                    # Attempt to typecast
-                    value = eval(value)
-                except:
-                    # The attempt failed. We believe that this is a string
-                    pass
+            if typecast:
+                value = self.typecastTagValue(address, value)
             return value
         return None
+
+    def typecastTagValue(self, address, value):
+        """
+        Convert the read tag value string to the tag value type.
+        The typecast function is detected by the first value of the tag
+        and then it is used for the next values.
+        Text values are not cached, so a transient error string
+        does not switch the tag to strings.
+
+        :param address: Tag address.
+        :param value: Read value string.
+        :return: Converted value.
+        """
+        if not isinstance(value, str) or not value:
+            return value
+
+        typecast = self._typecasts.get(address)
+        if typecast is float and INT_VALUE_PATTERN.match(value):
+            # Integer readings of the float tag are integers as in per value detection
+            return int(value)
+        elif typecast is not None:
+            try:
+                return typecast(value)
+            except (ValueError, SyntaxError, TypeError, KeyError, MemoryError, RecursionError):
+                # Tag value type is changed
+                pass
+
+        typecast = getTypecastFunction(value)
+        if typecast is _castStr:
+            self._typecasts.pop(address, None)
+        else:
+            self._typecasts[address] = typecast
+        return typecast(value)
+
+    def typecastTagValues(self, tags, values):
+        """
+        Convert the read tag value strings to the tag value types.
+
+        :param tags: Tags dictionary.
+            {'tag_name': 'tag_address', ...}
+        :param values: Tags dictionary with data.
+        :return: Tags dictionary with converted data.
+        """
+        return {tag_name: self.typecastTagValue(tags.get(tag_name), value) for tag_name, value in values.items()}
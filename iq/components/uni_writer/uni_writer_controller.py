@@ -7,11 +7,10 @@ UniWriter controller.
 This controller is used to write tag values
 using XML-RPC data from the UniWriter service."""
 
-import xmlrpc.client
-
 from ...util import log_func
+from ...util import xmlrpc_func
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 0, 3)
 
 
 # Default port
@@ -34,6 +33,39 @@ STRING_TAG_TYPE = 'string'
 BOOL_TAG_TYPE = 'bool'
 TAG_TYPES = (INT2_TAG_TYPE, INT4_TAG_TYPE, STRING_TAG_TYPE, BOOL_TAG_TYPE)
 
+WRITE_INT2_METHOD = 'destinations.WriteValueAsInt2'
+WRITE_INT4_METHOD = 'destinations.WriteValueAsInt4'
+WRITE_BOOL_METHOD = 'destinations.WriteValueAsBoolean'
+WRITE_STRING_METHOD = 'destinations.WriteValueAsString'
+
+
+def getWriteCall(node, server, address, value, tag_type=None):
+    """
+    Get XML RPC write call of the tag value.
+
+    :param node: Node name.
+    :param server: Server name.
+    :param address: Tag address.
+    :param value: Tag value.
+    :param tag_type: Tag type.
+        If the tag type is not specified then the tag type is determined by the value type.
+    :return: Tuple ('method name', (arguments)) or None if the tag type is not supported.
+    """
+    if tag_type == INT2_TAG_TYPE:
+        return WRITE_INT2_METHOD, (node, server, address, int(value))
+    elif tag_type == INT4_TAG_TYPE:
+        return WRITE_INT4_METHOD, (node, server, address, int(value))
+    elif isinstance(value, int):
+        # Default 2-byte
+        return WRITE_INT2_METHOD, (node, server, address, int(value))
+    elif isinstance(value, bool) or tag_type == BOOL_TAG_TYPE:
+        return WRITE_BOOL_METHOD, (node, server, address,
+                                   eval(value) if isinstance(value, str) else bool(value))
+    elif isinstance(value, str) or tag_type == STRING_TAG_TYPE:
+        return WRITE_STRING_METHOD, (node, server, address, str(value))
+    log_func.warning(u'UniWriter. Unsupported tag type <%s : %s>' % (tag_type, type(value)))
+    return None
+
 
 class iqUniWriterControllerProto(object):
     """
@@ -63,13 +95,13 @@ class iqUniWriterControllerProto(object):
         log_func.info(u'\tNode <%s>' % self.node)
         log_func.info(u'\tServer <%s>' % self.server)
 
-    def writeTags(self, host=None, port=DEFAULT_PORT, server=None, node=None,
+    def writeTags(self, host=None, port=None, server=None, node=None,
                   *tags_tuple, **tags_dict):
         """
         Write tags to UniWriter server.
 
         :param host: Server host.
-        :param port: Server port. Default 8081.
+        :param port: Server port. If None then the controller port is used.
         :param server: Server name.
         :param node: Node name.
         :param tags_tuple: Tags list. Format:
@@ -84,6 +116,9 @@ class iqUniWriterControllerProto(object):
         """
         if host is None:
             host = self.host
+
+        if port is None:
+            port = self.port if self.port else DEFAULT_PORT
             
         if server is None:
             server = self.server
@@ -132,43 +167,26 @@ class iqUniWriterControllerProto(object):
             return False
 
         try:
-            # Create OPC client
-            opc = xmlrpc.client.ServerProxy('http://%s:%d' % (host, port))
-
-            results = list()
+            calls = list()
+            # Unsupported tags are skipped and counted as failed
+            write_ok = True
             for tag_value in tag_values:
-                if len(tag_value) >= 3:
-                    address = tag_value[0]
-                    value = tag_value[1]
-                    tag_type = tag_value[2]
-                else:
-                    address = tag_value[0]
-                    value = tag_value[1]
-                    tag_type = None
-
-                if tag_type == INT2_TAG_TYPE:
-                    result = opc.destinations.WriteValueAsInt2(node, server, address, int(value))
-                elif tag_type == INT4_TAG_TYPE:
-                    result = opc.destinations.WriteValueAsInt4(node, server, address, int(value))
-                elif isinstance(value, int):
-                    # Default 2-byte
-                    result = opc.destinations.WriteValueAsInt2(node, server, address, int(value))
-                elif isinstance(value, bool) or tag_type == BOOL_TAG_TYPE:
-                    result = opc.destinations.WriteValueAsBoolean(node, server, address,
-                                                                  eval(value) if isinstance(value, str) else bool(value))
-                elif isinstance(value, str) or tag_type == STRING_TAG_TYPE:
-                    result = opc.destinations.WriteValueAsString(node, server, address, str(value))
-                else:
-                    log_func.warning(u'UniWriter. Unsupported tag type <%s : %s>' % (tag_type, type(value)))
-                    result = False
-                results.append(result)
-
-            return all(results)
+                write_call = getWriteCall(node, server, *tag_value[:3])
+                if write_call is None:
+                    write_ok = False
+                    continue
+                calls.append(write_call)
+            if not calls:
+                return False
+
+            # All values are written in one request through the persistent connection
+            results = xmlrpc_func.callMultiXMLRPC(host, port, calls)
+            return write_ok and all([bool(result) and not isinstance(result, Exception) for result in results])
         except:
             log_func.fatal(u'UniWriter. Error write data UniWriter <%s:%d / %s>' % (host, port, server))
         return False
 
-    def writeTag(self, host=None, port=DEFAULT_PORT, server=None, node=None,
+    def writeTag(self, host=None, port=None, server=None, node=None,
                  address=None, tag_type=None, value=None):
         """
         Writing data to the UniWriter server. Using XML RPC.
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+UniWriter asynchronous write queue.
+
+Writes are collected during the coalescing window.
+Writes to the same controller tag are coalesced (the last value wins).
+Then all writes of the controllers of one UniWriter server
+are made in one batch request through the persistent connection.
+"""
+
+import time
+import threading
+
+from ...util import log_func
+from ...util import xmlrpc_func
+
+from . import uni_writer_controller
+
+__version__ = (0, 0, 0, 1)
+
+# Coalescing window in seconds
+DEFAULT_WINDOW = 0.05
+
+
+class iqPendingWrite(object):
+    """
+    Pending tag write.
+    """
+    def __init__(self, controller, address, value, tag_type=None):
+        """
+        Constructor.
+
+        :param controller: UniWriter controller object.
+        :param address: Tag address.
+        :param value: Tag value.
+        :param tag_type: Tag type.
+        """
+        self.controller = controller
+        self.address = address
+        self.value = value
+        self.tag_type = tag_type
+        self.put_time = time.monotonic()
+        # Callbacks of all coalesced writes: [(on_ack, on_fail), ...]
+        self.callbacks = list()
+
+    def done(self, result):
+        """
+        Report write result to all coalesced write callbacks.
+
+        :param result: True - acknowledged / False - failed.
+        """
+        for on_ack, on_fail in self.callbacks:
+            callback = on_ack if result else on_fail
+            if callback is not None:
+                try:
+                    callback(self.controller, self.address, self.value)
+                except:
+                    log_func.fatal(u'UniWriter queue. Error tag <%s> write callback' % self.address)
+
+
+class iqUniWriterQueue(object):
+    """
+    UniWriter asynchronous write queue.
+    """
+    def __init__(self, window=DEFAULT_WINDOW):
+        """
+        Constructor.
+
+        :param window: Coalescing window in seconds.
+        """
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._running = False
+        # Pending writes: {(controller, address): pending write}
+        self._pending = dict()
+
+        self.resetMetrics()
+
+    def resetMetrics(self):
+        """
+        Reset queue metrics.
+        """
+        with self._lock:
+            self._put_count = 0
+            self._coalesced_count = 0
+            self._ack_count = 0
+            self._fail_count = 0
+            self._batch_count = 0
+            self._total_latency = 0.0
+            self._max_latency = 0.0
+
+    def getMetrics(self):
+        """
+        Get queue metrics.
+
+        :return: Metrics dictionary.
+        """
+        with self._lock:
+            write_count = self._ack_count + self._fail_count
+            return dict(put_count=self._put_count,
+                        coalesced_count=self._coalesced_count,
+                        ack_count=self._ack_count,
+                        fail_count=self._fail_count,
+                        batch_count=self._batch_count,
+                        pending_count=len(self._pending),
+                        avg_latency=self._total_latency / write_count if write_count else 0.0,
+                        max_latency=self._max_latency)
+
+    def put(self, controller, address, value, tag_type=None, on_ack=None, on_fail=None):
+        """
+        Put tag write to the queue.
+        If the tag write is already pending then its value is replaced.
+        The callbacks of coalesced writes are called with the result of the last value write.
+
+        :param controller: UniWriter controller object.
+        :param address: Tag address.
+        :param value: Tag value.
+        :param tag_type: Tag type. If None then the tag type is determined by the value type.
+        :param on_ack: Write acknowledgement callback.
+            Format: on_ack(controller, address, value).
+        :param on_fail: Write failure callback.
+            Format: on_fail(controller, address, value).
+        """
+        key = (controller, address)
+        with self._lock:
+            self._put_count += 1
+            pending_write = self._pending.get(key)
+            if pending_write is None:
+                pending_write = iqPendingWrite(controller, address, value, tag_type)
+                self._pending[key] = pending_write
+            else:
+                # Last value wins
+                self._coalesced_count += 1
+                pending_write.value = value
+                pending_write.tag_type = tag_type
+            pending_write.callbacks.append((on_ack, on_fail))
+        self._wakeup.set()
+
+    def _writeServer(self, host, port, pending_writes):
+        """
+        Write pending writes of one UniWriter server in one batch request.
+
+        :param host: Server host.
+        :param port: Server port.
+        :param pending_writes: Pending write list.
+        :return: Result list.
+        """
+        calls = list()
+        results = [False] * len(pending_writes)
+        call_indexes = list()
+        for i, pending_write in enumerate(pending_writes):
+            controller = pending_write.controller
+            try:
+                write_call = uni_writer_controller.getWriteCall(controller.node, controller.server,
+                                                                pending_write.address, pending_write.value,
+                                                                pending_write.tag_type)
+            except:
+                log_func.fatal(u'UniWriter queue. Error tag <%s> value <%s>' % (pending_write.address,
+                                                                               str(pending_write.value)))
+                write_call = None
+            if write_call is not None:
+                calls.append(write_call)
+                call_indexes.append(i)
+
+        try:
+            call_results = xmlrpc_func.callMultiXMLRPC(host, port, calls)
+        except:
+            log_func.fatal(u'UniWriter queue. Error write data UniWriter <%s:%d>' % (host, port))
+            call_results = [False] * len(calls)
+
+        for i, result in zip(call_indexes, call_results):
+            results[i] = bool(result) and not isinstance(result, Exception)
+        return results
+
+    def flush(self):
+        """
+        Write all pending writes.
+
+        :return: Written value number.
+        """
+        with self._lock:
+            pending_writes = list(self._pending.values())
+            self._pending = dict()
+        if not pending_writes:
+            return 0
+
+        # Group pending writes by server
+        server_writes = dict()
+        for pending_write in pending_writes:
+            controller = pending_write.controller
+            port = controller.port if controller.port else uni_writer_controller.DEFAULT_PORT
+            server_writes.setdefault((controller.host, port), list()).append(pending_write)
+
+        for (host, port), writes in server_writes.items():
+            results = self._writeServer(host, port, writes)
+            done_time = time.monotonic()
+            with self._lock:
+                self._batch_count += 1
+                for pending_write, result in zip(writes, results):
+                    if result:
+                        self._ack_count += 1
+                    else:
+                        self._fail_count += 1
+                    latency = done_time - pending_write.put_time
+                    self._total_latency += latency
+                    self._max_latency = max(self._max_latency, latency)
+            for pending_write, result in zip(writes, results):
+                pending_write.done(result)
+        return len(pending_writes)
+
+    def _run(self):
+        """
+        Queue thread function.
+        """
+        while self._running:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._running:
+                break
+            # Coalescing window
+            time.sleep(self.window)
+            self.flush()
+        self.flush()
+
+    def start(self):
+        """
+        Start queue thread.
+
+        :return: True/False.
+        """
+        if self.isRunning():
+            log_func.warning(u'UniWriter queue is already running')
+            return False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=None):
+        """
+        Stop queue thread. Pending writes are written before stop.
+
+        :param timeout: Join timeout in seconds.
+        :return: True/False.
+        """
+        if not self.isRunning():
+            return False
+        self._running = False
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+        return True
+
+    def isRunning(self):
+        """
+        Is the queue running?
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+
+# Shared write queue object
+WRITE_QUEUE = None
+
+
+def getWriteQueue(auto_start=True):
+    """
+    Get shared UniWriter write queue.
+
+    :param auto_start: Start the queue thread if it is not running.
+    :return: Queue object.
+    """
+    global WRITE_QUEUE
+    if WRITE_QUEUE is None:
+        WRITE_QUEUE = iqUniWriterQueue()
+    if auto_start and not WRITE_QUEUE.isRunning():
+        WRITE_QUEUE.start()
+    return WRITE_QUEUE
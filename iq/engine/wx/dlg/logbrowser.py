@@ -29,12 +29,15 @@ from ....util import lang_func
 from .. import wxdatetime_func
 from .. import wxbitmap_func
 
-__version__ = (0, 1, 1, 1)
+__version__ = (0, 1, 2, 1)
 
 _ = lang_func.getTranslation().gettext
 
 TIME_FMT = '%H:%M:%S'
 
+# Number of messages loaded into the list at a time
+LOG_PAGE_SIZE = 1000
+
 LOG_TYPE_COLOUR_NAMES = {
                          logfile_func.INFO_LOG_TYPE: 'DARK GREEN',
                          logfile_func.WARNING_LOG_TYPE: 'GOLD',
@@ -104,6 +107,8 @@ class iqLogBrowserPanelManager:
         self.filter_panel.start_timeControl.BindSpinButton(self.filter_panel.start_spinBtn)
         self.filter_panel.stop_timeControl.BindSpinButton(self.filter_panel.stop_spinBtn)
 
+        self.filter_panel.msg_listCtrl.Bind(wx.EVT_LIST_ITEM_FOCUSED, self.onMsgListItemFocused)
+
     def getSelectedLogTypes(self):
         """
         List of selected message types .
@@ -250,7 +255,7 @@ class iqLogBrowserPanelManager:
 
     def getRecords(self, log_filename=None, log_types=None,
                    dt_start_filter=None, dt_stop_filter=None,
-                   filters=None, filter_logic=None):
+                   filters=None, filter_logic=None, start=0, count=None):
         """
         Get a list of messages that match the set filters.
 
@@ -266,6 +271,8 @@ class iqLogBrowserPanelManager:
         :param filter_logic: Command for processing additional filters
             AND - For a record to be included in the selection, all filters must be positively executed,
             OR - For the entry to be included in the selection, a positive execution of one filter is sufficient.
+        :param start: Index of the first message for paging.
+        :param count: Maximum number of messages. If None then all messages are read.
         :return: Message record list.
         """
         if log_filename is None:
@@ -291,18 +298,30 @@ class iqLogBrowserPanelManager:
 
         records = logfile_func.getRecordsLogFile(log_filename, log_types,
                                                  dt_start_filter, dt_stop_filter,
-                                                 filters, filter_logic)
+                                                 filters, filter_logic,
+                                                 start=start, count=count)
         return records
 
     def refresh(self):
         """
         Refresh the list of messages that match the set filters.
+        Only the first page of messages is loaded.
+        The next pages are loaded when the last message of the list is focused.
 
         :return: True/False
         """
         self.filter_panel.msg_listCtrl.DeleteAllItems()
-        self.records = self.getRecords()
-        for i, record in enumerate(self.records):
+        self.records = list()
+        self.loadNextPage()
+
+    def loadNextPage(self):
+        """
+        Load the next page of messages into the list.
+
+        :return: Loaded message number.
+        """
+        records = self.getRecords(start=len(self.records), count=LOG_PAGE_SIZE)
+        for i, record in enumerate(records, len(self.records)):
             item_idx = self.filter_panel.msg_listCtrl.InsertItem(i, record['dt'].strftime(logfile_func.DATETIME_LOG_FMT))
             self.filter_panel.msg_listCtrl.SetItem(i, 1, record.get('type', u''))
             self.filter_panel.msg_listCtrl.SetItem(i, 2, record.get('short', u''))
@@ -310,9 +329,11 @@ class iqLogBrowserPanelManager:
             colour_name = LOG_TYPE_COLOUR_NAMES.get(record['type'], None)
             colour = wx.Colour(colour_name) if colour_name else wx.BLACK
             self.filter_panel.msg_listCtrl.SetItemTextColour(i, colour)
+        self.records += list(records)
 
         # Resize the column of the message text
         self.filter_panel.msg_listCtrl.SetColumnWidth(2, wx.LIST_AUTOSIZE)
+        return len(records)
 
     def onRefreshButtonClick(self, event):
         """
@@ -341,6 +362,15 @@ class iqLogBrowserPanelManager:
         self.filter_panel.stop_spinBtn.Enable(check)
         event.Skip()
 
+    def onMsgListItemFocused(self, event):
+        """
+        Handler for focusing a message in the list.
+        Load the next page when the last message is focused.
+        """
+        if self.records and event.GetIndex() >= len(self.records) - 1 and not len(self.records) % LOG_PAGE_SIZE:
+            self.loadNextPage()
+        event.Skip()
+
     def onMsgListItemActivated(self, event):
         """
         Handler for selecting a message from the list.
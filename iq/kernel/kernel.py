@@ -12,6 +12,7 @@ from .. import global_data
 from ..util import global_func
 from ..util import log_func
 from ..util import res_func
+from ..util import instrument_func
 from .. import components
 
 from ..passport import passport
@@ -21,7 +22,7 @@ from . import objects_access
 from . import settings_access
 from . import locals_access
 
-__version__ = (0, 0, 1, 1)
+__version__ = (0, 0, 1, 2)
 
 RUNTIME_MODE_STATE = 'runtime'
 EDITOR_MODE_STATE = 'editor'
@@ -161,6 +162,7 @@ class iqKernel(object):
         obj.setPassport(psp)
         return obj
 
+    @instrument_func.timed('kernel.createByPsp')
     def createByPsp(self, parent=None, psp=None, context=None, *args, **kwargs):
         """
         Create object by resource file.
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+File checksum benchmark.
+Compare MD5 calculation by 1 KB reads with large buffered and mmap reads,
+hash algorithms, the checksum cache and the parallel directory checksum.
+
+Run:
+    python3 -m iq.script.bench_checksum [file size MB] [directory file count]
+"""
+
+import sys
+import os
+import os.path
+import hashlib
+import shutil
+import tempfile
+import time
+
+from ..util import file_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_FILE_SIZE = 256
+DEFAULT_DIR_FILE_COUNT = 64
+
+HASH_NAMES = ('md5', 'sha1', 'sha256', 'blake2b', 'xxh3_64')
+
+
+def getFileCheckSumBy1KB(filename):
+    """
+    Calculation of MD5 of a file by 1 KB reads.
+    """
+    md5_obj = hashlib.md5()
+    with open(filename, 'rb') as src_file:
+        data = src_file.read(1024)
+        while data:
+            md5_obj.update(data)
+            data = src_file.read(1024)
+    return md5_obj.hexdigest()
+
+
+def _printThroughput(title, duration, size):
+    """
+    Print throughput.
+    """
+    print(u'%-40s %8.3f s %10.1f MB/s' % (title, duration, size / 1024.0 / 1024.0 / max(duration, 0.000001)))
+
+
+def benchCheckSum(file_size=DEFAULT_FILE_SIZE, dir_file_count=DEFAULT_DIR_FILE_COUNT):
+    """
+    Run benchmark.
+
+    :param file_size: Benchmark file size in MB.
+    :param dir_file_count: Benchmark directory file number.
+    """
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dirname, 'bench.bin')
+        with open(filename, 'wb') as bench_file:
+            for i in range(file_size):
+                bench_file.write(os.urandom(1024 * 1024))
+        size = os.path.getsize(filename)
+
+        start_time = time.time()
+        getFileCheckSumBy1KB(filename)
+        _printThroughput(u'md5. 1 KB reads', time.time() - start_time, size)
+
+        for hash_name in HASH_NAMES:
+            start_time = time.time()
+            if file_func.getFileCheckSum(filename, hash_name, use_cache=False) is None:
+                print(u'%s. Not available' % hash_name)
+                continue
+            _printThroughput(u'%s. mmap' % hash_name, time.time() - start_time, size)
+
+        file_func.clearCheckSumCache()
+        file_func.getFileCheckSum(filename)
+        start_time = time.time()
+        file_func.getFileCheckSum(filename)
+        _printThroughput(u'md5. Cached', time.time() - start_time, size)
+
+        dirname = os.path.join(tmp_dirname, 'dir')
+        os.makedirs(dirname)
+        for i in range(dir_file_count):
+            with open(os.path.join(dirname, 'file%04d.bin' % i), 'wb') as bench_file:
+                bench_file.write(os.urandom(size // dir_file_count))
+        dir_size = sum([os.path.getsize(os.path.join(dirname, name)) for name in os.listdir(dirname)])
+        for worker_count in sorted(set((1, os.cpu_count() or 1))):
+            start_time = time.time()
+            file_func.getDirCheckSum(dirname, use_cache=False, worker_count=worker_count)
+            _printThroughput(u'Directory md5. Threads %d' % worker_count, time.time() - start_time, dir_size)
+        file_func.getDirCheckSum(dirname)
+        start_time = time.time()
+        file_func.getDirCheckSum(dirname)
+        _printThroughput(u'Directory md5. Cached', time.time() - start_time, dir_size)
+    finally:
+        file_func.clearCheckSumCache()
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchCheckSum(*[int(arg) for arg in sys.argv[1:]])
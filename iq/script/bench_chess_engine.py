@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Chess engine search benchmark on the fixed position suite.
+Compare the fixed depth alpha-beta search without move ordering
+with the iterative deepening search with the transposition table
+and report nodes per second and time to depth.
+
+Run:
+    python3 -m iq.script.bench_chess_engine [depth] [legacy depth]
+"""
+
+import sys
+import time
+import chess
+
+from iq_chess.chessboard import chess_engine
+
+__version__ = (0, 0, 0, 2)
+
+DEFAULT_DEPTH = 5
+DEFAULT_LEGACY_DEPTH = 3
+
+BENCH_POSITIONS = (
+    (u'Start', chess.STARTING_FEN),
+    (u'Kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'),
+    (u'Middlegame', 'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 8'),
+    (u'Endgame', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1'),
+)
+
+
+class iqLegacySearch(object):
+    """
+    Fixed depth alpha-beta search without move ordering.
+    """
+    def __init__(self):
+        self.node_count = 0
+
+    def getMinimaxRoot(self, depth, board, is_maximising_player):
+        best_move = -9999
+        best_move_found = None
+        for new_game_move in list(board.legal_moves):
+            board.push(new_game_move)
+            value = self.getMinimax(depth - 1, board, -10000, 10000, not is_maximising_player)
+            board.pop()
+            if value >= best_move:
+                best_move = value
+                best_move_found = new_game_move
+        return best_move_found
+
+    def getMinimax(self, depth, board, alpha, beta, is_maximising_player):
+        self.node_count += 1
+        if depth == 0:
+            return -self.evaluateBoard(board)
+
+        best_move = -9999
+        if is_maximising_player:
+            for new_game_move in list(board.legal_moves):
+                board.push(new_game_move)
+                best_move = max(best_move, self.getMinimax(depth - 1, board, alpha, beta, not is_maximising_player))
+                board.pop()
+                alpha = max(alpha, best_move)
+                if beta <= alpha:
+                    return best_move
+            return best_move
+        else:
+            for new_game_move in list(board.legal_moves):
+                board.push(new_game_move)
+                best_move = min(best_move, self.getMinimax(depth - 1, board, alpha, beta, not is_maximising_player))
+                board.pop()
+                beta = min(beta, best_move)
+                if beta <= alpha:
+                    return best_move
+            return best_move
+
+    def evaluateBoard(self, board):
+        total_evaluation = 0
+        for i_rank in range(len(chess.RANK_NAMES)):
+            for i_file in range(len(chess.FILE_NAMES)):
+                piece_idx = i_rank * len(chess.RANK_NAMES) + i_file
+                piece = board.piece_map().get(piece_idx, None)
+                total_evaluation += chess_engine.getPieceValue(piece, i_rank, i_file)
+        return total_evaluation
+
+
+def benchChessEngine(depth=DEFAULT_DEPTH, legacy_depth=DEFAULT_LEGACY_DEPTH):
+    """
+    Run benchmark.
+
+    :param depth: Iterative deepening search depth.
+    :param legacy_depth: Fixed depth search depth. If 0 then it is not run.
+    """
+    total_legacy = [0, 0.0]
+    total_search = [0, 0.0]
+    for title, fen in BENCH_POSITIONS:
+        board = chess.Board(fen)
+        if legacy_depth:
+            legacy_search = iqLegacySearch()
+            start_time = time.perf_counter()
+            move = legacy_search.getMinimaxRoot(legacy_depth, board, True)
+            duration = time.perf_counter() - start_time
+            total_legacy[0] += legacy_search.node_count
+            total_legacy[1] += duration
+            print(u'%-10s Fixed depth %d: %s %d nodes %.3f s (%.0f nodes/s)' % (title, legacy_depth, move,
+                                                                                 legacy_search.node_count, duration,
+                                                                                 legacy_search.node_count / duration))
+
+        chess_search = chess_engine.iqChessSearch()
+        move = chess_search.search(board, max_depth=depth)
+        total_search[0] += chess_search.node_count
+        total_search[1] += chess_search.search_time
+        print(u'%-10s Iterative depth %d: %s %d nodes %.3f s (%.0f nodes/s, %d TT hits, TT fill %.1f%%)' % (title, chess_search.depth, move,
+                                                                                                            chess_search.node_count,
+                                                                                                            chess_search.search_time,
+                                                                                                            chess_search.node_count / chess_search.search_time,
+                                                                                                            chess_search.tt_hit_count,
+                                                                                                            chess_search.getTranspositionTableFill() * 100))
+        print(u'%-10s Time to depth: %s' % (title, u', '.join([u'%d: %.3f s' % (iteration[0], iteration[1])
+                                                               for iteration in chess_search.iterations])))
+
+    if total_legacy[0]:
+        print(u'Fixed depth %d total: %d nodes %.3f s (%.0f nodes/s)' % (legacy_depth, total_legacy[0], total_legacy[1],
+                                                                         total_legacy[0] / total_legacy[1]))
+    print(u'Iterative depth %d total: %d nodes %.3f s (%.0f nodes/s)' % (depth, total_search[0], total_search[1],
+                                                                         total_search[0] / total_search[1]))
+
+
+if __name__ == '__main__':
+    benchChessEngine(*[int(arg) for arg in sys.argv[1:]])
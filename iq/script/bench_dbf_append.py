@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+DBF file bulk append benchmark.
+Report appended records per second.
+
+Run:
+    python3 -m iq.script.bench_dbf_append [record count]
+"""
+
+import sys
+import os
+import os.path
+import shutil
+import tempfile
+import time
+
+from ..components.dbf_file import dbf
+from . import bench_dbf_restruct
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_REC_COUNT = 100000
+
+
+def genBenchRecords(rec_count=DEFAULT_REC_COUNT):
+    """
+    Generate benchmark records.
+
+    :param rec_count: Record number.
+    """
+    for i in range(rec_count):
+        yield {'CODE': 'C%08d' % i, 'NAME': u'Name %d' % i, 'SUMMA': i / 100.0}
+
+
+def benchAppend(rec_count=DEFAULT_REC_COUNT):
+    """
+    Run benchmark.
+
+    :param rec_count: Record number.
+    """
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        dbf_filename = os.path.join(tmp_dirname, 'bulk.dbf')
+        bench_dbf_restruct.createBenchDBF(dbf_filename, 0)
+        dbf_file = dbf.iqDBFPYFile(dbf_filename)
+        start_time = time.time()
+        dbf_file.appendRecords(genBenchRecords(rec_count))
+        duration = time.time() - start_time
+        print(u'Bulk append %d records: %.3f s (%.0f rec/s)' % (rec_count, duration, rec_count / duration))
+
+        try:
+            import dbfpy3.dbf
+        except ImportError:
+            print(u'Record by record append: skipped (dbfpy3 not installed)')
+            return
+
+        dbf_filename = os.path.join(tmp_dirname, 'single.dbf')
+        bench_dbf_restruct.createBenchDBF(dbf_filename, 0)
+        tab_dbf = dbfpy3.dbf.Dbf(dbf_filename)
+        start_time = time.time()
+        for record in genBenchRecords(rec_count):
+            new_record = tab_dbf.newRecord()
+            for field_name, value in record.items():
+                new_record[field_name] = value
+            new_record.store()
+        tab_dbf.close()
+        duration = time.time() - start_time
+        print(u'Record by record append %d records: %.3f s (%.0f rec/s)' % (rec_count, duration,
+                                                                              rec_count / duration))
+    finally:
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchAppend(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+DBF readonly file lookup benchmark.
+Report field index build time and lookups per second
+and check lookups by numeric field value with decimals.
+
+Run:
+    python3 -m iq.script.bench_dbf_readonly [record count] [lookup count]
+"""
+
+import sys
+import os.path
+import random
+import shutil
+import tempfile
+import time
+
+from ..components.dbf_readonly_file import dbf_readonly
+from . import bench_dbf_restruct
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_REC_COUNT = 1000000
+DEFAULT_LOOKUP_COUNT = 10000
+
+# Record with SUMMA = 5.00
+CHECK_REC_NO = 500
+
+
+def checkNumericLookup(dbf_file, rec_count):
+    """
+    Check lookups by N(12, 2) field value.
+    Benchmark record <i> has SUMMA = i / 100.
+
+    :param dbf_file: DBF readonly file object.
+    :param rec_count: Record number.
+    :return: True/False.
+    """
+    if rec_count <= CHECK_REC_NO:
+        print(u'Numeric lookup check: skipped (record number <= %d)' % CHECK_REC_NO)
+        return True
+    expected = [u'C%08d' % CHECK_REC_NO]
+    values = (5, 5.0, u'5', u'5.00')
+    for value in values:
+        records = dbf_file.filterRecsByField('SUMMA', value)
+        if [record['CODE'] for record in records] != expected:
+            print(u'Numeric lookup check: FAILED (value %r: %s)' % (value, [record['CODE'] for record in records]))
+            return False
+    print(u'Numeric lookup check: OK')
+    return True
+
+
+def benchReadOnly(rec_count=DEFAULT_REC_COUNT, lookup_count=DEFAULT_LOOKUP_COUNT):
+    """
+    Run benchmark.
+
+    :param rec_count: Record number.
+    :param lookup_count: Lookup number.
+    """
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        dbf_filename = os.path.join(tmp_dirname, 'bench.dbf')
+        bench_dbf_restruct.createBenchDBF(dbf_filename, rec_count)
+        dbf_file = dbf_readonly.iqDBFReadOnlyFile(dbf_filename, index_dirname=tmp_dirname)
+
+        start_time = time.time()
+        dbf_file.getFieldIndex('CODE')
+        print(u'Build CODE index of %d records: %.3f s' % (rec_count, time.time() - start_time))
+
+        codes = [u'C%08d' % random.randrange(rec_count) for i in range(lookup_count)]
+        start_time = time.time()
+        for code in codes:
+            dbf_file.filterRecsByField('CODE', code)
+        duration = time.time() - start_time
+        print(u'Lookup %d values: %.3f s (%.0f lookups/s)' % (lookup_count, duration, lookup_count / duration))
+
+        checkNumericLookup(dbf_file, rec_count)
+        dbf_file.closeDBF()
+    finally:
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchReadOnly(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+DBF file structure alteration benchmark.
+Compare native restructuring with HXTT DBF JDBC driver.
+
+Run:
+    python3 -m iq.script.bench_dbf_restruct [record count]
+"""
+
+import sys
+import os
+import os.path
+import struct
+import shutil
+import tempfile
+import time
+
+from ..util import dbf_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_REC_COUNT = 1000000
+
+BENCH_DBF_FIELDS = (('CODE', 'C', 10, 0),
+                    ('NAME', 'C', 40, 0),
+                    ('SUMMA', 'N', 12, 2))
+
+
+def createBenchDBF(dbf_filename, rec_count=DEFAULT_REC_COUNT):
+    """
+    Create benchmark DBF file.
+
+    :param dbf_filename: DBF filename.
+    :param rec_count: Record number.
+    """
+    record_len = 1 + sum([field[2] for field in BENCH_DBF_FIELDS])
+    header_len = dbf_func.DBF_HEADER_SIZE + dbf_func.DBF_FIELD_SIZE * len(BENCH_DBF_FIELDS) + 1
+    with open(dbf_filename, 'wb') as dbf_file:
+        dbf_file.write(struct.pack(dbf_func.DBF_HEADER_FMT, 3, 124, 1, 1,
+                                   rec_count, header_len, record_len, b'\x00' * 20))
+        for name, field_type, length, decimal in BENCH_DBF_FIELDS:
+            dbf_file.write(struct.pack(dbf_func.DBF_FIELD_FMT, name.encode(), field_type.encode(),
+                                       b'\x00' * 4, length, decimal, b'\x00' * 14))
+        dbf_file.write(dbf_func.DBF_HEADER_TERMINATOR)
+
+        for start in range(0, rec_count, dbf_func.DBF_BLOCK_REC_COUNT):
+            stop = min(start + dbf_func.DBF_BLOCK_REC_COUNT, rec_count)
+            dbf_file.write(b''.join([b' ' +
+                                     dbf_func.encodeDBFValue('C%08d' % i, 'C', 10) +
+                                     dbf_func.encodeDBFValue(u'Name %d' % i, 'C', 40) +
+                                     dbf_func.encodeDBFValue(i / 100.0, 'N', 12, 2) for i in range(start, stop)]))
+        dbf_file.write(dbf_func.DBF_FILE_EOF)
+
+
+def benchRestruct(rec_count=DEFAULT_REC_COUNT):
+    """
+    Run benchmark.
+
+    :param rec_count: Record number.
+    """
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        src_filename = os.path.join(tmp_dirname, 'bench.dbf')
+        start_time = time.time()
+        createBenchDBF(src_filename, rec_count)
+        print(u'Create %d records: %.3f s (%.1f MB)' % (rec_count, time.time() - start_time,
+                                                        os.path.getsize(src_filename) / 1048576.0))
+
+        dbf_filename = os.path.join(tmp_dirname, 'native.dbf')
+        shutil.copyfile(src_filename, dbf_filename)
+        start_time = time.time()
+        dbf_func.addDBFNewField(dbf_filename, 'FLAG', 'C', 5, default='new')
+        print(u'Native add field: %.3f s' % (time.time() - start_time))
+        start_time = time.time()
+        dbf_func.resizeDBFField(dbf_filename, 'NAME', 60)
+        print(u'Native resize field: %.3f s' % (time.time() - start_time))
+        start_time = time.time()
+        dbf_func.dropDBFFields(dbf_filename, 'FLAG')
+        print(u'Native drop field: %.3f s' % (time.time() - start_time))
+
+        if 'jaydebeapi' in sys.modules:
+            dbf_filename = os.path.join(tmp_dirname, 'jdbc.dbf')
+            shutil.copyfile(src_filename, dbf_filename)
+            start_time = time.time()
+            dbf_func.addDBFNewFieldsJDBC(dbf_filename, ('FLAG', 'C', 5, 'new'))
+            print(u'JDBC add field: %.3f s' % (time.time() - start_time))
+        else:
+            print(u'JDBC add field: skipped (jaydebeapi not installed)')
+    finally:
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchRestruct(*[int(arg) for arg in sys.argv[1:]])
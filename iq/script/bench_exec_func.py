@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Text function execution benchmark.
+Compare compiling of the event handler text on each call
+with the compiled text function cache.
+
+Run:
+    python3 -m iq.script.bench_exec_func [call count] [handler count]
+"""
+
+import sys
+import time
+import uuid
+
+from ..util import exec_func
+from ..util import sys_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_CALL_COUNT = 100000
+DEFAULT_HANDLER_COUNT = 10
+
+HANDLER_FMT = u'''value = RECORD.get('value', 0) * %d
+if value > 100:
+    return 'high'
+elif value > 10:
+    return 'middle'
+return 'low'
+'''
+
+
+def execTxtFunctionUncached(function, context):
+    """
+    Execute function text compiling it on each call with the unique function name.
+    """
+    function_body = sys_func.LINESEP.join(exec_func.INDENTATION + line for line in function.split(sys_func.LINESEP))
+    function_name = str(uuid.uuid4()).replace('-', '_')
+    function_header = 'def __%s():%s' % (function_name, sys_func.LINESEP)
+    function_footer = '%s__result__ = __%s()' % (sys_func.LINESEP, function_name)
+    exec(function_header + function_body + function_footer, context)
+    return context['__result__']
+
+
+def benchExecFunc(call_count=DEFAULT_CALL_COUNT, handler_count=DEFAULT_HANDLER_COUNT):
+    """
+    Run benchmark.
+
+    :param call_count: Handler call number.
+    :param handler_count: Different handler text number.
+    """
+    handlers = [HANDLER_FMT % (i + 1) for i in range(handler_count)]
+
+    context = dict(RECORD=dict(value=7))
+    start_time = time.time()
+    for i in range(call_count):
+        execTxtFunctionUncached(handlers[i % handler_count], context)
+    duration = time.time() - start_time
+    print(u'Compile on each call: %.3f s (%.1f us/call, %d context names)' % (duration,
+                                                                             duration * 1000000 / call_count,
+                                                                             len(context)))
+
+    exec_func.clearFunctionCache()
+    context = dict(RECORD=dict(value=7))
+    start_time = time.time()
+    for i in range(call_count):
+        exec_func.execTxtFunction(handlers[i % handler_count], context=context)
+    duration = time.time() - start_time
+    print(u'Compiled function cache: %.3f s (%.1f us/call, %d context names)' % (duration,
+                                                                                duration * 1000000 / call_count,
+                                                                                len(context)))
+    print(u'Statistics: %s' % str(exec_func.getFunctionCacheStatistics()))
+
+
+if __name__ == '__main__':
+    benchExecFunc(*[int(arg) for arg in sys.argv[1:]])
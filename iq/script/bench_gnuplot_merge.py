@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gnuplot trend pen data merge benchmark.
+Compare the point by point merge of pen series with the vectorised merge
+and the text data file with the binary data file.
+
+Run:
+    python3 -m iq.script.bench_gnuplot_merge [pen count] [point count]
+"""
+
+import sys
+import os
+import os.path
+import datetime
+import operator
+import shutil
+import tempfile
+import time
+
+from ..components.gnuplot_trend import gnuplot_manager
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_PEN_COUNT = 8
+DEFAULT_POINT_COUNT = 86400
+
+# Point by point merge is quadratic. It is measured only for this point number
+MAX_SCAN_POINT_COUNT = 5000
+
+
+def genBenchPens(pen_count=DEFAULT_PEN_COUNT, point_count=DEFAULT_POINT_COUNT):
+    """
+    Generate pen point lists with 1 second step.
+    Each pen has its own time shift so the series are not fully aligned.
+
+    :param pen_count: Pen number.
+    :param point_count: Point number of each pen.
+    """
+    start_dt = datetime.datetime(2020, 1, 1)
+    return [[(start_dt + datetime.timedelta(seconds=i + i_pen % 2), float((i * (i_pen + 1)) % 100))
+             for i in range(point_count)] for i_pen in range(pen_count)]
+
+
+def scanMerge(pens_points):
+    """
+    Point by point merge of pen series. Previous trend implementation.
+    """
+    graph_data = list()
+    for i_pen, points in enumerate(pens_points):
+        if not graph_data:
+            graph_data = [dict(x=point[0], pen0=float(point[1])) for point in points]
+            continue
+        point_name = 'pen%d' % i_pen
+        for point in points:
+            for graph_point in graph_data:
+                if graph_point['x'] == point[0]:
+                    graph_point[point_name] = float(point[1])
+                    break
+            else:
+                new_graph_point = dict(x=point[0])
+                new_graph_point[point_name] = float(point[1])
+                for i_prev_pen in range(i_pen):
+                    new_graph_point['pen%d' % i_prev_pen] = 0.0
+                graph_data.append(new_graph_point)
+    graph_data.sort(key=operator.itemgetter('x'))
+    return graph_data
+
+
+def benchGnuplotMerge(pen_count=DEFAULT_PEN_COUNT, point_count=DEFAULT_POINT_COUNT):
+    """
+    Run benchmark.
+
+    :param pen_count: Pen number.
+    :param point_count: Point number of each pen.
+    """
+    manager = gnuplot_manager.iqGnuplotManager()
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        scan_point_count = min(point_count, MAX_SCAN_POINT_COUNT)
+        pens_points = genBenchPens(pen_count, scan_point_count)
+        start_time = time.time()
+        graph_data = scanMerge(pens_points)
+        print(u'Point by point merge %d pens x %d points: %.3f s' % (pen_count, scan_point_count,
+                                                                     time.time() - start_time))
+        start_time = time.time()
+        gnuplot_manager.mergeGraphData(pens_points)
+        print(u'Vectorised merge %d pens x %d points: %.3f s' % (pen_count, scan_point_count,
+                                                                 time.time() - start_time))
+
+        pens_points = genBenchPens(pen_count, point_count)
+        start_time = time.time()
+        graph_data = gnuplot_manager.mergeGraphData(pens_points)
+        print(u'Vectorised merge %d pens x %d points: %.3f s' % (pen_count, point_count, time.time() - start_time))
+
+        fields = ['pen%d' % i_pen for i_pen in range(pen_count)]
+        records = [dict(zip(fields, row), x=gnuplot_manager.GRAPH_TIME_EPOCH + datetime.timedelta(seconds=row_x))
+                   for row_x, row in zip(graph_data[:, 0].tolist(), graph_data[:, 1:].tolist())]
+        txt_filename = os.path.join(tmp_dirname, 'trend.dat')
+        start_time = time.time()
+        manager.saveGraphData(txt_filename, records, fields)
+        print(u'Text data file: %.3f s (%.1f MB)' % (time.time() - start_time,
+                                                     os.path.getsize(txt_filename) / 1048576.0))
+
+        bin_filename = os.path.join(tmp_dirname, 'trend.bin')
+        start_time = time.time()
+        manager.saveGraphDataBinary(bin_filename, graph_data)
+        print(u'Binary data file: %.3f s (%.1f MB)' % (time.time() - start_time,
+                                                       os.path.getsize(bin_filename) / 1048576.0))
+    finally:
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchGnuplotMerge(*[int(arg) for arg in sys.argv[1:]])
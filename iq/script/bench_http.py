@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HTTP request throughput benchmark.
+Compare the shared keep-alive connection pool with a new pool per request
+against a local HTTP stub server.
+
+Run:
+    python3 -m iq.script.bench_http [request count]
+"""
+
+import sys
+import time
+import json
+import threading
+import http.server
+
+import urllib3
+
+from ..util import http_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_REQUEST_COUNT = 2000
+
+STUB_RESPONSE = json.dumps({'cells': [{'value': i} for i in range(100)]}).encode('utf-8')
+
+
+class iqHTTPStubHandler(http.server.BaseHTTPRequestHandler):
+    """
+    HTTP stub server request handler.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(STUB_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(STUB_RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def startStubServer():
+    """
+    Start HTTP stub server in the background thread.
+
+    :return: Server object.
+    """
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), iqHTTPStubHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def benchHTTP(request_count=DEFAULT_REQUEST_COUNT):
+    """
+    Run benchmark.
+
+    :param request_count: Request number.
+    """
+    server = startStubServer()
+    url = 'http://127.0.0.1:%d/cube/sales/aggregate' % server.server_address[1]
+    try:
+        start_time = time.time()
+        for i in range(request_count):
+            urllib3.PoolManager().request('GET', url).data
+        duration = time.time() - start_time
+        print(u'New pool per request: %.3f s (%.0f req/s)' % (duration, request_count / duration))
+
+        http_func.resetHTTPStatistics()
+        start_time = time.time()
+        for i in range(request_count):
+            http_func.getHTTP3(url)
+        duration = time.time() - start_time
+        print(u'Shared keep-alive pool: %.3f s (%.0f req/s)' % (duration, request_count / duration))
+        print(u'Statistics: %s' % str(http_func.getHTTPStatistics()))
+    finally:
+        http_func.closePoolManager()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    benchHTTP(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Timing instrumentation overhead benchmark.
+Measure timer decorator, timer context manager and counter call time
+when instrumentation is disabled and enabled.
+
+Run:
+    python3 -m iq.script.bench_instrument_func [call count]
+"""
+
+import sys
+import time
+
+from ..util import instrument_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_CALL_COUNT = 100000
+
+
+def plainFunction(value):
+    return value + 1
+
+
+@instrument_func.timed('bench.timedFunction')
+def timedFunction(value):
+    return value + 1
+
+
+def _benchCalls(call_count):
+    """
+    Get call times of plain function, timed function, timer and counter in microseconds.
+    """
+    times = list()
+    start_time = time.perf_counter()
+    for i in range(call_count):
+        plainFunction(i)
+    times.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    for i in range(call_count):
+        timedFunction(i)
+    times.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    for i in range(call_count):
+        with instrument_func.timer('bench.timer', index=i):
+            plainFunction(i)
+    times.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    for i in range(call_count):
+        instrument_func.count('bench.counter')
+    times.append(time.perf_counter() - start_time)
+    return [duration * 1000000 / call_count for duration in times]
+
+
+def benchInstrumentFunc(call_count=DEFAULT_CALL_COUNT):
+    """
+    Run benchmark.
+
+    :param call_count: Call number.
+    """
+    for enabled in (False, True):
+        instrument_func.enable(enabled)
+        instrument_func.reset()
+        plain_time, timed_time, timer_time, count_time = _benchCalls(call_count)
+        print(u'%s. Plain call: %.3f us, timed call: %.3f us, timer: %.3f us, counter: %.3f us' % (u'Enabled' if enabled else u'Disabled',
+                                                                                                 plain_time, timed_time,
+                                                                                                 timer_time, count_time))
+    instrument_func.exportTextSummary()
+    instrument_func.disable()
+    instrument_func.reset()
+
+
+if __name__ == '__main__':
+    benchInstrumentFunc(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Lock functions contention benchmark.
+Several processes lock and unlock the same objects.
+Compare lock files created with O_CREAT | O_EXCL
+with the lease lock manager with lock file and SQLite backends.
+
+Run:
+    python3 -m iq.script.bench_lock_func [process count] [cycle count] [lock name count]
+"""
+
+import sys
+import os
+import os.path
+import shutil
+import tempfile
+import time
+import multiprocessing
+
+from ..util import lock_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_PROCESS_COUNT = 4
+DEFAULT_CYCLE_COUNT = 2000
+DEFAULT_LOCK_NAME_COUNT = 4
+
+
+def _lockExclFile(lock_dir, name):
+    """
+    Lock object by the lock file created with O_CREAT | O_EXCL.
+    """
+    try:
+        lock_file = os.open(os.path.join(lock_dir, name + lock_func.LOCK_FILE_EXT), os.O_CREAT | os.O_EXCL)
+    except OSError:
+        return False
+    os.close(lock_file)
+    return True
+
+
+def _unLockExclFile(lock_dir, name):
+    """
+    Unlock object locked by the lock file created with O_CREAT | O_EXCL.
+    """
+    try:
+        os.remove(os.path.join(lock_dir, name + lock_func.LOCK_FILE_EXT))
+    except OSError:
+        pass
+
+
+def _runWorker(args):
+    """
+    Worker process function.
+
+    :param args: Tuple (backend type, lock directory, cycle count, lock name count).
+    :return: Tuple (lock latency list, unlock latency list, acquired lock count).
+    """
+    backend_type, lock_dir, cycle_count, lock_name_count = args
+    manager = None
+    if backend_type == 'file':
+        manager = lock_func.iqLeaseLockManager(lock_func.iqFileLeaseBackend(lock_dir), heartbeat=False)
+    elif backend_type == 'sqlite':
+        manager = lock_func.iqLeaseLockManager(lock_func.iqSQLiteLeaseBackend(os.path.join(lock_dir, lock_func.LEASE_DB_FILENAME)),
+                                               heartbeat=False)
+
+    lock_latencies = list()
+    unlock_latencies = list()
+    acquired_count = 0
+    for i in range(cycle_count):
+        name = 'obj%d' % (i % lock_name_count)
+        start_time = time.perf_counter()
+        if manager is None:
+            is_acquired = _lockExclFile(lock_dir, name)
+        else:
+            is_acquired = manager.lock(name)[0]
+        lock_latencies.append(time.perf_counter() - start_time)
+        if is_acquired:
+            acquired_count += 1
+            start_time = time.perf_counter()
+            if manager is None:
+                _unLockExclFile(lock_dir, name)
+            else:
+                manager.unlock(name)
+            unlock_latencies.append(time.perf_counter() - start_time)
+    return lock_latencies, unlock_latencies, acquired_count
+
+
+def _getPercentile(values, percent):
+    """
+    Get percentile of the values.
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100.0), len(values) - 1)]
+
+
+def benchLockFunc(process_count=DEFAULT_PROCESS_COUNT, cycle_count=DEFAULT_CYCLE_COUNT,
+                  lock_name_count=DEFAULT_LOCK_NAME_COUNT):
+    """
+    Run benchmark.
+
+    :param process_count: Process number.
+    :param cycle_count: Lock/unlock cycle number of each process.
+    :param lock_name_count: Lock name number.
+    """
+    for backend_type in ('excl', 'file', 'sqlite'):
+        lock_dir = tempfile.mkdtemp()
+        try:
+            if backend_type == 'sqlite':
+                # Create lease table before the processes start
+                lock_func.iqSQLiteLeaseBackend(os.path.join(lock_dir, lock_func.LEASE_DB_FILENAME)).getConnection()
+            start_time = time.time()
+            with multiprocessing.Pool(process_count) as pool:
+                results = pool.map(_runWorker, [(backend_type, lock_dir, cycle_count, lock_name_count)] * process_count)
+            duration = time.time() - start_time
+
+            lock_latencies = sum([result[0] for result in results], list())
+            unlock_latencies = sum([result[1] for result in results], list())
+            acquired_count = sum([result[2] for result in results])
+            print(u'%-6s: %.3f s. Lock p50 %.1f us p99 %.1f us. Unlock p50 %.1f us p99 %.1f us. Acquired %d of %d' % (backend_type, duration,
+                                                                                                                      _getPercentile(lock_latencies, 50) * 1000000,
+                                                                                                                      _getPercentile(lock_latencies, 99) * 1000000,
+                                                                                                                      _getPercentile(unlock_latencies, 50) * 1000000,
+                                                                                                                      _getPercentile(unlock_latencies, 99) * 1000000,
+                                                                                                                      acquired_count, len(lock_latencies)))
+        finally:
+            shutil.rmtree(lock_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchLockFunc(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Logging functions per call overhead benchmark.
+Measure log_func.debug call time when the output is disabled and
+when it is enabled in synchronous and asynchronous modes.
+
+Run:
+    python3 -m iq.script.bench_log_func [call count]
+"""
+
+import sys
+import os
+import os.path
+import logging
+import shutil
+import tempfile
+import time
+import contextlib
+
+from ..util import log_func
+from ..util import global_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_CALL_COUNT = 100000
+
+BENCH_RECORD = dict(id=1, code='A1', name='Record name', value=1.5, items=list(range(20)))
+
+
+def _benchCalls(call_count, message):
+    """
+    Call log_func.debug and get the call time in microseconds.
+    """
+    start_time = time.time()
+    for i in range(call_count):
+        log_func.debug(message)
+    return (time.time() - start_time) * 1000000 / call_count
+
+
+def _benchFormatCalls(call_count):
+    """
+    Call log_func.debug with the formatted message and get the call time in microseconds.
+    """
+    start_time = time.time()
+    for i in range(call_count):
+        log_func.debug(u'Record <%s>' % str(BENCH_RECORD))
+    return (time.time() - start_time) * 1000000 / call_count
+
+
+def _benchLazyCalls(call_count):
+    """
+    Call log_func.debug with the lazy message and get the call time in microseconds.
+    """
+    start_time = time.time()
+    for i in range(call_count):
+        log_func.debug(lambda: u'Record <%s>' % str(BENCH_RECORD))
+    return (time.time() - start_time) * 1000000 / call_count
+
+
+def benchLogFunc(call_count=DEFAULT_CALL_COUNT):
+    """
+    Run benchmark.
+
+    :param call_count: Call number.
+    """
+    debug_mode = global_func.isDebugMode()
+    log_mode = global_func.isLogMode()
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        global_func.setDebugMode(False)
+        global_func.setLogMode(False)
+        print(u'Disabled. Formatted message: %.2f us/call' % _benchFormatCalls(call_count))
+        print(u'Disabled. Lazy message: %.2f us/call' % _benchLazyCalls(call_count))
+
+        global_func.setDebugMode(True)
+        global_func.setLogMode(True)
+        log_func.init(os.path.join(tmp_dirname, 'bench.log'))
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            sync_time = _benchCalls(call_count, u'Debug message')
+            log_func.startAsyncLog()
+            start_time = time.time()
+            async_time = _benchCalls(call_count, u'Debug message')
+            log_func.stopAsyncLog()
+            drain_time = time.time() - start_time
+
+            log_func.setRateLimit(count=10, interval=1.0)
+            limit_time = _benchCalls(call_count, u'Debug message')
+            log_func.setRateLimit()
+        print(u'Enabled. Synchronous: %.2f us/call' % sync_time)
+        print(u'Enabled. Asynchronous: %.2f us/call (%.3f s with queue drain)' % (async_time, drain_time))
+        print(u'Enabled. Rate limited repeated message: %.2f us/call' % limit_time)
+    finally:
+        logging.shutdown()
+        global_func.setDebugMode(debug_mode)
+        global_func.setLogMode(log_mode)
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchLogFunc(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Log file reading benchmark.
+Compare reading of the whole log file line by line
+with the log file index queries by time range, by message type and by page.
+
+Run:
+    python3 -m iq.script.bench_logfile [message count]
+"""
+
+import sys
+import os.path
+import datetime
+import shutil
+import tempfile
+import time
+
+from ..util import logfile_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_MSG_COUNT = 1000000
+
+BENCH_START_DT = datetime.datetime(2020, 1, 1)
+
+# Every N-th message is multi-line error
+ERROR_MSG_STEP = 1000
+
+PAGE_SIZE = 1000
+
+
+def createBenchLogFile(log_filename, msg_count=DEFAULT_MSG_COUNT, start_msg=0):
+    """
+    Create/append benchmark log file.
+    Messages are written one per second.
+
+    :param log_filename: Log filename.
+    :param msg_count: Message number.
+    :param start_msg: Number of the first message.
+    """
+    with open(log_filename, 'at') as log_file:
+        for i in range(start_msg, start_msg + msg_count):
+            dt_txt = (BENCH_START_DT + datetime.timedelta(seconds=i)).strftime(logfile_func.DATETIME_LOG_FMT)
+            if i % ERROR_MSG_STEP:
+                log_file.write(u'%s %s Message %d\n' % (dt_txt, logfile_func.INFO_LOG_TYPE if i % 2 else logfile_func.DEBUG_LOG_TYPE, i))
+            else:
+                log_file.write(u'%s %s Error %d\nTraceback:\n  Line 1\n' % (dt_txt, logfile_func.ERROR_LOG_TYPE, i))
+
+
+def getRecordsLogFileUnindexed(log_filename, log_types=logfile_func.LOG_TYPES,
+                               dt_start_filter=None, dt_stop_filter=None):
+    """
+    Read messages parsing the whole log file line by line.
+    """
+    records = list()
+    record = dict()
+    with open(log_filename, 'r') as log_file:
+        for line in log_file:
+            if logfile_func.isNewMsg(line):
+                record = logfile_func.parseLogMsgRecord(line)
+                if logfile_func.checkFilterRecord(record, log_types, dt_start_filter, dt_stop_filter):
+                    records.append(record)
+            else:
+                record['text'] = record.get('text', u'') + line
+                record['short'] += (u'...' if not record.get('short', u'').endswith(u'...') else u'')
+    return records
+
+
+def _benchQuery(title, function, *args, **kwargs):
+    """
+    Run query and print the duration.
+    """
+    start_time = time.time()
+    records = function(*args, **kwargs)
+    print(u'%s: %.3f s (%d records)' % (title, time.time() - start_time, len(records)))
+    return records
+
+
+def benchLogFile(msg_count=DEFAULT_MSG_COUNT):
+    """
+    Run benchmark.
+
+    :param msg_count: Message number.
+    """
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        log_filename = os.path.join(tmp_dirname, 'bench.log')
+        createBenchLogFile(log_filename, msg_count)
+        print(u'Log file size: %.1f MB' % (os.path.getsize(log_filename) / 1024.0 / 1024.0))
+
+        # Last hour of the log
+        dt_stop = BENCH_START_DT + datetime.timedelta(seconds=msg_count)
+        dt_start = dt_stop - datetime.timedelta(hours=1)
+        error_types = (logfile_func.ERROR_LOG_TYPE, logfile_func.FATAL_LOG_TYPE)
+
+        _benchQuery(u'Whole file. Time range', getRecordsLogFileUnindexed, log_filename,
+                    dt_start_filter=dt_start, dt_stop_filter=dt_stop)
+        _benchQuery(u'Whole file. Errors', getRecordsLogFileUnindexed, log_filename, log_types=error_types)
+
+        logfile_func.clearLogFileIndexes()
+        start_time = time.time()
+        log_file_index = logfile_func.getLogFileIndex(log_filename)
+        print(u'Index build: %.3f s (%d blocks)' % (time.time() - start_time, log_file_index.getBlockCount()))
+
+        _benchQuery(u'Index. Time range', logfile_func.getRecordsLogFile, log_filename,
+                    dt_start_filter=dt_start, dt_stop_filter=dt_stop)
+        _benchQuery(u'Index. Errors', logfile_func.getRecordsLogFile, log_filename, log_types=error_types)
+        _benchQuery(u'Index. First page', logfile_func.getRecordsLogFile, log_filename, count=PAGE_SIZE)
+
+        createBenchLogFile(log_filename, msg_count // 100, start_msg=msg_count)
+        start_time = time.time()
+        logfile_func.getLogFileIndex(log_filename)
+        print(u'Index update after %d appended messages: %.3f s' % (msg_count // 100, time.time() - start_time))
+    finally:
+        logfile_func.clearLogFileIndexes()
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchLogFile(*[int(arg) for arg in sys.argv[1:]])
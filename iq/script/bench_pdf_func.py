@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PDF page compression benchmark.
+Compare the JPEG temporary file path with the in-memory page pipeline
+by wall time and peak memory on the generated document.
+Each variant is run in a separate process to measure its peak memory.
+
+Run:
+    python3 -m iq.script.bench_pdf_func [page count] [worker count]
+"""
+
+import sys
+import os
+import os.path
+import shutil
+import tempfile
+import time
+import resource
+import multiprocessing
+
+from ..util import pdf_func
+from ..util import img_func
+from ..util import file_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_PAGE_COUNT = 200
+
+# A4 page size in points
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+IMAGE_WIDTH = 400
+IMAGE_HEIGHT = 300
+
+
+def createBenchPDF(pdf_filename, page_count=DEFAULT_PAGE_COUNT):
+    """
+    Create benchmark PDF file with text, graphics and image on each page.
+
+    :param pdf_filename: PDF file name.
+    :param page_count: Page number.
+    """
+    import fitz
+
+    samples = bytes([(x * 255 // IMAGE_WIDTH + y) % 256 for y in range(IMAGE_HEIGHT) for x in range(IMAGE_WIDTH) for channel in range(3)])
+    pixmap = fitz.Pixmap(fitz.csRGB, IMAGE_WIDTH, IMAGE_HEIGHT, samples, 0)
+    doc = fitz.open()
+    for i in range(page_count):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_image(fitz.Rect(50, 400, 50 + IMAGE_WIDTH, 400 + IMAGE_HEIGHT), pixmap=pixmap)
+        for line in range(30):
+            page.insert_text((50, 60 + line * 11), u'Page %d. Line %d. Benchmark text of the document page' % (i + 1, line + 1),
+                             fontsize=9)
+        page.draw_rect(fitz.Rect(40, 40, PAGE_WIDTH - 40, PAGE_HEIGHT - 40), color=(0, 0, 1))
+    doc.save(pdf_filename)
+    doc.close()
+
+
+def compressPDFByTempFiles(pdf_filename, new_pdf_filename):
+    """
+    Compress PDF file by JPEG temporary files of pages.
+    """
+    compressed_jpeg_filenames = list()
+    for jpeg_filename in pdf_func.splitPDFPages2Jpeg(pdf_filename):
+        compressed_jpeg_filename = jpeg_filename.replace('.jpeg', '_compressed.jpeg')
+        if img_func.compressImage(img_filename=jpeg_filename, new_filename=compressed_jpeg_filename):
+            compressed_jpeg_filenames.append(compressed_jpeg_filename)
+        file_func.removeFile(jpeg_filename)
+    result = pdf_func.joinJpegPages2PDF(compressed_jpeg_filenames, new_pdf_filename)
+    for jpeg_filename in compressed_jpeg_filenames:
+        file_func.removeFile(jpeg_filename)
+    return result
+
+
+def _runVariant(variant, pdf_filename, new_pdf_filename, worker_count, result_queue):
+    """
+    Run benchmark variant in the child process.
+    """
+    start_time = time.time()
+    if variant == 'tempfiles':
+        compressPDFByTempFiles(pdf_filename, new_pdf_filename)
+    else:
+        pdf_func.compressPDFPages([pdf_filename], new_pdf_filename, worker_count=worker_count)
+    duration = time.time() - start_time
+    # Linux reports maximum resident set size in KB
+    peak_memory = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    result_queue.put((duration, peak_memory))
+
+
+def benchPDFFunc(page_count=DEFAULT_PAGE_COUNT, worker_count=None):
+    """
+    Run benchmark.
+
+    :param page_count: Page number.
+    :param worker_count: Worker process number. If None then the CPU number is used.
+    """
+    if worker_count is None:
+        worker_count = os.cpu_count() or 1
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        pdf_filename = os.path.join(tmp_dirname, 'bench.pdf')
+        createBenchPDF(pdf_filename, page_count)
+        print(u'Source PDF: %d pages %.1f MB' % (page_count, os.path.getsize(pdf_filename) / 1024.0 / 1024.0))
+
+        variants = [('tempfiles', 1)] + [('pipeline', workers) for workers in sorted(set((1, worker_count)))]
+        for variant, workers in variants:
+            new_pdf_filename = os.path.join(tmp_dirname, 'bench_%s_%d.pdf' % (variant, workers))
+            result_queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_runVariant,
+                                              args=(variant, pdf_filename, new_pdf_filename, workers, result_queue))
+            process.start()
+            duration, peak_memory = result_queue.get()
+            process.join()
+            print(u'%-10s workers %d: %.3f s. Peak memory %.1f MB. Result %.1f MB' % (variant, workers, duration,
+                                                                                     peak_memory / 1024.0,
+                                                                                     os.path.getsize(new_pdf_filename) / 1024.0 / 1024.0))
+    finally:
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchPDFFunc(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OLAP pivot table building benchmark.
+
+Run:
+    python3 -m iq.script.bench_pivot [cell count]
+"""
+
+import sys
+import time
+
+import pandas
+
+from ..components.cubes_olap_server import pivot_dataframe_manager
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_CELL_COUNT = 1000000
+
+ROW_DIMENSION = ('date.year', 'region', 'product')
+COL_DIMENSION = ('channel', )
+AGGREGATES = ('amount_sum', 'record_count')
+
+
+def genBenchCells(cell_count=DEFAULT_CELL_COUNT):
+    """
+    Generate OLAP server aggregate cells.
+
+    :param cell_count: Cell number.
+    """
+    return [{'date.year': 2000 + i % 20,
+             'region': u'Region %d' % (i % 50),
+             'product': u'Product %d' % (i % 1000),
+             'channel': u'Channel %d' % (i % 4),
+             'amount_sum': float(i % 997),
+             'record_count': 1} for i in range(cell_count)]
+
+
+def benchPivot(cell_count=DEFAULT_CELL_COUNT):
+    """
+    Run benchmark.
+
+    :param cell_count: Cell number.
+    """
+    cells = genBenchCells(cell_count)
+    col_names = list(ROW_DIMENSION) + list(COL_DIMENSION) + list(AGGREGATES)
+    manager = pivot_dataframe_manager.iqPivotDataFrameManager()
+
+    start_time = time.time()
+    dataframe = pandas.DataFrame([pandas.Series([cell.get(name, None) for name in col_names]) for cell in cells])
+    dataframe.columns = col_names
+    print(u'Row series dataframe (%d cells): %.3f s' % (cell_count, time.time() - start_time))
+
+    start_time = time.time()
+    manager.createDataFrameFromCells(cells, col_names)
+    print(u'Columnar dataframe (%d cells): %.3f s' % (cell_count, time.time() - start_time))
+
+    dataframe = manager.getPivotDataFrame().groupby(list(ROW_DIMENSION)).sum(numeric_only=True)
+    start_time = time.time()
+    pandas.concat([dataframe.groupby(level=list(ROW_DIMENSION)[:i_level]).sum()
+                   for i_level in range(len(ROW_DIMENSION) - 1, 0, -1)] + [dataframe.agg('sum').to_frame().T])
+    print(u'Per level group totals: %.3f s' % (time.time() - start_time))
+
+    start_time = time.time()
+    manager.rollupPivotTable(dataframe.copy())
+    print(u'One pass rollup totals: %.3f s' % (time.time() - start_time))
+
+
+if __name__ == '__main__':
+    benchPivot(*[int(arg) for arg in sys.argv[1:]])
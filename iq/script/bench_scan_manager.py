@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Multipage scan benchmark with the in-process dummy scan device.
+Compare writing pages to PDF through image files,
+in memory in the scan thread and in the scan pipeline.
+
+Run:
+    python3 -m iq.script.bench_scan_manager [page count] [scan delay ms]
+"""
+
+import sys
+import os
+import os.path
+import shutil
+import tempfile
+import time
+
+from iq_scanner.scanner import scan_manager
+
+__version__ = (0, 0, 0, 2)
+
+DEFAULT_PAGE_COUNT = 10
+DEFAULT_SCAN_DELAY = 500
+
+
+class iqFileScanManager(scan_manager.iqScanManager):
+    """
+    Scan manager writing pages to PDF through image files.
+    """
+    def __init__(self, page_dirname):
+        scan_manager.iqScanManager.__init__(self)
+        self.page_dirname = page_dirname
+
+    def _imageDrawCanvas(self, image, canvas, n, page_size=scan_manager.DEFAULT_IMAGE_PAGE_SIZE):
+        if image is not None and image.getbbox() is not None:
+            img_filename = os.path.join(self.page_dirname, 'page%d.jpg' % n)
+            width, height = page_size
+            image = image.resize((int(width), int(height)))
+            image.save(img_filename)
+            canvas.drawImage(img_filename, 0, 0)
+            canvas.showPage()
+            return True
+        return False
+
+
+def benchScanManager(page_count=DEFAULT_PAGE_COUNT, scan_delay=DEFAULT_SCAN_DELAY):
+    """
+    Run benchmark.
+
+    :param page_count: Page number.
+    :param scan_delay: Acquisition time of one page in milliseconds.
+    """
+    tmp_dirname = tempfile.mkdtemp()
+    queue_size = scan_manager.SCAN_PAGE_QUEUE_SIZE
+    try:
+        variants = ((u'Image files', iqFileScanManager(tmp_dirname), 0),
+                    (u'In memory', scan_manager.iqScanManager(), 0),
+                    (u'Pipeline', scan_manager.iqScanManager(), queue_size))
+        for title, manager, variant_queue_size in variants:
+            manager.open(scan_manager.DUMMY_SCAN_DEVICE_NAME)
+            manager.scan_device_obj.page_count = page_count
+            manager.scan_device_obj.scan_delay = scan_delay / 1000.0
+            scan_manager.SCAN_PAGE_QUEUE_SIZE = variant_queue_size
+
+            pdf_filename = os.path.join(tmp_dirname, 'scan.pdf')
+            start_time = time.time()
+            manager.scanMulti(pdf_filename, page_count)
+            duration = time.time() - start_time
+            print(u'%-12s %d pages: %.3f s (%.3f s/page). PDF %.1f MB' % (title, page_count, duration,
+                                                                         duration / page_count,
+                                                                         os.path.getsize(pdf_filename) / 1024.0 / 1024.0))
+            manager.close()
+    finally:
+        scan_manager.SCAN_PAGE_QUEUE_SIZE = queue_size
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchScanManager(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Transform datasource data exchange benchmark.
+Compare the row transpose export with the row adaptors and
+the columnar export/import on a transformed DataFrame.
+
+Run:
+    python3 -m iq.script.bench_transform_datasource [row count]
+"""
+
+import sys
+import time
+
+import numpy
+import pandas
+
+from ..components.transform_datasource import transform_datasource_proto
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_ROW_COUNT = 1000000
+
+
+def genBenchDataFrame(row_count=DEFAULT_ROW_COUNT):
+    """
+    Generate transformed benchmark DataFrame.
+
+    :param row_count: Row number.
+    :return: DataFrame object.
+    """
+    dataframe = pandas.DataFrame({'dt': pandas.date_range('2020-01-01', periods=row_count, freq='s'),
+                                  'code': numpy.array(['A', 'B', 'C', 'D'])[numpy.arange(row_count) % 4],
+                                  'value': numpy.random.rand(row_count),
+                                  'count': numpy.arange(row_count)})
+    # Typical transform
+    dataframe['total'] = dataframe.groupby('code')['value'].cumsum()
+    return dataframe
+
+
+def benchTransformDataSource(row_count=DEFAULT_ROW_COUNT):
+    """
+    Run benchmark.
+
+    :param row_count: Row number.
+    """
+    datasource = transform_datasource_proto.iqTransformDataSourceProto()
+    dataframe = genBenchDataFrame(row_count)
+
+    start_time = time.time()
+    rows = list(dataframe.reset_index().T.to_dict().values())
+    print(u'Transpose export: %.3f s' % (time.time() - start_time))
+
+    start_time = time.time()
+    rows = datasource.exportDataToValues(dataframe)
+    print(u'Records export: %.3f s' % (time.time() - start_time))
+
+    start_time = time.time()
+    columns, tuples = datasource.exportDataToTuples(dataframe)
+    print(u'Tuples export: %.3f s' % (time.time() - start_time))
+
+    start_time = time.time()
+    column_arrays = datasource.exportDataToColumns(dataframe)
+    print(u'Columns export: %.3f s' % (time.time() - start_time))
+
+    start_time = time.time()
+    datasource.importData(rows)
+    print(u'Records import: %.3f s' % (time.time() - start_time))
+
+    start_time = time.time()
+    datasource.importData(tuples, columns=columns)
+    print(u'Tuples import: %.3f s' % (time.time() - start_time))
+
+    start_time = time.time()
+    datasource.importData(column_arrays)
+    print(u'Columns import: %.3f s' % (time.time() - start_time))
+
+
+if __name__ == '__main__':
+    benchTransformDataSource(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Text generation benchmark.
+Compare template compilation on each generation
+with the compiled template cache and the bytecode cache warm start.
+
+Run:
+    python3 -m iq.script.bench_txtgen [render count] [template count]
+"""
+
+import sys
+import shutil
+import tempfile
+import time
+import jinja2
+
+from ..util import txtgen_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_RENDER_COUNT = 20000
+DEFAULT_TEMPLATE_COUNT = 10
+
+TEMPLATE_TXT = u'''SELECT id, dt, {{ column_name }} FROM {{ table_name }}
+WHERE dt BETWEEN '{{ start_dt }}' AND '{{ stop_dt }}'
+{% if codes %}AND code IN ({% for code in codes %}'{{ code }}'{% if not loop.last %}, {% endif %}{% endfor %}){% endif %}
+ORDER BY dt'''
+
+
+def benchTxtGen(render_count=DEFAULT_RENDER_COUNT, template_count=DEFAULT_TEMPLATE_COUNT):
+    """
+    Run benchmark.
+
+    :param render_count: Render number.
+    :param template_count: Different template text number.
+    """
+    templates = [u'{# Template %d #}' % i + TEMPLATE_TXT for i in range(template_count)]
+    context = dict(column_name='value', table_name='history',
+                   start_dt='2020-01-01 00:00:00', stop_dt='2020-01-02 00:00:00',
+                   codes=['A1', 'B2', 'C3'])
+
+    start_time = time.time()
+    for i in range(render_count):
+        jinja2.Template(templates[i % template_count]).render(**context)
+    duration = time.time() - start_time
+    print(u'Compile on each render: %.3f s (%.0f renders/s)' % (duration, render_count / duration))
+
+    txtgen_func.clearTemplateCache()
+    start_time = time.time()
+    for i in range(render_count):
+        txtgen_func.generate(templates[i % template_count], context)
+    duration = time.time() - start_time
+    print(u'Compiled template cache: %.3f s (%.0f renders/s)' % (duration, render_count / duration))
+    print(u'Statistics: %s' % str(txtgen_func.getTemplateCacheStatistics()))
+
+    cache_dirname = tempfile.mkdtemp()
+    try:
+        txtgen_func.setTemplateBytecodeCache(cache_dirname)
+        for title in (u'Cold start with bytecode cache', u'Warm start with bytecode cache'):
+            txtgen_func.clearTemplateCache()
+            start_time = time.time()
+            for template in templates:
+                txtgen_func.generate(template, context)
+            duration = time.time() - start_time
+            print(u'%s: %.3f s for %d templates' % (title, duration, template_count))
+        print(u'Statistics: %s' % str(txtgen_func.getTemplateCacheStatistics()))
+    finally:
+        txtgen_func.setTemplateBytecodeCache(False)
+        shutil.rmtree(cache_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchTxtGen(*[int(arg) for arg in sys.argv[1:]])
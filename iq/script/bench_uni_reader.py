@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+UniReader tag read throughput benchmark.
+Compare a new XML RPC connection per read, the persistent connection and
+system.multicall batching against a local UniReader stub server.
+
+Run:
+    python3 -m iq.script.bench_uni_reader [cycle count] [controller count] [tag count]
+"""
+
+import sys
+import time
+import threading
+import socketserver
+import xmlrpc.client
+import xmlrpc.server
+
+from ..util import xmlrpc_func
+from ..components.uni_reader import uni_reader_controller
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_CYCLE_COUNT = 200
+DEFAULT_CONTROLLER_COUNT = 10
+DEFAULT_TAG_COUNT = 20
+
+
+class iqXMLRPCStubHandler(xmlrpc.server.SimpleXMLRPCRequestHandler):
+    """
+    XML RPC stub server request handler with keep-alive support.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+
+class iqXMLRPCStubServer(socketserver.ThreadingMixIn, xmlrpc.server.SimpleXMLRPCServer):
+    """
+    Threading XML RPC stub server.
+    """
+    daemon_threads = True
+
+
+def readValuesAsStrings(node, server, *addresses):
+    """
+    UniReader stub read function.
+    """
+    values = [str(len(address)) if i % 3 else '%d.5' % i for i, address in enumerate(addresses)]
+    return values if len(values) > 1 else values[0]
+
+
+def startStubServer():
+    """
+    Start UniReader stub server in the background thread.
+
+    :return: Server object.
+    """
+    server = iqXMLRPCStubServer(('127.0.0.1', 0), requestHandler=iqXMLRPCStubHandler,
+                                logRequests=False, allow_none=True)
+    server.register_function(readValuesAsStrings, uni_reader_controller.READ_VALUES_METHOD)
+    server.register_multicall_functions()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def benchUniReader(cycle_count=DEFAULT_CYCLE_COUNT,
+                   controller_count=DEFAULT_CONTROLLER_COUNT, tag_count=DEFAULT_TAG_COUNT):
+    """
+    Run benchmark.
+
+    :param cycle_count: Read cycle number.
+    :param controller_count: Controller number.
+    :param tag_count: Tag number of each controller.
+    """
+    server = startStubServer()
+    port = server.server_address[1]
+    controllers = [uni_reader_controller.iqUniReaderControllerProto(host='127.0.0.1', port=port,
+                                                                    server=uni_reader_controller.RSLINX_SERVER,
+                                                                    node=uni_reader_controller.OPC_DA_NODE)
+                   for i in range(controller_count)]
+    tags = {'TAG%d' % i: 'PLC:N7/%d' % i for i in range(tag_count)}
+    addresses = list(tags.values())
+    read_count = cycle_count * controller_count * tag_count
+    try:
+        start_time = time.time()
+        for i_cycle in range(cycle_count):
+            for controller in controllers:
+                opc = xmlrpc.client.ServerProxy(xmlrpc_func.XMLRPC_URL_FMT % ('127.0.0.1', port))
+                values = opc.sources.ReadValuesAsStrings(controller.node, controller.server, *addresses)
+                for value in values:
+                    eval(value)
+        duration = time.time() - start_time
+        print(u'New connection per read + eval: %.3f s (%.0f tags/s)' % (duration, read_count / duration))
+
+        xmlrpc_func.resetXMLRPCStatistics()
+        start_time = time.time()
+        for i_cycle in range(cycle_count):
+            for controller in controllers:
+                controller.typecastTagValues(tags, controller.readTags(**tags))
+        duration = time.time() - start_time
+        print(u'Persistent connection: %.3f s (%.0f tags/s)' % (duration, read_count / duration))
+        print(u'Statistics: %s' % str(xmlrpc_func.getXMLRPCStatistics()))
+
+        xmlrpc_func.resetXMLRPCStatistics()
+        controller_tags = [(controller, tags) for controller in controllers]
+        start_time = time.time()
+        for i_cycle in range(cycle_count):
+            results = uni_reader_controller.readControllersTags(*controller_tags)
+            for controller, values in zip(controllers, results):
+                controller.typecastTagValues(tags, values)
+        duration = time.time() - start_time
+        print(u'Multicall batch: %.3f s (%.0f tags/s)' % (duration, read_count / duration))
+        print(u'Statistics: %s' % str(xmlrpc_func.getXMLRPCStatistics()))
+    finally:
+        xmlrpc_func.closeXMLRPCProxy()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    benchUniReader(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+UniWriter tag write benchmark.
+Compare a new XML RPC connection per value, the batch write through the persistent connection
+and the coalescing write queue against a local UniWriter stub server.
+
+Run:
+    python3 -m iq.script.bench_uni_writer [write count] [controller count] [tag count]
+"""
+
+import sys
+import time
+import threading
+import xmlrpc.client
+
+from ..util import xmlrpc_func
+from ..components.uni_writer import uni_writer_controller
+from ..components.uni_writer import write_queue
+from . import bench_uni_reader
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_WRITE_COUNT = 5000
+DEFAULT_CONTROLLER_COUNT = 5
+DEFAULT_TAG_COUNT = 10
+
+
+def writeValue(node, server, address, value):
+    """
+    UniWriter stub write function.
+    """
+    return True
+
+
+def startStubServer():
+    """
+    Start UniWriter stub server in the background thread.
+
+    :return: Server object.
+    """
+    server = bench_uni_reader.iqXMLRPCStubServer(('127.0.0.1', 0), requestHandler=bench_uni_reader.iqXMLRPCStubHandler,
+                                                 logRequests=False, allow_none=True)
+    for method_name in (uni_writer_controller.WRITE_INT2_METHOD, uni_writer_controller.WRITE_INT4_METHOD,
+                        uni_writer_controller.WRITE_BOOL_METHOD, uni_writer_controller.WRITE_STRING_METHOD):
+        server.register_function(writeValue, method_name)
+    server.register_multicall_functions()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def benchUniWriter(write_count=DEFAULT_WRITE_COUNT,
+                   controller_count=DEFAULT_CONTROLLER_COUNT, tag_count=DEFAULT_TAG_COUNT):
+    """
+    Run benchmark.
+
+    :param write_count: Written value number.
+    :param controller_count: Controller number.
+    :param tag_count: Tag number of each controller.
+    """
+    server = startStubServer()
+    port = server.server_address[1]
+    controllers = [uni_writer_controller.iqUniWriterControllerProto(host='127.0.0.1', port=port,
+                                                                    server=uni_writer_controller.RSLINX_SERVER,
+                                                                    node=uni_writer_controller.OPC_DA_NODE)
+                   for i in range(controller_count)]
+    writes = [(controllers[i % controller_count], 'PLC:N7/%d' % (i % tag_count), i % 1000)
+              for i in range(write_count)]
+    try:
+        start_time = time.time()
+        for controller, address, value in writes:
+            opc = xmlrpc.client.ServerProxy(xmlrpc_func.XMLRPC_URL_FMT % ('127.0.0.1', port))
+            opc.destinations.WriteValueAsInt2(controller.node, controller.server, address, value)
+        duration = time.time() - start_time
+        print(u'New connection per value: %.3f s (%.0f writes/s, %.2f ms latency)' % (duration, write_count / duration,
+                                                                                       duration / write_count * 1000))
+
+        start_time = time.time()
+        for controller, address, value in writes:
+            controller.writeTag(address=address, value=value)
+        duration = time.time() - start_time
+        print(u'Persistent connection: %.3f s (%.0f writes/s, %.2f ms latency)' % (duration, write_count / duration,
+                                                                                    duration / write_count * 1000))
+
+        queue = write_queue.iqUniWriterQueue()
+        queue.start()
+        done_event = threading.Event()
+        done_count = [0]
+
+        def onDone(controller, address, value):
+            done_count[0] += 1
+            if done_count[0] >= write_count:
+                done_event.set()
+
+        start_time = time.time()
+        for controller, address, value in writes:
+            queue.put(controller, address, value, on_ack=onDone, on_fail=onDone)
+        done_event.wait(60)
+        duration = time.time() - start_time
+        queue.stop()
+        metrics = queue.getMetrics()
+        print(u'Coalescing queue burst: %.3f s (%.0f writes/s, %.2f ms avg latency, %.2f ms max latency)' %
+              (duration, write_count / duration, metrics['avg_latency'] * 1000, metrics['max_latency'] * 1000))
+        print(u'Queue metrics: %s' % str(metrics))
+    finally:
+        xmlrpc_func.closeXMLRPCProxy()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    benchUniWriter(*[int(arg) for arg in sys.argv[1:]])
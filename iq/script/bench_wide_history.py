@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Wide history downsampling benchmark.
+Compare loading all records of the range with SQL time bucket downsampling
+on the SQLite history table.
+
+Run:
+    python3 -m iq.script.bench_wide_history [record count] [point count]
+"""
+
+import sys
+import os
+import os.path
+import datetime
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import sqlalchemy
+import sqlalchemy.orm
+import sqlalchemy.ext.declarative
+
+from ..components.data_wide_history import wide_history
+
+__version__ = (0, 0, 0, 2)
+
+DEFAULT_REC_COUNT = 10000000
+DEFAULT_POINT_COUNT = 1000
+
+# Full range load is measured only for this record number
+MAX_FULL_LOAD_REC_COUNT = 1000000
+
+BENCH_START_DT = datetime.datetime(2020, 1, 1)
+BENCH_BLOCK_REC_COUNT = 100000
+# SQLAlchemy SQLite date-time storage format
+BENCH_DT_FMT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+class iqBenchWideHistory(wide_history.iqWideHistoryManager):
+    """
+    Wide history manager of the benchmark SQLite table.
+    """
+    def __init__(self, db_filename):
+        """
+        Constructor.
+
+        :param db_filename: SQLite database filename.
+        """
+        self.engine = sqlalchemy.create_engine('sqlite:///%s' % db_filename)
+        base = sqlalchemy.ext.declarative.declarative_base()
+
+        class iqBenchHistory(base):
+            __tablename__ = 'history'
+            id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+            dt = sqlalchemy.Column(sqlalchemy.DateTime, index=True)
+            value1 = sqlalchemy.Column(sqlalchemy.Float)
+            value2 = sqlalchemy.Column(sqlalchemy.Float)
+
+        self.bench_model = iqBenchHistory
+        self.session_class = sqlalchemy.orm.sessionmaker(bind=self.engine)
+        wide_history.iqWideHistoryManager.__init__(self, model=iqBenchHistory)
+
+    def getName(self):
+        return 'bench_history'
+
+    def getModel(self):
+        return self.bench_model
+
+    def startTransaction(self, *args, **kwargs):
+        return self.session_class()
+
+    def stopTransaction(self, transaction, *args, **kwargs):
+        transaction.close()
+        return True
+
+
+def createBenchHistory(db_filename, rec_count=DEFAULT_REC_COUNT):
+    """
+    Create benchmark SQLite history table with 1 second step.
+
+    :param db_filename: SQLite database filename.
+    :param rec_count: Record number.
+    """
+    connection = sqlite3.connect(db_filename)
+    connection.execute('CREATE TABLE history (id INTEGER PRIMARY KEY, dt DATETIME, value1 FLOAT, value2 FLOAT)')
+    for start in range(0, rec_count, BENCH_BLOCK_REC_COUNT):
+        stop = min(start + BENCH_BLOCK_REC_COUNT, rec_count)
+        connection.executemany('INSERT INTO history (dt, value1, value2) VALUES (?, ?, ?)',
+                               [((BENCH_START_DT + datetime.timedelta(seconds=i)).strftime(BENCH_DT_FMT),
+                                 float(i % 3600), float(i % 97))
+                                for i in range(start, stop)])
+    connection.execute('CREATE INDEX ix_history_dt ON history (dt)')
+    connection.commit()
+    connection.close()
+
+
+def benchWideHistory(rec_count=DEFAULT_REC_COUNT, point_count=DEFAULT_POINT_COUNT):
+    """
+    Run benchmark.
+
+    :param rec_count: Record number.
+    :param point_count: Downsampled point number.
+    """
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        db_filename = os.path.join(tmp_dirname, 'history.db')
+        start_time = time.time()
+        createBenchHistory(db_filename, rec_count)
+        print(u'Create %d records: %.3f s (%.1f MB)' % (rec_count, time.time() - start_time,
+                                                        os.path.getsize(db_filename) / 1048576.0))
+
+        history = iqBenchWideHistory(db_filename)
+        full_rec_count = min(rec_count, MAX_FULL_LOAD_REC_COUNT)
+        start_dt = BENCH_START_DT
+        stop_dt = BENCH_START_DT + datetime.timedelta(seconds=full_rec_count - 1)
+        start_time = time.time()
+        values = history.getValues('value1', start_dt, stop_dt)
+        print(u'Full load %d records: %.3f s (%d points)' % (full_rec_count, time.time() - start_time, len(values)))
+
+        for method in wide_history.DOWNSAMPLE_METHODS:
+            start_time = time.time()
+            values = history.getDownsampledValues('value1', start_dt, stop_dt, point_count=point_count, method=method)
+            print(u'Downsampled <%s> %d records: %.3f s (%d points)' % (method, full_rec_count,
+                                                                       time.time() - start_time, len(values)))
+
+        stop_dt = BENCH_START_DT + datetime.timedelta(seconds=rec_count - 1)
+        method_values = dict()
+        for method in wide_history.DOWNSAMPLE_METHODS:
+            start_time = time.time()
+            values = history.getDownsampledValues('value1', start_dt, stop_dt, point_count=point_count, method=method)
+            print(u'Downsampled <%s> %d records: %.3f s (%d points)' % (method, rec_count,
+                                                                       time.time() - start_time, len(values)))
+            method_values[method] = values
+
+        lttb_values = method_values[wide_history.LTTB_DOWNSAMPLE]
+        lttb_ok = len(lttb_values) == point_count and lttb_values != method_values[wide_history.MINMAX_DOWNSAMPLE]
+        print(u'LTTB check: %s (%d points of %d, differs from <%s>)' % (u'OK' if lttb_ok else u'FAILED',
+                                                                        len(lttb_values), point_count,
+                                                                        wide_history.MINMAX_DOWNSAMPLE))
+    finally:
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchWideHistory(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Wide history range cache benchmark.
+Scroll a trend window back and forth over the SQLite history table
+with and without the columnar range cache.
+
+Run:
+    python3 -m iq.script.bench_wide_history_cache [record count] [window seconds] [scroll count]
+"""
+
+import sys
+import os.path
+import datetime
+import shutil
+import tempfile
+import time
+
+from . import bench_wide_history
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_REC_COUNT = 1000000
+DEFAULT_WINDOW = 3600
+DEFAULT_SCROLL_COUNT = 200
+
+# Scroll step as a window part
+SCROLL_STEP_PART = 4
+
+
+def getScrollRanges(rec_count=DEFAULT_REC_COUNT, window=DEFAULT_WINDOW, scroll_count=DEFAULT_SCROLL_COUNT):
+    """
+    Get window ranges of scrolling back and forth.
+
+    :param rec_count: Record number.
+    :param window: Window width in seconds.
+    :param scroll_count: Scroll number.
+    :return: [(start date-time, stop date-time), ...].
+    """
+    step = max(window // SCROLL_STEP_PART, 1)
+    max_start = max(rec_count - window, 0)
+    # Scroll over the first 10 windows and back
+    scroll_width = min(max_start, window * 10)
+    ranges = list()
+    offset = 0
+    direction = 1
+    for i in range(scroll_count):
+        start_dt = bench_wide_history.BENCH_START_DT + datetime.timedelta(seconds=offset)
+        ranges.append((start_dt, start_dt + datetime.timedelta(seconds=window)))
+        if not 0 <= offset + direction * step <= scroll_width:
+            direction = -direction
+        offset += direction * step
+    return ranges
+
+
+def benchWideHistoryCache(rec_count=DEFAULT_REC_COUNT, window=DEFAULT_WINDOW, scroll_count=DEFAULT_SCROLL_COUNT):
+    """
+    Run benchmark.
+
+    :param rec_count: Record number.
+    :param window: Window width in seconds.
+    :param scroll_count: Scroll number.
+    """
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        db_filename = os.path.join(tmp_dirname, 'history.db')
+        bench_wide_history.createBenchHistory(db_filename, rec_count)
+        ranges = getScrollRanges(rec_count, window, scroll_count)
+
+        history = bench_wide_history.iqBenchWideHistory(db_filename)
+        for cache_size in (0, 64):
+            history.getCacheSize = lambda: cache_size
+            history.clearRangeCache()
+            start_time = time.time()
+            point_count = 0
+            for start_dt, stop_dt in ranges:
+                point_count += len(history.getValues('value1', start_dt, stop_dt))
+                history.getRecord(start_dt + (stop_dt - start_dt) / 2)
+            duration = time.time() - start_time
+            print(u'Cache size %d MB. %d scrolls: %.3f s (%.1f ms/scroll, %d points)' % (cache_size, scroll_count,
+                                                                                          duration,
+                                                                                          duration * 1000 / scroll_count,
+                                                                                          point_count))
+            cache = history.getRangeCache()
+            if cache is not None:
+                print(u'Metrics: %s' % str(cache.getMetrics()))
+    finally:
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchWideHistoryCache(*[int(arg) for arg in sys.argv[1:]])
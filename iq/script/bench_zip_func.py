@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ZIP archive throughput benchmark.
+Compare the external zip tool with the in-process archive engine
+by compression level, worker process number and incremental mode.
+
+Run:
+    python3 -m iq.script.bench_zip_func [total size MB] [file count] [worker count]
+"""
+
+import sys
+import os
+import os.path
+import shutil
+import subprocess
+import tempfile
+import time
+
+from ..util import zip_func
+
+__version__ = (0, 0, 0, 1)
+
+DEFAULT_TOTAL_SIZE = 128
+DEFAULT_FILE_COUNT = 64
+
+LOG_LINE = b'2020-01-01 00:00:00 INFO Message of the program log file with the record number %d\n'
+
+# Part of the files changed before the incremental archive
+CHANGE_FILE_STEP = 10
+
+
+def createBenchFiles(dirname, total_size=DEFAULT_TOTAL_SIZE, file_count=DEFAULT_FILE_COUNT):
+    """
+    Create benchmark files.
+    Even files are compressible text. Odd files are random data.
+
+    :param dirname: Directory name.
+    :param total_size: Total size in MB.
+    :param file_count: File number.
+    :return: File name list.
+    """
+    file_size = total_size * 1024 * 1024 // file_count
+    filenames = list()
+    for i in range(file_count):
+        filename = os.path.join(dirname, 'file%04d.%s' % (i, 'bin' if i % 2 else 'log'))
+        with open(filename, 'wb') as bench_file:
+            if i % 2:
+                bench_file.write(os.urandom(file_size))
+            else:
+                size = 0
+                line_number = 0
+                while size < file_size:
+                    line = LOG_LINE % line_number
+                    bench_file.write(line)
+                    size += len(line)
+                    line_number += 1
+        filenames.append(filename)
+    return filenames
+
+
+def _printThroughput(title, duration, size):
+    """
+    Print throughput.
+    """
+    print(u'%-40s %8.3f s %8.1f MB/s' % (title, duration, size / 1024.0 / 1024.0 / duration))
+
+
+def benchZipFunc(total_size=DEFAULT_TOTAL_SIZE, file_count=DEFAULT_FILE_COUNT, worker_count=None):
+    """
+    Run benchmark.
+
+    :param total_size: Total size in MB.
+    :param file_count: File number.
+    :param worker_count: Worker process number. If None then the CPU number is used.
+    """
+    if worker_count is None:
+        worker_count = os.cpu_count() or 1
+    tmp_dirname = tempfile.mkdtemp()
+    try:
+        src_dirname = os.path.join(tmp_dirname, 'src')
+        os.makedirs(src_dirname)
+        filenames = createBenchFiles(src_dirname, total_size, file_count)
+        size = sum([os.path.getsize(filename) for filename in filenames])
+        zip_filename = os.path.join(tmp_dirname, 'bench.zip')
+
+        if shutil.which('zip'):
+            start_time = time.time()
+            subprocess.call(['zip', '-q', '-6', zip_filename] + filenames)
+            _printThroughput(u'External zip -6', time.time() - start_time, size)
+
+        for compress_level in (1, 6):
+            for workers in sorted(set((1, worker_count))):
+                start_time = time.time()
+                manifest = zip_func.archiveFiles(filenames, zip_filename, compress_level=compress_level,
+                                                 worker_count=workers)
+                _printThroughput(u'Level %d. Workers %d' % (compress_level, workers), time.time() - start_time, size)
+        print(u'Archive size: %.1f MB. Bad checksums: %s' % (os.path.getsize(zip_filename) / 1024.0 / 1024.0,
+                                                            zip_func.checkArchiveFiles(zip_filename)))
+
+        # Incremental archives are made by the manifest of the full archive
+        manifest_filename = zip_func.getArchiveManifestFilename(zip_filename)
+        start_time = time.time()
+        manifest = zip_func.archiveFiles(filenames, os.path.join(tmp_dirname, 'bench_inc1.zip'),
+                                         worker_count=worker_count, incremental=True,
+                                         manifest_filename=manifest_filename)
+        _printThroughput(u'Incremental. Unchanged', time.time() - start_time, size)
+        print(u'Added %d. Skipped %d' % (len(manifest['added']), len(manifest['skipped'])))
+
+        for filename in filenames[::CHANGE_FILE_STEP]:
+            with open(filename, 'r+b') as bench_file:
+                bench_file.write(b'#')
+        for filename in filenames[1::CHANGE_FILE_STEP]:
+            os.utime(filename)
+        start_time = time.time()
+        manifest = zip_func.archiveFiles(filenames, os.path.join(tmp_dirname, 'bench_inc2.zip'),
+                                         worker_count=worker_count, incremental=True, check_hash=True,
+                                         manifest_filename=manifest_filename)
+        _printThroughput(u'Incremental. Changed and touched', time.time() - start_time, size)
+        print(u'Added %d. Skipped %d' % (len(manifest['added']), len(manifest['skipped'])))
+    finally:
+        shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchZipFunc(*[int(arg) for arg in sys.argv[1:]])
@@ -17,7 +17,7 @@ from . import file_func
 from . import exec_func
 from . import global_func
 
-__version__ = (0, 0, 3, 1)
+__version__ = (0, 0, 4, 2)
 
 _ = lang_func.getTranslation().gettext
 
@@ -113,6 +113,9 @@ def backupFilesZipNfs(src_filenames, backup_url, zip_filename=None, dst_path=Non
     :param dst_path: Destination network backup folder.
     :param parent_win: Parent window for dialogs.
     :param do_zip: Make ZIP archive for backup.
+        The archive is made by the in-process archive engine.
+        Additional keyword arguments compress_level, worker_count and incremental
+        are passed to zip_func.archiveFiles.
     :return: True/False.
     """
     result = False
@@ -129,7 +132,11 @@ def backupFilesZipNfs(src_filenames, backup_url, zip_filename=None, dst_path=Non
         if do_zip:
             if zip_filename is None:
                 zip_filename = os.path.splitext(src_filenames[0])[0] + zip_func.ZIP_EXT
-            zip_result = zip_func.zipFiles(src_filenames=src_filenames, zip_filename=zip_filename)
+            manifest = zip_func.archiveFiles(src_filenames=src_filenames, zip_filename=zip_filename,
+                                             compress_level=kwargs.get('compress_level', zip_func.ZIP_COMPRESS_LEVEL),
+                                             worker_count=kwargs.get('worker_count', 1),
+                                             incremental=kwargs.get('incremental', False))
+            zip_result = manifest is not None
 
             if zip_result:
                 result = nfs_func.uploadNfsFile(upload_url=backup_url,
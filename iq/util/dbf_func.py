@@ -7,6 +7,8 @@
 
 import os
 import os.path
+import struct
+import datetime
 
 from . import log_func
 
@@ -25,7 +27,7 @@ try:
 except ImportError:
     log_func.error(u'Import error dbfread. Install <pip3 install dbfread>')
 
-__version__ = (0, 0, 1, 1)
+__version__ = (0, 0, 2, 2)
 
 #
 DBF_DB_URL_FMT = 'jdbc:dbf:///%s?charSet=%s'
@@ -33,6 +35,29 @@ JDBC_DBF_DRIVER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'db',
 
 DEFAULT_DBF_ENCODING = 'cp1251'
 
+# DBF file structure
+DBF_HEADER_FMT = '<B3BLHH20s'
+DBF_HEADER_SIZE = struct.calcsize(DBF_HEADER_FMT)
+DBF_FIELD_FMT = '<11sc4sBB14s'
+DBF_FIELD_SIZE = struct.calcsize(DBF_FIELD_FMT)
+DBF_HEADER_TERMINATOR = b'\r'
+DBF_FILE_EOF = b'\x1a'
+DBF_FIELD_NAME_MAX_LEN = 10
+
+# Record number in one read/write block of restructuring
+DBF_BLOCK_REC_COUNT = 8192
+
+# Default field length by type
+DBF_FIXED_FIELD_LENGTH = {'L': 1, 'D': 8}
+
+# Binary field types (Visual FoxPro/dBase 7)
+DBF_BINARY_FIELD_TYPES = ('I', '+', 'B', 'O', 'T', '@', 'Y')
+# Memo field types. Values are stored in the memo file
+DBF_MEMO_FIELD_TYPES = ('M', 'G', 'P')
+
+# Julian day number of 0001-01-01
+JULIAN_DAY_OFFSET = 1721425
+
 
 def getDBFFieldNames(tab_filename):
     """
@@ -84,6 +109,286 @@ def existsColumns(tab_filename, columns, auto_create=True):
     return all(results)
 
 
+def readDBFStructure(dbf_file):
+    """
+    Read DBF file header structure.
+
+    :param dbf_file: DBF file object opened in binary mode.
+    :return: Tuple (header dictionary, field list).
+        Field is dictionary:
+            {'name': field name,
+             'type': field type,
+             'len': field length,
+             'decimal': field decimal point,
+             'offset': field offset in record,
+             'descriptor': raw field descriptor bytes}
+    """
+    dbf_file.seek(0)
+    header_data = dbf_file.read(DBF_HEADER_SIZE)
+    version, year, month, day, rec_count, header_len, record_len, reserved = struct.unpack(DBF_HEADER_FMT,
+                                                                                           header_data)
+    header = dict(version=version, rec_count=rec_count, header_len=header_len,
+                  record_len=record_len, reserved=reserved)
+
+    fields = list()
+    offset = 1
+    descriptors = dbf_file.read(header_len - DBF_HEADER_SIZE)
+    pos = 0
+    while pos + DBF_FIELD_SIZE <= len(descriptors) and descriptors[pos:pos + 1] != DBF_HEADER_TERMINATOR:
+        descriptor = descriptors[pos:pos + DBF_FIELD_SIZE]
+        name, field_type, address, length, decimal, flags = struct.unpack(DBF_FIELD_FMT, descriptor)
+        fields.append(dict(name=name.split(b'\x00')[0].decode('ascii', 'replace').upper(),
+                           type=field_type.decode('ascii'), len=length, decimal=decimal,
+                           offset=offset, descriptor=descriptor))
+        offset += length
+        pos += DBF_FIELD_SIZE
+    # Data after field descriptors (for example Visual FoxPro backlink)
+    header['tail'] = descriptors[pos + 1:]
+    return header, fields
+
+
+def _packDBFField(field):
+    """
+    Pack DBF field descriptor.
+
+    :param field: Field dictionary.
+    :return: Field descriptor bytes.
+    """
+    descriptor = field.get('descriptor')
+    if descriptor:
+        flags = descriptor[18:]
+        # Visual FoxPro field displacement in record must follow the new layout
+        address = struct.pack('<L', field['offset']) if descriptor[12:16].strip(b'\x00') else b'\x00' * 4
+    else:
+        address, flags = b'\x00' * 4, b'\x00' * 14
+    return struct.pack(DBF_FIELD_FMT, field['name'].encode('ascii'), field['type'].encode('ascii'),
+                       address, field['len'], field['decimal'], flags)
+
+
+def _encodeBinaryDBFValue(value, field_type, field_length):
+    """
+    Encode value to binary DBF field bytes.
+
+    :param value: Value.
+    :param field_type: Binary field type.
+    :param field_length: Field length.
+    :return: Field bytes of field length.
+    """
+    if field_type in ('I', '+'):
+        return struct.pack('<i', int(value))
+    elif field_type in ('B', 'O') and field_length == 8:
+        return struct.pack('<d', float(value))
+    elif field_type == 'Y':
+        return struct.pack('<q', int(round(float(value) * 10000)))
+    elif field_type in ('T', '@'):
+        if not isinstance(value, datetime.datetime):
+            value = datetime.datetime(value.year, value.month, value.day)
+        msec = ((value.hour * 60 + value.minute) * 60 + value.second) * 1000 + value.microsecond // 1000
+        return struct.pack('<LL', value.toordinal() + JULIAN_DAY_OFFSET, msec)
+    raise TypeError(u'DBF field type <%s> length %d not supported' % (field_type, field_length))
+
+
+def encodeDBFValue(value, field_type, field_length, field_decimal=0, encoding=DEFAULT_DBF_ENCODING):
+    """
+    Encode value to DBF field bytes.
+
+    :param value: Value.
+    :param field_type: Field type.
+    :param field_length: Field length.
+    :param field_decimal: Field decimal point.
+    :param encoding: DBF file code page.
+    :return: Field bytes of field length.
+        TypeError is raised for memo field types.
+    """
+    if field_type in DBF_MEMO_FIELD_TYPES or (field_type == 'B' and field_length != 8):
+        raise TypeError(u'Memo DBF field type <%s> not supported' % field_type)
+    if field_type in DBF_BINARY_FIELD_TYPES:
+        if value is None:
+            return b'\x00' * field_length
+        return _encodeBinaryDBFValue(value, field_type, field_length)
+
+    if value is None:
+        return b' ' * field_length
+
+    if field_type == 'L':
+        if isinstance(value, str):
+            value = value.strip().upper() in ('T', 'Y', 'TRUE', '1')
+        data = b'T' if value else b'F'
+    elif field_type == 'D':
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            data = value.strftime('%Y%m%d').encode('ascii')
+        else:
+            data = str(value).replace('-', '').strip().encode('ascii')
+    elif field_type in ('N', 'F'):
+        if isinstance(value, (int, float)) and field_decimal:
+            data = ('%.*f' % (field_decimal, value)).encode('ascii')
+        else:
+            data = str(value).strip().encode('ascii')
+        if len(data) > field_length:
+            # dBase numeric overflow mark
+            data = b'*' * field_length
+        return data.rjust(field_length)
+    else:
+        data = str(value).encode(encoding)
+    return data[:field_length].ljust(field_length)
+
+
+def _resizeDBFValue(data, field):
+    """
+    Convert field bytes to new field size.
+
+    :param data: Old field bytes.
+    :param field: New field dictionary with 'old' old field dictionary.
+    :return: New field bytes.
+    """
+    old_field = field['old']
+    if field['type'] in ('N', 'F'):
+        if field['decimal'] != old_field['decimal']:
+            str_value = data.strip()
+            try:
+                value = float(str_value.replace(b',', b'.')) if str_value else None
+            except ValueError:
+                value = None
+            return encodeDBFValue(value, field['type'], field['len'], field['decimal'])
+        data = data.strip()
+        if len(data) > field['len']:
+            return b'*' * field['len']
+        return data.rjust(field['len'])
+    return data[:field['len']].ljust(field['len'])
+
+
+def restructDBF(dbf_filename, add_fields=(), drop_fields=(), resize_fields=None,
+                encoding=DEFAULT_DBF_ENCODING, block_rec_count=DBF_BLOCK_REC_COUNT):
+    """
+    Change DBF file structure.
+    The header is rewritten and records are streamed into
+    the new layout by blocks through temporary file.
+
+    :param dbf_filename: DBF table filename.
+    :param add_fields: Append field defines:
+        [(Field name, Field type, Length, Default value[, Decimal point]), ...].
+    :param drop_fields: Deleted field names.
+    :param resize_fields: Resized fields dictionary:
+        {Field name: Length or (Length, Decimal point), ...}.
+    :param encoding: DBF file code page.
+    :param block_rec_count: Record number in one read/write block.
+    :return: True/False.
+    """
+    dbf_filename = os.path.abspath(dbf_filename)
+    if not os.path.exists(dbf_filename):
+        log_func.warning(u'Restruct DBF file. File <%s> not found' % dbf_filename)
+        return False
+
+    drop_fields = [str(field_name).upper() for field_name in drop_fields]
+    resize_fields = dict([(str(field_name).upper(), size) for field_name, size in (resize_fields or dict()).items()])
+
+    tmp_filename = dbf_filename + '.tmp'
+    try:
+        with open(dbf_filename, 'rb') as src_file:
+            header, fields = readDBFStructure(src_file)
+            field_names = [field['name'] for field in fields]
+
+            # Field layout of the new structure. Every new field copies old field bytes
+            # or contains the default value bytes
+            new_fields = list()
+            for field in fields:
+                if field['name'] in drop_fields:
+                    continue
+                new_field = dict(field, old=field)
+                if field['name'] in resize_fields:
+                    if field['type'] in DBF_BINARY_FIELD_TYPES or field['type'] in DBF_MEMO_FIELD_TYPES:
+                        log_func.warning(u'Restruct DBF file. Field <%s> type <%s> can not be resized' % (field['name'],
+                                                                                                       field['type']))
+                        return False
+                    size = resize_fields[field['name']]
+                    length, decimal = size if isinstance(size, (list, tuple)) else (size, field['decimal'])
+                    new_field.update(len=length, decimal=decimal)
+                new_fields.append(new_field)
+
+            for field_def in add_fields:
+                field_name = str(field_def[0]).upper()[:DBF_FIELD_NAME_MAX_LEN]
+                field_type = field_def[1]
+                if field_name in field_names:
+                    log_func.warning(u'Restruct DBF file. Field <%s> already exists' % field_name)
+                    continue
+                if field_type not in ('C', 'N', 'F', 'L', 'D'):
+                    log_func.warning(u'Restruct DBF file. Field type <%s> not supported' % field_type)
+                    continue
+                length = DBF_FIXED_FIELD_LENGTH.get(field_type, field_def[2])
+                default = field_def[3] if len(field_def) > 3 else None
+                decimal = field_def[4] if len(field_def) > 4 else 0
+                new_fields.append(dict(name=field_name, type=field_type, len=length, decimal=decimal,
+                                       old=None, data=encodeDBFValue(default, field_type, length,
+                                                                     decimal, encoding=encoding)))
+                field_names.append(field_name)
+
+            offset = 1
+            for field in new_fields:
+                field['offset'] = offset
+                offset += field['len']
+            record_len = offset
+            header_len = DBF_HEADER_SIZE + DBF_FIELD_SIZE * len(new_fields) + 1 + len(header['tail'])
+            today = datetime.date.today()
+            new_header = struct.pack(DBF_HEADER_FMT, header['version'],
+                                     today.year % 100, today.month, today.day,
+                                     header['rec_count'], header_len, record_len, header['reserved'])
+
+            # Record converters (deleted flag is always copied)
+            converters = [(0, 1, None)]
+            for field in new_fields:
+                old_field = field['old']
+                if old_field is None:
+                    converters.append((None, None, field['data']))
+                elif old_field['len'] == field['len'] and old_field['decimal'] == field['decimal']:
+                    converters.append((old_field['offset'], old_field['offset'] + old_field['len'], None))
+                else:
+                    converters.append((old_field['offset'], old_field['offset'] + old_field['len'], field))
+
+            # Join adjacent copied slices to decrease slicing per record
+            slices = list()
+            for start, stop, data in converters:
+                if data is None and slices and slices[-1][2] is None and slices[-1][1] == start:
+                    slices[-1] = (slices[-1][0], stop, None)
+                else:
+                    slices.append((start, stop, data))
+
+            old_record_len = header['record_len']
+            src_file.seek(header['header_len'])
+            with open(tmp_filename, 'wb') as dst_file:
+                dst_file.write(new_header)
+                dst_file.write(b''.join([_packDBFField(field) for field in new_fields]))
+                dst_file.write(DBF_HEADER_TERMINATOR + header['tail'])
+
+                rec_count = header['rec_count']
+                while rec_count > 0:
+                    block_count = min(block_rec_count, rec_count)
+                    block = src_file.read(block_count * old_record_len)
+                    block_count = len(block) // old_record_len
+                    if not block_count:
+                        break
+                    records = list()
+                    for i_rec in range(block_count):
+                        record = block[i_rec * old_record_len:(i_rec + 1) * old_record_len]
+                        for start, stop, data in slices:
+                            if data is None:
+                                records.append(record[start:stop])
+                            elif isinstance(data, bytes):
+                                records.append(data)
+                            else:
+                                records.append(_resizeDBFValue(record[start:stop], data))
+                    dst_file.write(b''.join(records))
+                    rec_count -= block_count
+                dst_file.write(DBF_FILE_EOF)
+
+        os.replace(tmp_filename, dbf_filename)
+        return True
+    except:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        log_func.fatal(u'Error restruct DBF file <%s>' % dbf_filename)
+    return False
+
+
 def addDBFNewField(dbf_filename,
                    new_fieldname,
                    field_type='C',
@@ -99,53 +404,108 @@ def addDBFNewField(dbf_filename,
     :param default: Default value.
     :return: True/False.
     """
+    return addDBFNewFields(dbf_filename, (new_fieldname, field_type, field_length, default))
+
+
+def addDBFNewFields(dbf_filename, *field_defs):
+    """
+    Append new fields in DBF file.
+
+    :param dbf_filename: DBF table filename.
+    :param field_defs: Field defines (Field name, Field type, Length, Default value).
+    :return: True/False.
+    """
+    if not os.path.exists(dbf_filename):
+        log_func.warning(u'Add fields in DBF file. File <%s> not found' % dbf_filename)
+        return False
+    return restructDBF(dbf_filename, add_fields=field_defs)
+
+
+def dropDBFFields(dbf_filename, *field_names):
+    """
+    Delete fields from DBF file.
+
+    :param dbf_filename: DBF table filename.
+    :param field_names: Deleted field names.
+    :return: True/False.
+    """
+    if not os.path.exists(dbf_filename):
+        log_func.warning(u'Drop fields in DBF file. File <%s> not found' % dbf_filename)
+        return False
+    return restructDBF(dbf_filename, drop_fields=field_names)
+
+
+def resizeDBFField(dbf_filename, field_name, field_length, field_decimal=None):
+    """
+    Change DBF file field length.
+
+    :param dbf_filename: DBF table filename.
+    :param field_name: Field name.
+    :param field_length: New field length.
+    :param field_decimal: New field decimal point. If None then it is not changed.
+    :return: True/False.
+    """
+    if not os.path.exists(dbf_filename):
+        log_func.warning(u'Resize field in DBF file. File <%s> not found' % dbf_filename)
+        return False
+    size = field_length if field_decimal is None else (field_length, field_decimal)
+    return restructDBF(dbf_filename, resize_fields={field_name: size})
+
+
+def setDBFFieldValue(dbf_filename, field_name, value, field_type='C'):
+    """
+    Set DBF file field value in all records.
+
+    :param dbf_filename: DBF table filename.
+    :param field_name: Field name.
+    :param value: Value.
+    :param field_type: Field type.
+        If the field type in the file is different then the file field type is used.
+    :return: True/False.
+    """
     dbf_filename = os.path.abspath(dbf_filename)
     if not os.path.exists(dbf_filename):
-        log_func.warning(u'Add field in DBF file. File <%s> not found' % dbf_filename)
+        log_func.warning(u'Set field value in DBF file. File <%s> not found' % dbf_filename)
         return False
 
-    dbf_connection = None
     try:
-        dbf_url = DBF_DB_URL_FMT % (os.path.dirname(dbf_filename), DEFAULT_DBF_ENCODING)
-        dbf_connection = jaydebeapi.connect('com.hxtt.sql.dbf.DBFDriver', [dbf_url], JDBC_DBF_DRIVER)
-
-        # Create new field
-        if field_type == 'C':
-            db_cursor = dbf_connection.cursor()
-            sql = 'ALTER TABLE %s ADD %s VARCHAR(%d)' % (os.path.splitext(os.path.basename(dbf_filename))[0],
-                                                         new_fieldname, field_length)
-            if default is not None:
-                sql += ' DEFAULT \'%s\'' % str(default)
-            log_func.debug(u'Execute SQL <%s>' % sql)
-            db_cursor.execute(sql)
-        elif field_type == 'L':
-            db_cursor = dbf_connection.cursor()
-            sql = 'ALTER TABLE %s ADD %s BOOLEAN' % (os.path.splitext(os.path.basename(dbf_filename))[0],
-                                                     new_fieldname)
-            if default is not None:
-                sql += ' DEFAULT %s' % str(default)
-            db_cursor.execute(sql)
-        elif field_type == 'D':
-            db_cursor = dbf_connection.cursor()
-            sql = 'ALTER TABLE %s ADD %s DATE' % (os.path.splitext(os.path.basename(dbf_filename))[0],
-                                                  new_fieldname)
-            if default is not None:
-                sql += ' DEFAULT \'%s\'' % str(default)
-            db_cursor.execute(sql)
-        else:
-            log_func.warning(u'Add field in DBF file. Field type <%s> not supported' % field_type)
-        dbf_connection.close()
+        with open(dbf_filename, 'r+b') as dbf_file:
+            header, fields = readDBFStructure(dbf_file)
+            fields = [field for field in fields if field['name'] == str(field_name).upper()]
+            if not fields:
+                log_func.warning(u'Set field value in DBF file. Field <%s> not found' % field_name)
+                return False
+            field = fields[0]
+            data = encodeDBFValue(value, field['type'] or field_type, field['len'], field['decimal'])
+
+            record_len = header['record_len']
+            start, stop = field['offset'], field['offset'] + field['len']
+            rec_count = header['rec_count']
+            pos = header['header_len']
+            while rec_count > 0:
+                block_count = min(DBF_BLOCK_REC_COUNT, rec_count)
+                dbf_file.seek(pos)
+                block = bytearray(dbf_file.read(block_count * record_len))
+                block_count = len(block) // record_len
+                if not block_count:
+                    break
+                for i_rec in range(block_count):
+                    rec_start = i_rec * record_len
+                    block[rec_start + start:rec_start + stop] = data
+                dbf_file.seek(pos)
+                dbf_file.write(block)
+                pos += block_count * record_len
+                rec_count -= block_count
         return True
     except:
-        if dbf_connection:
-            dbf_connection.close()
-        log_func.fatal(u'Error add field in DBF file <%s>' % dbf_filename)
+        log_func.fatal(u'Error set field value in DBF file <%s>' % dbf_filename)
     return False
 
 
-def addDBFNewFields(dbf_filename, *field_defs):
+def addDBFNewFieldsJDBC(dbf_filename, *field_defs):
     """
-    Append new fields in DBF file.
+    Append new fields in DBF file through HXTT DBF JDBC driver.
+    Requires Java runtime. Use addDBFNewFields instead.
 
     :param dbf_filename: DBF table filename.
     :param field_defs: Field defines (Field name, Field type, Length, Default value).
@@ -197,9 +557,10 @@ def addDBFNewFields(dbf_filename, *field_defs):
     return False
 
 
-def setDBFFieldValue(dbf_filename, field_name, value, field_type='C'):
+def setDBFFieldValueJDBC(dbf_filename, field_name, value, field_type='C'):
     """
-    Set DBF file field value.
+    Set DBF file field value through HXTT DBF JDBC driver.
+    Requires Java runtime. Use setDBFFieldValue instead.
 
     :param dbf_filename: DBF table filename.
     :param field_name: Field name.
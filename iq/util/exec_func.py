@@ -8,9 +8,13 @@ Execute functions module.
 import os
 import os.path
 import stat
-import uuid
 import subprocess
 import locale
+import builtins
+import hashlib
+import threading
+import types
+import collections
 
 from . import log_func
 from . import sys_func
@@ -18,7 +22,7 @@ from . import file_func
 from . import global_func
 from . import txtfile_func
 
-__version__ = (0, 1, 1, 2)
+__version__ = (0, 1, 2, 1)
 
 
 def execSystemCommand(cmd=''):
@@ -82,10 +86,93 @@ def getLinesExecutedCommand(cmd='', console_encoding=None, echo=False):
 
 INDENTATION = u' ' * 4
 
+TXT_FUNCTION_NAME = '__iq_txt_function__'
+TXT_FUNCTION_FILENAME = '<txt function>'
+
+# Maximum number of compiled text functions in the cache
+FUNCTION_CACHE_SIZE = 256
+
+# Compiled text functions: {source text hash: code object}
+FUNCTION_CACHE = collections.OrderedDict()
+FUNCTION_CACHE_LOCK = threading.Lock()
+
+FUNCTION_CACHE_STATISTICS = dict(hit_count=0, miss_count=0, evict_count=0, error_count=0)
+
+
+def getFunctionCacheStatistics():
+    """
+    Get compiled text function cache statistics.
+
+    :return: Statistics dictionary.
+    """
+    with FUNCTION_CACHE_LOCK:
+        statistics = dict(FUNCTION_CACHE_STATISTICS)
+        statistics['size'] = len(FUNCTION_CACHE)
+        return statistics
+
+
+def clearFunctionCache():
+    """
+    Clear compiled text function cache and statistics.
+    """
+    with FUNCTION_CACHE_LOCK:
+        FUNCTION_CACHE.clear()
+        for name in FUNCTION_CACHE_STATISTICS.keys():
+            FUNCTION_CACHE_STATISTICS[name] = 0
+
+
+def getTxtFunctionSource(function):
+    """
+    Get source text of function definition by function text body.
+
+    :param function: Function text body.
+    :return: Function definition text.
+    """
+    # Find source line separator
+    linesep = os.linesep
+    for sep in sys_func.LINE_SEPARATORS:
+        if sep in function:
+            linesep = sep
+
+    function_body = sys_func.LINESEP.join(INDENTATION + line for line in function.split(linesep))
+    function_header = 'def %s():%s' % (TXT_FUNCTION_NAME, sys_func.LINESEP)
+    return function_header + function_body
+
+
+def compileTxtFunction(function):
+    """
+    Get compiled code object of function by function text body.
+    The code is compiled once and taken from the cache on the next calls.
+
+    :param function: Function text body.
+    :return: Function code object. Exceptions of compilation are raised to the caller.
+    """
+    key = hashlib.md5(function.encode('utf-8')).digest()
+    with FUNCTION_CACHE_LOCK:
+        code = FUNCTION_CACHE.get(key)
+        if code is not None:
+            FUNCTION_CACHE.move_to_end(key)
+            FUNCTION_CACHE_STATISTICS['hit_count'] += 1
+            return code
+
+    module_code = compile(getTxtFunctionSource(function), TXT_FUNCTION_FILENAME, 'exec')
+    code = [const for const in module_code.co_consts if isinstance(const, types.CodeType)][0]
+
+    with FUNCTION_CACHE_LOCK:
+        FUNCTION_CACHE_STATISTICS['miss_count'] += 1
+        FUNCTION_CACHE[key] = code
+        while len(FUNCTION_CACHE) > FUNCTION_CACHE_SIZE:
+            FUNCTION_CACHE.popitem(last=False)
+            FUNCTION_CACHE_STATISTICS['evict_count'] += 1
+    return code
+
 
 def execTxtFunction(function, context=None, show_debug=False):
     """
     Execute function.
+    The function is compiled once and cached by the function text hash.
+    The context is bound to the function as globals on each call.
+    The function object is not saved in the context.
 
     :param function: Function text body.
     :param context: Run function context dictionary.
@@ -99,25 +186,17 @@ def execTxtFunction(function, context=None, show_debug=False):
         log_func.warning(u'Not valid function body type <%s>' % type(function))
         return None
 
-    # Find source line separator
-    linesep = os.linesep
-    for sep in sys_func.LINE_SEPARATORS:
-        if sep in function:
-            linesep = sep
-
-    function_body = sys_func.LINESEP.join(INDENTATION + line for line in function.split(linesep))
-    function_name = str(uuid.uuid4()).replace('-', '_')
-    function_header = 'def __%s():%s' % (function_name, sys_func.LINESEP)
-    function_footer = '%s__result__ = __%s()' % (sys_func.LINESEP, function_name)
-    function_txt = function_header + function_body + function_footer
-
     try:
-        exec(function_txt, context)
+        code = compileTxtFunction(function)
+        if '__builtins__' not in context:
+            context['__builtins__'] = builtins
         if show_debug:
-            log_func.debug(u'Execute function:\n%s' % function_txt)
-        return context['__result__']
+            log_func.debug(u'Execute function:\n%s' % getTxtFunctionSource(function))
+        return types.FunctionType(code, context)()
     except:
-        log_func.fatal(u'Error execute function:\n%s' % function_txt)
+        with FUNCTION_CACHE_LOCK:
+            FUNCTION_CACHE_STATISTICS['error_count'] += 1
+        log_func.fatal(u'Error execute function:\n%s' % getTxtFunctionSource(function))
     return None
 
 
@@ -14,12 +14,17 @@ import hashlib
 import shutil
 import glob
 import pathlib
+import mmap
+import json
+import atexit
+import threading
+import concurrent.futures
 
 from . import log_func
 from . import global_func
 from .. import global_data
 
-__version__ = (0, 2, 5, 1)
+__version__ = (0, 2, 6, 2)
 
 HIDDEN_DIRNAMES = ('.svn', '.git', '.idea', '__pycache__')
 
@@ -36,6 +41,23 @@ BACKUP_FILENAME_EXT = '.bak'
 FILE_MODE777 = stat.S_IRUSR | stat.S_IWUSR | stat.S_IXUSR | stat.S_IRGRP | stat.S_IWGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IWOTH | stat.S_IXOTH
 
 
+# Default checksum hash algorithm
+CHECKSUM_HASH_NAME = 'md5'
+# Read buffer size for the checksum calculation
+CHECKSUM_BUFFER_SIZE = 1024 * 1024
+# Files from the size are mapped into memory for the checksum calculation
+CHECKSUM_MMAP_SIZE = 16 * 1024 * 1024
+# xxHash algorithms of the xxhash library
+XXHASH_NAMES = ('xxh32', 'xxh64', 'xxh3_64', 'xxh3_128', 'xxh128')
+
+# The cache file is JSON list [[file path, hash name, size, modify time in nanoseconds, digest], ...]
+CHECKSUM_CACHE_FILENAME = 'checksum_cache.json'
+# Checksum cache: {(file path, hash name): (size, modify time in nanoseconds, digest)}
+CHECKSUM_CACHE = None
+CHECKSUM_CACHE_MODIFIED = False
+CHECKSUM_CACHE_LOCK = threading.Lock()
+
+
 def getDirectoryNames(path):
     """
     Get directory names in path.
@@ -267,29 +289,213 @@ def getUserHomePath():
     return getHomePath()
 
 
-def getFileCheckSum(filename):
+def newCheckSum(hash_name=CHECKSUM_HASH_NAME):
+    """
+    Create checksum hash object.
+
+    :param hash_name: Hash algorithm name.
+        hashlib algorithms (md5, sha1, sha256, blake2b and etc) or
+        xxHash algorithms of xxhash library (xxh64, xxh3_64, xxh128 and etc).
+    :return: Hash object with update and hexdigest methods.
+    """
+    if hash_name in XXHASH_NAMES:
+        try:
+            import xxhash
+        except ImportError:
+            log_func.warning(u'Import error xxhash. For install: pip3 install xxhash')
+            raise
+        return getattr(xxhash, hash_name)()
+    return hashlib.new(hash_name)
+
+
+def _calcFileCheckSum(filename, hash_name=CHECKSUM_HASH_NAME):
+    """
+    Calculation of the checksum of a file without the cache.
+    Large files are mapped into memory.
+    """
+    checksum = newCheckSum(hash_name)
+    with open(filename, 'rb') as src_file:
+        if os.fstat(src_file.fileno()).st_size >= CHECKSUM_MMAP_SIZE:
+            with mmap.mmap(src_file.fileno(), 0, access=mmap.ACCESS_READ) as src_map:
+                checksum.update(src_map)
+        else:
+            for data in iter(lambda: src_file.read(CHECKSUM_BUFFER_SIZE), b''):
+                checksum.update(data)
+    return checksum.hexdigest()
+
+
+def _loadCheckSumCache(cache_filename):
+    """
+    Load checksum cache from JSON file.
+    Wrong cache records are skipped.
+
+    :param cache_filename: Cache file name.
+    :return: Checksum cache dictionary.
+    """
+    cache = dict()
+    with open(cache_filename, 'rt') as cache_file:
+        records = json.load(cache_file)
+    for record in records if isinstance(records, list) else ():
+        if isinstance(record, list) and len(record) == 5 and all(isinstance(item, str) for item in record[:2]) and \
+                all(isinstance(item, int) for item in record[2:4]) and isinstance(record[4], str):
+            cache[(record[0], record[1])] = (record[2], record[3], record[4])
+    return cache
+
+
+def _getCheckSumCache():
+    """
+    Get checksum cache.
+    The cache is loaded from the profile directory on the first call.
+    """
+    global CHECKSUM_CACHE
+
+    if CHECKSUM_CACHE is not None:
+        return CHECKSUM_CACHE
+
+    with CHECKSUM_CACHE_LOCK:
+        # The cache may be loaded by other thread while waiting for the lock
+        if CHECKSUM_CACHE is None:
+            cache = dict()
+            cache_filename = getCheckSumCacheFilename()
+            if cache_filename and os.path.exists(cache_filename):
+                try:
+                    cache = _loadCheckSumCache(cache_filename)
+                except:
+                    log_func.fatal(u'Error load checksum cache <%s>' % cache_filename)
+            atexit.register(saveCheckSumCache)
+            CHECKSUM_CACHE = cache
+    return CHECKSUM_CACHE
+
+
+def getCheckSumCacheFilename():
+    """
+    Get checksum cache file name.
+
+    :return: File name or None if the profile directory is not defined.
+    """
+    profile_path = getProfilePath()
+    return os.path.join(profile_path, CHECKSUM_CACHE_FILENAME) if profile_path else None
+
+
+def saveCheckSumCache(cache_filename=None):
+    """
+    Save checksum cache if it is modified.
+
+    :param cache_filename: Cache file name. If None then the cache is saved in the profile directory.
+    :return: True/False.
+    """
+    global CHECKSUM_CACHE_MODIFIED
+
+    if cache_filename is None:
+        cache_filename = getCheckSumCacheFilename()
+    if not cache_filename or CHECKSUM_CACHE is None or not CHECKSUM_CACHE_MODIFIED:
+        return False
+
+    try:
+        with CHECKSUM_CACHE_LOCK:
+            # Remove records of deleted files
+            for key in [key for key in CHECKSUM_CACHE.keys() if not os.path.exists(key[0])]:
+                del CHECKSUM_CACHE[key]
+            records = [[key[0], key[1]] + list(record) for key, record in CHECKSUM_CACHE.items()]
+            tmp_filename = cache_filename + '.tmp'
+            with open(tmp_filename, 'wt') as cache_file:
+                json.dump(records, cache_file)
+            os.replace(tmp_filename, cache_filename)
+            CHECKSUM_CACHE_MODIFIED = False
+        return True
+    except:
+        log_func.fatal(u'Error save checksum cache <%s>' % cache_filename)
+    return False
+
+
+def clearCheckSumCache():
+    """
+    Clear checksum cache.
+    """
+    global CHECKSUM_CACHE_MODIFIED
+
+    cache = _getCheckSumCache()
+    with CHECKSUM_CACHE_LOCK:
+        cache.clear()
+        CHECKSUM_CACHE_MODIFIED = True
+
+
+def getFileCheckSum(filename, hash_name=CHECKSUM_HASH_NAME, use_cache=True):
     """
     Calculation of the checksum of a file.
 
     :param filename: File name.
+    :param hash_name: Hash algorithm name. See newCheckSum.
+    :param use_cache: Use checksum cache?
+        The checksum of the file with unchanged size and modify time is taken from the cache.
     :return: Check sum or None if error.
     """
-    md5_obj = hashlib.md5()
+    global CHECKSUM_CACHE_MODIFIED
 
-    f = None
     try:
-        f = open(filename, 'rb')
-        data = f.read(1024)
-        while data:
-            md5_obj.update(data)
-            data = f.read(1024)
-        f.close()
+        if not use_cache:
+            return _calcFileCheckSum(filename, hash_name)
+
+        file_stat = os.stat(filename)
+        key = (os.path.abspath(filename), hash_name)
+        cache = _getCheckSumCache()
+        cache_record = cache.get(key)
+        if cache_record and cache_record[0] == file_stat.st_size and cache_record[1] == file_stat.st_mtime_ns:
+            return cache_record[2]
+
+        check_sum = _calcFileCheckSum(filename, hash_name)
+        with CHECKSUM_CACHE_LOCK:
+            cache[key] = (file_stat.st_size, file_stat.st_mtime_ns, check_sum)
+            CHECKSUM_CACHE_MODIFIED = True
+        return check_sum
     except:
-        if f:
-            f.close()
-            f = None
         return None
-    return md5_obj.hexdigest()
+
+
+def getDirCheckSums(dirname, hash_name=CHECKSUM_HASH_NAME, use_cache=True, worker_count=None):
+    """
+    Calculation of the checksums of the directory files.
+    The files are processed in parallel threads.
+    Hash functions release GIL on large data.
+
+    :param dirname: Directory path.
+    :param hash_name: Hash algorithm name. See newCheckSum.
+    :param use_cache: Use checksum cache?
+    :param worker_count: Thread number. If None then the CPU number is used.
+    :return: Dictionary {relative file name: check sum}.
+    """
+    filenames = list()
+    for cur_dirname, sub_dirnames, sub_filenames in os.walk(dirname):
+        filenames += [os.path.join(cur_dirname, sub_filename) for sub_filename in sub_filenames]
+    filenames.sort()
+
+    if worker_count is None:
+        worker_count = os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(worker_count, 1)) as executor:
+        check_sums = executor.map(lambda filename: getFileCheckSum(filename, hash_name, use_cache), filenames)
+        return dict([(os.path.relpath(filename, dirname), check_sum) for filename, check_sum in zip(filenames, check_sums)])
+
+
+def getDirCheckSum(dirname, hash_name=CHECKSUM_HASH_NAME, use_cache=True, worker_count=None):
+    """
+    Calculation of the checksum of a directory.
+    The checksum is calculated by the relative file names and checksums of the files.
+
+    :param dirname: Directory path.
+    :param hash_name: Hash algorithm name. See newCheckSum.
+    :param use_cache: Use checksum cache?
+    :param worker_count: Thread number. If None then the CPU number is used.
+    :return: Check sum or None if error.
+    """
+    try:
+        check_sums = getDirCheckSums(dirname, hash_name, use_cache, worker_count)
+        checksum = newCheckSum(hash_name)
+        for filename in sorted(check_sums.keys()):
+            checksum.update((u'%s\0%s\n' % (filename.replace(os.sep, '/'), check_sums[filename])).encode())
+        return checksum.hexdigest()
+    except:
+        log_func.fatal(u'Error calculation checksum of directory <%s>' % dirname)
+    return None
 
 
 def isSameFile(first_filename, second_filename):
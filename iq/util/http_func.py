@@ -8,6 +8,7 @@ HTTP send get/post request functions.
 import os
 import time
 import json
+import threading
 
 from . import log_func
 from . import file_func
@@ -17,7 +18,133 @@ try:
 except ImportError:
     log_func.error(u'Import error urllib3')
 
-__version__ = (0, 1, 2, 2)
+__version__ = (0, 1, 3, 1)
+
+# Shared connection pool settings
+DEFAULT_NUM_POOLS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.3
+RETRY_STATUS_CODES = (502, 503, 504)
+
+# Shared pool manager. Connections are reused between requests to the same host
+POOL_MANAGER = None
+POOL_MANAGER_HEADERS = dict()
+POOL_MANAGER_LOCK = threading.Lock()
+
+HTTP_STATISTICS = dict(request_count=0, error_count=0, total_time=0.0, max_time=0.0)
+HTTP_STATISTICS_LOCK = threading.Lock()
+
+
+def initPoolManager(num_pools=DEFAULT_NUM_POOLS, maxsize=DEFAULT_POOL_MAXSIZE,
+                    connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                    retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                    gzip=True):
+    """
+    Initialize shared HTTP connection pool manager.
+
+    :param num_pools: Number of per host connection pools.
+    :param maxsize: Maximum number of connections kept in one pool.
+    :param connect_timeout: Connect timeout in seconds.
+    :param read_timeout: Read timeout in seconds.
+    :param retries: Number of retries on connection errors and 502/503/504 responses.
+    :param backoff_factor: Retry backoff factor. Pause between retries is backoff_factor * 2 ** (retry - 1).
+    :param gzip: Request gzip compressed responses?
+    :return: urllib3.PoolManager object.
+    """
+    global POOL_MANAGER, POOL_MANAGER_HEADERS
+
+    with POOL_MANAGER_LOCK:
+        if POOL_MANAGER is not None:
+            POOL_MANAGER.clear()
+        retry = urllib3.util.Retry(total=retries, backoff_factor=backoff_factor,
+                                   status_forcelist=RETRY_STATUS_CODES, raise_on_status=False)
+        timeout = urllib3.Timeout(connect=connect_timeout, read=read_timeout)
+        POOL_MANAGER_HEADERS = urllib3.make_headers(accept_encoding=True) if gzip else dict()
+        POOL_MANAGER = urllib3.PoolManager(num_pools=num_pools, maxsize=maxsize,
+                                           retries=retry, timeout=timeout)
+    return POOL_MANAGER
+
+
+def getPoolManager():
+    """
+    Get shared HTTP connection pool manager.
+    The pool manager is created with default settings at first call.
+
+    :return: urllib3.PoolManager object.
+    """
+    if POOL_MANAGER is None:
+        return initPoolManager()
+    return POOL_MANAGER
+
+
+def closePoolManager():
+    """
+    Close all connections of the shared HTTP connection pool manager.
+    """
+    global POOL_MANAGER
+
+    with POOL_MANAGER_LOCK:
+        if POOL_MANAGER is not None:
+            POOL_MANAGER.clear()
+            POOL_MANAGER = None
+
+
+def getHTTPStatistics():
+    """
+    Get HTTP request timing statistics.
+
+    :return: Dictionary:
+        {'request_count': request number,
+         'error_count': error number,
+         'total_time': total request time in seconds,
+         'avg_time': average request time in seconds,
+         'max_time': maximum request time in seconds}
+    """
+    with HTTP_STATISTICS_LOCK:
+        statistics = dict(HTTP_STATISTICS)
+    count = statistics['request_count']
+    statistics['avg_time'] = statistics['total_time'] / count if count else 0.0
+    return statistics
+
+
+def resetHTTPStatistics():
+    """
+    Reset HTTP request timing statistics.
+    """
+    with HTTP_STATISTICS_LOCK:
+        HTTP_STATISTICS.update(request_count=0, error_count=0, total_time=0.0, max_time=0.0)
+
+
+def requestHTTP3(method, url, headers=None, **kwargs):
+    """
+    Make HTTP request through the shared pool manager. urllib3 version.
+
+    :param method: HTTP method ('GET', 'POST' and etc).
+    :param url: URL.
+    :param headers: Request headers.
+    :return: urllib3 response object.
+    """
+    pool_manager = getPoolManager()
+    if POOL_MANAGER_HEADERS:
+        headers = dict(POOL_MANAGER_HEADERS, **headers) if headers else POOL_MANAGER_HEADERS
+
+    start_time = time.time()
+    is_error = True
+    try:
+        response = pool_manager.request(method, url, headers=headers, **kwargs)
+        is_error = False
+        return response
+    finally:
+        request_time = time.time() - start_time
+        with HTTP_STATISTICS_LOCK:
+            HTTP_STATISTICS['request_count'] += 1
+            HTTP_STATISTICS['total_time'] += request_time
+            HTTP_STATISTICS['max_time'] = max(HTTP_STATISTICS['max_time'], request_time)
+            if is_error:
+                HTTP_STATISTICS['error_count'] += 1
 
 
 def getHTTP3(url, headers=None, **kwargs):
@@ -33,8 +160,7 @@ def getHTTP3(url, headers=None, **kwargs):
         return None
 
     try:
-        http = urllib3.PoolManager()
-        response = http.request('GET', url, headers=headers, **kwargs)
+        response = requestHTTP3('GET', url, headers=headers, **kwargs)
         response_content = response.data.decode('utf-8')
         return response_content
     except:
@@ -64,8 +190,7 @@ def getHTTPSaveFile3(url, dst_filename=None, as_text=False, headers=None, **kwar
         log_func.info(u'Get <%s> file by URL <%s>...' % (dst_filename, url))
         start_time = time.time()
 
-        http = urllib3.PoolManager()
-        response = http.request('GET', url, headers=headers, **kwargs)
+        response = requestHTTP3('GET', url, headers=headers, **kwargs)
         response_content = response.data.decode('utf-8') if as_text else response.data
 
         file_obj = None
@@ -105,8 +230,7 @@ def postHTTP3(url, headers=None, body=None, **kwargs):
 
     try:
         encoded_body = json.dumps(body)
-        http = urllib3.PoolManager()
-        response = http.request('POST', url, headers=headers, body=encoded_body, **kwargs)
+        response = requestHTTP3('POST', url, headers=headers, body=encoded_body, **kwargs)
         response_content = response.data.decode('utf-8')
         return response_content
     except:
@@ -127,8 +251,7 @@ def deleteHTTP3(url, headers=None, **kwargs):
         return None
 
     try:
-        http = urllib3.PoolManager()
-        response = http.request('DELETE', url, headers=headers, **kwargs)
+        response = requestHTTP3('DELETE', url, headers=headers, **kwargs)
         response_code = response.status
         return response_code
     except:
@@ -150,8 +273,7 @@ def putHTTP3(url, headers=None, fields=None, **kwargs):
         return None
 
     try:
-        http = urllib3.PoolManager()
-        response = http.request('PUT', url, fields=fields, headers=headers, **kwargs)
+        response = requestHTTP3('PUT', url, fields=fields, headers=headers, **kwargs)
         response_code = response.status
         return response_code
     except:
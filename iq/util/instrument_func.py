@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Timing instrumentation functions.
+
+Timers are used as context managers or decorators:
+    with instrument_func.timer('name'):
+        ...
+
+    @instrument_func.timed('name')
+    def func():
+        ...
+
+Timers of one thread are nested in the span stack.
+Finished spans are saved as trace events and summarized by timer name.
+Counters are increased with instrument_func.count('name', value).
+
+Instrumentation is disabled by default. When disabled timers and counters
+only check the enabled flag.
+"""
+
+import os
+import json
+import time
+import functools
+import threading
+
+from . import log_func
+
+__version__ = (0, 0, 0, 1)
+
+# Maximum number of saved trace events. Older events are dropped
+MAX_TRACE_EVENTS = 100000
+
+INSTRUMENT_ENABLED = False
+
+# Timer statistics: {name: [count, total, min, max]}
+TIMER_STATISTICS = dict()
+# Counters: {name: value}
+COUNTERS = dict()
+# Trace events: [(name, thread id, start, duration, parent span name, attributes), ...]
+TRACE_EVENTS = list()
+INSTRUMENT_LOCK = threading.Lock()
+
+# Per thread span stack
+SPAN_STACKS = threading.local()
+
+START_TIME = time.perf_counter()
+
+
+def enable(enabled=True):
+    """
+    Enable/disable instrumentation.
+
+    :param enabled: True - enable / False - disable.
+    """
+    global INSTRUMENT_ENABLED
+    INSTRUMENT_ENABLED = enabled
+
+
+def disable():
+    """
+    Disable instrumentation.
+    """
+    enable(False)
+
+
+def isEnabled():
+    """
+    Is instrumentation enabled?
+    """
+    return INSTRUMENT_ENABLED
+
+
+def reset():
+    """
+    Clear timer statistics, counters and trace events.
+    """
+    with INSTRUMENT_LOCK:
+        TIMER_STATISTICS.clear()
+        COUNTERS.clear()
+        del TRACE_EVENTS[:]
+
+
+def _getSpanStack():
+    """
+    Get span stack of the current thread.
+    """
+    stack = getattr(SPAN_STACKS, 'stack', None)
+    if stack is None:
+        stack = list()
+        SPAN_STACKS.stack = stack
+    return stack
+
+
+def getCurrentSpan():
+    """
+    Get current span name of the current thread.
+
+    :return: Span name or None if there is no span.
+    """
+    stack = _getSpanStack()
+    return stack[-1].name if stack else None
+
+
+class iqTimer(object):
+    """
+    Timer span.
+    """
+    def __init__(self, name, attributes=None):
+        """
+        Constructor.
+
+        :param name: Timer name.
+        :param attributes: Span attributes dictionary.
+        """
+        self.name = name
+        self.attributes = attributes
+        self.start_time = 0.0
+        self.duration = 0.0
+
+    def __enter__(self):
+        _getSpanStack().append(self)
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.duration = time.perf_counter() - self.start_time
+        stack = _getSpanStack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        parent_name = stack[-1].name if stack else None
+
+        with INSTRUMENT_LOCK:
+            statistics = TIMER_STATISTICS.get(self.name)
+            if statistics is None:
+                TIMER_STATISTICS[self.name] = [1, self.duration, self.duration, self.duration]
+            else:
+                statistics[0] += 1
+                statistics[1] += self.duration
+                statistics[2] = min(statistics[2], self.duration)
+                statistics[3] = max(statistics[3], self.duration)
+            if len(TRACE_EVENTS) >= MAX_TRACE_EVENTS:
+                del TRACE_EVENTS[:MAX_TRACE_EVENTS // 10]
+            TRACE_EVENTS.append((self.name, threading.get_ident(), self.start_time, self.duration,
+                                 parent_name, self.attributes))
+        return False
+
+
+class iqNullTimer(object):
+    """
+    Timer of disabled instrumentation.
+    """
+    name = None
+    duration = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        return False
+
+
+NULL_TIMER = iqNullTimer()
+
+
+def timer(name, **attributes):
+    """
+    Get timer context manager.
+
+    :param name: Timer name.
+    :param attributes: Span attributes.
+        The values are converted to string only on export.
+    :return: Timer object.
+    """
+    if not INSTRUMENT_ENABLED:
+        return NULL_TIMER
+    return iqTimer(name, attributes)
+
+
+def timed(name=None):
+    """
+    Timer decorator.
+
+    :param name: Timer name. If None then the function qualified name is used.
+    :return: Decorator.
+    """
+    def decorator(function):
+        timer_name = name if name else function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENT_ENABLED:
+                return function(*args, **kwargs)
+            with iqTimer(timer_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """
+    Increase counter.
+
+    :param name: Counter name.
+    :param value: Increment.
+    """
+    if not INSTRUMENT_ENABLED:
+        return
+    with INSTRUMENT_LOCK:
+        COUNTERS[name] = COUNTERS.get(name, 0) + value
+
+
+def getTimerStatistics():
+    """
+    Get timer statistics.
+
+    :return: Dictionary {timer name: {'count': ..., 'total': ..., 'avg': ..., 'min': ..., 'max': ...}}.
+        Times in seconds.
+    """
+    with INSTRUMENT_LOCK:
+        return {name: dict(count=statistics[0], total=statistics[1],
+                           avg=statistics[1] / statistics[0],
+                           min=statistics[2], max=statistics[3])
+                for name, statistics in TIMER_STATISTICS.items()}
+
+
+def getCounters():
+    """
+    Get counters.
+
+    :return: Dictionary {counter name: value}.
+    """
+    with INSTRUMENT_LOCK:
+        return dict(COUNTERS)
+
+
+def getTraceEvents():
+    """
+    Get trace events in Chrome trace event format.
+
+    :return: Trace event list.
+    """
+    with INSTRUMENT_LOCK:
+        events = list(TRACE_EVENTS)
+        counters = dict(COUNTERS)
+
+    pid = os.getpid()
+    trace_events = list()
+    for name, thread_id, start_time, duration, parent_name, attributes in events:
+        event = dict(name=name, ph='X', pid=pid, tid=thread_id,
+                     ts=(start_time - START_TIME) * 1000000, dur=duration * 1000000)
+        args = {key: str(value) for key, value in attributes.items()} if attributes else dict()
+        if parent_name:
+            args['parent'] = parent_name
+        if args:
+            event['args'] = args
+        trace_events.append(event)
+    if counters:
+        trace_events.append(dict(name='counters', ph='C', pid=pid, tid=0,
+                                 ts=(time.perf_counter() - START_TIME) * 1000000, args=counters))
+    return trace_events
+
+
+def exportJSONTrace(json_filename):
+    """
+    Export trace events to JSON trace file.
+    The file can be opened in chrome://tracing or Perfetto UI.
+
+    :param json_filename: JSON trace filename.
+    :return: True/False.
+    """
+    try:
+        with open(json_filename, 'wt') as json_file:
+            json.dump(dict(traceEvents=getTraceEvents(), displayTimeUnit='ms'), json_file)
+        return True
+    except:
+        log_func.fatal(u'Error export JSON trace file <%s>' % json_filename)
+    return False
+
+
+def getTextSummary():
+    """
+    Get text summary of timers and counters.
+    Timers are sorted by total time.
+
+    :return: Summary text.
+    """
+    lines = [u'%-48s %10s %12s %12s %12s %12s' % (u'Timer', u'Count', u'Total ms', u'Avg ms', u'Min ms', u'Max ms')]
+    statistics = getTimerStatistics()
+    for name in sorted(statistics.keys(), key=lambda timer_name: -statistics[timer_name]['total']):
+        timer_statistics = statistics[name]
+        lines.append(u'%-48s %10d %12.3f %12.3f %12.3f %12.3f' % (name, timer_statistics['count'],
+                                                                 timer_statistics['total'] * 1000,
+                                                                 timer_statistics['avg'] * 1000,
+                                                                 timer_statistics['min'] * 1000,
+                                                                 timer_statistics['max'] * 1000))
+    counters = getCounters()
+    if counters:
+        lines.append(u'')
+        lines.append(u'%-48s %10s' % (u'Counter', u'Value'))
+        for name in sorted(counters.keys()):
+            lines.append(u'%-48s %10s' % (name, counters[name]))
+    return os.linesep.join(lines)
+
+
+def exportTextSummary(txt_filename=None):
+    """
+    Export text summary of timers and counters.
+
+    :param txt_filename: Text filename. If None then the summary is printed.
+    :return: True/False.
+    """
+    summary = getTextSummary()
+    if txt_filename is None:
+        print(summary)
+        return True
+
+    try:
+        with open(txt_filename, 'wt') as txt_file:
+            txt_file.write(summary)
+        return True
+    except:
+        log_func.fatal(u'Error export text summary file <%s>' % txt_filename)
+    return False
@@ -11,19 +11,14 @@ import os.path
 
 from . import log_func
 from . import file_func
+from . import http_func
 
 try:
     import urllib.request
 except ImportError:
     log_func.error(u'Import error urllib')
 
-try:
-    import urllib3
-except ImportError:
-    log_func.error(u'Import error urllib3')
-
-
-__version__ = (0, 0, 1, 4)
+__version__ = (0, 0, 1, 5)
 
 
 def dict2JSON(data_dict):
@@ -115,8 +110,7 @@ def getJSONAsDictByURL3(url, headers=None, *args, **kwargs):
 
     json_content = None
     try:
-        http = urllib3.PoolManager()
-        response = http.request('GET', url, headers=headers)
+        response = http_func.requestHTTP3('GET', url, headers=headers)
         json_content = response.data.decode('utf-8')
         json_dict = json.loads(json_content)
         return json_dict
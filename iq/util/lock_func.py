@@ -8,6 +8,19 @@ Lock system functions.
 import os
 import os.path
 import stat
+import json
+import time
+import atexit
+import sqlite3
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
 
 from . import log_func
 from . import file_func
@@ -16,7 +29,7 @@ from . import global_func
 from . import lang_func
 from ..dialog import dlg_func
 
-__version__ = (0, 0, 1, 2)
+__version__ = (0, 0, 2, 2)
 
 _ = lang_func.getTranslation().gettext
 
@@ -29,6 +42,21 @@ DEFAULT_LOCK_DIR = os.path.join(file_func.getFrameworkPath(), 'lock')
 UNKNOWN_USER = u'User name not defined'
 UNKNOWN_COMPUTER = u'Computer name not defined'
 
+LEASE_FILE_EXT = '.lease'
+LEASE_DB_FILENAME = 'lease.db'
+LEASE_TABLE_NAME = 'iq_lease'
+
+# Lease time to live in seconds
+DEFAULT_LEASE_TTL = 60.0
+# Held leases are renewed LEASE_HEARTBEAT_COUNT times per TTL
+LEASE_HEARTBEAT_COUNT = 3
+# Lifetime of the lease records of other owners in the owner index, seconds
+OWNER_INDEX_TTL = 1.0
+# Lease file lock retry interval on Windows, seconds
+LEASE_FILE_LOCK_RETRY_INTERVAL = 0.01
+
+LEASE_LOCK_MANAGER = None
+
 
 def lockRecord(table, record, message=None):
     """
@@ -427,24 +455,36 @@ def getLockFilename(lock_name):
 def lockObj(lock_name):
     """
     Lock object by name.
+    The lease of the object is held by the lease lock manager until unlock.
 
     :param lock_name: Lock name.
-    :return:
+    :return: Tuple:
+        (True/False, Lock owner record).
     """
-    username = global_func.getUsername()
-    computer = sys_func.getComputerName()
-    return lockFile(getLockFilename(lock_name=lock_name),
-                    lock_record=dict(user=username, computer=computer))
+    is_locked, lease = getLeaseLockManager().lock(lock_name)
+    return is_locked, lease['owner'] if lease else None
 
 
-def unLockObj(lock_name, *args, **kwargs):
+def unLockObj(lock_name, **unlock_condition):
     """
     Unlock object by name.
 
     :param lock_name: Lock name.
-    :return:
+    :param unlock_condition: Unlock check condition.
+        Lock owner record attribute name = value.
+        If the condition is specified then the lease of other owner is also released.
+    :return: True/False.
     """
-    return unLockFile(getLockFilename(lock_name=lock_name), *args, **kwargs)
+    manager = getLeaseLockManager()
+    if unlock_condition:
+        lease = manager.getLease(lock_name, use_index=False)
+        if lease is None:
+            return True
+        owner = lease.get('owner', dict())
+        if all([owner.get(name, None) == value for name, value in unlock_condition.items()]):
+            return manager.unlock(lock_name, force=True)
+        return False
+    return manager.unlock(lock_name)
 
 
 def isLockObj(lock_name):
@@ -454,12 +494,13 @@ def isLockObj(lock_name):
     :param lock_name: Lock name.
     :return: True/False.
     """
-    is_lock_file = isLockFile(getLockFilename(lock_name=lock_name))
-    if is_lock_file:
+    lease = getLeaseLockManager().getLease(lock_name)
+    if lease:
+        owner = lease.get('owner', dict())
         username = global_func.getUsername()
         computer = sys_func.getComputerName()
-        return (username != getLockUsernameObj(lock_name)) or (computer != getLockComputerObj(lock_name))
-    return is_lock_file
+        return (username != owner.get('user', None)) or (computer != owner.get('computer', None))
+    return False
 
 
 def getLockUsernameObj(lock_name):
@@ -469,7 +510,8 @@ def getLockUsernameObj(lock_name):
     :param lock_name: Lock name.
     :return:
     """
-    return getLockUsername(getLockFilename(lock_name=lock_name))
+    lease = getLeaseLockManager().getLease(lock_name)
+    return lease['owner'].get('user', UNKNOWN_USER) if lease else UNKNOWN_USER
 
 
 def getLockComputerObj(lock_name):
@@ -479,7 +521,8 @@ def getLockComputerObj(lock_name):
     :param lock_name: Lock name.
     :return:
     """
-    return getLockComputer(getLockFilename(lock_name=lock_name))
+    lease = getLeaseLockManager().getLease(lock_name)
+    return lease['owner'].get('computer', UNKNOWN_COMPUTER) if lease else UNKNOWN_COMPUTER
 
 
 def openStdWarningBoxIfLocked(lock_name, lock_msg=None):
@@ -498,3 +541,540 @@ def openStdWarningBoxIfLocked(lock_name, lock_msg=None):
         dlg_func.openWarningBox(_('ATTENTION'), lock_msg)
         return True
     return False
+
+
+def createLease(owner_id, owner, ttl, now=None):
+    """
+    Create lease record.
+
+    :param owner_id: Lock owner identifier.
+    :param owner: Lock owner record.
+    :param ttl: Lease time to live in seconds.
+    :param now: Current time. If None then the system time is used.
+    :return: Lease record dictionary.
+    """
+    if now is None:
+        now = time.time()
+    return dict(owner_id=owner_id, owner=owner, expires=now + ttl)
+
+
+def isActiveLease(lease, now=None):
+    """
+    Is the lease not expired?
+
+    :param lease: Lease record dictionary or None.
+    :param now: Current time. If None then the system time is used.
+    :return: True/False.
+    """
+    if not lease:
+        return False
+    if now is None:
+        now = time.time()
+    return lease.get('expires', 0.0) > now
+
+
+class iqLeaseBackend(object):
+    """
+    Lease storage backend.
+    """
+    def acquire(self, name, owner_id, owner, ttl):
+        """
+        Acquire lease.
+        The lease is acquired if it is free, expired or held by the same owner.
+
+        :param name: Lock name.
+        :param owner_id: Lock owner identifier.
+        :param owner: Lock owner record.
+        :param ttl: Lease time to live in seconds.
+        :return: Tuple:
+            (True/False, Current lease record).
+        """
+        log_func.warning(u'Not define method <acquire> in <%s>' % self.__class__.__name__)
+        return False, None
+
+    def renew(self, name, owner_id, ttl):
+        """
+        Renew lease.
+
+        :param name: Lock name.
+        :param owner_id: Lock owner identifier.
+        :param ttl: Lease time to live in seconds.
+        :return: True - renewed / False - the lease is lost.
+        """
+        log_func.warning(u'Not define method <renew> in <%s>' % self.__class__.__name__)
+        return False
+
+    def release(self, name, owner_id=None):
+        """
+        Release lease.
+
+        :param name: Lock name.
+        :param owner_id: Lock owner identifier.
+            If None then the lease is released regardless of the owner.
+        :return: True/False.
+        """
+        log_func.warning(u'Not define method <release> in <%s>' % self.__class__.__name__)
+        return False
+
+    def getLease(self, name):
+        """
+        Get active lease.
+
+        :param name: Lock name.
+        :return: Lease record or None if the lease is free or expired.
+        """
+        log_func.warning(u'Not define method <getLease> in <%s>' % self.__class__.__name__)
+        return None
+
+
+class iqFileLeaseBackend(iqLeaseBackend):
+    """
+    Lease storage in lock files.
+    The lease file is changed under fcntl.flock lock (msvcrt.locking lock on Windows).
+    The expired lease is overwritten by the next owner, so stale lock files do not block.
+    """
+    def __init__(self, lock_dir=None):
+        """
+        Constructor.
+
+        :param lock_dir: Lock directory. If None then the lock directory of the project is used.
+        """
+        self.lock_dir = lock_dir if lock_dir else getLockDir()
+
+    def getLeaseFilename(self, name):
+        """
+        Get lease filename.
+
+        :param name: Lock name.
+        """
+        return os.path.join(self.lock_dir, name + LEASE_FILE_EXT)
+
+    @contextlib.contextmanager
+    def _openLeaseFile(self, name, exclusive=True):
+        """
+        Open lease file and lock it.
+
+        :param name: Lock name.
+        :param exclusive: Exclusive lock for change / Shared lock for reading.
+        :return: File descriptor.
+        """
+        lease_filename = self.getLeaseFilename(name)
+        lease_dirname = os.path.dirname(lease_filename)
+        if not os.path.isdir(lease_dirname):
+            os.makedirs(lease_dirname, exist_ok=True)
+
+        lease_file = os.open(lease_filename, os.O_RDWR | os.O_CREAT,
+                             stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IWGRP | stat.S_IROTH | stat.S_IWOTH)
+        locked = False
+        try:
+            if fcntl is not None:
+                fcntl.flock(lease_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            else:
+                # msvcrt has only exclusive locks of the byte range
+                while not locked:
+                    os.lseek(lease_file, 0, os.SEEK_SET)
+                    try:
+                        msvcrt.locking(lease_file, msvcrt.LK_NBLCK, 1)
+                        locked = True
+                    except OSError:
+                        time.sleep(LEASE_FILE_LOCK_RETRY_INTERVAL)
+            yield lease_file
+        finally:
+            if locked:
+                os.lseek(lease_file, 0, os.SEEK_SET)
+                msvcrt.locking(lease_file, msvcrt.LK_UNLCK, 1)
+            # Closing the file releases flock lock
+            os.close(lease_file)
+
+    def _readLease(self, lease_file):
+        """
+        Read lease record from the lease file.
+        """
+        os.lseek(lease_file, 0, os.SEEK_SET)
+        data = os.read(lease_file, 65535)
+        if not data:
+            return None
+        try:
+            return json.loads(data.decode())
+        except ValueError:
+            log_func.warning(u'Error lease record format <%s>' % data)
+        return None
+
+    def _writeLease(self, lease_file, lease):
+        """
+        Write lease record into the lease file.
+        """
+        os.lseek(lease_file, 0, os.SEEK_SET)
+        os.ftruncate(lease_file, 0)
+        if lease:
+            os.write(lease_file, json.dumps(lease).encode())
+
+    def acquire(self, name, owner_id, owner, ttl):
+        try:
+            with self._openLeaseFile(name) as lease_file:
+                lease = self._readLease(lease_file)
+                now = time.time()
+                if isActiveLease(lease, now) and lease.get('owner_id', None) != owner_id:
+                    return False, lease
+                lease = createLease(owner_id, owner, ttl, now)
+                self._writeLease(lease_file, lease)
+                return True, lease
+        except:
+            log_func.fatal(u'Error acquire lease <%s>' % name)
+        return False, None
+
+    def renew(self, name, owner_id, ttl):
+        try:
+            with self._openLeaseFile(name) as lease_file:
+                lease = self._readLease(lease_file)
+                now = time.time()
+                if not isActiveLease(lease, now) or lease.get('owner_id', None) != owner_id:
+                    return False
+                lease['expires'] = now + ttl
+                self._writeLease(lease_file, lease)
+                return True
+        except:
+            log_func.fatal(u'Error renew lease <%s>' % name)
+        return False
+
+    def release(self, name, owner_id=None):
+        if not os.path.exists(self.getLeaseFilename(name)):
+            return True
+        try:
+            with self._openLeaseFile(name) as lease_file:
+                lease = self._readLease(lease_file)
+                if isActiveLease(lease) and owner_id is not None and lease.get('owner_id', None) != owner_id:
+                    return False
+                self._writeLease(lease_file, None)
+                return True
+        except:
+            log_func.fatal(u'Error release lease <%s>' % name)
+        return False
+
+    def getLease(self, name):
+        if not os.path.exists(self.getLeaseFilename(name)):
+            return None
+        try:
+            with self._openLeaseFile(name, exclusive=False) as lease_file:
+                lease = self._readLease(lease_file)
+                return lease if isActiveLease(lease) else None
+        except:
+            log_func.fatal(u'Error read lease <%s>' % name)
+        return None
+
+
+class iqSQLiteLeaseBackend(iqLeaseBackend):
+    """
+    Lease storage in SQLite table.
+    The lease is changed in IMMEDIATE transaction.
+    """
+    def __init__(self, db_filename=None, table_name=LEASE_TABLE_NAME, timeout=30.0):
+        """
+        Constructor.
+
+        :param db_filename: SQLite database filename.
+            If None then the database is created in the lock directory of the project.
+        :param table_name: Lease table name.
+        :param timeout: Database lock wait timeout in seconds.
+        """
+        self.db_filename = db_filename if db_filename else os.path.join(getLockDir(), LEASE_DB_FILENAME)
+        self.table_name = table_name
+        self.timeout = timeout
+        # Connection per thread
+        self._local = threading.local()
+
+    def getConnection(self):
+        """
+        Get database connection of the current thread.
+        The lease table is created on connect.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            db_dirname = os.path.dirname(self.db_filename)
+            if db_dirname and not os.path.isdir(db_dirname):
+                os.makedirs(db_dirname, exist_ok=True)
+            connection = sqlite3.connect(self.db_filename, timeout=self.timeout, isolation_level=None)
+            # Readers do not wait for the writer in WAL mode
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS %s (name TEXT PRIMARY KEY, owner_id TEXT, owner TEXT, expires REAL)' % self.table_name)
+            self._local.connection = connection
+        return connection
+
+    def _getLease(self, connection, name):
+        """
+        Get lease record from the table.
+        """
+        row = connection.execute('SELECT owner_id, owner, expires FROM %s WHERE name = ?' % self.table_name,
+                                 (name, )).fetchone()
+        if row is None:
+            return None
+        return dict(owner_id=row[0], owner=json.loads(row[1]), expires=row[2])
+
+    def acquire(self, name, owner_id, owner, ttl):
+        try:
+            connection = self.getConnection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                lease = self._getLease(connection, name)
+                now = time.time()
+                if isActiveLease(lease, now) and lease.get('owner_id', None) != owner_id:
+                    connection.execute('COMMIT')
+                    return False, lease
+                lease = createLease(owner_id, owner, ttl, now)
+                connection.execute('INSERT OR REPLACE INTO %s (name, owner_id, owner, expires) VALUES (?, ?, ?, ?)' % self.table_name,
+                                   (name, owner_id, json.dumps(owner), lease['expires']))
+                connection.execute('COMMIT')
+                return True, lease
+            except:
+                connection.execute('ROLLBACK')
+                raise
+        except:
+            log_func.fatal(u'Error acquire lease <%s>' % name)
+        return False, None
+
+    def renew(self, name, owner_id, ttl):
+        try:
+            now = time.time()
+            cursor = self.getConnection().execute('UPDATE %s SET expires = ? WHERE name = ? AND owner_id = ? AND expires > ?' % self.table_name,
+                                                  (now + ttl, name, owner_id, now))
+            return cursor.rowcount > 0
+        except:
+            log_func.fatal(u'Error renew lease <%s>' % name)
+        return False
+
+    def release(self, name, owner_id=None):
+        try:
+            connection = self.getConnection()
+            if owner_id is None:
+                connection.execute('DELETE FROM %s WHERE name = ?' % self.table_name, (name, ))
+                return True
+            cursor = connection.execute('DELETE FROM %s WHERE name = ? AND (owner_id = ? OR expires <= ?)' % self.table_name,
+                                        (name, owner_id, time.time()))
+            return cursor.rowcount > 0 or self.getLease(name) is None
+        except:
+            log_func.fatal(u'Error release lease <%s>' % name)
+        return False
+
+    def getLease(self, name):
+        try:
+            lease = self._getLease(self.getConnection(), name)
+            return lease if isActiveLease(lease) else None
+        except:
+            log_func.fatal(u'Error read lease <%s>' % name)
+        return None
+
+
+class iqLeaseLockManager(object):
+    """
+    Lease lock manager.
+    Locks are leases with time to live.
+    Held leases are renewed by the heartbeat thread.
+    If the owner process crashes then its leases expire after TTL.
+    Owners of the locks are cached in the in-memory owner index.
+    """
+    def __init__(self, backend=None, ttl=DEFAULT_LEASE_TTL, heartbeat=True, owner=None):
+        """
+        Constructor.
+
+        :param backend: Lease storage backend. If None then lock files are used.
+        :param ttl: Lease time to live in seconds.
+        :param heartbeat: Renew held leases in the heartbeat thread?
+        :param owner: Lock owner record. If None then the current user and computer are used.
+        """
+        self.backend = backend if backend is not None else iqFileLeaseBackend()
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        if owner is None:
+            owner = dict(user=global_func.getUsername(), computer=sys_func.getComputerName(), pid=os.getpid())
+        self.owner = owner
+        self.owner_id = u'%s/%s/%s' % (owner.get('computer', u''), owner.get('user', u''), owner.get('pid', os.getpid()))
+
+        # Held leases: {lock name: lease record}
+        self.held_leases = dict()
+        # Owner index: {lock name: (lease record or None, observation time)}
+        self.owner_index = dict()
+        self.index_lock = threading.Lock()
+
+        self._heartbeat_thread = None
+        self._stop_event = threading.Event()
+
+    def getOwnerId(self):
+        """
+        Get lock owner identifier of the manager.
+        """
+        return self.owner_id
+
+    def lock(self, name, ttl=None):
+        """
+        Lock by name.
+
+        :param name: Lock name.
+        :param ttl: Lease time to live in seconds. If None then the manager TTL is used.
+        :return: Tuple:
+            (True/False, Current lease record).
+        """
+        is_acquired, lease = self.backend.acquire(name, self.owner_id, self.owner, ttl if ttl else self.ttl)
+        with self.index_lock:
+            if is_acquired:
+                self.held_leases[name] = lease
+            self.owner_index[name] = (lease, time.time())
+        if is_acquired and self.heartbeat:
+            self.startHeartbeat()
+        return is_acquired, lease
+
+    def unlock(self, name, force=False):
+        """
+        Unlock by name.
+
+        :param name: Lock name.
+        :param force: Release the lease of other owner?
+        :return: True/False.
+        """
+        result = self.backend.release(name, None if force else self.owner_id)
+        with self.index_lock:
+            self.held_leases.pop(name, None)
+            self.owner_index.pop(name, None)
+        return result
+
+    def unlockAll(self):
+        """
+        Unlock all held leases.
+        """
+        with self.index_lock:
+            names = list(self.held_leases.keys())
+        for name in names:
+            self.unlock(name)
+
+    def getHeldLocks(self):
+        """
+        Get names of the held leases.
+        """
+        with self.index_lock:
+            return list(self.held_leases.keys())
+
+    def getLease(self, name, use_index=True):
+        """
+        Get active lease.
+
+        :param name: Lock name.
+        :param use_index: Use the owner index?
+            The lease records of other owners are cached for OWNER_INDEX_TTL seconds.
+        :return: Lease record or None if the lock is free.
+        """
+        now = time.time()
+        with self.index_lock:
+            lease = self.held_leases.get(name)
+            if lease is not None and isActiveLease(lease, now):
+                return lease
+            if use_index and name in self.owner_index:
+                lease, observation_time = self.owner_index[name]
+                if now - observation_time < OWNER_INDEX_TTL and (lease is None or isActiveLease(lease, now)):
+                    return lease
+
+        lease = self.backend.getLease(name)
+        with self.index_lock:
+            self.owner_index[name] = (lease, now)
+        return lease
+
+    def isLocked(self, name):
+        """
+        Is locked by other owner?
+
+        :param name: Lock name.
+        :return: True/False.
+        """
+        lease = self.getLease(name)
+        return lease is not None and lease.get('owner_id', None) != self.owner_id
+
+    def renewAll(self):
+        """
+        Renew all held leases.
+        Lost leases are removed from the held leases.
+
+        :return: Renewed lease number.
+        """
+        with self.index_lock:
+            names = list(self.held_leases.keys())
+        renew_count = 0
+        for name in names:
+            if self.backend.renew(name, self.owner_id, self.ttl):
+                renew_count += 1
+                with self.index_lock:
+                    if name in self.held_leases:
+                        self.held_leases[name] = dict(self.held_leases[name], expires=time.time() + self.ttl)
+            else:
+                log_func.warning(u'Lease <%s> is lost' % name)
+                with self.index_lock:
+                    self.held_leases.pop(name, None)
+                    self.owner_index.pop(name, None)
+        return renew_count
+
+    def _runHeartbeat(self, stop_event):
+        """
+        Heartbeat thread function.
+        """
+        while not stop_event.wait(self.ttl / LEASE_HEARTBEAT_COUNT):
+            try:
+                self.renewAll()
+            except:
+                log_func.fatal(u'Error renew leases')
+
+    def startHeartbeat(self):
+        """
+        Start heartbeat thread if it is not started.
+        """
+        with self.index_lock:
+            if self._heartbeat_thread is not None and self._heartbeat_thread.is_alive():
+                return
+            self._stop_event = threading.Event()
+            self._heartbeat_thread = threading.Thread(target=self._runHeartbeat, args=(self._stop_event, ),
+                                                      name='LeaseHeartbeat', daemon=True)
+            self._heartbeat_thread.start()
+
+    def stopHeartbeat(self):
+        """
+        Stop heartbeat thread.
+        """
+        with self.index_lock:
+            heartbeat_thread = self._heartbeat_thread
+            self._heartbeat_thread = None
+            self._stop_event.set()
+        if heartbeat_thread is not None:
+            heartbeat_thread.join()
+
+    def close(self):
+        """
+        Stop heartbeat and unlock all held leases.
+        """
+        self.stopHeartbeat()
+        self.unlockAll()
+
+
+def getLeaseLockManager():
+    """
+    Get lease lock manager.
+    By default lock files of the project lock directory are used.
+    """
+    global LEASE_LOCK_MANAGER
+
+    if LEASE_LOCK_MANAGER is None:
+        LEASE_LOCK_MANAGER = iqLeaseLockManager()
+        atexit.register(LEASE_LOCK_MANAGER.close)
+    return LEASE_LOCK_MANAGER
+
+
+def setLeaseLockManager(manager=None):
+    """
+    Set lease lock manager.
+    For example the manager with SQLite backend:
+        lock_func.setLeaseLockManager(lock_func.iqLeaseLockManager(lock_func.iqSQLiteLeaseBackend()))
+
+    :param manager: Lease lock manager. If None then the default manager is created on the next call.
+    """
+    global LEASE_LOCK_MANAGER
+
+    if LEASE_LOCK_MANAGER is not None and LEASE_LOCK_MANAGER is not manager:
+        LEASE_LOCK_MANAGER.close()
+    LEASE_LOCK_MANAGER = manager
+    if manager is not None:
+        atexit.register(manager.close)
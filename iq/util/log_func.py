@@ -3,15 +3,27 @@
 
 """
 Logging functions.
+
+Messages below the log level or when the debug and log modes are off
+are skipped before any formatting.
+The message may be a function without arguments returning the message text.
+It is called only if the message is output.
+In asynchronous mode console output and log file writing are made
+in the background threads.
 """
 
 import sys
 import logging
+import logging.handlers
 import os
 import os.path
 import tempfile
 import stat
 import traceback
+import time
+import queue
+import threading
+import atexit
 
 try:
     import termcolor
@@ -26,8 +38,9 @@ if sys.platform.startswith('win'):
         print(u'Import error colorama. Install: pip3 install colorama')
 
 from . import global_func
+from .. import global_data
 
-__version__ = (0, 0, 2, 3)
+__version__ = (0, 0, 3, 1)
 
 # Shell text colors
 RED_COLOR_TEXT = 'red'
@@ -44,6 +57,28 @@ NOT_INIT_LOG_SYS_MSG = u'Not Initialized Logging System'
 
 LOG_DATETIME_FMT = '%Y-%m-%d %H:%M:%S'
 
+# Minimum message level. Messages below the level are skipped if not forced
+LOG_LEVEL = logging.DEBUG
+
+# Maximum number of the same messages in the rate limit interval. None - not limited
+RATE_LIMIT_COUNT = None
+# Rate limit interval in seconds
+RATE_LIMIT_INTERVAL = 1.0
+# Each N-th suppressed message is output anyway. 0 - all suppressed messages are skipped
+RATE_LIMIT_SAMPLE = 0
+MAX_RATE_LIMIT_MESSAGES = 10000
+
+# Rate limit state: {(level, message): [interval start time, message count, suppressed count]}
+RATE_LIMIT_STATE = dict()
+RATE_LIMIT_LOCK = threading.Lock()
+
+# Asynchronous mode objects
+LOG_QUEUE_HANDLER = None
+LOG_QUEUE_LISTENER = None
+LOG_QUEUE_HANDLERS = list()
+PRINT_QUEUE = None
+PRINT_THREAD = None
+
 
 def printColourText(text, color=NORMAL_COLOR_TEXT):
     """
@@ -80,13 +115,180 @@ def printColourText(text, color=NORMAL_COLOR_TEXT):
     print(txt)
 
 
-def init(log_filename=None):
+def setLogLevel(level=logging.DEBUG):
+    """
+    Set minimum message level.
+
+    :param level: logging module level. For example logging.WARNING.
+    """
+    global LOG_LEVEL
+    LOG_LEVEL = level
+
+
+def getLogLevel():
+    """
+    Get minimum message level.
+    """
+    return LOG_LEVEL
+
+
+def setRateLimit(count=None, interval=1.0, sample=0):
+    """
+    Set rate limit of the same messages.
+
+    :param count: Maximum number of the same messages in the interval. None - not limited.
+    :param interval: Rate limit interval in seconds.
+    :param sample: Each N-th suppressed message is output anyway. 0 - none.
+    """
+    global RATE_LIMIT_COUNT, RATE_LIMIT_INTERVAL, RATE_LIMIT_SAMPLE
+    with RATE_LIMIT_LOCK:
+        RATE_LIMIT_COUNT = count
+        RATE_LIMIT_INTERVAL = interval
+        RATE_LIMIT_SAMPLE = sample
+        RATE_LIMIT_STATE.clear()
+
+
+def _limitRate(level, message):
+    """
+    Check message rate limit.
+
+    :param level: Message level.
+    :param message: Message text.
+    :return: Message text to output or None if the message is suppressed.
+    """
+    now = time.monotonic()
+    key = (level, message)
+    with RATE_LIMIT_LOCK:
+        state = RATE_LIMIT_STATE.get(key)
+        if state is None or now - state[0] >= RATE_LIMIT_INTERVAL:
+            suppressed_count = state[2] if state else 0
+            if state is None and len(RATE_LIMIT_STATE) >= MAX_RATE_LIMIT_MESSAGES:
+                RATE_LIMIT_STATE.clear()
+            RATE_LIMIT_STATE[key] = [now, 1, 0]
+            if suppressed_count:
+                return message + u' (%d same messages suppressed)' % suppressed_count
+            return message
+
+        state[1] += 1
+        if state[1] <= RATE_LIMIT_COUNT:
+            return message
+        state[2] += 1
+        if RATE_LIMIT_SAMPLE and not state[2] % RATE_LIMIT_SAMPLE:
+            return message + u' (%d same messages suppressed)' % state[2]
+    return None
+
+
+class iqLogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Log queue handler.
+    Log messages are already formatted, so the record is queued as is.
+    """
+    def prepare(self, record):
+        return record
+
+
+def _printQueue(print_queue):
+    """
+    Console output thread function of asynchronous mode.
+
+    :param print_queue: Console output queue.
+    """
+    while True:
+        item = print_queue.get()
+        if item is None:
+            break
+        try:
+            printColourText(*item)
+        except:
+            pass
+
+
+def _printText(text, color=NORMAL_COLOR_TEXT):
+    """
+    Print colour text in console/shell directly or by the console output thread.
+    """
+    print_queue = PRINT_QUEUE
+    if print_queue is not None:
+        print_queue.put((text, color))
+    else:
+        printColourText(text, color)
+
+
+def startAsyncLog():
+    """
+    Start asynchronous mode.
+    Console output and log file writing are made in the background threads.
+    Log records are passed to the log file handlers through logging.handlers.QueueHandler.
+
+    :return: True/False.
+    """
+    global LOG_QUEUE_HANDLER, LOG_QUEUE_LISTENER, LOG_QUEUE_HANDLERS, PRINT_QUEUE, PRINT_THREAD
+    if LOG_QUEUE_LISTENER is not None:
+        return False
+
+    root_logger = logging.getLogger()
+    LOG_QUEUE_HANDLERS = list(root_logger.handlers)
+    log_queue = queue.SimpleQueue()
+    for handler in LOG_QUEUE_HANDLERS:
+        root_logger.removeHandler(handler)
+    LOG_QUEUE_HANDLER = iqLogQueueHandler(log_queue)
+    root_logger.addHandler(LOG_QUEUE_HANDLER)
+    LOG_QUEUE_LISTENER = logging.handlers.QueueListener(log_queue, *LOG_QUEUE_HANDLERS,
+                                                        respect_handler_level=True)
+    LOG_QUEUE_LISTENER.start()
+
+    PRINT_QUEUE = queue.SimpleQueue()
+    PRINT_THREAD = threading.Thread(target=_printQueue, args=(PRINT_QUEUE, ), daemon=True)
+    PRINT_THREAD.start()
+    atexit.register(stopAsyncLog)
+    return True
+
+
+def stopAsyncLog():
+    """
+    Stop asynchronous mode.
+    All queued messages are output before stop.
+
+    :return: True/False.
+    """
+    global LOG_QUEUE_HANDLER, LOG_QUEUE_LISTENER, LOG_QUEUE_HANDLERS, PRINT_QUEUE, PRINT_THREAD
+    if LOG_QUEUE_LISTENER is None:
+        return False
+
+    root_logger = logging.getLogger()
+    root_logger.removeHandler(LOG_QUEUE_HANDLER)
+    LOG_QUEUE_HANDLER = None
+    LOG_QUEUE_LISTENER.stop()
+    for handler in LOG_QUEUE_HANDLERS:
+        root_logger.addHandler(handler)
+    LOG_QUEUE_LISTENER = None
+    LOG_QUEUE_HANDLERS = list()
+
+    print_queue = PRINT_QUEUE
+    PRINT_QUEUE = None
+    print_queue.put(None)
+    PRINT_THREAD.join()
+    PRINT_THREAD = None
+    return True
+
+
+def isAsyncLog():
+    """
+    Is asynchronous mode?
+    """
+    return LOG_QUEUE_LISTENER is not None
+
+
+def init(log_filename=None, async_mode=False):
     """
     Initializing the log file.
 
     :param log_filename: Log file name.
+    :param async_mode: Start asynchronous mode?
     """
     if not global_func.isLogMode():
+        if async_mode:
+            startAsyncLog()
         return
     
     if log_filename is None:
@@ -120,115 +322,124 @@ def init(log_filename=None):
     if global_func.isDebugMode():
         printColourText('INFO. Initializing the log file <%s>' % log_filename, GREEN_COLOR_TEXT)
 
+    if async_mode:
+        startAsyncLog()
 
-def debug(message=u'', is_force_print=False, is_force_log=False):
+
+def _outputMessage(level, prefix, color, message, is_force_print, is_force_log, log_prefix=u''):
     """
-    Display debug information.
+    Output message to console and log file.
 
-    :param message: Text message.
+    :param level: Message level.
+    :param prefix: Console message prefix.
+    :param color: Console message colour.
+    :param message: Text message or function returning the text message.
     :param is_force_print: Forcibly display.
     :param is_force_log: Forcibly recorded in a journal.
+    :param log_prefix: Log file message prefix.
     """
+    if level < LOG_LEVEL:
+        is_print = is_force_print
+        is_log = is_force_log
+    else:
+        is_print = global_data.DEBUG_MODE or is_force_print
+        is_log = global_data.LOG_MODE or is_force_log
+    if not is_print and not is_log:
+        return
+
+    if callable(message):
+        message = message()
     if not isinstance(message, str):
         message = str(message)
 
-    if global_func.isDebugMode() or is_force_print:
-        printColourText('DEBUG. ' + message, BLUE_COLOR_TEXT)
-    if global_func.isLogMode() or is_force_log:
-        logging.debug(message)
+    if level >= logging.CRITICAL:
+        trace_txt = traceback.format_exc()
+        try:
+            message = message + os.linesep + trace_txt
+        except UnicodeDecodeError:
+            message = message + os.linesep + str(trace_txt)
+
+    if RATE_LIMIT_COUNT and not is_force_print and not is_force_log:
+        message = _limitRate(level, message)
+        if message is None:
+            return
+
+    if is_print:
+        _printText(prefix + message, color)
+    if is_log:
+        log_level = logging.DEBUG if log_prefix else level
+        queue_handler = LOG_QUEUE_HANDLER
+        if queue_handler is not None:
+            # The record is made without caller search. It is formatted by the log queue listener thread
+            queue_handler.enqueue(logging.LogRecord(logging.root.name, log_level, '', 0,
+                                                    log_prefix + message, None, None))
+        else:
+            logging.log(log_level, log_prefix + message)
+
+
+def debug(message=u'', is_force_print=False, is_force_log=False):
+    """
+    Display debug information.
+
+    :param message: Text message or function returning the text message.
+    :param is_force_print: Forcibly display.
+    :param is_force_log: Forcibly recorded in a journal.
+    """
+    _outputMessage(logging.DEBUG, 'DEBUG. ', BLUE_COLOR_TEXT, message, is_force_print, is_force_log)
 
 
 def info(message=u'', is_force_print=False, is_force_log=False):
     """
     Print information.
 
-    :param message: Text message.
+    :param message: Text message or function returning the text message.
     :param is_force_print: Forcibly display.
     :param is_force_log: Forcibly recorded in a journal.
     """
-    if not isinstance(message, str):
-        message = str(message)
-
-    if global_func.isDebugMode() or is_force_print:
-        printColourText('INFO. ' + message, GREEN_COLOR_TEXT)
-    if global_func.isLogMode() or is_force_log:
-        logging.info(message)
+    _outputMessage(logging.INFO, 'INFO. ', GREEN_COLOR_TEXT, message, is_force_print, is_force_log)
 
 
 def error(message=u'', is_force_print=False, is_force_log=False):
     """
     Print error message.
 
-    :param message: Text message.
+    :param message: Text message or function returning the text message.
     :param is_force_print: Forcibly display.
     :param is_force_log: Forcibly recorded in a journal.
     """
-    if not isinstance(message, str):
-        message = str(message)
-
-    if global_func.isDebugMode() or is_force_print:
-        printColourText('ERROR. ' + message, RED_COLOR_TEXT)
-    if global_func.isLogMode() or is_force_log:
-        logging.error(message)
+    _outputMessage(logging.ERROR, 'ERROR. ', RED_COLOR_TEXT, message, is_force_print, is_force_log)
 
 
 def warning(message=u'', is_force_print=False, is_force_log=False):
     """
     Print warning message.
 
-    :param message: Text message.
+    :param message: Text message or function returning the text message.
     :param is_force_print: Forcibly display.
     :param is_force_log: Forcibly recorded in a journal.
     """
-    if not isinstance(message, str):
-        message = str(message)
-
-    if global_func.isDebugMode() or is_force_print:
-        printColourText('WARNING. ' + message, YELLOW_COLOR_TEXT)
-    if global_func.isLogMode() or is_force_log:
-        logging.warning(message)
+    _outputMessage(logging.WARNING, 'WARNING. ', YELLOW_COLOR_TEXT, message, is_force_print, is_force_log)
 
 
 def fatal(message=u'', is_force_print=False, is_force_log=False):
     """
     Print critical error message.
+    The current exception traceback is added to the message.
 
-    :param message: Text message.
+    :param message: Text message or function returning the text message.
     :param is_force_print: Forcibly display.
     :param is_force_log: Forcibly recorded in a journal.
     """
-    if not isinstance(message, str):
-        message = str(message)
-
-    trace_txt = traceback.format_exc()
-
-    try:
-        msg = message + os.linesep + trace_txt
-    except UnicodeDecodeError:
-        if not isinstance(message, str):
-            message = str(message)
-        if not isinstance(trace_txt, str):
-            trace_txt = str(trace_txt)
-        msg = message + os.linesep + trace_txt
-
-    if global_func.isDebugMode() or is_force_print:
-        printColourText('FATAL. ' + msg, RED_COLOR_TEXT)
-    if global_func.isLogMode() or is_force_log:
-        logging.fatal(msg)
+    _outputMessage(logging.CRITICAL, 'FATAL. ', RED_COLOR_TEXT, message, is_force_print, is_force_log)
 
 
 def service(message=u'', is_force_print=False, is_force_log=False):
     """
     Print service message.
 
-    :param message: Text message.
+    :param message: Text message or function returning the text message.
     :param is_force_print: Forcibly display.
     :param is_force_log: Forcibly recorded in a journal.
     """
-    if not isinstance(message, str):
-        message = str(message)
-
-    if global_func.isDebugMode() or is_force_print:
-        printColourText('SERVICE. ' + message, CYAN_COLOR_TEXT)
-    if global_func.isLogMode() or is_force_log:
-        logging.debug('SERVICE. ' + message)
+    _outputMessage(logging.INFO, 'SERVICE. ', CYAN_COLOR_TEXT, message, is_force_print, is_force_log,
+                   log_prefix='SERVICE. ')
@@ -19,11 +19,13 @@ All programs should output messages in this format.
 import os
 import os.path
 import datetime
+import itertools
+import threading
 
 from . import log_func
 from . import global_func
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 1, 1)
 
 # Log types
 INFO_LOG_TYPE = 'INFO'
@@ -54,13 +56,28 @@ DEFAULT_ENCODING = global_func.getDefaultEncoding()
 
 LINE_SEPARATOR = os.linesep
 
+# Message number in the log file index block
+INDEX_BLOCK_MSG_COUNT = 256
+# Read buffer size for log file indexing
+INDEX_READ_BUFFER_SIZE = 1024 * 1024
+
+# Log type bit masks in the log file index block
+LOG_TYPE_MASKS = dict([(log_type, 1 << i) for i, log_type in enumerate(LOG_TYPES)])
+LOG_TYPE_BYTES = tuple([(log_type.encode(), log_type) for log_type in LOG_TYPES])
+LOG_TYPE_WORDS = frozenset([log_type.encode() for log_type in LOG_TYPES])
+
+# Log file indexes: {log filename: iqLogFileIndex object}
+LOG_FILE_INDEXES = dict()
+LOG_FILE_INDEX_LOCK = threading.Lock()
+
 
 def getRecordsLogFile(log_filename, log_types=LOG_TYPES,
                       dt_start_filter=None, dt_stop_filter=None,
                       filters=(), filter_logic=AND_FILTER_LOGIC,
-                      encoding=DEFAULT_ENCODING):
+                      encoding=DEFAULT_ENCODING, start=0, count=None):
     """
     Read messages of the specified types from the program message log file.
+    The log file index is used for seeking to the blocks of the selected messages.
 
     :param log_filename: Log filename.
     :param log_types: Log message types.
@@ -75,6 +92,8 @@ def getRecordsLogFile(log_filename, log_types=LOG_TYPES,
         AND - For a record to be included in the selection, all filters must be positively executed,
         OR - For the entry to be included in the selection, a positive execution of one filter is sufficient.
     :param encoding: Log file encoding.
+    :param start: Index of the first selected message for paging.
+    :param count: Maximum number of messages. If None then all selected messages are read.
     :return: List of format dictionaries:
         [{'dt': Log datetime as datetime.datetime,
           'type': Message type: INFO, WARNING and etc,
@@ -89,27 +108,12 @@ def getRecordsLogFile(log_filename, log_types=LOG_TYPES,
         log_func.warning(u'Program message log file <%s> not found' % log_filename)
         return list()
 
-    log_file = None
     try:
-        records = list()
-
-        record = dict()
-        log_file = open(log_filename, 'r')
-        for line in log_file:
-            # Determine whether the current line is the beginning of a new message or a continuation of the previous one
-            if isNewMsg(line):
-                record = parseLogMsgRecord(line, encoding=encoding)
-                if checkFilterRecord(record, log_types, dt_start_filter, dt_stop_filter, filters, filter_logic):
-                    records.append(record)
-            else:
-                record['text'] = record.get('text', u'') + line
-                record['short'] += (u'...' if not record.get('short', u'').endswith(u'...') else u'')
-
-        log_file.close()
-        return records
+        log_file_index = getLogFileIndex(log_filename)
+        records = log_file_index.iterRecords(log_types, dt_start_filter, dt_stop_filter,
+                                             filters, filter_logic, encoding=encoding)
+        return list(itertools.islice(records, start, None if count is None else start + count))
     except:
-        if log_file:
-            log_file.close()
         log_func.fatal(u'Error reading program message log entries <%s>' % log_filename)
     return list()
 
@@ -225,3 +229,238 @@ def checkFilterRecord(record, log_types=LOG_TYPES,
             result = result and any(filter_result)
 
     return result
+
+
+def getLogTypeBytes(line):
+    """
+    Determine the type of message log by the binary line of the log file.
+
+    :param line: The current binary line of the program message log file.
+    :return: Message type or None if the line is continuation of the previous message.
+    """
+    if len(line) < 20:
+        return None
+    msg_type_end = line.find(b' ', 20)
+    if msg_type_end < 0:
+        return None
+    if line[20:msg_type_end] not in LOG_TYPE_WORDS:
+        return None
+    for log_type_bytes, log_type in LOG_TYPE_BYTES:
+        if line.startswith(log_type_bytes, 20):
+            return log_type
+    return None
+
+
+class iqLogFileIndex(object):
+    """
+    Log file index.
+    Messages of the log file are grouped into blocks of INDEX_BLOCK_MSG_COUNT messages.
+    For each block the byte offsets, the datetime range and the message type mask are saved.
+    The index is updated incrementally as the log file grows.
+    """
+    def __init__(self, log_filename):
+        """
+        Constructor.
+
+        :param log_filename: Log filename.
+        """
+        self.log_filename = log_filename
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        """
+        Clear index.
+        """
+        self.inode = None
+        # Indexed file size. Incomplete last line is not indexed
+        self.indexed_size = 0
+        # Blocks: [start offset, stop offset, min datetime, max datetime, type mask, message count]
+        self.blocks = list()
+
+    def getBlockCount(self):
+        """
+        Get index block number.
+        """
+        return len(self.blocks)
+
+    def getMsgCount(self):
+        """
+        Get indexed message number.
+        """
+        return sum([block[5] for block in self.blocks])
+
+    def update(self):
+        """
+        Update index.
+        If the log file is truncated or replaced then the index is rebuilt.
+        Otherwise the last block and the appended lines are indexed.
+
+        :return: True - index changed / False - not changed.
+        """
+        with self.lock:
+            try:
+                file_stat = os.stat(self.log_filename)
+            except OSError:
+                self.clear()
+                return False
+
+            if file_stat.st_ino != self.inode or file_stat.st_size < self.indexed_size:
+                self.clear()
+                self.inode = file_stat.st_ino
+            elif file_stat.st_size == self.indexed_size:
+                return False
+
+            # The last block is not full. Index it again
+            offset = self.blocks.pop()[0] if self.blocks else 0
+            with open(self.log_filename, 'rb', buffering=INDEX_READ_BUFFER_SIZE) as log_file:
+                log_file.seek(offset)
+                self.indexed_size = self._indexLines(log_file, offset)
+            return True
+
+    def _indexLines(self, log_file, offset):
+        """
+        Index lines of the log file from the current position.
+
+        :param log_file: Binary log file object.
+        :param offset: Current position.
+        :return: Indexed position.
+        """
+        block = None
+        for line in log_file:
+            if not line.endswith(b'\n'):
+                # The line is being written
+                break
+            log_type = getLogTypeBytes(line)
+            if log_type is not None:
+                if block is None or block[5] >= INDEX_BLOCK_MSG_COUNT:
+                    if block is not None:
+                        block[1] = offset
+                    dt_txt = line[:19]
+                    block = [offset, offset, dt_txt, dt_txt, 0, 0]
+                    self.blocks.append(block)
+                dt_txt = line[:19]
+                if dt_txt < block[2]:
+                    block[2] = dt_txt
+                elif dt_txt > block[3]:
+                    block[3] = dt_txt
+                block[4] |= LOG_TYPE_MASKS[log_type]
+                block[5] += 1
+            elif block is None:
+                # Continuation lines in the beginning of the file
+                block = [offset, offset, b'', b'', 0, 0]
+                self.blocks.append(block)
+            offset += len(line)
+
+        if block is not None:
+            block[1] = offset
+        return offset
+
+    def getBlocks(self, log_types=LOG_TYPES, dt_start_filter=None, dt_stop_filter=None):
+        """
+        Get index blocks that may contain the selected messages.
+
+        :param log_types: Log message types.
+        :param dt_start_filter: Start datetime of the filter by time.
+        :param dt_stop_filter: End datetime filter by time.
+        :return: [(start offset, stop offset), ...].
+        """
+        type_mask = 0
+        for log_type in log_types:
+            type_mask |= LOG_TYPE_MASKS.get(log_type, 0)
+        start_txt = dt_start_filter.strftime(DATETIME_LOG_FMT).encode() if dt_start_filter else None
+        stop_txt = dt_stop_filter.strftime(DATETIME_LOG_FMT).encode() if dt_stop_filter else None
+
+        with self.lock:
+            blocks = list()
+            for start_offset, stop_offset, min_dt, max_dt, block_type_mask, msg_count in self.blocks:
+                if not block_type_mask & type_mask:
+                    continue
+                if start_txt and max_dt < start_txt:
+                    continue
+                if stop_txt and min_dt > stop_txt:
+                    continue
+                if blocks and blocks[-1][1] == start_offset:
+                    # Adjacent blocks are read together
+                    blocks[-1] = (blocks[-1][0], stop_offset)
+                else:
+                    blocks.append((start_offset, stop_offset))
+            return blocks
+
+    def iterRecords(self, log_types=LOG_TYPES,
+                    dt_start_filter=None, dt_stop_filter=None,
+                    filters=(), filter_logic=AND_FILTER_LOGIC,
+                    encoding=DEFAULT_ENCODING):
+        """
+        Iterate messages of the specified types.
+        Only index blocks that may contain the selected messages are read.
+
+        :param log_types: Log message types.
+        :param dt_start_filter: Start datetime of the filter by time.
+        :param dt_stop_filter: End datetime filter by time.
+        :param filters: Tuple / list of additional filtering methods.
+        :param filter_logic: Command for processing additional filters.
+        :param encoding: Log file encoding.
+        :return: Message record iterator.
+        """
+        blocks = self.getBlocks(log_types, dt_start_filter, dt_stop_filter)
+        start_txt = dt_start_filter.strftime(DATETIME_LOG_FMT).encode() if dt_start_filter else None
+        stop_txt = dt_stop_filter.strftime(DATETIME_LOG_FMT).encode() if dt_stop_filter else None
+
+        with open(self.log_filename, 'rb') as log_file:
+            for start_offset, stop_offset in blocks:
+                log_file.seek(start_offset)
+                lines = log_file.read(stop_offset - start_offset).splitlines(True)
+
+                record = None
+                for line in lines:
+                    log_type = getLogTypeBytes(line)
+                    if log_type is None:
+                        if record is not None:
+                            record['text'] += line.decode(encoding, 'replace').replace('\r\n', '\n')
+                            if not record['short'].endswith(u'...'):
+                                record['short'] += u'...'
+                        continue
+
+                    if record is not None:
+                        yield record
+                        record = None
+                    # Skip messages before parsing
+                    if log_type not in log_types:
+                        continue
+                    dt_txt = line[:19]
+                    if (start_txt and dt_txt < start_txt) or (stop_txt and dt_txt > stop_txt):
+                        continue
+
+                    msg_record = parseLogMsgRecord(line.decode(encoding, 'replace'), encoding=encoding)
+                    if checkFilterRecord(msg_record, log_types, dt_start_filter, dt_stop_filter,
+                                         filters, filter_logic):
+                        record = msg_record
+
+                if record is not None:
+                    yield record
+
+
+def getLogFileIndex(log_filename):
+    """
+    Get updated log file index.
+
+    :param log_filename: Log filename.
+    :return: iqLogFileIndex object.
+    """
+    log_filename = os.path.abspath(log_filename)
+    with LOG_FILE_INDEX_LOCK:
+        log_file_index = LOG_FILE_INDEXES.get(log_filename)
+        if log_file_index is None:
+            log_file_index = iqLogFileIndex(log_filename)
+            LOG_FILE_INDEXES[log_filename] = log_file_index
+    log_file_index.update()
+    return log_file_index
+
+
+def clearLogFileIndexes():
+    """
+    Clear all log file indexes.
+    """
+    with LOG_FILE_INDEX_LOCK:
+        LOG_FILE_INDEXES.clear()
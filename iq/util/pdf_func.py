@@ -6,6 +6,8 @@ PDF file functions.
 """
 
 import os.path
+import collections
+import concurrent.futures
 
 from . import log_func
 from . import sys_func
@@ -29,7 +31,7 @@ try:
 except ImportError:
     log_func.warning('Import error PyPDF2. For install: pip3 install PyPDF2', is_force_print=True)
 
-__version__ = (0, 3, 1, 1)
+__version__ = (0, 3, 2, 2)
 
 
 PDF_FILENAME_EXT = '.pdf'
@@ -37,6 +39,19 @@ PDF_FILENAME_EXT = '.pdf'
 DEFAULT_PDF_VIEWER = 'evince'
 DEFAULT_PDF_PRINT_SYSTEM = 'lpr'
 
+# DPI/JPEG quality presets of the page pipeline by Ghostscript quality names
+PDF_PAGE_PRESETS = {printer_func.GS_QUALITY_DEFAULT: dict(dpi=72, quality=90),
+                    printer_func.GS_QUALITY_SCREEN: dict(dpi=72, quality=60),
+                    printer_func.GS_QUALITY_EBOOK: dict(dpi=150, quality=75),
+                    printer_func.GS_QUALITY_PRINTER: dict(dpi=300, quality=85),
+                    printer_func.GS_QUALITY_PREPRESS: dict(dpi=300, quality=95),
+                    }
+# Rendered page number waiting for assembly per worker process
+PDF_PAGE_PENDING_PER_WORKER = 2
+
+# Opened documents of the page pipeline worker process: {PDF filename: fitz document}
+_PAGE_DOCUMENTS = dict()
+
 
 def viewPDF(pdf_filename):
     """
@@ -233,16 +248,172 @@ def joinJpegPages2PDF(src_jpeg_filenames, dst_pdf_filename):
     return False
 
 
+def getPDFPageOptions(preset=printer_func.GS_QUALITY_DEFAULT, dpi=None, quality=None):
+    """
+    Get page pipeline options.
+
+    :param preset: Preset name. See PDF_PAGE_PRESETS.
+    :param dpi: Page render DPI. If None then the preset DPI is used.
+    :param quality: Page JPEG quality. If None then the preset quality is used.
+    :return: Dictionary {'dpi': ..., 'quality': ...}.
+    """
+    options = dict(PDF_PAGE_PRESETS.get(preset, PDF_PAGE_PRESETS[printer_func.GS_QUALITY_DEFAULT]))
+    if dpi:
+        options['dpi'] = dpi
+    if quality:
+        options['quality'] = quality
+    return options
+
+
+def _getCompressImagePageOptions(new_size_ratio=1.0, quality=None, **kwargs):
+    """
+    Get page pipeline options by img_func.compressImage arguments.
+    Pages are rendered in the current process:
+    the old functions may be called from threads and GUI code
+    where forking worker processes is not safe.
+    """
+    options = getPDFPageOptions(quality=quality)
+    options['dpi'] = max(int(options['dpi'] * new_size_ratio), 1)
+    options['worker_count'] = 1
+    return options
+
+
+def _renderPDFPage(task):
+    """
+    Render PDF page as JPEG.
+    The function is executed in the worker process.
+    Opened documents are cached in the worker process.
+
+    :param task: Tuple (PDF file name, page index, DPI, JPEG quality).
+    :return: JPEG data.
+    """
+    pdf_filename, page_index, dpi, quality = task
+    doc = _PAGE_DOCUMENTS.get(pdf_filename)
+    if doc is None:
+        doc = fitz.open(pdf_filename)
+        _PAGE_DOCUMENTS[pdf_filename] = doc
+    pixmap = doc.load_page(page_index).get_pixmap(dpi=dpi)
+    # Page size in the result PDF is calculated by DPI
+    pixmap.set_dpi(dpi, dpi)
+    return pixmap.tobytes('jpeg', jpg_quality=quality)
+
+
+def _closePDFPageDocuments():
+    """
+    Close opened documents of the page pipeline.
+    """
+    for doc in _PAGE_DOCUMENTS.values():
+        doc.close()
+    _PAGE_DOCUMENTS.clear()
+
+
+def renderPDFPages(pdf_filenames, preset=printer_func.GS_QUALITY_DEFAULT, dpi=None, quality=None,
+                   worker_count=None, max_pending=None):
+    """
+    Render PDF pages as JPEG in memory.
+    Pages are rendered in worker processes.
+    The number of rendered pages waiting for the consumer is bounded.
+
+    :param pdf_filenames: PDF file names.
+    :param preset: Preset name. See PDF_PAGE_PRESETS.
+    :param dpi: Page render DPI. If None then the preset DPI is used.
+    :param quality: Page JPEG quality. If None then the preset quality is used.
+    :param worker_count: Worker process number.
+        If None then the CPU number is used. If 1 then pages are rendered in the current process.
+    :param max_pending: Maximum number of rendered pages waiting for the consumer.
+        If None then PDF_PAGE_PENDING_PER_WORKER pages per worker process.
+    :return: JPEG data iterator in page order.
+    """
+    options = getPDFPageOptions(preset, dpi, quality)
+    if isinstance(pdf_filenames, str):
+        pdf_filenames = [pdf_filenames]
+
+    tasks = list()
+    for pdf_filename in pdf_filenames:
+        pdf_filename = os.path.abspath(pdf_filename)
+        doc = fitz.open(pdf_filename)
+        tasks += [(pdf_filename, page_index, options['dpi'], options['quality']) for page_index in range(doc.page_count)]
+        doc.close()
+
+    if worker_count is None:
+        worker_count = os.cpu_count() or 1
+    if worker_count <= 1 or len(tasks) <= 1:
+        try:
+            for task in tasks:
+                yield _renderPDFPage(task)
+        finally:
+            _closePDFPageDocuments()
+        return
+
+    if max_pending is None:
+        max_pending = worker_count * PDF_PAGE_PENDING_PER_WORKER
+    with concurrent.futures.ProcessPoolExecutor(max_workers=worker_count) as executor:
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(executor.submit(_renderPDFPage, task))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def compressPDFPages(src_pdf_filenames, dst_pdf_filename, preset=printer_func.GS_QUALITY_DEFAULT,
+                     dpi=None, quality=None, worker_count=None):
+    """
+    Join PDF files into one with compress by the in-memory page pipeline.
+    Pages are rendered and re-encoded as JPEG in memory and reassembled by img2pdf.
+
+    :param src_pdf_filenames: List of source files.
+    :param dst_pdf_filename: The full name of the resulting PDF file.
+        It may be one of the source files.
+    :param preset: Preset name. See PDF_PAGE_PRESETS.
+    :param dpi: Page render DPI. If None then the preset DPI is used.
+    :param quality: Page JPEG quality. If None then the preset quality is used.
+    :param worker_count: Worker process number.
+        If None then the CPU number is used. If 1 then pages are rendered in the current process.
+    :return: True/False.
+    """
+    if isinstance(src_pdf_filenames, str):
+        src_pdf_filenames = [src_pdf_filenames]
+    pdf_filenames = list()
+    for pdf_filename in src_pdf_filenames:
+        if not os.path.exists(pdf_filename):
+            log_func.warning(u'Not found PDF file <%s> for join to PDF file <%s>' % (pdf_filename, dst_pdf_filename))
+        else:
+            pdf_filenames.append(pdf_filename)
+    if not pdf_filenames:
+        log_func.warning(u'Not define PDF files for join to PDF file <%s>' % dst_pdf_filename)
+        return False
+
+    try:
+        log_func.info(u'Compress %s to PDF file <%s> by page pipeline' % (str(pdf_filenames), dst_pdf_filename))
+        pages = list(renderPDFPages(pdf_filenames, preset=preset, dpi=dpi, quality=quality,
+                                    worker_count=worker_count))
+        pdf_data = img2pdf.convert(pages)
+        del pages
+        with open(dst_pdf_filename, 'wb') as pdf_file:
+            pdf_file.write(pdf_data)
+        return True
+    except:
+        log_func.fatal(u'Error compress %s to PDF file <%s> by page pipeline' % (str(src_pdf_filenames), dst_pdf_filename))
+    return False
+
+
 def compressJpegPagesPDF(pdf_filename, new_pdf_filename=None, *args, **kwargs):
     """
     An attempt to reduce the size of a PDF file.
         The PDF file is compressed by compress JPEG pages.
+        If the page width and height are not specified then the in-memory page pipeline is used.
 
     :param pdf_filename: Compressible PDF file.
     :param new_pdf_filename: New PDF file.
         If not specified, the existing PDF file is overwritten.
     :return: True/False.
     """
+    if not args and not kwargs.get('width', None) and not kwargs.get('height', None):
+        return compressPDFPages([pdf_filename], pdf_filename if new_pdf_filename is None else new_pdf_filename,
+                                **_getCompressImagePageOptions(**kwargs))
+
     try:
         log_func.info(u'Compress PDF file <%s> by compress JPEG pages' % pdf_filename)
 
@@ -276,6 +447,7 @@ def compressJpegPagesPDF(pdf_filename, new_pdf_filename=None, *args, **kwargs):
 def joinPDFWithCompress(src_pdf_filenames, dst_pdf_filename, *args, **kwargs):
     """
     Join PDF files into one with compress.
+    If the page width and height are not specified then the in-memory page pipeline is used.
 
     :param src_pdf_filenames: List of source files.
         All files must be present!
@@ -283,6 +455,9 @@ def joinPDFWithCompress(src_pdf_filenames, dst_pdf_filename, *args, **kwargs):
     :param dst_pdf_filename: The full name of the resulting PDF file.
     :return: True/False.
     """
+    if not args and not kwargs.get('width', None) and not kwargs.get('height', None):
+        return compressPDFPages(src_pdf_filenames, dst_pdf_filename, **_getCompressImagePageOptions(**kwargs))
+
     try:
         log_func.info(u'Join %s to PDF file <%s>' % (str(src_pdf_filenames), dst_pdf_filename))
 
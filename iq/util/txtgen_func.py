@@ -8,23 +8,137 @@ Text generate function by context.
 import os
 import os.path
 import re
+import hashlib
+import threading
+import collections
 import jinja2
+import jinja2.bccache
 
 from ..util import log_func
 from ..util import global_func
 from ..util import file_func
 
-__version__ = (0, 1, 1, 1)
+__version__ = (0, 1, 2, 1)
 
 REPLACE_NAME_START = u'{{'
 REPLACE_NAME_END = u'}}'
 
 VAR_PATTERN = r'(\{\{.*?\}\})'
 
+# Maximum number of compiled templates in the cache
+TEMPLATE_CACHE_SIZE = 256
+
+# Bytecode cache directory name in the profile directory
+TEMPLATE_BYTECODE_CACHE_DIRNAME = 'jinja2_cache'
+
+# Shared template environment
+TEMPLATE_ENVIRONMENT = jinja2.Environment()
+
+# Compiled templates: {template text hash: template}
+TEMPLATE_CACHE = collections.OrderedDict()
+TEMPLATE_CACHE_LOCK = threading.Lock()
+
+TEMPLATE_CACHE_STATISTICS = dict(hit_count=0, miss_count=0, evict_count=0, bytecode_hit_count=0)
+
+
+def getTemplateCacheStatistics():
+    """
+    Get compiled template cache statistics.
+
+    :return: Statistics dictionary.
+    """
+    with TEMPLATE_CACHE_LOCK:
+        statistics = dict(TEMPLATE_CACHE_STATISTICS)
+        statistics['size'] = len(TEMPLATE_CACHE)
+        return statistics
+
+
+def clearTemplateCache():
+    """
+    Clear compiled template cache and statistics.
+    The bytecode cache files are not removed.
+    """
+    with TEMPLATE_CACHE_LOCK:
+        TEMPLATE_CACHE.clear()
+        for name in TEMPLATE_CACHE_STATISTICS.keys():
+            TEMPLATE_CACHE_STATISTICS[name] = 0
+
+
+def setTemplateBytecodeCache(cache_dirname=None):
+    """
+    Enable on-disk bytecode cache of the compiled templates.
+    The templates compiled in previous runs are loaded without compilation.
+
+    :param cache_dirname: Bytecode cache directory.
+        If None then the directory in the profile directory is used.
+        If False then the bytecode cache is disabled.
+    :return: True/False.
+    """
+    if cache_dirname is False:
+        TEMPLATE_ENVIRONMENT.bytecode_cache = None
+        return True
+
+    if cache_dirname is None:
+        profile_path = file_func.getProfilePath()
+        if not profile_path:
+            log_func.warning(u'Profile directory is not defined for template bytecode cache')
+            return False
+        cache_dirname = os.path.join(profile_path, TEMPLATE_BYTECODE_CACHE_DIRNAME)
+
+    try:
+        if not os.path.exists(cache_dirname):
+            file_func.createDir(cache_dirname)
+        TEMPLATE_ENVIRONMENT.bytecode_cache = jinja2.bccache.FileSystemBytecodeCache(cache_dirname)
+        return True
+    except:
+        log_func.fatal(u'Error set template bytecode cache <%s>' % cache_dirname)
+    return False
+
+
+def getTemplate(text_template):
+    """
+    Get compiled template.
+    The template is compiled once and taken from the cache on the next calls.
+
+    :param text_template: Template text.
+    :return: jinja2 template object. Exceptions of compilation are raised to the caller.
+    """
+    key = hashlib.md5(text_template.encode('utf-8')).hexdigest()
+    with TEMPLATE_CACHE_LOCK:
+        template = TEMPLATE_CACHE.get(key)
+        if template is not None:
+            TEMPLATE_CACHE.move_to_end(key)
+            TEMPLATE_CACHE_STATISTICS['hit_count'] += 1
+            return template
+
+    environment = TEMPLATE_ENVIRONMENT
+    bytecode_cache = environment.bytecode_cache
+    if bytecode_cache is not None:
+        bucket = bytecode_cache.get_bucket(environment, key, None, text_template)
+        if bucket.code is None:
+            bucket.code = environment.compile(text_template)
+            bytecode_cache.set_bucket(bucket)
+        else:
+            with TEMPLATE_CACHE_LOCK:
+                TEMPLATE_CACHE_STATISTICS['bytecode_hit_count'] += 1
+        template = environment.template_class.from_code(environment, bucket.code,
+                                                        environment.make_globals(None))
+    else:
+        template = environment.from_string(text_template)
+
+    with TEMPLATE_CACHE_LOCK:
+        TEMPLATE_CACHE_STATISTICS['miss_count'] += 1
+        TEMPLATE_CACHE[key] = template
+        while len(TEMPLATE_CACHE) > TEMPLATE_CACHE_SIZE:
+            TEMPLATE_CACHE.popitem(last=False)
+            TEMPLATE_CACHE_STATISTICS['evict_count'] += 1
+    return template
+
 
 def generate(text_template, context=None):
     """
     Generate text by context.
+    Compiled templates are cached by the template text hash.
 
     :param text_template: Template text.
     :param context. Context dictionary.
@@ -34,7 +148,7 @@ def generate(text_template, context=None):
         context = dict()
 
     try:
-        template = jinja2.Template(text_template)
+        template = getTemplate(text_template)
         result_txt = template.render(**context)
         return result_txt
     except:
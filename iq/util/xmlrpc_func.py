@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+XML RPC client functions.
+
+Server proxies are cached by (host, port).
+The cached proxy transport keeps the HTTP connection alive between calls,
+so the connection is not reestablished on each request.
+Several calls to one server may be joined in one request with system.multicall.
+"""
+
+import threading
+import xmlrpc.client
+
+from . import log_func
+
+__version__ = (0, 0, 0, 1)
+
+XMLRPC_URL_FMT = 'http://%s:%d'
+
+DEFAULT_TIMEOUT = 30
+
+# Server proxies: {(host, port): (proxy, lock)}
+XMLRPC_PROXIES = dict()
+XMLRPC_PROXIES_LOCK = threading.Lock()
+
+# Servers without system.multicall support
+NO_MULTICALL_SERVERS = set()
+
+XMLRPC_STATISTICS = dict(request_count=0, call_count=0, connect_count=0, error_count=0)
+XMLRPC_STATISTICS_LOCK = threading.Lock()
+
+
+class iqKeepAliveTransport(xmlrpc.client.Transport):
+    """
+    XML RPC transport with persistent HTTP connection and connection timeout.
+    """
+    def __init__(self, timeout=DEFAULT_TIMEOUT, *args, **kwargs):
+        """
+        Constructor.
+
+        :param timeout: Connection timeout in seconds.
+        """
+        xmlrpc.client.Transport.__init__(self, *args, **kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        """
+        Get HTTP connection.
+        A new connection is created only if the previous one was closed.
+        """
+        if self._connection and host == self._connection[0]:
+            return self._connection[1]
+        connection = xmlrpc.client.Transport.make_connection(self, host)
+        connection.timeout = self.timeout
+        _addStatistics(connect_count=1)
+        return connection
+
+
+def _addStatistics(**counters):
+    """
+    Increase XML RPC statistics counters.
+    """
+    with XMLRPC_STATISTICS_LOCK:
+        for name, value in counters.items():
+            XMLRPC_STATISTICS[name] += value
+
+
+def getXMLRPCStatistics():
+    """
+    Get XML RPC statistics.
+
+    :return: Statistics dictionary.
+    """
+    with XMLRPC_STATISTICS_LOCK:
+        return dict(XMLRPC_STATISTICS)
+
+
+def resetXMLRPCStatistics():
+    """
+    Reset XML RPC statistics.
+    """
+    with XMLRPC_STATISTICS_LOCK:
+        for name in XMLRPC_STATISTICS.keys():
+            XMLRPC_STATISTICS[name] = 0
+
+
+def getXMLRPCProxy(host, port, timeout=DEFAULT_TIMEOUT):
+    """
+    Get cached XML RPC server proxy.
+
+    :param host: Server host.
+    :param port: Server port.
+    :param timeout: Connection timeout in seconds.
+    :return: Tuple (proxy, lock).
+        The proxy is not thread safe, so calls must be made under the lock.
+    """
+    key = (host, int(port))
+    with XMLRPC_PROXIES_LOCK:
+        proxy_lock = XMLRPC_PROXIES.get(key)
+        if proxy_lock is None:
+            proxy = xmlrpc.client.ServerProxy(XMLRPC_URL_FMT % key,
+                                              transport=iqKeepAliveTransport(timeout=timeout),
+                                              allow_none=True)
+            proxy_lock = (proxy, threading.Lock())
+            XMLRPC_PROXIES[key] = proxy_lock
+        return proxy_lock
+
+
+def closeXMLRPCProxy(host=None, port=None):
+    """
+    Close cached XML RPC server proxy.
+
+    :param host: Server host. If None then all proxies are closed.
+    :param port: Server port.
+    """
+    with XMLRPC_PROXIES_LOCK:
+        keys = list(XMLRPC_PROXIES.keys()) if host is None else [(host, int(port))]
+        for key in keys:
+            proxy_lock = XMLRPC_PROXIES.pop(key, None)
+            if proxy_lock is not None:
+                proxy, lock = proxy_lock
+                with lock:
+                    proxy('close')()
+
+
+def _getMethod(proxy, method_name):
+    """
+    Get proxy method by dotted name.
+    """
+    method = proxy
+    for name in method_name.split('.'):
+        method = getattr(method, name)
+    return method
+
+
+def callXMLRPC(host, port, method_name, *args):
+    """
+    Call XML RPC method through the persistent connection.
+
+    :param host: Server host.
+    :param port: Server port.
+    :param method_name: Dotted method name. For example 'sources.ReadValuesAsStrings'.
+    :param args: Method arguments.
+    :return: Method result. Exceptions are raised to the caller.
+    """
+    proxy, lock = getXMLRPCProxy(host, port)
+    _addStatistics(request_count=1, call_count=1)
+    try:
+        with lock:
+            return _getMethod(proxy, method_name)(*args)
+    except:
+        _addStatistics(error_count=1)
+        raise
+
+
+def callMultiXMLRPC(host, port, calls):
+    """
+    Make several XML RPC calls in one request with system.multicall.
+    If the server does not support system.multicall then
+    the calls are made one by one through the persistent connection.
+
+    :param host: Server host.
+    :param port: Server port.
+    :param calls: Call list. Format:
+        [('dotted method name', (arg1, arg2, ...)), ...]
+    :return: Result list in call order.
+        The failed call result is xmlrpc.client.Fault object.
+    """
+    if not calls:
+        return list()
+
+    key = (host, int(port))
+    proxy, lock = getXMLRPCProxy(host, port)
+    if len(calls) > 1 and key not in NO_MULTICALL_SERVERS:
+        multicall = xmlrpc.client.MultiCall(proxy)
+        for method_name, args in calls:
+            _getMethod(multicall, method_name)(*args)
+        try:
+            with lock:
+                multicall_results = multicall()
+            _addStatistics(request_count=1, call_count=len(calls))
+            results = list()
+            for i in range(len(calls)):
+                try:
+                    results.append(multicall_results[i])
+                except xmlrpc.client.Fault as fault:
+                    results.append(fault)
+            return results
+        except xmlrpc.client.Fault:
+            log_func.warning(u'XML RPC server <%s:%d> does not support system.multicall' % key)
+            NO_MULTICALL_SERVERS.add(key)
+        except:
+            _addStatistics(error_count=1)
+            raise
+
+    results = list()
+    for method_name, args in calls:
+        try:
+            results.append(callXMLRPC(host, port, method_name, *args))
+        except xmlrpc.client.Fault as fault:
+            results.append(fault)
+    return results
@@ -7,21 +7,37 @@ ZIP archive file manipulate functions.
 
 import os
 import os.path
+import io
+import struct
+import json
+import zlib
+import shutil
+import tempfile
 import subprocess
 import locale
 import zipfile
+import concurrent.futures
 
 from . import log_func
 from . import file_func
 from . import sys_func
 
-__version__ = (0, 0, 5, 2)
+__version__ = (0, 0, 6, 3)
 
 ZIP_EXT = '.zip'
 
 APP_7ZIPFM_EXE_NAME = '7zfm.exe'
 APP_7Z_EXE_NAME = '7z.exe'
 
+# Default compression level of the in-process archive engine
+ZIP_COMPRESS_LEVEL = 6
+ZIP_CHUNK_SIZE = 1024 * 1024
+# Compressed members up to the size are returned from worker processes in memory.
+# Larger members are returned in temporary files
+ZIP_MEMORY_MEMBER_LIMIT = 4 * 1024 * 1024
+ZIP_CHECKSUM_NAME = 'sha256'
+ZIP_MANIFEST_EXT = '.manifest.json'
+
 
 def unzipToDir(zip_filename, dst_dir=None, overwrite=True, to_console=True, options=()):
     """
@@ -308,3 +324,425 @@ def unzipToDirBy7Zip(zip_filename, dst_dir=None, overwrite=True, to_console=True
     except:
         log_func.fatal(u'Error unzip <%s> by 7Zip tool' % unzip_cmd)
     return False
+
+
+def getArchiveFilenames(src_filenames):
+    """
+    Get file names for archiving.
+    Directories are added recursively.
+
+    :param src_filenames: File and directory names.
+    :return: File name list.
+    """
+    if isinstance(src_filenames, str):
+        src_filenames = [src_filenames]
+
+    filenames = list()
+    for src_filename in src_filenames:
+        if os.path.isdir(src_filename):
+            for dirname, sub_dirnames, sub_filenames in os.walk(src_filename):
+                sub_dirnames.sort()
+                filenames += [os.path.join(dirname, sub_filename) for sub_filename in sorted(sub_filenames)]
+        else:
+            filenames.append(src_filename)
+    return filenames
+
+
+def _compressStream(src_file, dst_file, compression=zipfile.ZIP_DEFLATED,
+                    compress_level=ZIP_COMPRESS_LEVEL, checksum_name=ZIP_CHECKSUM_NAME):
+    """
+    Compress file data as ZIP member data.
+    CRC and checksum are calculated during the write.
+
+    :param src_file: Source binary file object.
+    :param dst_file: Destination binary file object.
+    :param compression: ZIP_DEFLATED or ZIP_STORED.
+    :param compress_level: Compression level 0-9.
+    :param checksum_name: Hash algorithm name. See file_func.newCheckSum.
+    :return: Tuple (CRC, file size, compressed size, checksum hex digest).
+    """
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15) if compression == zipfile.ZIP_DEFLATED else None
+    checksum = file_func.newCheckSum(checksum_name)
+    crc = 0
+    file_size = 0
+    compress_size = 0
+    for chunk in iter(lambda: src_file.read(ZIP_CHUNK_SIZE), b''):
+        crc = zlib.crc32(chunk, crc)
+        checksum.update(chunk)
+        file_size += len(chunk)
+        if compressor:
+            chunk = compressor.compress(chunk)
+        compress_size += len(chunk)
+        dst_file.write(chunk)
+    if compressor:
+        chunk = compressor.flush()
+        compress_size += len(chunk)
+        dst_file.write(chunk)
+    return crc, file_size, compress_size, checksum.hexdigest()
+
+
+def _compressMember(task):
+    """
+    Compress archive member.
+    The function is executed in the worker process.
+
+    :param task: Tuple (file name, compression, compression level, checksum name, previous checksum).
+        If the previous checksum is equal to the file checksum then the file is skipped.
+    :return: Member dictionary:
+        {'filename': File name, 'skipped': True/False, 'crc': CRC, 'file_size': File size,
+         'compress_size': Compressed size, 'checksum': Checksum hex digest,
+         'data': Compressed data or None, 'tmp_filename': Compressed data temporary file name or None}.
+    """
+    filename, compression, compress_level, checksum_name, previous_checksum = task
+    member = dict(filename=filename, skipped=False, data=None, tmp_filename=None)
+    if previous_checksum:
+        checksum = file_func.getFileCheckSum(filename, checksum_name)
+        if checksum == previous_checksum:
+            member.update(skipped=True, checksum=checksum)
+            return member
+
+    if os.path.getsize(filename) <= ZIP_MEMORY_MEMBER_LIMIT:
+        dst_file = io.BytesIO()
+    else:
+        dst_file = tempfile.NamedTemporaryFile(suffix='.zipmember', delete=False)
+        member['tmp_filename'] = dst_file.name
+    try:
+        with open(filename, 'rb') as src_file:
+            crc, file_size, compress_size, checksum = _compressStream(src_file, dst_file, compression,
+                                                                      compress_level, checksum_name)
+        if member['tmp_filename'] is None:
+            member['data'] = dst_file.getvalue()
+    finally:
+        dst_file.close()
+    member.update(crc=crc, file_size=file_size, compress_size=compress_size, checksum=checksum)
+    return member
+
+
+def _getMemberZipInfo(filename, arcname=None, compression=zipfile.ZIP_DEFLATED):
+    """
+    Get ZIP member info by the file.
+    """
+    zip_info = zipfile.ZipInfo.from_file(filename, arcname)
+    zip_info.compress_type = compression
+    return zip_info
+
+
+def _isZip64Member(zip_info):
+    """
+    Are ZIP64 extensions required for the member?
+    """
+    return zip_info.file_size * 1.05 > zipfile.ZIP64_LIMIT or zip_info.compress_size > zipfile.ZIP64_LIMIT
+
+
+def _appendMember(zip_file, zip_info):
+    """
+    Register the written member in the ZIP file.
+    zipfile has no public API for writing precompressed members,
+    so the member is registered as in zipfile._ZipWriteFile.close.
+    """
+    zip_file.start_dir = zip_file.fp.tell()
+    zip_file.filelist.append(zip_info)
+    zip_file.NameToInfo[zip_info.filename] = zip_info
+
+
+def _writeMember(zip_file, filename, arcname=None, compression=zipfile.ZIP_DEFLATED,
+                 compress_level=ZIP_COMPRESS_LEVEL, checksum_name=ZIP_CHECKSUM_NAME):
+    """
+    Compress file directly into the ZIP file.
+
+    :return: Tuple (ZIP member info, checksum hex digest).
+    """
+    zip_info = _getMemberZipInfo(filename, arcname, compression)
+    zip_info.CRC = 0
+    zip_info.compress_size = 0
+    zip_file._writecheck(zip_info)
+    zip_file._didModify = True
+    zip64 = _isZip64Member(zip_info)
+
+    zip_info.header_offset = zip_file.fp.tell()
+    zip_file.fp.write(zip_info.FileHeader(zip64))
+    with open(filename, 'rb') as src_file:
+        crc, file_size, compress_size, checksum = _compressStream(src_file, zip_file.fp, compression,
+                                                                  compress_level, checksum_name)
+    zip_info.CRC = crc
+    zip_info.file_size = file_size
+    zip_info.compress_size = compress_size
+
+    # Write file header with CRC and sizes
+    stop_offset = zip_file.fp.tell()
+    zip_file.fp.seek(zip_info.header_offset)
+    zip_file.fp.write(zip_info.FileHeader(zip64))
+    zip_file.fp.seek(stop_offset)
+    _appendMember(zip_file, zip_info)
+    return zip_info, checksum
+
+
+def _writeCompressedMember(zip_file, member, arcname=None, compression=zipfile.ZIP_DEFLATED):
+    """
+    Write member compressed in the worker process into the ZIP file.
+
+    :return: ZIP member info.
+    """
+    zip_info = _getMemberZipInfo(member['filename'], arcname, compression)
+    zip_info.CRC = member['crc']
+    zip_info.file_size = member['file_size']
+    zip_info.compress_size = member['compress_size']
+    zip_file._writecheck(zip_info)
+    zip_file._didModify = True
+
+    zip_info.header_offset = zip_file.fp.tell()
+    zip_file.fp.write(zip_info.FileHeader(_isZip64Member(zip_info)))
+    if member['tmp_filename']:
+        try:
+            with open(member['tmp_filename'], 'rb') as member_file:
+                shutil.copyfileobj(member_file, zip_file.fp, ZIP_CHUNK_SIZE)
+        finally:
+            os.remove(member['tmp_filename'])
+    else:
+        zip_file.fp.write(member['data'])
+    _appendMember(zip_file, zip_info)
+    return zip_info
+
+
+def _copyMember(zip_file, src_zip_file, src_zip_info):
+    """
+    Copy compressed member data from other ZIP file without recompression.
+
+    :param zip_file: Destination ZIP file object opened for writing.
+    :param src_zip_file: Source ZIP file object opened for reading.
+    :param src_zip_info: Source member info.
+    :return: ZIP member info.
+    """
+    zip_info = zipfile.ZipInfo(src_zip_info.filename, src_zip_info.date_time)
+    zip_info.compress_type = src_zip_info.compress_type
+    zip_info.create_system = src_zip_info.create_system
+    zip_info.external_attr = src_zip_info.external_attr
+    zip_info.CRC = src_zip_info.CRC
+    zip_info.file_size = src_zip_info.file_size
+    zip_info.compress_size = src_zip_info.compress_size
+    zip_file._writecheck(zip_info)
+    zip_file._didModify = True
+
+    # Member data follows the local file header with the file name and extra field
+    src_zip_file.fp.seek(src_zip_info.header_offset)
+    file_header = struct.unpack(zipfile.structFileHeader, src_zip_file.fp.read(zipfile.sizeFileHeader))
+    src_zip_file.fp.seek(file_header[zipfile._FH_FILENAME_LENGTH] + file_header[zipfile._FH_EXTRA_FIELD_LENGTH],
+                         os.SEEK_CUR)
+
+    zip_info.header_offset = zip_file.fp.tell()
+    zip_file.fp.write(zip_info.FileHeader(_isZip64Member(zip_info)))
+    size = zip_info.compress_size
+    while size > 0:
+        chunk = src_zip_file.fp.read(min(ZIP_CHUNK_SIZE, size))
+        if not chunk:
+            raise EOFError(u'Unexpected end of ZIP member <%s> data' % zip_info.filename)
+        zip_file.fp.write(chunk)
+        size -= len(chunk)
+    _appendMember(zip_file, zip_info)
+    return zip_info
+
+
+def getArchiveManifestFilename(zip_filename):
+    """
+    Get manifest filename of the archive.
+
+    :param zip_filename: Zip filename.
+    """
+    return os.path.splitext(zip_filename)[0] + ZIP_MANIFEST_EXT
+
+
+def loadArchiveManifest(manifest_filename):
+    """
+    Load archive manifest.
+
+    :param manifest_filename: Manifest filename.
+    :return: Manifest dictionary or None if error.
+    """
+    if not manifest_filename or not os.path.exists(manifest_filename):
+        return None
+    try:
+        with open(manifest_filename, 'rt') as manifest_file:
+            return json.load(manifest_file)
+    except:
+        log_func.fatal(u'Error load archive manifest <%s>' % manifest_filename)
+    return None
+
+
+def saveArchiveManifest(manifest_filename, manifest):
+    """
+    Save archive manifest.
+
+    :param manifest_filename: Manifest filename.
+    :param manifest: Manifest dictionary.
+    :return: True/False.
+    """
+    try:
+        with open(manifest_filename, 'wt') as manifest_file:
+            json.dump(manifest, manifest_file, indent=1)
+        return True
+    except:
+        log_func.fatal(u'Error save archive manifest <%s>' % manifest_filename)
+    return False
+
+
+def archiveFiles(src_filenames, zip_filename, compression=zipfile.ZIP_DEFLATED,
+                 compress_level=ZIP_COMPRESS_LEVEL, worker_count=1,
+                 checksum_name=ZIP_CHECKSUM_NAME, incremental=False,
+                 manifest_filename=None, check_hash=False, overwrite=True):
+    """
+    Compress files to *.zip by the in-process archive engine.
+    The files are compressed in streaming mode.
+    CRC and checksum of the files are calculated during the write.
+
+    :param src_filenames: File and directory names.
+    :param zip_filename: Zip filename.
+    :param compression: zipfile.ZIP_DEFLATED or zipfile.ZIP_STORED.
+    :param compress_level: Compression level 0-9.
+    :param worker_count: Worker process number for parallel compression of the members.
+        If None then the CPU number is used. If 1 then the members are compressed in the current process.
+    :param checksum_name: Hash algorithm name. See file_func.newCheckSum.
+    :param incremental: Incremental mode.
+        Files unchanged since the previous archive of the manifest are not compressed again:
+        their compressed data is copied from the previous archive.
+        The archive is rebuilt in a temporary file and always contains all files.
+    :param manifest_filename: Manifest filename.
+        If None then the manifest is saved next to the archive.
+    :param check_hash: Compare checksums of files with the same size but changed modification time
+        in incremental mode.
+    :param overwrite: Overwrite existing archive? Not used in incremental mode.
+    :return: Manifest dictionary:
+        {'checksum_name': Hash algorithm name,
+         'files': {archive name: {'size': ..., 'mtime': ..., 'crc': ..., 'checksum': ...}, ...},
+         'added': [Added archive names], 'skipped': [Skipped archive names], 'deleted': [Deleted archive names]}
+        or None if error.
+    """
+    filenames = getArchiveFilenames(src_filenames)
+    if not all([os.path.exists(filename) for filename in filenames]):
+        log_func.warning(u'Compressed files %s to ZIP not found' % [filename for filename in filenames if not os.path.exists(filename)])
+        return None
+
+    if manifest_filename is None:
+        manifest_filename = getArchiveManifestFilename(zip_filename)
+    previous_manifest = loadArchiveManifest(manifest_filename) if incremental else None
+    previous_files = previous_manifest.get('files', dict()) if previous_manifest and previous_manifest.get('checksum_name', None) == checksum_name else dict()
+
+    if worker_count is None:
+        worker_count = os.cpu_count() or 1
+
+    manifest = dict(checksum_name=checksum_name, files=dict(), added=list(), skipped=list(), deleted=list())
+    executor = None
+    previous_zip_file = None
+    # The incremental archive is written next to the previous one and replaces it at the end
+    dst_zip_filename = zip_filename + '.tmp' if incremental else zip_filename
+    try:
+        if incremental:
+            if previous_files and os.path.exists(zip_filename):
+                previous_zip_file = zipfile.ZipFile(zip_filename, 'r')
+                # Only files present in the previous archive can be skipped
+                previous_files = dict([(arcname, previous_file) for arcname, previous_file in previous_files.items()
+                                       if arcname in previous_zip_file.NameToInfo])
+            else:
+                previous_files = dict()
+        elif overwrite and os.path.exists(zip_filename):
+            file_func.removeFile(zip_filename)
+
+        # Tasks: [(file name, archive name, previous checksum), ...]
+        tasks = list()
+        for filename in filenames:
+            arcname = _getMemberZipInfo(filename).filename
+            file_stat = os.stat(filename)
+            previous_file = previous_files.get(arcname)
+            if previous_file and previous_file['size'] == file_stat.st_size:
+                if previous_file['mtime'] == file_stat.st_mtime:
+                    manifest['files'][arcname] = previous_file
+                    manifest['skipped'].append(arcname)
+                    continue
+                elif check_hash:
+                    tasks.append((filename, arcname, file_stat, previous_file['checksum']))
+                    continue
+            tasks.append((filename, arcname, file_stat, None))
+
+        with zipfile.ZipFile(dst_zip_filename, 'w', compression=compression, allowZip64=True) as zip_file:
+            for arcname in manifest['skipped']:
+                _copyMember(zip_file, previous_zip_file, previous_zip_file.getinfo(arcname))
+
+            if worker_count > 1 and len(tasks) > 1:
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=worker_count)
+                members = executor.map(_compressMember, [(filename, compression, compress_level, checksum_name, previous_checksum) for filename, arcname, file_stat, previous_checksum in tasks])
+            else:
+                members = [None] * len(tasks)
+
+            for (filename, arcname, file_stat, previous_checksum), member in zip(tasks, members):
+                if member is None and previous_checksum and file_func.getFileCheckSum(filename, checksum_name) == previous_checksum:
+                    member = dict(skipped=True, checksum=previous_checksum)
+
+                if member is not None and member['skipped']:
+                    _copyMember(zip_file, previous_zip_file, previous_zip_file.getinfo(arcname))
+                    manifest['files'][arcname] = dict(previous_files[arcname], mtime=file_stat.st_mtime)
+                    manifest['skipped'].append(arcname)
+                    continue
+
+                if member is None:
+                    zip_info, checksum = _writeMember(zip_file, filename, arcname, compression,
+                                                      compress_level, checksum_name)
+                else:
+                    zip_info = _writeCompressedMember(zip_file, member, arcname, compression)
+                    checksum = member['checksum']
+                manifest['files'][arcname] = dict(size=zip_info.file_size, mtime=file_stat.st_mtime,
+                                                  crc=zip_info.CRC, checksum=checksum)
+                manifest['added'].append(arcname)
+
+        if previous_zip_file is not None:
+            previous_zip_file.close()
+            previous_zip_file = None
+        if incremental:
+            os.replace(dst_zip_filename, zip_filename)
+
+        previous_arcnames = previous_manifest.get('files', dict()) if previous_manifest else dict()
+        manifest['deleted'] = [arcname for arcname in previous_arcnames if arcname not in manifest['files']]
+        saveArchiveManifest(manifest_filename, manifest)
+        return manifest
+    except:
+        log_func.fatal(u'Error archive files to ZIP <%s>' % zip_filename)
+        if incremental and os.path.exists(dst_zip_filename):
+            os.remove(dst_zip_filename)
+    finally:
+        if previous_zip_file is not None:
+            previous_zip_file.close()
+        if executor is not None:
+            executor.shutdown()
+    return None
+
+
+def checkArchiveFiles(zip_filename, manifest_filename=None):
+    """
+    Check archive members by the checksums of the manifest.
+
+    :param zip_filename: Zip filename.
+    :param manifest_filename: Manifest filename.
+        If None then the manifest next to the archive is used.
+    :return: List of the archive names with wrong checksum
+        and the manifest archive names missing in the archive or None if error.
+    """
+    if manifest_filename is None:
+        manifest_filename = getArchiveManifestFilename(zip_filename)
+    manifest = loadArchiveManifest(manifest_filename)
+    if manifest is None:
+        log_func.warning(u'Archive manifest <%s> not found' % manifest_filename)
+        return None
+
+    try:
+        bad_arcnames = list()
+        with zipfile.ZipFile(zip_filename, 'r') as zip_file:
+            for arcname in zip_file.namelist():
+                checksum = file_func.newCheckSum(manifest['checksum_name'])
+                with zip_file.open(arcname) as member_file:
+                    for chunk in iter(lambda: member_file.read(ZIP_CHUNK_SIZE), b''):
+                        checksum.update(chunk)
+                if manifest['files'].get(arcname, dict()).get('checksum', None) != checksum.hexdigest():
+                    bad_arcnames.append(arcname)
+            bad_arcnames += [arcname for arcname in manifest['files'] if arcname not in zip_file.NameToInfo]
+        return bad_arcnames
+    except:
+        log_func.fatal(u'Error check archive <%s>' % zip_filename)
+    return None
@@ -18,7 +18,7 @@ try:
 except ImportError:
     import chess_figures
 
-__version__ = (0, 0, 0, 1)
+__version__ = (0, 0, 1, 1)
 
 FIGURE_VALUES = {
     chess.PAWN: 10,
@@ -104,7 +104,50 @@ KING_EVAL_WHITE = [
 KING_EVAL_BLACK = list(reversed(KING_EVAL_WHITE))
 
 POSITION_COUNT = 0
-DEFAULT_DEPTH = 3
+# Maximum search depth of iterative deepening
+MAX_SEARCH_DEPTH = 64
+# Search time budget in seconds
+DEFAULT_MOVE_TIME = 5.0
+# Transposition table entry number (power of two)
+DEFAULT_TT_SIZE = 1 << 20
+# Check search time every 1024 nodes
+TIME_CHECK_NODE_MASK = 1023
+
+MATE_SCORE = 100000
+MATE_BOUND_SCORE = MATE_SCORE - 1000
+INFINITY_SCORE = MATE_SCORE + 1
+
+# Transposition table entry flags
+TT_EXACT = 0
+TT_LOWER_BOUND = 1
+TT_UPPER_BOUND = 2
+
+# Move order keys
+TT_MOVE_ORDER = 1 << 62
+CAPTURE_MOVE_ORDER = 1 << 61
+KILLER_MOVE_ORDER = 1 << 60
+
+# Most valuable victim - least valuable attacker: [victim piece type][attacker piece type]
+MVV_LVA_ORDERS = [[FIGURE_VALUES.get(victim, 0) * 100 - FIGURE_VALUES.get(attacker, 0)
+                   for attacker in range(chess.KING + 1)]
+                  for victim in range(chess.KING + 1)]
+
+ZOBRIST_SEED = 20240101
+_zobrist_random = random.Random(ZOBRIST_SEED)
+# Zobrist keys: [color][piece type][square]
+ZOBRIST_PIECE_KEYS = [[[_zobrist_random.getrandbits(64) for square in chess.SQUARES]
+                       for piece_type in [0] + list(chess.PIECE_TYPES)]
+                      for color in (chess.BLACK, chess.WHITE)]
+# Castling rights keys by rook square
+ZOBRIST_CASTLING_KEYS = [_zobrist_random.getrandbits(64) for square in chess.SQUARES]
+# En passant keys by file
+ZOBRIST_EP_KEYS = [_zobrist_random.getrandbits(64) for file_name in chess.FILE_NAMES]
+ZOBRIST_TURN_KEY = _zobrist_random.getrandbits(64)
+# Castling rights keys cache: {castling rights: key}
+ZOBRIST_CASTLING_CACHE = dict()
+del _zobrist_random
+
+CHESS_SEARCH = None
 
 PLAYER_COLOR = chess.WHITE
 BOARD = None
@@ -240,96 +283,389 @@ def printBigBoard(board, show_small_board=True, auto_clear=True):
     print(str_big_board)
 
 
-def getBestMove(board):
+def getBestMove(board, move_time=DEFAULT_MOVE_TIME, max_depth=MAX_SEARCH_DEPTH):
     """
+    Get best move.
+
+    :param board: Board object.
+    :param move_time: Search time budget in seconds.
+    :param max_depth: Maximum search depth.
+    :return: Best move or None if game over.
     """
     if board.is_game_over():
         print('Game over')
+        return None
 
     global POSITION_COUNT
-    POSITION_COUNT = 0
-    depth = DEFAULT_DEPTH
-
-    time_player1 = time.time()
-    best_move = getMinimaxRoot(depth, board, True)
-    time_player2 = time.time()
-    move_time = time_player2 - time_player1
-    positions_per_second = POSITION_COUNT * 1000 / move_time
-    
+    chess_search = getChessSearch()
+    best_move = chess_search.search(board, max_depth=max_depth, move_time=move_time)
+    POSITION_COUNT = chess_search.node_count
+
+    move_time = max(chess_search.search_time, 0.000001)
     print('Position count:', POSITION_COUNT)
-    print('Time:', str(move_time / 1000) + 's')
-    print('Position per second', positions_per_second)
+    print('Depth:', chess_search.depth)
+    print('Time:', '%.3fs' % move_time)
+    print('Position per second', int(POSITION_COUNT / move_time))
     return best_move
 
 
-def getMinimaxRoot(depth, board, is_maximising_player):
-    """
+def getZobristHash(board):
     """
-    new_game_moves = list(board.legal_moves)
-    best_move = -9999
-    best_move_found = None
+    Calculate Zobrist hash of the board position.
 
-    for i, new_game_move in enumerate(new_game_moves):
-        board.push(new_game_move)
-        value = getMinimax(depth - 1, board, -10000, 10000, not is_maximising_player)
-        board.pop()
+    :param board: Board object.
+    :return: 64 bit hash.
+    """
+    zobrist_hash = 0
+    for color in chess.COLORS:
+        for piece_type in chess.PIECE_TYPES:
+            piece_keys = ZOBRIST_PIECE_KEYS[color][piece_type]
+            for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                zobrist_hash ^= piece_keys[square]
+    zobrist_hash ^= getZobristCastlingKey(board.castling_rights)
+    if board.ep_square is not None:
+        zobrist_hash ^= ZOBRIST_EP_KEYS[chess.square_file(board.ep_square)]
+    if board.turn == chess.BLACK:
+        zobrist_hash ^= ZOBRIST_TURN_KEY
+    return zobrist_hash
+
+
+def getZobristCastlingKey(castling_rights):
+    """
+    Get Zobrist key of castling rights.
 
-        if value >= best_move:
-            best_move = value
-            best_move_found = new_game_move
-    if best_move_found is None:
-        print('Not found best move')
-    return best_move_found
+    :param castling_rights: Castling rights mask of rook squares.
+    :return: 64 bit key.
+    """
+    castling_key = ZOBRIST_CASTLING_CACHE.get(castling_rights)
+    if castling_key is None:
+        castling_key = 0
+        for square in chess.scan_forward(castling_rights):
+            castling_key ^= ZOBRIST_CASTLING_KEYS[square]
+        ZOBRIST_CASTLING_CACHE[castling_rights] = castling_key
+    return castling_key
 
 
-def getMinimax(depth, board, alpha, beta, is_maximising_player):
+def pushZobristMove(board, move, zobrist_hash):
     """
+    Push move on the board and update Zobrist hash incrementally.
+
+    :param board: Board object.
+    :param move: Legal move.
+    :param zobrist_hash: Zobrist hash of the board position before the move.
+    :return: Zobrist hash of the board position after the move.
     """
-    global POSITION_COUNT
-    POSITION_COUNT += 1
+    if board.is_castling(move):
+        # Castling is rare in the search tree
+        board.push(move)
+        return getZobristHash(board)
+
+    color = board.turn
+    from_square = move.from_square
+    to_square = move.to_square
+    piece_type = board.piece_type_at(from_square)
+    piece_keys = ZOBRIST_PIECE_KEYS[color]
+    zobrist_hash ^= piece_keys[piece_type][from_square] ^ piece_keys[move.promotion or piece_type][to_square]
+
+    if board.is_en_passant(move):
+        capture_square = chess.square(chess.square_file(to_square), chess.square_rank(from_square))
+        zobrist_hash ^= ZOBRIST_PIECE_KEYS[not color][chess.PAWN][capture_square]
+    else:
+        captured_piece_type = board.piece_type_at(to_square)
+        if captured_piece_type:
+            zobrist_hash ^= ZOBRIST_PIECE_KEYS[not color][captured_piece_type][to_square]
 
-    if depth == 0:
-        return -evaluateBoard(board)
+    zobrist_hash ^= ZOBRIST_TURN_KEY ^ getZobristCastlingKey(board.castling_rights)
+    if board.ep_square is not None:
+        zobrist_hash ^= ZOBRIST_EP_KEYS[chess.square_file(board.ep_square)]
 
-    new_game_moves = list(board.legal_moves)
+    board.push(move)
+
+    zobrist_hash ^= getZobristCastlingKey(board.castling_rights)
+    if board.ep_square is not None:
+        zobrist_hash ^= ZOBRIST_EP_KEYS[chess.square_file(board.ep_square)]
+    return zobrist_hash
 
-    best_move = -9999
-    if is_maximising_player:
-        for i, new_game_move in enumerate(new_game_moves):
-            board.push(new_game_move)
-            best_move = max(best_move, getMinimax(depth - 1, board, alpha, beta, not is_maximising_player))
-            board.pop()
 
-            alpha = max(alpha, best_move)
-            if beta <= alpha:
-                return best_move
+class iqSearchTimeout(Exception):
+    """
+    Search time budget is over.
+    """
+    pass
+
+
+class iqChessSearch(object):
+    """
+    Alpha-beta search with transposition table, move ordering and iterative deepening.
+    """
+    def __init__(self, tt_size=DEFAULT_TT_SIZE):
+        """
+        Constructor.
+
+        :param tt_size: Transposition table entry number.
+            It is rounded down to the power of two.
+        """
+        self.tt_size = 0
+        self.tt_mask = 0
+        self.transposition_table = list()
+        # Killer moves by ply
+        self.killers = list()
+        # History scores by side to move and from/to squares
+        self.history = list()
+
+        self.deadline = None
+        self.node_count = 0
+        self.tt_hit_count = 0
+        self.depth = 0
+        self.search_time = 0.0
+        # Completed iterations: [(depth, time, node count, best move, score), ...]
+        self.iterations = list()
+
+        self.setTranspositionTableSize(tt_size)
+
+    def setTranspositionTableSize(self, tt_size):
+        """
+        Set transposition table size.
+
+        :param tt_size: Transposition table entry number.
+            It is rounded down to the power of two.
+        """
+        self.tt_size = 1 << max(int(tt_size), 1).bit_length() - 1
+        self.tt_mask = self.tt_size - 1
+        self.clear()
+
+    def clear(self):
+        """
+        Clear transposition table and move ordering heuristics.
+        """
+        self.transposition_table = [None] * self.tt_size
+        self.killers = [[None, None] for i in range(MAX_SEARCH_DEPTH + 1)]
+        self.history = [[0] * 4096, [0] * 4096]
+
+    def getTranspositionTableFill(self):
+        """
+        Get transposition table fill part.
+
+        :return: Used entry part 0..1.
+        """
+        return (self.tt_size - self.transposition_table.count(None)) / self.tt_size
+
+    def search(self, board, max_depth=MAX_SEARCH_DEPTH, move_time=None):
+        """
+        Search best move by iterative deepening.
+        Depth 1 is always completed.
+
+        :param board: Board object. It is not changed.
+        :param max_depth: Maximum search depth.
+        :param move_time: Search time budget in seconds. If None then search to max depth.
+        :return: Best move or None if there are no legal moves.
+        """
+        start_time = time.perf_counter()
+        self.deadline = None
+        self.node_count = 0
+        self.tt_hit_count = 0
+        self.depth = 0
+        self.iterations = list()
+        self.killers = [[None, None] for i in range(MAX_SEARCH_DEPTH + 1)]
+        for side_history in self.history:
+            for i, value in enumerate(side_history):
+                if value:
+                    side_history[i] = value >> 1
+
+        board = board.copy(stack=False)
+        zobrist_hash = getZobristHash(board)
+        best_move = None
+        for depth in range(1, min(max_depth, MAX_SEARCH_DEPTH) + 1):
+            try:
+                score = self._search(board, depth, -INFINITY_SCORE, INFINITY_SCORE, 0, zobrist_hash)
+            except iqSearchTimeout:
+                break
+            entry = self.transposition_table[zobrist_hash & self.tt_mask]
+            if entry is None or entry[0] != zobrist_hash or entry[4] is None:
+                break
+            best_move = entry[4]
+            self.depth = depth
+            search_time = time.perf_counter() - start_time
+            self.iterations.append((depth, search_time, self.node_count, best_move, score))
+
+            if abs(score) >= MATE_BOUND_SCORE:
+                break
+            if move_time is not None:
+                # The next iteration takes more time than all previous ones
+                if search_time * 2 >= move_time:
+                    break
+                self.deadline = start_time + move_time
+
+        self.search_time = time.perf_counter() - start_time
         return best_move
-    else:
-        for i, new_game_move in enumerate(new_game_moves):
-            board.push(new_game_move)
-            best_move = min(best_move, getMinimax(depth - 1, board, alpha, beta, not is_maximising_player))
+
+    def _search(self, board, depth, alpha, beta, ply, zobrist_hash):
+        """
+        Negamax alpha-beta search.
+
+        :param board: Board object.
+        :param depth: Remaining depth.
+        :param alpha: Lower bound.
+        :param beta: Upper bound.
+        :param ply: Distance from the root.
+        :param zobrist_hash: Zobrist hash of the board position.
+        :return: Score for the side to move.
+        """
+        self.node_count += 1
+        if self.deadline is not None and not self.node_count & TIME_CHECK_NODE_MASK:
+            if time.perf_counter() >= self.deadline:
+                raise iqSearchTimeout()
+
+        if ply and board.halfmove_clock >= 100:
+            return 0
+
+        tt_index = zobrist_hash & self.tt_mask
+        entry = self.transposition_table[tt_index]
+        tt_move = None
+        if entry is not None and entry[0] == zobrist_hash:
+            tt_move = entry[4]
+            if ply and entry[1] >= depth:
+                self.tt_hit_count += 1
+                score = entry[2]
+                if score >= MATE_BOUND_SCORE:
+                    score -= ply
+                elif score <= -MATE_BOUND_SCORE:
+                    score += ply
+                flag = entry[3]
+                if flag == TT_EXACT:
+                    return score
+                elif flag == TT_LOWER_BOUND:
+                    alpha = max(alpha, score)
+                elif flag == TT_UPPER_BOUND:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        if depth <= 0:
+            score = evaluateBoard(board)
+            return score if board.turn == chess.WHITE else -score
+
+        moves = list(board.generate_legal_moves())
+        if not moves:
+            return -MATE_SCORE + ply if board.is_check() else 0
+        if len(moves) > 1:
+            self._sortMoves(board, moves, tt_move, ply)
+
+        start_alpha = alpha
+        best_score = -INFINITY_SCORE
+        best_move = None
+        for move in moves:
+            child_hash = pushZobristMove(board, move, zobrist_hash)
+            score = -self._search(board, depth - 1, -beta, -alpha, ply + 1, child_hash)
             board.pop()
 
-            beta = min(beta, best_move)
-            if beta <= alpha:
-                return best_move
-        return best_move
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not board.is_capture(move) and not move.promotion:
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self.history[board.turn][move.from_square * 64 + move.to_square] += depth * depth
+                        break
+
+        if best_score <= start_alpha:
+            flag = TT_UPPER_BOUND
+        elif best_score >= beta:
+            flag = TT_LOWER_BOUND
+        else:
+            flag = TT_EXACT
+        if entry is None or entry[0] != zobrist_hash or depth >= entry[1]:
+            score = best_score
+            if score >= MATE_BOUND_SCORE:
+                score += ply
+            elif score <= -MATE_BOUND_SCORE:
+                score -= ply
+            self.transposition_table[tt_index] = (zobrist_hash, depth, score, flag, best_move)
+        return best_score
+
+    def _sortMoves(self, board, moves, tt_move, ply):
+        """
+        Sort moves: transposition table move, captures and promotions by MVV-LVA,
+        killer moves and quiet moves by history score.
+
+        :param board: Board object.
+        :param moves: Legal move list. It is sorted in place.
+        :param tt_move: Transposition table move or None.
+        :param ply: Distance from the root.
+        """
+        killer1, killer2 = self.killers[ply]
+        history = self.history[board.turn]
+        piece_type_at = board.piece_type_at
+        occupied = board.occupied_co[not board.turn]
+
+        def getMoveOrder(move):
+            if move == tt_move:
+                return TT_MOVE_ORDER
+            to_square = move.to_square
+            if occupied & chess.BB_SQUARES[to_square]:
+                return CAPTURE_MOVE_ORDER + MVV_LVA_ORDERS[piece_type_at(to_square)][piece_type_at(move.from_square)]
+            if move.promotion:
+                return CAPTURE_MOVE_ORDER + FIGURE_VALUES[move.promotion]
+            if move == killer1:
+                return KILLER_MOVE_ORDER
+            if move == killer2:
+                return KILLER_MOVE_ORDER - 1
+            return history[move.from_square * 64 + to_square]
+
+        moves.sort(key=getMoveOrder, reverse=True)
+
+
+def getChessSearch():
+    """
+    Get chess search object.
+
+    :return: iqChessSearch object.
+    """
+    global CHESS_SEARCH
+    if CHESS_SEARCH is None:
+        CHESS_SEARCH = iqChessSearch()
+    return CHESS_SEARCH
+
+
+def setChessSearch(chess_search):
+    """
+    Set chess search object.
+
+    :param chess_search: iqChessSearch object.
+    """
+    global CHESS_SEARCH
+    CHESS_SEARCH = chess_search
 
 
 def evaluateBoard(board):
     """
+    Evaluate board position.
+
+    :param board: Board object.
+    :return: Score. Positive value is for white.
     """
-    total_evaluation = 0
-    for i_rank in range(len(chess.RANK_NAMES)):
-        for i_file in range(len(chess.FILE_NAMES)):
-            piece_idx = i_rank * len(chess.RANK_NAMES) + i_file
-            piece = board.piece_map().get(piece_idx, None)
-            total_evaluation += getPieceValue(piece, i_rank, i_file)
+    total_evaluation = 0.0
+    for color in chess.COLORS:
+        for piece_type in chess.PIECE_TYPES:
+            square_values = SQUARE_VALUES[color][piece_type]
+            for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                total_evaluation += square_values[square]
     return total_evaluation
 
 
 def getPieceValue(piece, x, y):
     """
+    Get piece value.
+
+    :param piece: Piece object.
+    :param x: File index.
+    :param y: Row index of the evaluation table. Row 0 is rank 8.
+    :return: Value. Positive value is for white.
     """
     if piece is None:
         return 0
@@ -357,6 +693,28 @@ def getAbsoluteValue(piece, is_white, x, y):
     print('Unknown piece type <%s>' % piece.type)
 
 
+def createSquareValues():
+    """
+    Create piece values by square.
+
+    :return: [color][piece type][square] value list. Positive value is for white.
+    """
+    square_values = [[[0.0] * len(chess.SQUARES) for piece_type in range(chess.KING + 1)]
+                     for color in (chess.BLACK, chess.WHITE)]
+    for color in chess.COLORS:
+        for piece_type in chess.PIECE_TYPES:
+            piece = chess.Piece(piece_type, color)
+            for square in chess.SQUARES:
+                square_values[color][piece_type][square] = getPieceValue(piece,
+                                                                         chess.square_file(square),
+                                                                         len(chess.RANK_NAMES) - 1 - chess.square_rank(square))
+    return square_values
+
+
+# Piece values by square: [color][piece type][square]
+SQUARE_VALUES = createSquareValues()
+
+
 def clear():
     """
 
@@ -39,8 +39,9 @@ from iq.util import log_func
 from iq.util import str_func
 from iq.util import exec_func
 from iq.util import dt_func
+from iq.util import instrument_func
 
-__version__ = (0, 0, 3, 7)
+__version__ = (0, 0, 3, 8)
 
 # Report cell tags:
 # query table field values
@@ -249,6 +250,7 @@ class iqReportGenerator(object):
         # Cell format dictionary
         self._cell_format = dict()
 
+    @instrument_func.timed('report_generator.generate')
     def generate(self, rep_template, query_table, name_space=None, coord_fill=None):
         """
         Generate report.
@@ -26,8 +26,13 @@ sudo apt-get install python3-reportlab
 import traceback
 import os
 import os.path
+import io
+import time
+import queue
+import threading
 import wx
 from reportlab.pdfgen import canvas
+from reportlab.lib import utils as reportlab_utils
 
 from iq.util import log_func
 from iq.util import file_func
@@ -45,7 +50,7 @@ except ImportError:
     log_func.error('Import error sane. For install: sudo apt install --assume-yes python3-sane', is_force_print=True)
 
 
-__version__ = (0, 2, 1, 5)
+__version__ = (0, 2, 2, 1)
 
 # Scan modes
 GREY_SCAN_MODE = 'Grey'
@@ -105,11 +110,203 @@ DEFAULT_IMAGE_PAGE_SIZE = (4961, 7016)
 # Error message when a document is jammed in the feed tray
 DOC_FEEDER_JAMMED_ERR = 'error: Document feeder jammed'
 
+# Scanned page queue size of the multipage scan pipeline.
+# Acquisition of the next page overlaps with writing of the previous pages to PDF.
+# If 0 then pages are written to PDF in the scan thread
+SCAN_PAGE_QUEUE_SIZE = 2
+
+# In-process dummy scan device name. Used for testing and benchmarks without hardware
+DUMMY_SCAN_DEVICE_NAME = 'dummy'
+# Dummy scan device page image size in dots (A4 150 dpi)
+DUMMY_IMAGE_PAGE_SIZE = (1240, 1754)
+
+
+class iqDummyScanDevice(object):
+    """
+    In-process dummy scan device.
+    Emulates the python-sane device object with the generated page images.
+    """
+    def __init__(self, page_count=10, image_size=DUMMY_IMAGE_PAGE_SIZE, scan_delay=0.0):
+        """
+        Constructor.
+
+        :param page_count: Page number in the document feeder.
+        :param image_size: Page image size in dots.
+        :param scan_delay: Acquisition time of one page in seconds.
+        """
+        self.page_count = page_count
+        self.image_size = image_size
+        self.scan_delay = scan_delay
+
+        self.source = FLATBED_SOURCE
+        self.mode = GREY_SCAN_MODE
+        self.depth = DEFAULT_DEPTH
+
+    def get_options(self):
+        """
+        Get scan options in python-sane format:
+            (index, name, title, description, type, unit, size, capability, constraint).
+        """
+        return [(1, 'source', 'Source', 'Scan source', 3, 0, 32, 5, list(SCAN_SOURCES)),
+                (2, 'mode', 'Mode', 'Scan mode', 3, 0, 32, 5, list(SCAN_MODES)),
+                (3, 'depth', 'Depth', 'Bit depth', 1, 0, 4, 5, [1, 8])]
+
+    def get_parameters(self):
+        """
+        Get scan parameters in python-sane format:
+            (format, last frame, (pixels per line, lines), depth, bytes per line).
+        """
+        color = self.mode == COLOR_SCAN_MODE
+        return ('color' if color else 'gray', 1, self.image_size, self.depth,
+                self.image_size[0] * (3 if color else 1))
+
+    def start(self):
+        """
+        Start scan.
+        """
+        pass
+
+    def close(self):
+        """
+        Close device.
+        """
+        pass
+
+    def createPageImage(self, n):
+        """
+        Create page image.
+
+        :param n: Page number.
+        :return: PIL.Image object.
+        """
+        import PIL.Image
+        import PIL.ImageDraw
+
+        image = PIL.Image.new('RGB' if self.mode == COLOR_SCAN_MODE else 'L', self.image_size, 'white')
+        draw = PIL.ImageDraw.Draw(image)
+        width, height = self.image_size
+        draw.rectangle((width // 20, height // 20, width - width // 20, height - height // 20), outline='black', width=3)
+        for i_line in range(height // 40):
+            y = height // 10 + i_line * 30
+            if y > height - height // 10:
+                break
+            draw.text((width // 10, y), u'Page %d. Line %d. Scanned document text' % (n + 1, i_line + 1), fill='black')
+        return image
+
+    def snap(self):
+        """
+        Scan one page.
+
+        :return: PIL.Image object.
+        """
+        if self.scan_delay:
+            time.sleep(self.scan_delay)
+        return self.createPageImage(0)
+
+    def multi_scan(self):
+        """
+        Scan all pages of the document feeder.
+
+        :return: PIL.Image object iterator.
+        """
+        for n in range(self.page_count):
+            if self.scan_delay:
+                time.sleep(self.scan_delay)
+            yield self.createPageImage(n)
+
+
+class iqScanPageWriter(object):
+    """
+    Writer of scanned pages to PDF canvas.
+    Pages are passed in memory through the queue to the writer thread.
+    """
+    def __init__(self, scan_manager, scan_canvas, queue_size=None):
+        """
+        Constructor.
+
+        :param scan_manager: Scan manager object.
+        :param scan_canvas: PDF canvas object.
+        :param queue_size: Page queue size. If None then SCAN_PAGE_QUEUE_SIZE is used.
+            If 0 then pages are written in the calling thread.
+        """
+        if queue_size is None:
+            queue_size = SCAN_PAGE_QUEUE_SIZE
+        self.scan_manager = scan_manager
+        self.scan_canvas = scan_canvas
+        self.page_count = 0
+        self.exception = None
+
+        self.page_queue = None
+        self.thread = None
+        if queue_size > 0:
+            self.page_queue = queue.Queue(maxsize=queue_size)
+            self.thread = threading.Thread(target=self._run, name='ScanPageWriter', daemon=True)
+            self.thread.start()
+
+    def _writePage(self, image, n):
+        """
+        Write page to PDF canvas.
+        After an error the pages are skipped.
+        """
+        if self.exception is not None:
+            return
+        try:
+            if self.scan_manager._imageDrawCanvas(image, self.scan_canvas, n):
+                self.page_count += 1
+        except Exception as exception:
+            log_func.fatal(u'Error writing scanned page [%d] to PDF file' % n)
+            self.exception = exception
+
+    def _run(self):
+        """
+        Writer thread function.
+        """
+        while True:
+            page = self.page_queue.get()
+            if page is None:
+                break
+            self._writePage(*page)
+
+    def put(self, image, n):
+        """
+        Put scanned page to write.
+        Blocks while the page queue is full.
+
+        :param image: Image object of the scanned page.
+        :param n: Page number.
+        """
+        if self.page_queue is None:
+            self._writePage(image, n)
+        else:
+            self.page_queue.put((image, n))
+
+    def close(self):
+        """
+        Wait for all pages to be written.
+        The error of the writer thread is raised.
+
+        :return: Written page number.
+        """
+        if self.thread is not None:
+            self.page_queue.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.exception is not None:
+            raise self.exception
+        return self.page_count
+
 
 class iqScanManager(object):
     """
     Scan Management Manager.
     """
+    def __init__(self):
+        """
+        Constructor.
+        """
+        self.scan_device_obj = None
+        self.options = dict()
+
     def init(self):
         """
         Initialization.
@@ -174,11 +371,15 @@ class iqScanManager(object):
         Open scan device.
 
         :param device_name: The name of the scan device.
+            DUMMY_SCAN_DEVICE_NAME - in-process dummy scan device.
         :return: Scan device object.
         """
         try:
             log_func.info(u'Open scan device <%s>' % device_name)
-            self.scan_device_obj = sane.open(device_name)
+            if device_name == DUMMY_SCAN_DEVICE_NAME:
+                self.scan_device_obj = iqDummyScanDevice()
+            else:
+                self.scan_device_obj = sane.open(device_name)
             self.initOptionsOrder()
         except:
             log_func.fatal(u'Error opening scan device <%s>' % device_name)
@@ -387,17 +588,38 @@ class iqScanManager(object):
         :return: True/False.
         """
         if image is not None and image.getbbox() is not None:
-            img_filename = MULTISCAN_PAGE_FILENAME % n
             width, height = page_size
             image = image.resize((int(width), int(height)))
-            image.save(img_filename)
-            canvas.drawImage(img_filename, 0, 0)
+            # The page is encoded as JPEG in memory.
+            # JPEG data is embedded in PDF without re-encoding
+            jpeg_file = io.BytesIO()
+            image.save(jpeg_file, format='JPEG')
+            jpeg_file.seek(0)
+            canvas.drawImage(reportlab_utils.ImageReader(jpeg_file), 0, 0)
             canvas.showPage()
             return True
         else:
             log_func.warning(u'Error writing scanned page [%d] to PDF file' % n)
         return False
 
+    def _iterScanImages(self, scan, n_page=-1):
+        """
+        Iterate scanned page images.
+
+        :param scan: Multipage scan iterator of the device.
+        :param n_page: The number of scanned pages.
+            If -1, then all possible pages are scanned.
+        :return: Image object iterator.
+        """
+        i_page = 0
+        while n_page < 0 or i_page < n_page:
+            try:
+                image = scan.next() if hasattr(scan, 'next') else next(scan)
+            except StopIteration:
+                break
+            yield image
+            i_page += 1
+
     def scanMulti(self, scan_filename=None, n_page=-1):
         """
         Multipage scanning.
@@ -409,6 +631,7 @@ class iqScanManager(object):
             ~ / .icscanner / scan.pdf
         :param n_page: The number of scanned pages.
             If -1, then all possible pages are scanned.
+            Acquisition of the next page overlaps with writing of the previous pages to PDF.
         :return: True/False.
         """
         if scan_filename is None:
@@ -427,40 +650,12 @@ class iqScanManager(object):
             scan = self.scan_device_obj.multi_scan()
 
             scan_canvas = canvas.Canvas(scan_filename, pagesize=DEFAULT_IMAGE_PAGE_SIZE)
-
-            if n_page < 0:
-                # Scan all possible pages
-                is_stop_scan = False
-                i_page = 0
-                while not is_stop_scan:
-                    image = None
-                    try:
-                        image = scan.next() if hasattr(scan, 'next') else next(scan)
-                    except StopIteration:
-                        is_stop_scan = True
-                        continue
-                    except _sane.error:
-                        raise
-
-                    result = self._imageDrawCanvas(image, scan_canvas, i_page)
-                    if not result:
-                        continue
-
-                    i_page += 1
-            else:
-                # Scan specific number of pages
-                for i_page in range(n_page):
-                    image = None
-                    try:
-                        image = scan.next() if hasattr(scan, 'next') else next(scan)
-                    except StopIteration:
-                        continue
-                    except _sane.error:
-                        raise
-
-                    result = self._imageDrawCanvas(image, scan_canvas, i_page)
-                    if not result:
-                        continue
+            page_writer = iqScanPageWriter(self, scan_canvas)
+            try:
+                for i_page, image in enumerate(self._iterScanImages(scan, n_page)):
+                    page_writer.put(image, i_page)
+            finally:
+                page_writer.close()
             # Save PDF Canvas
             scan_canvas.save()
             return True